@@ -0,0 +1,209 @@
+'''
+
+Benchmark suite for the data extraction, running on deterministic synthetic match data
+(see ressources/synthetic_data.py), so neither a database nor API access is needed.
+
+Every stage is timed at several corpus sizes, reporting the throughput (matches per second, match
+histories per second for getRelevantMatchesFromHistory) and the peak memory (measured in a separate
+run with tracemalloc, which slows down the execution). The throughput is compared to a stored
+baseline, the script exits with an error if a stage got slower than the allowed tolerance.
+
+Usage (from the project folder):
+    python src/benchmark_extraction.py                      # Compare with the baseline
+    python src/benchmark_extraction.py --update-baseline    # Store the results as new baseline
+
+'''
+
+
+###
+# Imports
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+    import src.ressources.data_processing as dataProcessing
+    import src.ressources.api_data_transformations as apiDataTransformations
+    import src.ressources.synthetic_data as syntheticData
+except Exception:
+    import ressources.constants as const
+    import ressources.data_processing as dataProcessing
+    import ressources.api_data_transformations as apiDataTransformations
+    import ressources.synthetic_data as syntheticData
+
+
+###
+# Logging
+logging.basicConfig(level = 'INFO') # Set to DEBUG for more informations
+logger = logging.getLogger(__name__)
+
+
+###
+# Functions
+
+##
+# Run a single stage
+def runStage(stageFunction: Callable[[], None], nUnits: int) -> Dict:
+    '''
+    Time a stage (best of several repetitions to reduce the noise), then run it once more with
+    tracemalloc to get the peak memory
+    '''
+
+    durations = list()
+    for _ in range(const.BENCHMARK_REPETITIONS):
+        startTime = time.perf_counter()
+        stageFunction()
+        durations.append(time.perf_counter() - startTime)
+
+    duration = min(durations)
+
+    tracemalloc.start()
+    stageFunction()
+    _, peakMemory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return({'Seconds': duration, 'MatchesPerSecond': nUnits / duration, 'PeakMemoryMB': peakMemory / 2**20})
+
+
+##
+# Benchmark all stages for one corpus size
+def benchmarkCorpusSize(nMatches: int) -> Dict:
+    '''
+    Generate a corpus of the given size and benchmark all stages on it
+    '''
+
+    logger.info('Benchmark corpus with %i matches', nMatches)
+
+    ###
+    # Prepare the inputs of every stage (not timed)
+    legendaryItemsIds, mythicItemsIds, _ = syntheticData.getSyntheticItemInformation()
+
+    corpus = list(syntheticData.generateSyntheticCorpus(nMatches = nMatches, seed = nMatches))
+    queueAndChampionIds = [dataProcessing.extractQueueAndChampions(matchData) for matchData in corpus]
+    extractedData = [dataProcessing.extractBoughtMythicAndLegendaryItems(matchData = matchData,
+        legendaryItemsIds = legendaryItemsIds, mythicItemsIds = mythicItemsIds,
+        queueAndChampionIds = queueAndChampionIds[ct], ct = ct) for ct, matchData in enumerate(corpus)]
+
+    rng = random.Random(nMatches)
+    matchHistories = [syntheticData.generateSyntheticMatchHistory(rng = rng) for _ in range(nMatches)]
+
+
+    ###
+    # Stages
+    stages = {
+        'extractQueueAndChampions': lambda: [dataProcessing.extractQueueAndChampions(matchData)
+            for matchData in corpus],
+        'extractItemEvents': lambda: [dataProcessing.extractItemEvents(matchData = matchData,
+            legendaryItemsIds = legendaryItemsIds, mythicItemsIds = mythicItemsIds) for matchData in corpus],
+        'extractBoughtMythicAndLegendaryItems': lambda: [dataProcessing.extractBoughtMythicAndLegendaryItems(
+            matchData = matchData, legendaryItemsIds = legendaryItemsIds, mythicItemsIds = mythicItemsIds,
+            queueAndChampionIds = queueAndChampionIds[ct], ct = ct) for ct, matchData in enumerate(corpus)],
+        'concatenateAndSaveExtractedData': lambda: dataProcessing.concatenateAndSaveExtractedData(
+            region = 'benchmark', firstMythicItemCollected = [firstMythicItem for firstMythicItem, _ in extractedData],
+            legendaryAndMythicItemsCollected = [legendaryAndMythicItems for _, legendaryAndMythicItems
+                in extractedData], mythicItemsIds = mythicItemsIds),
+        'getRelevantMatchesFromHistory': lambda: [apiDataTransformations.getRelevantMatchesFromHistory(
+            matchHistory = matchHistory) for matchHistory in matchHistories]
+    }
+
+    return({stageName: runStage(stageFunction = stageFunction, nUnits = nMatches)
+        for stageName, stageFunction in stages.items()})
+
+
+##
+# Compare with the baseline
+def compareWithBaseline(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    '''
+    Return a description of every stage and corpus size which is slower than the baseline allows
+    '''
+
+    regressions = list()
+    for nMatches, stageResults in results.items():
+        for stageName, stageResult in stageResults.items():
+            if (baselineResult := baseline.get(nMatches, dict()).get(stageName, None)) is None:
+                continue
+
+            if stageResult['MatchesPerSecond'] < baselineResult['MatchesPerSecond'] * (1 - tolerance):
+                regressions.append('{} with {} matches: {:.1f}/s, baseline {:.1f}/s'.format(stageName, nMatches,
+                    stageResult['MatchesPerSecond'], baselineResult['MatchesPerSecond']))
+
+    return(regressions)
+
+
+###
+# Main
+if __name__ == '__main__':
+    ###
+    # Arguments
+    argumentParser = argparse.ArgumentParser(description = 'Benchmark the data extraction on synthetic matches')
+    argumentParser.add_argument('--sizes', type = int, nargs = '+', default = const.BENCHMARK_CORPUS_SIZES,
+        help = 'Corpus sizes (number of matches)')
+    argumentParser.add_argument('--update-baseline', action = 'store_true',
+        help = 'Store the results as new baseline instead of comparing with it')
+    argumentParser.add_argument('--tolerance', type = float, default = const.BENCHMARK_TOLERANCE,
+        help = 'Allowed relative loss in throughput compared to the baseline')
+    arguments = argumentParser.parse_args()
+
+    baselinePath = os.path.abspath('{}{}'.format(const.FOLDER_DATA, const.BENCHMARK_BASELINE))
+
+    # A missing baseline is an error (it is only stored on request), checked before the benchmark runs
+    if not arguments.update_baseline and not os.path.isfile(baselinePath):
+        logger.error('No baseline found at %s, store one with --update-baseline', baselinePath)
+
+        sys.exit(1)
+
+
+    ###
+    # Run the benchmarks inside a temporary folder, as the stage saving the data writes to file
+    workingDirectory = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as temporaryDirectory:
+        os.chdir(temporaryDirectory)
+        os.makedirs(const.FOLDER_DATA)
+
+        try:
+            results = {str(nMatches): benchmarkCorpusSize(nMatches = nMatches) for nMatches in arguments.sizes}
+        finally:
+            os.chdir(workingDirectory)
+
+
+    ###
+    # Report
+    for nMatches, stageResults in results.items():
+        for stageName, stageResult in stageResults.items():
+            logger.info('%-40s %6s matches: %10.1f matches/s, %8.3f s, peak memory %8.1f MB', stageName, nMatches,
+                stageResult['MatchesPerSecond'], stageResult['Seconds'], stageResult['PeakMemoryMB'])
+
+
+    ###
+    # Store the baseline or compare with it
+    if arguments.update_baseline:
+        os.makedirs(os.path.dirname(baselinePath), exist_ok = True)
+
+        with open(baselinePath, 'w') as baselineFile:
+            json.dump(results, baselineFile, indent = 1)
+
+        logger.info('Baseline saved to %s', baselinePath)
+
+    else:
+        with open(baselinePath, 'r') as baselineFile:
+            baseline = json.load(baselineFile)
+
+        if regressions := compareWithBaseline(results = results, baseline = baseline, tolerance = arguments.tolerance):
+            for regression in regressions:
+                logger.error('Regression: %s', regression)
+
+            sys.exit(1)
+
+        logger.info('No regressions compared to the baseline')
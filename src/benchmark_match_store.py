@@ -0,0 +1,183 @@
+'''
+
+Benchmark of the match stores (see ressources/match_store.py) on deterministic synthetic matches
+(see ressources/synthetic_data.py): every backend ingests the same matches one by one (as the crawler
+does), then the ids of the time window are selected and all matches are scanned (as the extraction does)
+with a newly opened store. Reported are the throughput of the ingest and the scan (matches per second),
+the duration of the window selection and the size on disk.
+
+The local store is written to a temporary folder. The MongoDB store uses a separate database
+(const.BENCHMARK_MATCH_STORE_DATABASE, dropped afterwards) and is skipped if no server is reachable.
+
+Usage (from the project folder):
+    python src/benchmark_match_store.py
+    python src/benchmark_match_store.py --matches 10000 --backends local
+
+'''
+
+
+###
+# Imports
+import argparse
+import logging
+import os
+import tempfile
+import time
+from typing import Callable, Dict, List, Union
+
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+    import src.ressources.match_store as matchStore
+    import src.ressources.storage_layout as storageLayout
+    import src.ressources.synthetic_data as syntheticData
+except Exception:
+    import ressources.constants as const
+    import ressources.match_store as matchStore
+    import ressources.storage_layout as storageLayout
+    import ressources.synthetic_data as syntheticData
+
+
+###
+# Logging
+logging.basicConfig(level = 'INFO') # Set to DEBUG for more informations
+logger = logging.getLogger(__name__)
+
+
+###
+# Set run-specific constants
+BENCHMARK_REGION = 'benchmark'
+
+
+###
+# Functions
+
+##
+# Benchmark one store
+def benchmarkStore(openStore: Callable[[], matchStore.MatchStore], corpus: List[Dict],
+        getSizeOnDisk: Callable[[matchStore.MatchStore], int]) -> Dict:
+    '''
+    Ingest the corpus (match documents with the timeline in 'timeline' and the id in '_id') into a new store,
+    then time the window selection and the scan of all matches with a newly opened store
+    '''
+
+    ###
+    # Ingest, match by match
+    store = openStore()
+    store.setupRegion(region = BENCHMARK_REGION)
+
+    startTime = time.perf_counter()
+    for matchDocument in corpus:
+        store.saveMatch(region = BENCHMARK_REGION, matchId = matchDocument['_id'],
+            matchInformation = {field: value for field, value in matchDocument.items()
+                if field not in ('_id', 'timeline')}, matchTimeline = matchDocument['timeline'])
+    ingestSeconds = time.perf_counter() - startTime
+
+    store.close()
+
+
+    ###
+    # Window selection and scan
+    store = openStore()
+
+    startTime = time.perf_counter()
+    matchIdsInWindow = store.getMatchIdsInWindow(region = BENCHMARK_REGION)
+    windowSeconds = time.perf_counter() - startTime
+
+    startTime = time.perf_counter()
+    nScanned = sum(1 for _ in store.iterateMatches(region = BENCHMARK_REGION))
+    scanSeconds = time.perf_counter() - startTime
+
+    if nScanned != len(corpus):
+        raise AssertionError('{} of {} matches scanned'.format(nScanned, len(corpus)))
+
+    sizeOnDisk = getSizeOnDisk(store)
+    store.close()
+
+    return({'IngestPerSecond': len(corpus) / ingestSeconds, 'ScanPerSecond': nScanned / scanSeconds,
+        'WindowSeconds': windowSeconds, 'NMatchesInWindow': len(matchIdsInWindow), 'SizeOnDiskMB': sizeOnDisk / 2**20})
+
+
+##
+# Benchmark the local store
+def benchmarkLocalStore(corpus: List[Dict]) -> Dict:
+    '''
+    Benchmark the local store in a temporary folder
+    '''
+
+    with tempfile.TemporaryDirectory() as temporaryDirectory:
+        storeFolder = os.path.join(temporaryDirectory, '{region}', '')
+
+        return(benchmarkStore(openStore = lambda: matchStore.openMatchStore(backend = const.MATCH_STORE_LOCAL,
+            folder = storeFolder), corpus = corpus, getSizeOnDisk = lambda store: sum(os.path.getsize(entry.path)
+                for entry in os.scandir(store.getRegionFolder(region = BENCHMARK_REGION)))))
+
+
+##
+# Benchmark the MongoDB store
+def benchmarkMongoStore(corpus: List[Dict]) -> Union[Dict, None]:
+    '''
+    Benchmark the MongoDB store in the benchmark database (dropped afterwards). Returns None if no server
+    is reachable
+    '''
+
+    mongoDbClient = MongoClient(const.MONGODB_PATH,
+        serverSelectionTimeoutMS = const.BENCHMARK_MATCH_STORE_SERVER_TIMEOUT_MS)
+    try:
+        mongoDbClient.admin.command('ping')
+    except PyMongoError as mongoError:
+        logger.warning('MongoDB server not reachable, benchmark of the MongoDB store skipped (%s)', mongoError)
+        return(None)
+
+    try:
+        mongoDbClient.drop_database(const.BENCHMARK_MATCH_STORE_DATABASE)
+
+        return(benchmarkStore(openStore = lambda: matchStore.openMatchStore(backend = const.MATCH_STORE_MONGODB,
+            databaseName = const.BENCHMARK_MATCH_STORE_DATABASE), corpus = corpus,
+            getSizeOnDisk = lambda store: sum(collectionStatistics['StorageSize'] + collectionStatistics['IndexSize']
+                for collectionStatistics in storageLayout.getRegionStatistics(mongoDbDatabase = store.mongoDbDatabase,
+                    region = BENCHMARK_REGION))))
+
+    finally:
+        mongoDbClient.drop_database(const.BENCHMARK_MATCH_STORE_DATABASE)
+        mongoDbClient.close()
+
+
+###
+# Main
+if __name__ == '__main__':
+    ###
+    # Arguments
+    argumentParser = argparse.ArgumentParser(description = 'Benchmark the match stores on synthetic matches')
+    argumentParser.add_argument('--matches', type = int, default = const.BENCHMARK_MATCH_STORE_MATCHES,
+        help = 'Number of matches')
+    argumentParser.add_argument('--backends', nargs = '+', choices = [const.MATCH_STORE_MONGODB,
+        const.MATCH_STORE_LOCAL], default = [const.MATCH_STORE_MONGODB, const.MATCH_STORE_LOCAL],
+        help = 'Backends to benchmark')
+    arguments = argumentParser.parse_args()
+
+
+    ###
+    # Benchmark the backends on the same matches
+    corpus = list(syntheticData.generateSyntheticCorpus(nMatches = arguments.matches))
+
+    benchmarkFunctions = {const.MATCH_STORE_MONGODB: benchmarkMongoStore, const.MATCH_STORE_LOCAL: benchmarkLocalStore}
+
+    results = {backend: benchmarkFunctions[backend](corpus = corpus) for backend in arguments.backends}
+
+
+    ###
+    # Report
+    for backend, backendResult in results.items():
+        if backendResult is None:
+            continue
+
+        logger.info('%-8s %i matches: ingest %8.1f matches/s, scan %8.1f matches/s, window %6.3f s (%i matches), '
+            '%.1f MB on disk', backend, arguments.matches, backendResult['IngestPerSecond'],
+            backendResult['ScanPerSecond'], backendResult['WindowSeconds'], backendResult['NMatchesInWindow'],
+            backendResult['SizeOnDiskMB'])
@@ -0,0 +1,210 @@
+'''
+
+Benchmark of the startup time of the entry points (get_data_from_api.py and extract_item_data.py).
+Every entry point is imported (without running its main loop) in a fresh interpreter with -X importtime,
+several times, and the fastest import time is reported together with its most expensive imports.
+
+The import time is compared to a stored baseline, and the modules which an entry point must not import
+at its start are checked (const.BENCHMARK_STARTUP_ENTRY_POINTS, e.g. pandas for the crawler). The script
+exits with an error if an entry point got slower than the allowed tolerance or imports such a module.
+The baseline depends on the machine, so it is not part of the repository and has to be stored once with
+--update-baseline (a missing baseline is an error).
+
+Usage (from the project folder):
+    python src/benchmark_startup.py                      # Compare with the baseline
+    python src/benchmark_startup.py --update-baseline    # Store the results as new baseline
+
+'''
+
+
+###
+# Imports
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+except Exception:
+    import ressources.constants as const
+
+
+###
+# Logging
+logging.basicConfig(level = 'INFO') # Set to DEBUG for more informations
+logger = logging.getLogger(__name__)
+
+
+###
+# Set run-specific constants
+FOLDER_SOURCE = os.path.dirname(os.path.abspath(__file__))
+
+# Number of most expensive imports reported per entry point
+N_TOP_IMPORTS = 5
+
+# Code run in the fresh interpreter: import the entry point like a script would (source folder first on
+# the path) and print the loaded modules
+IMPORT_CODE = 'import json, sys; sys.path.insert(0, {folder!r}); import {entryPoint}; print(json.dumps(sorted(sys.modules)))'
+
+
+###
+# Functions
+
+##
+# Import an entry point in a fresh interpreter
+def importEntryPoint(entryPoint: str) -> Tuple[float, List[Tuple[str, float]], List[str]]:
+    '''
+    Import the entry point in a new interpreter with -X importtime. Returns the import time of the entry
+    point in seconds, its direct imports with their import time (most expensive first) and the loaded modules
+    '''
+
+    importProcess = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+        IMPORT_CODE.format(folder = FOLDER_SOURCE, entryPoint = entryPoint)], capture_output = True, text = True,
+        check = True)
+
+
+    ###
+    # Parse the import times (lines 'import time: self [us] | cumulative | name', the name is indented by
+    # two spaces per nesting level and printed after all its imports)
+    importTime = None
+    directImports = list()
+
+    for importLine in importProcess.stderr.splitlines():
+        if not importLine.startswith('import time:') or 'cumulative' in importLine:
+            continue
+
+        _, cumulativeMicroseconds, moduleName = importLine[len('import time:'):].split('|')
+        nestingLevel = (len(moduleName) - len(moduleName.lstrip(' ')) - 1) // 2
+
+        if nestingLevel == 0:
+            if moduleName.strip() == entryPoint:
+                importTime = int(cumulativeMicroseconds) / 1e6
+                break
+
+            directImports = list()
+
+        elif nestingLevel == 1:
+            directImports.append((moduleName.strip(), int(cumulativeMicroseconds) / 1e6))
+
+    if importTime is None:
+        raise AssertionError('Import time of entry point {} not found'.format(entryPoint))
+
+    return(importTime, sorted(directImports, key = lambda directImport: -directImport[1]),
+        json.loads(importProcess.stdout.splitlines()[-1]))
+
+
+##
+# Benchmark an entry point
+def benchmarkEntryPoint(entryPoint: str, forbiddenModules: List[str]) -> Dict:
+    '''
+    Import the entry point several times (fastest run reported, the first runs also fill the file system
+    cache) and find the loaded modules which it must not import
+    '''
+
+    logger.info('Benchmark startup of %s', entryPoint)
+
+    importRuns = list()
+    for _ in range(const.BENCHMARK_STARTUP_REPETITIONS):
+        startTime = time.perf_counter()
+        importTime, directImports, loadedModules = importEntryPoint(entryPoint = entryPoint)
+        importRuns.append({'ImportSeconds': importTime, 'ProcessSeconds': time.perf_counter() - startTime,
+            'TopImports': directImports[:N_TOP_IMPORTS]})
+
+    fastestRun = min(importRuns, key = lambda importRun: importRun['ImportSeconds'])
+
+
+    ###
+    # Modules which are loaded but should not be (also found if imported as src.ressources.*)
+    fastestRun['ForbiddenModules'] = sorted({forbiddenModule for forbiddenModule in forbiddenModules
+        for loadedModule in loadedModules if loadedModule == forbiddenModule
+            or loadedModule.startswith('{}.'.format(forbiddenModule))
+            or loadedModule.endswith('.{}'.format(forbiddenModule))})
+
+    return(fastestRun)
+
+
+##
+# Compare with the baseline
+def compareWithBaseline(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    '''
+    Return a description of every entry point which imports slower than the baseline allows
+    '''
+
+    regressions = list()
+    for entryPoint, result in results.items():
+        if (baselineResult := baseline.get(entryPoint, None)) is None:
+            continue
+
+        if result['ImportSeconds'] > baselineResult['ImportSeconds'] * (1 + tolerance):
+            regressions.append('{}: import {:.3f} s, baseline {:.3f} s'.format(entryPoint, result['ImportSeconds'],
+                baselineResult['ImportSeconds']))
+
+    return(regressions)
+
+
+###
+# Main
+if __name__ == '__main__':
+    ###
+    # Arguments
+    argumentParser = argparse.ArgumentParser(description = 'Benchmark the startup time of the entry points')
+    argumentParser.add_argument('--entry-points', nargs = '+', default = list(const.BENCHMARK_STARTUP_ENTRY_POINTS),
+        help = 'Entry points (module names in the source folder)')
+    argumentParser.add_argument('--update-baseline', action = 'store_true',
+        help = 'Store the results as new baseline instead of comparing with it')
+    argumentParser.add_argument('--tolerance', type = float, default = const.BENCHMARK_STARTUP_TOLERANCE,
+        help = 'Allowed relative increase of the import time compared to the baseline')
+    arguments = argumentParser.parse_args()
+
+    baselinePath = os.path.abspath('{}{}'.format(const.FOLDER_DATA, const.BENCHMARK_STARTUP_BASELINE))
+
+
+    ###
+    # Benchmark and report
+    results = {entryPoint: benchmarkEntryPoint(entryPoint = entryPoint,
+        forbiddenModules = const.BENCHMARK_STARTUP_ENTRY_POINTS.get(entryPoint, list()))
+        for entryPoint in arguments.entry_points}
+
+    for entryPoint, result in results.items():
+        logger.info('%-20s import %6.3f s, process %6.3f s, most expensive imports: %s', entryPoint,
+            result['ImportSeconds'], result['ProcessSeconds'], ', '.join('{} {:.3f} s'.format(moduleName, moduleTime)
+                for moduleName, moduleTime in result['TopImports']))
+
+    failures = ['{} imports {}'.format(entryPoint, ', '.join(result['ForbiddenModules']))
+        for entryPoint, result in results.items() if result['ForbiddenModules']]
+
+
+    ###
+    # Store the baseline or compare with it (a missing baseline is an error, it is only stored on request, as the
+    # import times depend on the machine)
+    if arguments.update_baseline:
+        os.makedirs(os.path.dirname(baselinePath), exist_ok = True)
+        with open(baselinePath, 'w') as baselineFile:
+            json.dump(results, baselineFile, indent = 1)
+
+        logger.info('Baseline saved to %s', baselinePath)
+
+    elif not os.path.isfile(baselinePath):
+        failures.append('no baseline found at {}, store one with --update-baseline'.format(baselinePath))
+
+    else:
+        with open(baselinePath, 'r') as baselineFile:
+            baseline = json.load(baselineFile)
+
+        failures += compareWithBaseline(results = results, baseline = baseline, tolerance = arguments.tolerance)
+
+    if failures:
+        for failure in failures:
+            logger.error('Startup regression: %s', failure)
+
+        sys.exit(1)
+
+    logger.info('No startup regressions')
@@ -0,0 +1,69 @@
+'''
+
+Script to build the build order tries (queue -> champion -> first item -> ... -> fifth item with the number
+of participants per node) from the extracted data of the regions (extract_item_data.py, csv output). The
+data is read in chunks, the tries of the chunks are merged. If several regions are given, a trie over all
+regions is saved in addition (region 'all').
+
+Example to read a trie:
+    buildOrderTrie = buildTrie.BuildTrie.load(triePath = buildTrie.getBuildTriePath(region = 'euw1'))
+    buildOrderTrie.getNextItemDistribution(championId = 22, items = [6672])
+
+'''
+
+
+###
+# Imports
+import logging
+import os
+
+
+###
+# Load ressources
+try:
+    import src.ressources.build_trie as buildTrie
+    import src.ressources.constants as const
+    import src.ressources.data_processing as dataProcessing
+except Exception:
+    import ressources.build_trie as buildTrie
+    import ressources.constants as const
+    import ressources.data_processing as dataProcessing
+
+
+###
+# Logging
+logging.basicConfig(level = 'INFO') # Set to DEBUG for more informations
+logger = logging.getLogger(__name__)
+
+
+###
+# Set run-specific constants
+REGIONS = ['euw1']
+
+
+###
+# Main loop
+if __name__ == '__main__':
+    os.makedirs(const.FOLDER_BUILD_TRIES, exist_ok = True)
+
+    ###
+    # Build the trie of every region from the tries of the chunks
+    regionTries = list()
+    for region in REGIONS:
+        _, legendaryMythicDataPath = dataProcessing.getExtractedDataPaths(region = region)
+
+        regionTrie = buildTrie.BuildTrie.merge([buildTrie.BuildTrie.fromExtractedData(legendaryAndMythicItems = dataChunk)
+            for dataChunk in dataProcessing.readExtractedDataChunks(legendaryMythicDataPath = legendaryMythicDataPath,
+            columns = ['Item', 'Champion', 'Match', 'Queue'])])
+        regionTrie.save(triePath = buildTrie.getBuildTriePath(region = region))
+
+        logger.info('Build order trie of region %s with %i participants and %i nodes', region,
+            regionTrie.nodeCount[0], len(regionTrie.nodeCount))
+
+        regionTries.append(regionTrie)
+
+
+    ###
+    # Trie over all regions
+    if len(REGIONS) > 1:
+        buildTrie.BuildTrie.merge(regionTries).save(triePath = buildTrie.getBuildTriePath(region = 'all'))
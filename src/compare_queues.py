@@ -0,0 +1,67 @@
+'''
+
+Script to test the differences between queues (const.QUEUE_COMPARISONS, e.g. Normal against Ranked) and, with
+several regions, between the regions per queue, for every champion (chi-square/G-tests and permutation tests of
+the differences in diversity, see ressources/significance_tests.py). The tests run on the count cubes written by
+the extraction (extract_item_data.py), once for the mythic items and once for the item in the given slot. The
+results are saved to the data folder.
+
+'''
+
+
+###
+# Imports
+import logging
+
+import pandas as pd
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+    import src.ressources.significance_tests as significanceTests
+except Exception:
+    import ressources.constants as const
+    import ressources.significance_tests as significanceTests
+
+
+###
+# Logging
+logging.basicConfig(level = 'INFO') # Set to DEBUG for more informations
+logger = logging.getLogger(__name__)
+
+
+###
+# Set run-specific constants
+REGIONS = ['euw1']
+
+# Number of processes for the permutations (None uses all cores)
+MAX_WORKERS = None
+
+# Cube, the axis of the compared distributions and the selected labels of the other axes
+TESTED_DISTRIBUTIONS = {
+    const.COUNT_CUBE_MYTHIC: ('Mythic', None),
+    const.COUNT_CUBE_ITEM_SLOT: ('Item', {'Slot': 2})
+}
+
+
+###
+# Main loop
+if __name__ == '__main__':
+    for cubeName, (categoryAxis, fixedAxes) in TESTED_DISTRIBUTIONS.items():
+        testResults = [significanceTests.compareQueues(cubeName = cubeName, categoryAxis = categoryAxis,
+            regions = REGIONS, fixedAxes = fixedAxes, maxWorkers = MAX_WORKERS)]
+
+        if len(REGIONS) > 1:
+            testResults.append(significanceTests.compareRegions(cubeName = cubeName, categoryAxis = categoryAxis,
+                regions = REGIONS, fixedAxes = fixedAxes, maxWorkers = MAX_WORKERS))
+
+        testResults = pd.concat(testResults, ignore_index = True)
+
+        significancePath = '{}{}'.format(const.FOLDER_DATA, const.SIGNIFICANCE_FILE.format(cube = cubeName,
+            dateFrom = const.EARLIEST_DATE_FOR_GAMES, dateTo = const.LATEST_DATE_FOR_GAMES))
+        testResults.to_csv(significancePath, index = False)
+
+        logger.info('%i tests saved to %s, %i significant (G-test, Benjamini-Hochberg adjusted p < 0.05)',
+            testResults.shape[0], significancePath, int((testResults.get('GPBH', pd.Series(dtype = float)) < 0.05).sum()))
@@ -0,0 +1,42 @@
+'''
+
+Script to compute the champion similarities (distances between the mythic item distributions per queue and
+the champion orders of hierarchical clusterings, see ressources/champion_similarity.py) from the mythic count
+cube written by the extraction (extract_item_data.py). The results are cached in the data folder, the R script
+uses the champion orders for the heatmaps with USE_CHAMPION_ORDERS.
+
+'''
+
+
+###
+# Imports
+import logging
+
+
+###
+# Load ressources
+try:
+    import src.ressources.champion_similarity as championSimilarity
+except Exception:
+    import ressources.champion_similarity as championSimilarity
+
+
+###
+# Logging
+logging.basicConfig(level = 'INFO') # Set to DEBUG for more informations
+logger = logging.getLogger(__name__)
+
+
+###
+# Set run-specific constants
+REGIONS = ['euw1']
+
+
+###
+# Main loop
+if __name__ == '__main__':
+    for region in REGIONS:
+        championSimilarities = championSimilarity.loadChampionSimilarities(region = region)
+
+        for heatmapName, heatmapSimilarity in championSimilarities.items():
+            logger.info('Region %s, %s: %i champions', region, heatmapName, len(heatmapSimilarity['Champions']))
@@ -0,0 +1,54 @@
+'''
+
+Script to compute the item diversity metrics (entropy, effective number, Gini-Simpson, top-k share with
+bootstrap confidence intervals) per region, queue and champion from the count cubes written by the
+extraction (extract_item_data.py), once for the mythic items and once for the item in every slot of
+the first 5 legendary/mythic items. The results are saved to the data folder.
+
+'''
+
+
+###
+# Imports
+import logging
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+    import src.ressources.diversity_metrics as diversityMetrics
+except Exception:
+    import ressources.constants as const
+    import ressources.diversity_metrics as diversityMetrics
+
+
+###
+# Logging
+logging.basicConfig(level = 'INFO') # Set to DEBUG for more informations
+logger = logging.getLogger(__name__)
+
+
+###
+# Set run-specific constants
+REGIONS = ['euw1']
+
+# Number of processes for the bootstrap (None uses all cores)
+MAX_WORKERS = None
+
+# Cube and the axis over which the diversity is measured
+DIVERSITY_DISTRIBUTIONS = {const.COUNT_CUBE_MYTHIC: 'Mythic', const.COUNT_CUBE_ITEM_SLOT: 'Item'}
+
+
+###
+# Main loop
+if __name__ == '__main__':
+    for cubeName, categoryAxis in DIVERSITY_DISTRIBUTIONS.items():
+        diversityTable = diversityMetrics.computeDiversityTable(cubeName = cubeName, categoryAxis = categoryAxis,
+            regions = REGIONS, maxWorkers = MAX_WORKERS)
+
+        diversityPath = '{}{}'.format(const.FOLDER_DATA, const.DIVERSITY_FILE.format(cube = cubeName,
+            dateFrom = const.EARLIEST_DATE_FOR_GAMES, dateTo = const.LATEST_DATE_FOR_GAMES))
+        diversityTable.to_csv(diversityPath, index = False)
+
+        logger.info('Diversity metrics of %i groups saved to %s', diversityTable.shape[0], diversityPath)
@@ -0,0 +1,59 @@
+'''
+
+Script to compute the quantiles of the times at which the items were bought from the timing sketches
+written by the extraction (extract_item_data.py with ITEM_TIMINGS), merged over the regions: the time
+to the first mythic item (slot 0) and the time to the Nth legendary/mythic item (slots 1 to 5) per
+queue and champion, once per item and once over all items of a slot (Item 0). One table is saved per
+sketch (minutes and share of the game duration) to the data folder.
+
+'''
+
+
+###
+# Imports
+import logging
+
+import pandas as pd
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+    import src.ressources.timing_sketches as timingSketches
+except Exception:
+    import ressources.constants as const
+    import ressources.timing_sketches as timingSketches
+
+
+###
+# Logging
+logging.basicConfig(level = 'INFO') # Set to DEBUG for more informations
+logger = logging.getLogger(__name__)
+
+
+###
+# Set run-specific constants
+REGIONS = ['euw1']
+
+# Quantiles of the purchase times
+QUANTILES = const.TIMING_SKETCH_QUANTILES
+
+
+###
+# Main loop
+if __name__ == '__main__':
+    mergedTimingSketches = timingSketches.loadMergedTimingSketches(regions = REGIONS)
+
+    for sketchName, timingSketch in mergedTimingSketches.items():
+        quantileTable = pd.concat([
+            timingSketch.getQuantiles(quantiles = QUANTILES, groupBy = ['Queue', 'Champion', 'Slot', 'Item']),
+            timingSketch.getQuantiles(quantiles = QUANTILES, groupBy = ['Queue', 'Champion', 'Slot'])
+        ], ignore_index = True).sort_values(['Queue', 'Champion', 'Slot', 'Item'])
+
+        quantilePath = '{}{}'.format(const.FOLDER_DATA, const.TIMING_QUANTILES_FILE.format(sketch = sketchName,
+            dateFrom = const.EARLIEST_DATE_FOR_GAMES, dateTo = const.LATEST_DATE_FOR_GAMES))
+        quantileTable.to_csv(quantilePath, index = False)
+
+        logger.info('Timing quantiles of %i groups (%i matches, relative error %.3f) saved to %s', quantileTable.shape[0],
+            timingSketch.nMatches, timingSketch.relativeAccuracy, quantilePath)
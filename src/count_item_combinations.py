@@ -0,0 +1,113 @@
+'''
+
+Script to count the unordered item combinations (first 5 legendary/mythic items, without considering
+the order) per queue and champion from the extracted data of a region (extract_item_data.py, csv output).
+The counts are saved to the data folder together with the share of the most frequent build per champion.
+
+With USE_BUILD_SKETCHES, the approximate counts of the extraction (APPROXIMATE_BUILD_COUNTS in extract_item_data.py)
+are used instead: the sketches of the regions are merged and the top builds per queue and champion are saved with
+their error bounds.
+
+'''
+
+
+###
+# Imports
+import logging
+import sys
+
+import urllib3
+
+
+###
+# Load ressources
+try:
+    import src.ressources.api_requests as apiRequests
+    import src.ressources.build_sketches as buildSketches
+    import src.ressources.constants as const
+    import src.ressources.data_processing as dataProcessing
+    import src.ressources.item_combinations as itemCombinations
+    import src.ressources.metadata_requests as metadataRequests
+except Exception:
+    import ressources.api_requests as apiRequests
+    import ressources.build_sketches as buildSketches
+    import ressources.constants as const
+    import ressources.data_processing as dataProcessing
+    import ressources.item_combinations as itemCombinations
+    import ressources.metadata_requests as metadataRequests
+
+
+###
+# Logging
+logging.basicConfig(level = 'INFO') # Set to DEBUG for more informations
+logger = logging.getLogger(__name__)
+
+
+###
+# Set run-specific constants
+REGION = 'euw1'
+
+# Use the approximate counts (build sketches) of the given regions instead of the exact counts
+USE_BUILD_SKETCHES = False
+SKETCH_REGIONS = ['euw1']
+
+
+###
+# Main loop
+if __name__ == '__main__':
+    ###
+    # Suppress SSL warnings (has to be disabled due to proxy)
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+    ###
+    # Top builds from the merged sketches of the regions
+    if USE_BUILD_SKETCHES:
+        buildSketch = buildSketches.loadMergedBuildSketch(regions = SKETCH_REGIONS)
+        heavyHitters = buildSketch.getHeavyHitters()
+
+        heavyHittersPath = '{}{}'.format(const.FOLDER_BUILD_SKETCHES, const.BUILD_SKETCH_HEAVY_HITTERS_FILE.format(
+            dateFrom = const.EARLIEST_DATE_FOR_GAMES, dateTo = const.LATEST_DATE_FOR_GAMES))
+        heavyHitters.to_csv(heavyHittersPath, index = False)
+
+        logger.info('Top builds of %i groups (%i matches, relative error bound %.4f) saved to %s',
+            len(buildSketch.groupKeys), buildSketch.nMatches, buildSketch.epsilon, heavyHittersPath)
+        sys.exit()
+
+
+    ###
+    # Item universe
+    _, proxies = apiRequests.setApiKeyAndProxy()
+    _, legendaryItemsIds, mythicItemsIds, _ = metadataRequests.getItemInformation(proxies = proxies)
+
+    itemUniverse = itemCombinations.createItemUniverse(legendaryItemsIds = legendaryItemsIds,
+        mythicItemsIds = mythicItemsIds)
+
+
+    ###
+    # Count the combinations
+    _, legendaryMythicDataPath = dataProcessing.getExtractedDataPaths(region = REGION)
+
+    combinationCounts = itemCombinations.countItemCombinationsOfChunks(dataChunks = dataProcessing.readExtractedDataChunks(
+        legendaryMythicDataPath = legendaryMythicDataPath, columns = ['Item', 'Champion', 'Match', 'Queue']),
+        itemUniverse = itemUniverse)
+
+
+    ###
+    # Save the counts with the decoded items
+    combinationCounts['Items'] = ['-'.join(str(itemId) for itemId in itemCombinations.decodeItemCombination(
+        combination = combination, itemUniverse = itemUniverse)) for combination in combinationCounts['Combination']]
+
+    combinationsPath = '{}{}'.format(const.FOLDER_DATA, const.ITEM_COMBINATION_FILE.format(region = REGION,
+        dateFrom = const.EARLIEST_DATE_FOR_GAMES, dateTo = const.LATEST_DATE_FOR_GAMES))
+    combinationCounts.drop(columns = 'Combination').sort_values(['Queue', 'Champion', 'N'],
+        ascending = [True, True, False]).to_csv(combinationsPath, index = False)
+
+
+    ###
+    # Report
+    modalBuildShares = itemCombinations.getModalBuildShares(combinationCounts = combinationCounts)
+
+    logger.info('%i distinct builds of %i participants saved to %s', combinationCounts.shape[0],
+        combinationCounts['N'].sum(), combinationsPath)
+    logger.info('Median share of the modal build (champions with 5 items): %.3f', modalBuildShares['ModalShare'].median())
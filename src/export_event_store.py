@@ -0,0 +1,114 @@
+'''
+
+Script to export the item events and the match information of a region from the match store (MongoDB or
+the local match store, see ressources/match_store.py) into the local event store (memory-mapped arrays, see
+ressources/event_store.py). Only matches which are not in the store yet are exported, so the script can be
+run again after new matches were downloaded.
+
+Example to read the store:
+    storeArrays = eventStore.loadEventStore(region = 'euw1')
+    matchEvents = eventStore.getMatchEvents(eventStore = storeArrays, matchIndex = 0)
+    matchIndices, participantIds = eventStore.getChampionParticipants(eventStore = storeArrays, championId = 22)
+
+'''
+
+
+###
+# Imports
+import logging
+
+from tqdm import tqdm
+import urllib3
+
+
+###
+# Load ressources
+try:
+    import src.ressources.api_requests as apiRequests
+    import src.ressources.constants as const
+    import src.ressources.event_store as eventStore
+    import src.ressources.match_store as matchStore
+    import src.ressources.metadata_requests as metadataRequests
+    import src.ressources.profiling as profiling
+except Exception:
+    import ressources.api_requests as apiRequests
+    import ressources.constants as const
+    import ressources.event_store as eventStore
+    import ressources.match_store as matchStore
+    import ressources.metadata_requests as metadataRequests
+    import ressources.profiling as profiling
+
+
+###
+# Logging
+logging.basicConfig(level = 'INFO') # Set to DEBUG for more informations
+logger = logging.getLogger(__name__)
+
+
+###
+# Set run-specific constants
+REGION = 'euw1'
+
+# Storage of the matches, the MongoDB database (const.MATCH_STORE_MONGODB) or the local match store
+# (const.MATCH_STORE_LOCAL)
+MATCH_STORE = const.MATCH_STORE_BACKEND
+
+# Profiling options (const.PROFILING_TIMERS, const.PROFILING_CPROFILE, const.PROFILING_TRACEMALLOC). If None,
+# they are taken from the environment variable const.PROFILING_ENVIRONMENT_VARIABLE (comma separated)
+PROFILING = None
+
+
+###
+# Main loop
+if __name__ == '__main__':
+    ###
+    # Setup the profiling (report written at exit)
+    profiling.setupProfiling(name = 'export_event_store', profilingOptions = PROFILING)
+
+
+    ###
+    # Open the match store
+    store = matchStore.openMatchStore(backend = MATCH_STORE)
+
+
+    ###
+    # Suppress SSL warnings (has to be disabled due to proxy)
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+    ###
+    # Get the mythic items (flag of the stored events)
+    with profiling.stageTimer(stageName = 'Metadata'):
+        _, proxies = apiRequests.setApiKeyAndProxy()
+
+        _, _, mythicItemsIds, _ = metadataRequests.getItemInformation(proxies = proxies)
+
+
+    ###
+    # Open the store and select the matches of the time window which are not exported yet
+    eventStoreWriter = eventStore.EventStoreWriter(region = REGION, mythicItemsIds = mythicItemsIds)
+
+    matchIdsToExport = store.getMatchIdsInWindow(region = REGION, dateFrom = const.EARLIEST_DATE_FOR_GAMES,
+        dateTo = const.LATEST_DATE_FOR_GAMES) - eventStoreWriter.storedMatchIds
+
+    logger.info('%i matches to export for region %s', len(matchIdsToExport), REGION)
+
+
+    ###
+    # Export the matches
+    dataGenerator = store.iterateMatches(region = REGION, matchIds = matchIdsToExport)
+
+    for matchData in tqdm(profiling.timedIterator(dataGenerator, stageName = 'CursorRead'),
+            total = len(matchIdsToExport)):
+        profiling.nextIteration()
+
+        with profiling.stageTimer(stageName = 'Export'):
+            eventStoreWriter.addMatch(matchData = matchData)
+
+
+    ###
+    # Write the remaining matches and the champion index
+    with profiling.stageTimer(stageName = 'Export'):
+        eventStoreWriter.close()
+
+    store.close()
@@ -1,108 +1,151 @@
-'''
-
-Script to extract the data which mythic/legendary items were bought and save the data to file
-for analysis/graphics
-
-'''
-
-
-###
-# Imports
-import logging
-
-from tqdm import tqdm
-import urllib3
-
-
-###
-# Load ressources
-try:
-    import src.ressources.mongodb as mongodb
-    import src.ressources.data_processing as dataProcessing
-    import src.ressources.api_requests as apiRequests
-except Exception:
-    import ressources.mongodb as mongodb
-    import ressources.data_processing as dataProcessing
-    import ressources.api_requests as apiRequests
-
-
-###
-# Logging
-logging.basicConfig(level = 'INFO') # Set to DEBUG for more informations
-logger = logging.getLogger(__name__)
-
-
-###
-# Set run-specific constants
-REGION = 'euw1'
-
-
-###
-# Main loop
-if __name__ == '__main__':
-    ###
-    # Create the MongoDB-client
-    mongoDbClient, mongoDbDatabase = mongodb.setupClientAndDatabase()
-
-
-    ###
-    # Suppress SSL warnings (has to be disabled due to proxy)
-    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
-
-    ###
-    # Generate the generator for the timeline data
-    dataGenerator = mongodb.getTimelineDataGenerator(mongoDbDatabase = mongoDbDatabase,
-        region = REGION)
-
-
-    ###
-    # Load proxy information
-    _, proxies = apiRequests.setApiKeyAndProxy()
-
-
-    ###
-    # Get item informations
-    itemRawData, legendaryItemsIds, mythicItemsIds, tearItemMappings = apiRequests.getItemInformation(
-        proxies = proxies)
-
-
-    ###
-    # Get and save champion information and icons
-    apiRequests.getChampionInfoAndIcons(proxies = proxies)
-
-
-    ###
-    # Get and save item icons
-    apiRequests.getItemIcons(legendaryItemsIds = legendaryItemsIds, mythicItemsIds = mythicItemsIds,
-        proxies = proxies)
-
-
-    ###
-    # Iterate over the data
-    firstMythicItemCollected = list()
-    legendaryAndMythicItemsCollected = list()
-
-    for ct, matchData in tqdm(enumerate(dataGenerator)):
-        ###
-        # Get the queue id as well as the champion ids
-        queueAndChampionIds = dataProcessing.extractQueueAndChampions(matchData)
-
-
-        ###
-        # Get the first 5 legendary/mythic items bought per champion as well as the mythic items per champion
-        firstMythicItem, legendaryAndMythicItemsBought = dataProcessing.extractBoughtMythicAndLegendaryItems(
-            matchData = matchData, legendaryItemsIds = legendaryItemsIds, mythicItemsIds = mythicItemsIds,
-            queueAndChampionIds = queueAndChampionIds, ct = ct)
-
-
-        ###
-        # Save the extracted information
-        firstMythicItemCollected.append(firstMythicItem)
-        legendaryAndMythicItemsCollected.append(legendaryAndMythicItemsBought)
-
-
-    ###
-    # Concatenate the information and save it
-    dataProcessing.concatenateAndSaveExtractedData(region = REGION, firstMythicItemCollected = firstMythicItemCollected,
-        legendaryAndMythicItemsCollected = legendaryAndMythicItemsCollected, mythicItemsIds = mythicItemsIds)
+'''
+
+Script to extract the data which mythic/legendary items were bought and save the data to file
+for analysis/graphics. Several regions can be extracted in one run: the metadata is retrieved once
+and the regions are processed concurrently (see ressources/region_extraction.py)
+
+'''
+
+
+###
+# Imports
+import logging
+
+import urllib3
+
+
+###
+# Load ressources
+try:
+    import src.ressources.api_requests as apiRequests
+    import src.ressources.constants as const
+    import src.ressources.icon_atlas as iconAtlas
+    import src.ressources.item_combinations as itemCombinations
+    import src.ressources.metadata_requests as metadataRequests
+    import src.ressources.profiling as profiling
+    import src.ressources.region_extraction as regionExtraction
+except Exception:
+    import ressources.api_requests as apiRequests
+    import ressources.constants as const
+    import ressources.icon_atlas as iconAtlas
+    import ressources.item_combinations as itemCombinations
+    import ressources.metadata_requests as metadataRequests
+    import ressources.profiling as profiling
+    import ressources.region_extraction as regionExtraction
+
+
+###
+# Logging
+logging.basicConfig(level = 'INFO') # Set to DEBUG for more informations
+logger = logging.getLogger(__name__)
+
+
+###
+# Set run-specific constants
+REGIONS = ['euw1']
+
+# Number of processes for the extraction of several regions (None uses one per region)
+MAX_WORKERS = None
+
+# Additionally combine the extracted data of all regions into one dataset with the region as column
+# (csv output, file names with const.COMBINED_REGIONS instead of the region)
+COMBINE_REGIONS = False
+
+# Preview mode: only extract a uniform random sample of the matches of every region, given as number of matches
+# or as share of the matches if below 1 (e.g. 0.02). The sample is written to separate outputs (const.PREVIEW_REGION)
+# and the estimates with their confidence intervals are saved (see ressources/sampled_preview.py). None extracts
+# all matches
+PREVIEW_SAMPLE_SIZE = None
+
+# Storage of the matches, the MongoDB database (const.MATCH_STORE_MONGODB) or the local match store
+# (const.MATCH_STORE_LOCAL), the same as the one of the crawler
+MATCH_STORE = const.MATCH_STORE_BACKEND
+
+# Only extract the matches which were added since the last run. A full extraction is done
+# automatically if the item definitions changed
+INCREMENTAL_EXTRACTION = True
+
+# Output format, either csv files (const.OUTPUT_FORMAT_CSV) or parquet datasets partitioned by region
+# and queue (const.OUTPUT_FORMAT_PARQUET, requires pyarrow)
+OUTPUT_FORMAT = const.OUTPUT_FORMAT_CSV
+
+# Additionally count the builds approximately per queue and champion (count-min sketches with the top builds,
+# bounded memory, mergeable over regions, see ressources/build_sketches.py). The error bounds are set in the constants
+APPROXIMATE_BUILD_COUNTS = False
+
+# Additionally collect the quantiles of the purchase times per queue, champion, slot and item (time to the first mythic
+# item, time to the Nth item, in minutes and as share of the game duration, see ressources/timing_sketches.py)
+ITEM_TIMINGS = True
+
+# Profiling options (const.PROFILING_TIMERS, const.PROFILING_CPROFILE, const.PROFILING_TRACEMALLOC), e.g.
+# {const.PROFILING_TIMERS, const.PROFILING_CPROFILE}. If None, they are taken from the environment
+# variable const.PROFILING_ENVIRONMENT_VARIABLE (comma separated), profiling is off if it is not set.
+# The stages of the extraction loop are only timed for a single region (extracted in this process)
+PROFILING = None
+
+
+###
+# Main loop
+if __name__ == '__main__':
+    ###
+    # Setup the profiling (report written at exit)
+    profiling.setupProfiling(name = 'extract_item_data', profilingOptions = PROFILING)
+
+
+    ###
+    # Suppress SSL warnings (has to be disabled due to proxy)
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+    ###
+    # Item and champion metadata (shared by all regions), timed as one stage
+    with profiling.stageTimer(stageName = 'Metadata'):
+        ###
+        # Load proxy information
+        _, proxies = apiRequests.setApiKeyAndProxy()
+
+
+        ###
+        # Get item informations
+        itemRawData, legendaryItemsIds, mythicItemsIds, tearItemMappings = metadataRequests.getItemInformation(
+            proxies = proxies)
+
+
+        ###
+        # Get and save champion information and icons
+        championInformation = metadataRequests.getChampionInfoAndIcons(proxies = proxies)
+
+
+        ###
+        # Get and save item icons
+        metadataRequests.getItemIcons(legendaryItemsIds = legendaryItemsIds, mythicItemsIds = mythicItemsIds,
+            proxies = proxies)
+
+
+        ###
+        # Pack the icons into one atlas for the graphics (only rebuilt if the icons changed)
+        iconAtlas.updateIconAtlas()
+
+
+    ###
+    # Extract the regions (concurrently if there are several), sharing the metadata
+    itemUniverse = itemCombinations.createItemUniverse(legendaryItemsIds = legendaryItemsIds,
+        mythicItemsIds = mythicItemsIds) if APPROXIMATE_BUILD_COUNTS else None
+
+    regionSummaries = regionExtraction.extractRegions(regions = REGIONS, legendaryItemsIds = legendaryItemsIds,
+        mythicItemsIds = mythicItemsIds, tearItemMappings = tearItemMappings, championInformation = championInformation,
+        outputFormat = OUTPUT_FORMAT, incrementalExtraction = INCREMENTAL_EXTRACTION, itemUniverse = itemUniverse,
+        itemTimings = ITEM_TIMINGS, sampleSize = PREVIEW_SAMPLE_SIZE, matchStoreBackend = MATCH_STORE,
+        maxWorkers = MAX_WORKERS)
+
+    logger.info('Extraction finished:\n%s', regionSummaries.to_string(index = False))
+
+
+    ###
+    # Combine the regions into one dataset (csv output of a full extraction only, the parquet datasets are
+    # partitioned by region)
+    if COMBINE_REGIONS and OUTPUT_FORMAT == const.OUTPUT_FORMAT_CSV and PREVIEW_SAMPLE_SIZE is None:
+        with profiling.stageTimer(stageName = 'Output'):
+            combinedPaths = regionExtraction.combineRegionOutputs(regions = REGIONS)
+
+        logger.info('Combined data of %i regions saved to %s', len(REGIONS), ', '.join(combinedPaths))
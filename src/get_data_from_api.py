@@ -1,198 +1,247 @@
-'''
-
-Main module to download the necessary data for the item diversity analysis from the Riot games API
-(https://developer.riotgames.com/).
-
-The main goal of the analysis is to try to identify how much item diversity there exists is lol, once
-for mythic items, followed by first/second/third/... item and maybe also item combination (without
-considering the item order). Boots will probably be excluded.
-
-This analysis could also be done for various regions, trying to identify differences between them.
-In addition, it could also be done comparing normal/flex/ranked games e.g. to see whether people try
-more things in normal/flex compared to ranked.
-
-The data will be collected the following way:
-- Start with an initial summoner (my summoner, currently gold 4, so somewhat average)
-- Get a list of recently played normal/flex/ranked/ARAM games to get more summoner ids.
-- Download the game information for all/some of the found games, storing the information either to
-  file or to a NoSQL database. Be aware that the API by default only returns the last 100
-  games played
-- Select a new summoner id and repeat steps 2 and 3 until enough data has been collected.
-
-For this project, a local MongoDB is used (https://docs.mongodb.com/guides/server/install/).
-
-'''
-
-
-###
-# Imports
-import logging
-
-from tqdm import tqdm
-import urllib3
-
-
-###
-# Load ressources
-try:
-    import src.ressources.constants as const
-    import src.ressources.mongodb as mongodb
-    import src.ressources.api_requests as apiRequests
-    import src.ressources.api_data_transformations as apiDataTransformations
-except Exception:
-    import ressources.constants as const
-    import ressources.mongodb as mongodb
-    import ressources.api_requests as apiRequests
-    import ressources.api_data_transformations as apiDataTransformations
-
-
-
-###
-# Logging
-logging.basicConfig(level = 'INFO') # Set to DEBUG for more informations
-logger = logging.getLogger(__name__)
-
-
-###
-# Set run-specific constants
-# REGION = 'euw1'
-REGION = 'na1'
-
-
-###
-# Main loop
-if __name__ == '__main__':
-    ###
-    # Create the MongoDB-client
-    mongoDbClient, mongoDbDatabase = mongodb.setupClientAndDatabase()
-
-
-    ###
-    # Suppress SSL warnings (has to be disabled due to proxy)
-    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
-
-    ###
-    # Load api key and proxy information
-    apiKey, proxies = apiRequests.setApiKeyAndProxy()
-
-
-    ###
-    # Get initial summoner id from provided summoner name. This has to be done as
-    # all APIs work via a summoner id (which I think is modified by the used API key
-    # and can vary therefore when using different keys).
-    #
-    # Afterwards, save it into the summoner collection in the database
-    initialAccount = apiRequests.getInitialSummonerId(
-        region = REGION,
-        summonerName = const.INITIAL_ACCOUNTS[REGION],
-        apiKey = apiKey,
-        proxies = proxies
-    )
-    mongodb.saveSummoner(mongoDbDatabase = mongoDbDatabase, region = REGION,
-        summonerInformation = initialAccount, checkIfExists = True)
-
-
-    ###
-    # Create sets for the available summoners, evaluated summoners and evaluated matches.
-    # Having these sets in memory reduces the need to call the database
-    evaluatedSummoners = mongodb.getIdsOfCollection(mongoDbDatabase = mongoDbDatabase,
-        dbCollection = const.MONGODB_DOCUMENTS_SUMMONER_IDS_PROCESSED, region = REGION)
-
-    availableSummoners = mongodb.getIdsOfCollection(mongoDbDatabase = mongoDbDatabase,
-        dbCollection = const.MONGODB_DOCUMENTS_SUMMONER_IDS, region = REGION) - evaluatedSummoners
-
-    savedMatches = mongodb.getIdsOfCollection(mongoDbDatabase = mongoDbDatabase,
-        dbCollection = const.MONGODB_DOCUMENTS_GAME_INFORMATION, region = REGION)
-
-    if not availableSummoners:
-        raise AssertionError('No summoners to evaluate found after initialization')
-
-
-    ###
-    # Iterate over summoners:
-    # First, find a new summoner that has not been evaluated yet. Then download the match history
-    # for this summoner, selecting only normal, flex and ranked games. Add all new summoners to the
-    # collection of summoners to be evaluated. Then save all the games in the relevant time window.
-
-    for _ in tqdm(range(const.MAXIMUM_ACCOUNTS_TO_EVALUATE)):
-        ##
-        # Get a new summoner id. Inside a try statement because there will be an error if none is found
-        logger.debug('Select new summoner to evaluate')
-        try:
-            summonerAccountId = availableSummoners.pop()
-
-        except Exception:
-            logger.warning('No summoners to evaluate available inside loop, end of loop')
-            break
-
-
-        ##
-        # Retrieve match history and select the relevant matches
-        logger.debug('Get match history for summoner %s', summonerAccountId)
-
-        matchHistory = apiRequests.getMatchHistory(region = REGION, summonerAccountId = summonerAccountId,
-            apiKey = apiKey, proxies = proxies)
-
-        relevantMatches, relevantMatchIds = apiDataTransformations.getRelevantMatchesFromHistory(
-            matchHistory = matchHistory)
-
-
-        ##
-        # Compare the played games with the already processed games to find those that have not yet been
-        # processed
-        newMatchIds = relevantMatchIds - savedMatches
-
-
-        ##
-        # If new matches are present, iterate over them to retrieve and save the match data
-        if newMatchIds:
-            logger.debug('Process found matches')
-
-            for matchId in tqdm(newMatchIds):
-                logger.debug('Process match with it %i', matchId)
-
-                ##
-                # Retrieve the match information and timeline
-                matchInformation = apiRequests.getMatchInformation(region = REGION,
-                    matchId = matchId, apiKey = apiKey, proxies = proxies)
-
-                matchTimeline = apiRequests.getMatchTimeline(region = REGION,
-                    matchId = matchId, apiKey = apiKey, proxies = proxies)
-
-
-                ##
-                # Save the match data into the corresponding collection
-                mongodb.saveRetrievedMatchData(mongoDbDatabase = mongoDbDatabase, region = REGION,
-                    matchId = matchId, matchInformation = matchInformation, matchTimeline = matchTimeline)
-
-
-                ##
-                # Extract the account ids for all new participants
-                newSummonersInMatch = apiDataTransformations.extractAccountIdsFromMatchInformation(
-                    matchInformation = matchInformation, availableSummoners = availableSummoners,
-                    evaluatedSummoners = evaluatedSummoners, summonerAccountId = summonerAccountId)
-
-
-                ##
-                # Write the newly found summoners into the collection and set of available summoners
-                for newSummonerAccount in newSummonersInMatch.values():
-                    mongodb.saveSummoner(mongoDbDatabase = mongoDbDatabase, region = REGION,
-                        summonerInformation = newSummonerAccount, checkIfExists = False)
-
-                availableSummoners = availableSummoners.union(set(newSummonersInMatch.keys()))
-
-
-                ##
-                # Update the set with the saved matches
-                savedMatches = savedMatches.union(set((matchId, )))
-
-
-
-        ##
-        # Update the sets and collection of evaluated summoner ids
-        logger.debug('Update set and collection of processed summoner ids with id %s', summonerAccountId)
-
-        evaluatedSummoners = evaluatedSummoners.union(set((summonerAccountId, )))
-        mongodb.saveProcessedSummoner(mongoDbDatabase = mongoDbDatabase,
-            region = REGION, summonerAccountId = summonerAccountId)
+'''
+
+Main module to download the necessary data for the item diversity analysis from the Riot games API
+(https://developer.riotgames.com/).
+
+The main goal of the analysis is to try to identify how much item diversity there exists is lol, once
+for mythic items, followed by first/second/third/... item and maybe also item combination (without
+considering the item order). Boots will probably be excluded.
+
+This analysis could also be done for various regions, trying to identify differences between them.
+In addition, it could also be done comparing normal/flex/ranked games e.g. to see whether people try
+more things in normal/flex compared to ranked.
+
+The data will be collected the following way:
+- Start with an initial summoner (my summoner, currently gold 4, so somewhat average)
+- Get a list of recently played normal/flex/ranked/ARAM games to get more summoner ids.
+- Download the game information for all/some of the found games, storing the information either to
+  file or to a NoSQL database. Be aware that the API by default only returns the last 100
+  games played
+- Select a new summoner id and repeat steps 2 and 3 until enough data has been collected.
+
+For this project, a local MongoDB is used (https://docs.mongodb.com/guides/server/install/), or the local
+match store without a server (see ressources/match_store.py, MATCH_STORE below). The database
+is shared by all time windows: the time window is set below, the summoners and matches already retrieved
+for other windows are reused and only the time intervals not yet covered are requested per summoner.
+
+'''
+
+
+###
+# Imports
+import logging
+
+from tqdm import tqdm
+import urllib3
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+    import src.ressources.match_store as matchStore
+    import src.ressources.api_requests as apiRequests
+    import src.ressources.api_data_transformations as apiDataTransformations
+    import src.ressources.profiling as profiling
+except Exception:
+    import ressources.constants as const
+    import ressources.match_store as matchStore
+    import ressources.api_requests as apiRequests
+    import ressources.api_data_transformations as apiDataTransformations
+    import ressources.profiling as profiling
+
+
+
+###
+# Logging
+logging.basicConfig(level = 'INFO') # Set to DEBUG for more informations
+logger = logging.getLogger(__name__)
+
+
+###
+# Set run-specific constants
+# REGION = 'euw1'
+REGION = 'na1'
+
+# Time window of the games (time format const.TIME_FORMAT, both dates included)
+DATE_FROM = const.EARLIEST_DATE_FOR_GAMES
+DATE_TO = const.LATEST_DATE_FOR_GAMES
+
+# Storage of the summoners and matches, the MongoDB database (const.MATCH_STORE_MONGODB) or the local match store
+# (const.MATCH_STORE_LOCAL)
+MATCH_STORE = const.MATCH_STORE_BACKEND
+
+# Profiling options (const.PROFILING_TIMERS, const.PROFILING_CPROFILE, const.PROFILING_TRACEMALLOC). If None,
+# they are taken from the environment variable const.PROFILING_ENVIRONMENT_VARIABLE (comma separated)
+PROFILING = None
+
+
+###
+# Main loop
+if __name__ == '__main__':
+    ###
+    # Setup the profiling (report written at exit)
+    profiling.setupProfiling(name = 'get_data_from_api', profilingOptions = PROFILING)
+
+
+    ###
+    # Open the match store and prepare the storage of the region (for MongoDB the collections with the storage
+    # options, if they do not exist yet, and the indexes)
+    store = matchStore.openMatchStore(backend = MATCH_STORE)
+    store.setupRegion(region = REGION)
+
+
+    ###
+    # Suppress SSL warnings (has to be disabled due to proxy)
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+    ###
+    # Load api key and proxy information
+    apiKey, proxies = apiRequests.setApiKeyAndProxy()
+
+
+    ###
+    # Get initial summoner id from provided summoner name. This has to be done as
+    # all APIs work via a summoner id (which I think is modified by the used API key
+    # and can vary therefore when using different keys).
+    #
+    # Afterwards, save it into the summoner collection in the database
+    initialAccount = apiRequests.getInitialSummonerId(
+        region = REGION,
+        summonerName = const.INITIAL_ACCOUNTS[REGION],
+        apiKey = apiKey,
+        proxies = proxies
+    )
+    store.saveSummoner(region = REGION, summonerInformation = initialAccount, checkIfExists = True)
+
+
+    ###
+    # Create sets for the available summoners, evaluated summoners and evaluated matches.
+    # Having these sets in memory reduces the need to call the database. A summoner is evaluated
+    # if the time intervals covered by the retrieved match histories include the whole time window
+    timeWindow = apiDataTransformations.getTimeWindow(dateFrom = DATE_FROM, dateTo = DATE_TO)
+
+    coveredIntervals = store.getCoveredIntervals(region = REGION)
+
+    evaluatedSummoners = set(summonerAccountId for summonerAccountId, summonerIntervals in coveredIntervals.items()
+        if not apiDataTransformations.getMissingIntervals(timeWindow = timeWindow, coveredIntervals = summonerIntervals))
+
+    availableSummoners = store.getSummonerIds(region = REGION) - evaluatedSummoners
+
+    savedMatches = store.getMatchIds(region = REGION)
+
+    if not availableSummoners:
+        raise AssertionError('No summoners to evaluate found after initialization')
+
+
+    ###
+    # Iterate over summoners:
+    # First, find a new summoner that has not been evaluated yet. Then download the match history
+    # for the parts of the time window not covered yet for this summoner, selecting only normal, flex
+    # and ranked games. Add all new summoners to the
+    # collection of summoners to be evaluated. Then save all the games in the relevant time window.
+
+    for _ in tqdm(range(const.MAXIMUM_ACCOUNTS_TO_EVALUATE)):
+        ##
+        # Get a new summoner id. Inside a try statement because there will be an error if none is found
+        logger.debug('Select new summoner to evaluate')
+        try:
+            summonerAccountId = availableSummoners.pop()
+
+        except Exception:
+            logger.warning('No summoners to evaluate available inside loop, end of loop')
+            break
+
+
+        ##
+        # Retrieve match history of the missing time intervals and select the relevant matches
+        logger.debug('Get match history for summoner %s', summonerAccountId)
+
+        relevantMatchIds = set()
+        for beginTime, endTime in apiDataTransformations.getMissingIntervals(timeWindow = timeWindow,
+                coveredIntervals = coveredIntervals.get(summonerAccountId, list())):
+            with profiling.stageTimer(stageName = 'HistoryFetch'):
+                matchHistory = apiRequests.getMatchHistory(region = REGION, summonerAccountId = summonerAccountId,
+                    apiKey = apiKey, proxies = proxies, beginTime = beginTime, endTime = endTime)
+
+            relevantMatchIds |= apiDataTransformations.getRelevantMatchesFromHistory(matchHistory = matchHistory,
+                dateFrom = DATE_FROM, dateTo = DATE_TO)[1]
+
+
+        ##
+        # Compare the played games with the already processed games to find those that have not yet been
+        # processed
+        newMatchIds = relevantMatchIds - savedMatches
+
+
+        ##
+        # If new matches are present, iterate over them to retrieve and save the match data
+        if newMatchIds:
+            logger.debug('Process found matches')
+
+            for matchId in tqdm(newMatchIds):
+                logger.debug('Process match with it %i', matchId)
+                profiling.nextIteration()
+
+                ##
+                # Retrieve the match information and timeline
+                with profiling.stageTimer(stageName = 'MatchFetch'):
+                    matchInformation = apiRequests.getMatchInformation(region = REGION,
+                        matchId = matchId, apiKey = apiKey, proxies = proxies)
+
+                with profiling.stageTimer(stageName = 'TimelineFetch'):
+                    matchTimeline = apiRequests.getMatchTimeline(region = REGION,
+                        matchId = matchId, apiKey = apiKey, proxies = proxies)
+
+
+                ##
+                # Save the match data into the corresponding collection
+                with profiling.stageTimer(stageName = 'DatabaseWrite'):
+                    store.saveMatch(region = REGION, matchId = matchId, matchInformation = matchInformation,
+                        matchTimeline = matchTimeline)
+
+
+                ##
+                # Extract the account ids for all new participants
+                newSummonersInMatch = apiDataTransformations.extractAccountIdsFromMatchInformation(
+                    matchInformation = matchInformation, availableSummoners = availableSummoners,
+                    evaluatedSummoners = evaluatedSummoners, summonerAccountId = summonerAccountId)
+
+
+                ##
+                # Write the newly found summoners into the collection and set of available summoners
+                with profiling.stageTimer(stageName = 'DatabaseWrite'):
+                    for newSummonerAccount in newSummonersInMatch.values():
+                        store.saveSummoner(region = REGION, summonerInformation = newSummonerAccount,
+                            checkIfExists = False)
+
+                availableSummoners = availableSummoners.union(set(newSummonersInMatch.keys()))
+
+
+                ##
+                # Update the set with the saved matches
+                savedMatches = savedMatches.union(set((matchId, )))
+
+
+
+        ##
+        # Update the sets and collection of evaluated summoner ids. The covered time ends at the
+        # time of the request if the window reaches into the future
+        logger.debug('Update set and collection of processed summoner ids with id %s', summonerAccountId)
+
+        coveredEnd = min(timeWindow[1], apiRequests.currentTime() * 1000)
+
+        coveredIntervals[summonerAccountId] = apiDataTransformations.mergeIntervals(
+            intervals = coveredIntervals.get(summonerAccountId, list())
+                + ([[timeWindow[0], coveredEnd]] if coveredEnd > timeWindow[0] else list()))
+
+        evaluatedSummoners = evaluatedSummoners.union(set((summonerAccountId, )))
+        with profiling.stageTimer(stageName = 'DatabaseWrite'):
+            store.saveProcessedSummoner(region = REGION, summonerAccountId = summonerAccountId,
+                coveredIntervals = coveredIntervals[summonerAccountId])
+
+
+    ###
+    # Close the match store
+    store.close()
@@ -0,0 +1,69 @@
+'''
+
+Script to move the per-window databases of earlier versions (one database per time window, see
+const.MONGODB_DATABASE_WINDOW) into the database shared by all time windows. The summoners, the
+processed summoners (with the window as covered time interval) and the matches (with the patch) are
+copied, entries which already exist are kept. Afterwards, the crawl only requests the time intervals
+which are not covered yet and the indexes on the creation time and the patch are available.
+
+'''
+
+
+###
+# Imports
+import logging
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+    import src.ressources.mongodb as mongodb
+    import src.ressources.storage_layout as storageLayout
+except Exception:
+    import ressources.constants as const
+    import ressources.mongodb as mongodb
+    import ressources.storage_layout as storageLayout
+
+
+###
+# Logging
+logging.basicConfig(level = 'INFO') # Set to DEBUG for more informations
+logger = logging.getLogger(__name__)
+
+
+###
+# Set run-specific constants
+REGIONS = ['euw1', 'na1']
+
+# Time windows of the databases to migrate (dates in time format const.TIME_FORMAT)
+WINDOWS = [(const.EARLIEST_DATE_FOR_GAMES, const.LATEST_DATE_FOR_GAMES)]
+
+# Delete the per-window databases after they were migrated for all regions
+DROP_WINDOW_DATABASES = False
+
+
+###
+# Main loop
+if __name__ == '__main__':
+    mongoDbClient, mongoDbDatabase = mongodb.setupClientAndDatabase()
+
+    for dateFrom, dateTo in WINDOWS:
+        windowDatabaseName = const.MONGODB_DATABASE_WINDOW.format(startDate = dateFrom, endDate = dateTo)
+
+        if windowDatabaseName not in mongoDbClient.list_database_names():
+            logger.warning('Database %s does not exist, nothing to migrate', windowDatabaseName)
+            continue
+
+        for region in REGIONS:
+            storageLayout.setupCollections(mongoDbDatabase = mongoDbDatabase, region = region)
+
+            nCopied = mongodb.migrateWindowDatabase(mongoDbClient = mongoDbClient, mongoDbDatabase = mongoDbDatabase,
+                region = region, dateFrom = dateFrom, dateTo = dateTo)
+
+            logger.info('Region %s: %i summoners, %i processed summoners and %i matches copied from %s', region,
+                nCopied['Summoners'], nCopied['ProcessedSummoners'], nCopied['Matches'], windowDatabaseName)
+
+        if DROP_WINDOW_DATABASES:
+            logger.info('Drop database %s', windowDatabaseName)
+            mongoDbClient.drop_database(windowDatabaseName)
@@ -0,0 +1,88 @@
+'''
+
+Command line interface of the local query service (see ressources/query_service.py) over the count cubes and
+the item combinations of the extracted data (extract_item_data.py, csv or parquet output, read in the output format
+recorded in the extraction state of the region).
+
+Examples:
+    python query_builds.py distribution --champion 22 --queue 420
+    python query_builds.py builds --champion 22 --queue 420 440 --n 5
+    python query_builds.py diversity --champion 22 --slot 2
+    python query_builds.py serve --port 8765
+        (then e.g. http://127.0.0.1:8765/builds?region=euw1&champion=22&queue=420,440)
+
+'''
+
+
+###
+# Imports
+import argparse
+import json
+import logging
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+    import src.ressources.query_service as queryService
+except Exception:
+    import ressources.constants as const
+    import ressources.query_service as queryService
+
+
+###
+# Logging
+logging.basicConfig(level = 'INFO') # Set to DEBUG for more informations
+logger = logging.getLogger(__name__)
+
+
+###
+# Main
+if __name__ == '__main__':
+    ###
+    # Arguments
+    argumentParser = argparse.ArgumentParser(description = 'Query the build statistics of the extracted data')
+    argumentParser.add_argument('query', choices = [*queryService.QueryService.QUERIES, 'serve'],
+        help = 'Query to answer, or serve to start the http server')
+    argumentParser.add_argument('--region', default = 'euw1', help = 'Region of the data')
+    argumentParser.add_argument('--champion', type = int, help = 'Champion id')
+    argumentParser.add_argument('--queue', type = int, nargs = '+', help = 'Queue ids (all queues if not given)')
+    argumentParser.add_argument('--slot', type = int, help = 'Item slot (1 to 5) instead of the mythic item')
+    argumentParser.add_argument('--n', type = int, default = const.QUERY_TOP_BUILDS, help = 'Number of builds')
+    argumentParser.add_argument('--items', type = int, default = const.ITEM_COMBINATION_SIZE,
+        help = 'Number of items of the builds')
+    argumentParser.add_argument('--host', default = const.QUERY_HOST, help = 'Host of the http server')
+    argumentParser.add_argument('--port', type = int, default = const.QUERY_PORT, help = 'Port of the http server')
+    arguments = argumentParser.parse_args()
+
+    buildQueryService = queryService.QueryService()
+
+
+    ###
+    # Http server
+    if arguments.query == 'serve':
+        queryServer = queryService.createQueryServer(queryService = buildQueryService, host = arguments.host,
+            port = arguments.port)
+
+        logger.info('Serving queries on http://%s:%i', arguments.host, arguments.port)
+
+        try:
+            queryServer.serve_forever()
+        except KeyboardInterrupt:
+            queryServer.server_close()
+
+
+    ###
+    # Single query
+    else:
+        if arguments.champion is None:
+            argumentParser.error('--champion is required for queries')
+
+        queryParameters = {'championId': arguments.champion, 'queueIds': arguments.queue}
+        if arguments.query == 'builds':
+            queryParameters.update({'nBuilds': arguments.n, 'nItems': arguments.items})
+        else:
+            queryParameters['slot'] = arguments.slot
+
+        print(json.dumps(buildQueryService.query(arguments.query, arguments.region, **queryParameters), indent = 1))
@@ -1,106 +1,178 @@
-'''
-
-Functions to transform the retrieved data
-
-'''
-
-
-###
-# Imports
-import logging
-import time
-from typing import Dict, List, Set, Tuple
-
-from datetime import datetime, timedelta
-
-
-###
-# Load ressources
-try:
-    import src.ressources.constants as const
-except Exception:
-    import ressources.constants as const
-
-
-###
-# Logging
-logger = logging.getLogger(__name__)
-
-
-###
-# Functions
-
-##
-# Retrieve the matches from the relevant queues in the relevant time frame
-def getRelevantMatchesFromHistory(matchHistory: Dict) -> Tuple[Dict, Set]:
-    '''
-    Extract the relevant matches from the match history. Relevant queues are normal, flex,
-    ranked and ARAM within the prespecified time window
-    '''
-
-    logger.debug('Get relevant matches from match history')
-
-
-    ###
-    # Convert the dates to the relevant unix timestamps (could be done once to save some little computation time).
-    # Multiply by 1000 as the Riot API is in milliseconds, not seconds
-    startTimewindow = int(time.mktime(datetime.strptime(const.EARLIEST_DATE_FOR_GAMES, const.TIME_FORMAT).timetuple()))
-    startTimewindow *= 1000
-
-    endTimewindow = int(time.mktime((datetime.strptime(const.LATEST_DATE_FOR_GAMES, const.TIME_FORMAT)
-        + timedelta(days = 1)).timetuple()))    # Add one day to include the specified date
-    endTimewindow *= 1000
-
-
-    ###
-    # Go through the list of played games and keep only the relevant games
-    if 'matches' in matchHistory.keys():
-        relevantMatches = {match['gameId']: match for match in matchHistory['matches']
-            if match['queue'] in const.QUEUES_EVALUATE
-                and match['timestamp'] >= startTimewindow and match['timestamp'] < endTimewindow}
-
-    else:
-        logger.warning('No matches found in match history')
-        relevantMatches = dict()
-
-
-    ###
-    # Collect the game ids into a set for quick comparisons
-    if relevantMatches:
-        relevantMatchIds = set(relevantMatches.keys())
-    else:
-        relevantMatchIds = set()
-
-
-    ###
-    # Return the relevant matches
-    return(relevantMatches, relevantMatchIds)
-
-
-##
-# Extract the account ids for all participants
-def extractAccountIdsFromMatchInformation(matchInformation: Dict,
-        availableSummoners: Set, evaluatedSummoners: Set, summonerAccountId: str) -> List:
-    '''
-    Extract and prepare the summoner ids for all summoners which participated in a match
-    '''
-
-    logger.debug('Extract summoner ids from match information')
-
-
-    ###
-    # Extract summoner id and summoner account id (static ones, not the current version fields)
-    # for all summoners which were not yet added to the list of available summoners
-    newSummonersInMatch = dict()
-    for summoner in matchInformation['participantIdentities']:
-        summonerAccountIdMatch = summoner['player']['accountId']
-        if (summonerAccountIdMatch not in evaluatedSummoners and summonerAccountIdMatch not in availableSummoners and
-            summonerAccountId != summonerAccountIdMatch):
-
-            newSummonersInMatch[summonerAccountIdMatch] = {'SummonerAccountId': summonerAccountIdMatch,
-                'SummonerId': summoner['player']['summonerId']}
-
-
-    ###
-    # Return dictionary with extracted summoners
-    return(newSummonersInMatch)
+'''
+
+Functions to transform the retrieved data
+
+'''
+
+
+###
+# Imports
+import logging
+import time
+from typing import Dict, List, Set, Tuple
+
+from datetime import datetime, timedelta
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+except Exception:
+    import ressources.constants as const
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Functions
+
+##
+# Time window in unix time
+def getTimeWindow(dateFrom: str = const.EARLIEST_DATE_FOR_GAMES,
+        dateTo: str = const.LATEST_DATE_FOR_GAMES) -> Tuple[int, int]:
+    '''
+    Convert the dates (time format TIME_FORMAT, both included) to the time window [begin, end) in unix time
+    in milliseconds (the Riot API is in milliseconds, not seconds)
+    '''
+
+    startTimewindow = int(time.mktime(datetime.strptime(dateFrom, const.TIME_FORMAT).timetuple())) * 1000
+
+    endTimewindow = int(time.mktime((datetime.strptime(dateTo, const.TIME_FORMAT)
+        + timedelta(days = 1)).timetuple())) * 1000    # Add one day to include the specified date
+
+    return(startTimewindow, endTimewindow)
+
+
+##
+# Patch of a match
+def getPatch(gameVersion: str) -> str:
+    '''
+    Return the patch (major and minor version, e.g. 11.10) of the game version of a match (e.g. 11.10.376.1234)
+    '''
+
+    return('.'.join(gameVersion.split('.')[:2]))
+
+
+##
+# Merge time intervals
+def mergeIntervals(intervals: List) -> List[List[int]]:
+    '''
+    Merge overlapping or adjacent time intervals [begin, end), returned sorted by their begin
+    '''
+
+    mergedIntervals = list()
+    for begin, end in sorted(intervals):
+        if mergedIntervals and begin <= mergedIntervals[-1][1]:
+            mergedIntervals[-1][1] = max(mergedIntervals[-1][1], end)
+        else:
+            mergedIntervals.append([begin, end])
+
+    return(mergedIntervals)
+
+
+##
+# Parts of a time window which are not covered yet
+def getMissingIntervals(timeWindow: Tuple[int, int], coveredIntervals: List,
+        maximumLength: int = const.MATCH_HISTORY_MAXIMUM_TIME_RANGE) -> List[Tuple[int, int]]:
+    '''
+    Return the parts of the time window [begin, end) which are not covered by the intervals, split into
+    intervals of at most maximumLength (longest time range of a match history request)
+    '''
+
+    ###
+    # Gaps between the covered intervals within the window
+    missingIntervals = list()
+    begin = timeWindow[0]
+
+    for coveredBegin, coveredEnd in mergeIntervals(intervals = coveredIntervals):
+        if coveredEnd <= begin or coveredBegin >= timeWindow[1]:
+            continue
+
+        if coveredBegin > begin:
+            missingIntervals.append((begin, coveredBegin))
+
+        begin = max(begin, coveredEnd)
+
+    if begin < timeWindow[1]:
+        missingIntervals.append((begin, timeWindow[1]))
+
+
+    ###
+    # Split the gaps
+    return([(splitBegin, min(splitBegin + maximumLength, end)) for begin, end in missingIntervals
+        for splitBegin in range(begin, end, maximumLength)])
+
+
+##
+# Retrieve the matches from the relevant queues in the relevant time frame
+def getRelevantMatchesFromHistory(matchHistory: Dict, dateFrom: str = const.EARLIEST_DATE_FOR_GAMES,
+        dateTo: str = const.LATEST_DATE_FOR_GAMES) -> Tuple[Dict, Set]:
+    '''
+    Extract the relevant matches from the match history. Relevant queues are normal, flex,
+    ranked and ARAM within the given time window
+    '''
+
+    logger.debug('Get relevant matches from match history')
+
+
+    ###
+    # Convert the dates to the relevant unix timestamps (could be done once to save some little computation time)
+    startTimewindow, endTimewindow = getTimeWindow(dateFrom = dateFrom, dateTo = dateTo)
+
+
+    ###
+    # Go through the list of played games and keep only the relevant games
+    if 'matches' in matchHistory.keys():
+        relevantMatches = {match['gameId']: match for match in matchHistory['matches']
+            if match['queue'] in const.QUEUES_EVALUATE
+                and match['timestamp'] >= startTimewindow and match['timestamp'] < endTimewindow}
+
+    else:
+        logger.warning('No matches found in match history')
+        relevantMatches = dict()
+
+
+    ###
+    # Collect the game ids into a set for quick comparisons
+    if relevantMatches:
+        relevantMatchIds = set(relevantMatches.keys())
+    else:
+        relevantMatchIds = set()
+
+
+    ###
+    # Return the relevant matches
+    return(relevantMatches, relevantMatchIds)
+
+
+##
+# Extract the account ids for all participants
+def extractAccountIdsFromMatchInformation(matchInformation: Dict,
+        availableSummoners: Set, evaluatedSummoners: Set, summonerAccountId: str) -> List:
+    '''
+    Extract and prepare the summoner ids for all summoners which participated in a match
+    '''
+
+    logger.debug('Extract summoner ids from match information')
+
+
+    ###
+    # Extract summoner id and summoner account id (static ones, not the current version fields)
+    # for all summoners which were not yet added to the list of available summoners
+    newSummonersInMatch = dict()
+    for summoner in matchInformation['participantIdentities']:
+        summonerAccountIdMatch = summoner['player']['accountId']
+        if (summonerAccountIdMatch not in evaluatedSummoners and summonerAccountIdMatch not in availableSummoners and
+            summonerAccountId != summonerAccountIdMatch):
+
+            newSummonersInMatch[summonerAccountIdMatch] = {'SummonerAccountId': summonerAccountIdMatch,
+                'SummonerId': summoner['player']['summonerId']}
+
+
+    ###
+    # Return dictionary with extracted summoners
+    return(newSummonersInMatch)
@@ -0,0 +1,390 @@
+'''
+
+Approximate counting of the unordered item combinations (builds, see item_combinations.py) per queue and
+champion with bounded memory:
+- a count-min sketch per group (depth rows of width counters, one hash function per row). The estimate
+  of a build is the minimum over the rows and exceeds the true count by at most epsilon times the
+  participants of the group with probability 1 - delta (width = e / epsilon, depth = ln(1 / delta))
+- the top k builds per group (heavy hitters), re-ranked with the sketch estimates after every update
+
+The memory per group does not depend on the number of distinct builds. Sketches with the same parameters
+and item universe can be merged (sum of the counters), e.g. over worker processes, extraction chunks or
+regions.
+
+'''
+
+
+###
+# Imports
+import logging
+import os
+from typing import List, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+    import src.ressources.item_combinations as itemCombinations
+except Exception:
+    import ressources.constants as const
+    import ressources.item_combinations as itemCombinations
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Functions
+
+##
+# Hash functions
+def hashKeys(keys: np.ndarray, seeds: np.ndarray) -> np.ndarray:
+    '''
+    Hash the keys once per seed (splitmix64 finaliser of the key combined with the seed).
+    Returns an array of uint64 with one row per seed
+    '''
+
+    with np.errstate(over = 'ignore'):
+        hashes = (keys.astype(np.uint64)[np.newaxis, :] ^ seeds[:, np.newaxis]) + np.uint64(0x9E3779B97F4A7C15)
+        hashes = (hashes ^ (hashes >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        hashes = (hashes ^ (hashes >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+
+    return(hashes ^ (hashes >> np.uint64(31)))
+
+
+##
+# Group keys
+def getGroupKeys(queueIds: np.ndarray, championIds: np.ndarray) -> np.ndarray:
+    '''
+    Return the keys of the groups (queue and champion packed into one integer)
+    '''
+
+    return((queueIds.astype(np.int64) << const.BUILD_SKETCH_GROUP_BITS) | championIds.astype(np.int64))
+
+
+###
+# Classes
+
+##
+# Sketch of the builds
+class BuildSketch:
+    '''
+    Count-min sketches of the encoded item combinations per group with the top k builds per group.
+    New groups extend the sketch when data is added
+    '''
+
+    def __init__(self, itemUniverse: np.ndarray, width: int, depth: int, topK: int, seed: int,
+            groupKeys: Union[np.ndarray, None] = None, counts: Union[np.ndarray, None] = None,
+            groupTotals: Union[np.ndarray, None] = None, hitterGroupKeys: Union[np.ndarray, None] = None,
+            hitterCombinations: Union[np.ndarray, None] = None, nMatches: int = 0) -> None:
+        self.itemUniverse = itemUniverse
+        self.width = width
+        self.depth = depth
+        self.topK = topK
+        self.seed = seed
+        self.seeds = np.random.SeedSequence(seed).generate_state(depth, dtype = np.uint64)
+
+        self.groupKeys = groupKeys if groupKeys is not None else np.zeros(0, dtype = np.int64)
+        self.counts = counts if counts is not None else np.zeros((len(self.groupKeys), depth, width), dtype = np.int64)
+        self.groupTotals = groupTotals if groupTotals is not None else np.zeros(len(self.groupKeys), dtype = np.int64)
+
+        self.hitterGroupKeys = hitterGroupKeys if hitterGroupKeys is not None else np.zeros(0, dtype = np.int64)
+        self.hitterCombinations = hitterCombinations if hitterCombinations is not None else np.zeros(0, dtype = np.int64)
+
+        self.nMatches = nMatches
+
+
+    ##
+    # Create a sketch from the error bounds
+    @classmethod
+    def create(cls, itemUniverse: np.ndarray, epsilon: float = const.BUILD_SKETCH_EPSILON,
+            delta: float = const.BUILD_SKETCH_DELTA, topK: int = const.BUILD_SKETCH_TOP_K,
+            seed: int = const.BUILD_SKETCH_SEED) -> 'BuildSketch':
+        '''
+        Create an empty sketch with the width and depth for the given error bounds
+        '''
+
+        return(cls(itemUniverse = itemUniverse, width = int(np.ceil(np.e / epsilon)),
+            depth = int(np.ceil(np.log(1 / delta))), topK = topK, seed = seed))
+
+
+    ##
+    # Relative error bound
+    @property
+    def epsilon(self) -> float:
+        '''
+        Error bound of the estimates relative to the participants of the group
+        '''
+
+        return(np.e / self.width)
+
+
+    ##
+    # Compatibility of two sketches
+    def isCompatible(self, buildSketch: 'BuildSketch') -> bool:
+        '''
+        Check if another sketch has the same parameters and item universe (required to merge them)
+        '''
+
+        return(self.width == buildSketch.width and self.depth == buildSketch.depth and self.topK == buildSketch.topK
+            and self.seed == buildSketch.seed and np.array_equal(self.itemUniverse, buildSketch.itemUniverse))
+
+
+    ##
+    # Indices of groups
+    def getGroupIndices(self, groupKeys: np.ndarray) -> np.ndarray:
+        '''
+        Return the indices of the groups, extending the sketch by unknown groups
+        '''
+
+        uniqueGroupKeys = np.unique(groupKeys)
+
+        if not np.isin(uniqueGroupKeys, self.groupKeys).all():
+            newGroupKeys = np.union1d(self.groupKeys, uniqueGroupKeys)
+            oldGroupIndices = np.searchsorted(newGroupKeys, self.groupKeys)
+
+            newCounts = np.zeros((len(newGroupKeys), self.depth, self.width), dtype = np.int64)
+            newCounts[oldGroupIndices] = self.counts
+
+            newGroupTotals = np.zeros(len(newGroupKeys), dtype = np.int64)
+            newGroupTotals[oldGroupIndices] = self.groupTotals
+
+            self.groupKeys, self.counts, self.groupTotals = newGroupKeys, newCounts, newGroupTotals
+
+        return(np.searchsorted(self.groupKeys, groupKeys))
+
+
+    ##
+    # Estimate counts
+    def estimate(self, groupKeys: np.ndarray, combinations: np.ndarray) -> np.ndarray:
+        '''
+        Return the estimated counts of the combinations in the groups (0 for unknown groups)
+        '''
+
+        groupIndices = np.minimum(np.searchsorted(self.groupKeys, groupKeys), max(len(self.groupKeys) - 1, 0))
+        knownGroups = (groupIndices < len(self.groupKeys)) & (self.groupKeys[groupIndices] == groupKeys) \
+            if len(self.groupKeys) > 0 else np.zeros(len(groupKeys), dtype = bool)
+
+        estimates = np.zeros(len(groupKeys), dtype = np.int64)
+        if knownGroups.any():
+            columns = (hashKeys(keys = combinations[knownGroups], seeds = self.seeds) % np.uint64(self.width)).astype(np.int64)
+            estimates[knownGroups] = self.counts[groupIndices[knownGroups][np.newaxis, :],
+                np.arange(self.depth)[:, np.newaxis], columns].min(axis = 0)
+
+        return(estimates)
+
+
+    ##
+    # Update the heavy hitters
+    def updateHeavyHitters(self, groupKeys: np.ndarray, combinations: np.ndarray) -> None:
+        '''
+        Rank the current heavy hitters together with new candidates by their estimates and keep the top k per group
+        '''
+
+        candidates = pd.DataFrame({'Group': groupKeys, 'Combination': combinations}).drop_duplicates()
+        candidates['N'] = self.estimate(groupKeys = candidates['Group'].to_numpy(),
+            combinations = candidates['Combination'].to_numpy())
+
+        candidates = candidates.sort_values(['Group', 'N', 'Combination'], ascending = [True, False, True])
+        candidates = candidates.loc[candidates.groupby('Group').cumcount().to_numpy() < self.topK]
+
+        self.hitterGroupKeys = candidates['Group'].to_numpy(dtype = np.int64)
+        self.hitterCombinations = candidates['Combination'].to_numpy(dtype = np.int64)
+
+
+    ##
+    # Add data
+    def add(self, legendaryAndMythicItems: pd.DataFrame, nMatches: int) -> None:
+        '''
+        Add the extracted legendary/mythic items of complete participants (e.g. a chunk of the extraction)
+        '''
+
+        self.nMatches += nMatches
+
+        if legendaryAndMythicItems.shape[0] == 0:
+            return
+
+        ###
+        # Builds of the participants, counted per group
+        combinationCounts = itemCombinations.countItemCombinations(encodedCombinations = itemCombinations.encodeItemCombinations(
+            legendaryAndMythicItems = legendaryAndMythicItems, itemUniverse = self.itemUniverse))
+
+        groupKeys = getGroupKeys(queueIds = combinationCounts['Queue'].to_numpy(),
+            championIds = combinationCounts['Champion'].to_numpy())
+        combinations = combinationCounts['Combination'].to_numpy(dtype = np.int64)
+        combinationN = combinationCounts['N'].to_numpy(dtype = np.int64)
+
+
+        ###
+        # Update the counters (one counter per row and build)
+        groupIndices = self.getGroupIndices(groupKeys = groupKeys)
+        columns = (hashKeys(keys = combinations, seeds = self.seeds) % np.uint64(self.width)).astype(np.int64)
+
+        np.add.at(self.counts, (groupIndices[np.newaxis, :], np.arange(self.depth)[:, np.newaxis], columns),
+            combinationN[np.newaxis, :])
+        np.add.at(self.groupTotals, groupIndices, combinationN)
+
+
+        ###
+        # Heavy hitters
+        self.updateHeavyHitters(groupKeys = np.concatenate([self.hitterGroupKeys, groupKeys]),
+            combinations = np.concatenate([self.hitterCombinations, combinations]))
+
+
+    ##
+    # Merge sketches
+    @classmethod
+    def merge(cls, buildSketches: Sequence['BuildSketch']) -> 'BuildSketch':
+        '''
+        Merge sketches with the same parameters (sum of the counters, heavy hitters re-ranked over the union)
+        '''
+
+        for buildSketch in buildSketches[1:]:
+            if not buildSketches[0].isCompatible(buildSketch = buildSketch):
+                raise AssertionError('Sketches with different parameters or item universes can not be merged')
+
+        mergedSketch = cls(itemUniverse = buildSketches[0].itemUniverse, width = buildSketches[0].width,
+            depth = buildSketches[0].depth, topK = buildSketches[0].topK, seed = buildSketches[0].seed,
+            nMatches = sum(buildSketch.nMatches for buildSketch in buildSketches))
+
+        mergedSketch.getGroupIndices(groupKeys = np.concatenate([buildSketch.groupKeys for buildSketch in buildSketches]))
+        for buildSketch in buildSketches:
+            groupIndices = np.searchsorted(mergedSketch.groupKeys, buildSketch.groupKeys)
+
+            mergedSketch.counts[groupIndices] += buildSketch.counts
+            mergedSketch.groupTotals[groupIndices] += buildSketch.groupTotals
+
+        mergedSketch.updateHeavyHitters(
+            groupKeys = np.concatenate([buildSketch.hitterGroupKeys for buildSketch in buildSketches]),
+            combinations = np.concatenate([buildSketch.hitterCombinations for buildSketch in buildSketches]))
+
+        return(mergedSketch)
+
+
+    ##
+    # Heavy hitters
+    def getHeavyHitters(self) -> pd.DataFrame:
+        '''
+        Return the top builds per queue and champion with the estimated count N, the error bound of the
+        estimate (N - ErrorBound <= true count <= N with probability 1 - delta), the participants of the
+        group and the estimated share of the build
+        '''
+
+        groupIndices = np.searchsorted(self.groupKeys, self.hitterGroupKeys)
+        estimates = self.estimate(groupKeys = self.hitterGroupKeys, combinations = self.hitterCombinations)
+
+        return(pd.DataFrame({
+            'Queue': self.hitterGroupKeys >> const.BUILD_SKETCH_GROUP_BITS,
+            'Champion': self.hitterGroupKeys & (2**const.BUILD_SKETCH_GROUP_BITS - 1),
+            'Items': ['-'.join(str(itemId) for itemId in itemCombinations.decodeItemCombination(
+                combination = combination, itemUniverse = self.itemUniverse)) for combination in self.hitterCombinations],
+            'N': estimates,
+            'ErrorBound': np.ceil(self.epsilon * self.groupTotals[groupIndices]).astype(np.int64),
+            'GroupN': self.groupTotals[groupIndices],
+            'Share': estimates / np.maximum(self.groupTotals[groupIndices], 1)
+        }))
+
+
+    ##
+    # Save
+    def save(self, sketchPath: str) -> None:
+        '''
+        Save the sketch as npz file (temporary file which then replaces the old file)
+        '''
+
+        with open('{}{}'.format(sketchPath, const.PARTIAL_FILE_SUFFIX), 'wb') as sketchFile:
+            np.savez_compressed(sketchFile, ItemUniverse = self.itemUniverse, Width = self.width, Depth = self.depth,
+                TopK = self.topK, Seed = self.seed, GroupKeys = self.groupKeys, Counts = self.counts,
+                GroupTotals = self.groupTotals, HitterGroupKeys = self.hitterGroupKeys,
+                HitterCombinations = self.hitterCombinations, NMatches = self.nMatches)
+
+        os.replace('{}{}'.format(sketchPath, const.PARTIAL_FILE_SUFFIX), sketchPath)
+
+
+    ##
+    # Load
+    @classmethod
+    def load(cls, sketchPath: str) -> 'BuildSketch':
+        '''
+        Load a sketch saved with save
+        '''
+
+        with np.load(sketchPath) as sketchFile:
+            return(cls(itemUniverse = sketchFile['ItemUniverse'], width = int(sketchFile['Width']),
+                depth = int(sketchFile['Depth']), topK = int(sketchFile['TopK']), seed = int(sketchFile['Seed']),
+                groupKeys = sketchFile['GroupKeys'], counts = sketchFile['Counts'], groupTotals = sketchFile['GroupTotals'],
+                hitterGroupKeys = sketchFile['HitterGroupKeys'], hitterCombinations = sketchFile['HitterCombinations'],
+                nMatches = int(sketchFile['NMatches'])))
+
+
+###
+# Functions
+
+##
+# Path of a sketch
+def getBuildSketchPath(region: str) -> str:
+    '''
+    Return the path of the build sketch of a region
+    '''
+
+    return('{}{}'.format(const.FOLDER_BUILD_SKETCHES, const.BUILD_SKETCH_FILE.format(region = region,
+        dateFrom = const.EARLIEST_DATE_FOR_GAMES, dateTo = const.LATEST_DATE_FOR_GAMES)))
+
+
+##
+# Load the sketch of a region
+def loadBuildSketch(region: str, nMatches: int, itemUniverse: np.ndarray) -> Union[BuildSketch, None]:
+    '''
+    Load the sketch of a region. Returns None if it is missing, does not contain the given number of
+    matches or was created with other parameters, the sketch then has to be rebuilt from the extracted data
+    '''
+
+    emptySketch = BuildSketch.create(itemUniverse = itemUniverse)
+
+    if nMatches == 0:
+        return(emptySketch)
+
+    sketchPath = getBuildSketchPath(region = region)
+    if not os.path.isfile(sketchPath):
+        logger.info('Build sketch of region %s does not exist', region)
+        return(None)
+
+    buildSketch = BuildSketch.load(sketchPath = sketchPath)
+
+    if buildSketch.nMatches != nMatches or not buildSketch.isCompatible(buildSketch = emptySketch):
+        logger.info('Build sketch of region %s does not match the extracted data', region)
+        return(None)
+
+    return(buildSketch)
+
+
+##
+# Save the sketch of a region
+def saveBuildSketch(region: str, buildSketch: BuildSketch) -> None:
+    '''
+    Save the sketch of a region
+    '''
+
+    os.makedirs(const.FOLDER_BUILD_SKETCHES, exist_ok = True)
+    buildSketch.save(sketchPath = getBuildSketchPath(region = region))
+
+
+    ###
+    # End of function
+    return
+
+
+##
+# Merge the sketches of several regions
+def loadMergedBuildSketch(regions: List[str]) -> BuildSketch:
+    '''
+    Load and merge the sketches of several regions
+    '''
+
+    return(BuildSketch.merge([BuildSketch.load(sketchPath = getBuildSketchPath(region = region)) for region in regions]))
@@ -0,0 +1,275 @@
+'''
+
+Build order index: prefix trie over the paths queue -> champion -> first item -> ... -> fifth item of
+every participant, with the number of participants passing through every node.
+
+The trie is stored in flat arrays (parent, label and count per node). The nodes are ordered by depth and,
+within a depth, by (parent, label), so the edge keys (parent << const.BUILD_TRIE_LABEL_BITS | label) of all
+nodes are sorted. A child is found with a binary search on the edge keys and the children of a node are a
+contiguous range, a lookup of a prefix costs one search per level.
+
+Tries are built level by level with vectorised operations and can be merged (e.g. extraction chunks or
+regions) by summing the counts of the same paths.
+
+'''
+
+
+###
+# Imports
+import logging
+import os
+from typing import List, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+    import src.ressources.data_processing as dataProcessing
+except Exception:
+    import ressources.constants as const
+    import ressources.data_processing as dataProcessing
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Classes
+
+##
+# Prefix trie
+class BuildTrie:
+    '''
+    Array-backed prefix trie with counts. Node 0 is the root (count = number of participants)
+    '''
+
+    def __init__(self, nodeParent: np.ndarray, nodeLabel: np.ndarray, nodeCount: np.ndarray,
+            depthOffsets: np.ndarray) -> None:
+        self.nodeParent = nodeParent
+        self.nodeLabel = nodeLabel
+        self.nodeCount = nodeCount
+        self.depthOffsets = depthOffsets
+
+        # Edge keys of all nodes except the root (node i has the key at position i - 1)
+        self.edgeKeys = (nodeParent[1:] << const.BUILD_TRIE_LABEL_BITS) | nodeLabel[1:]
+
+
+    ##
+    # Create a trie from the nodes of every level
+    @classmethod
+    def fromLevels(cls, rootCount: int, levels: List[Tuple[np.ndarray, np.ndarray]]) -> 'BuildTrie':
+        '''
+        Create a trie from the root count and, per level, the sorted unique edge keys and their counts
+        '''
+
+        nodeParent = [np.array([-1], dtype = np.int64)]
+        nodeLabel = [np.array([0], dtype = np.int64)]
+        nodeCount = [np.array([rootCount], dtype = np.int64)]
+        depthOffsets = [0, 1]
+
+        for edgeKeys, edgeCounts in levels:
+            nodeParent.append(edgeKeys >> const.BUILD_TRIE_LABEL_BITS)
+            nodeLabel.append(edgeKeys & (2**const.BUILD_TRIE_LABEL_BITS - 1))
+            nodeCount.append(edgeCounts.astype(np.int64))
+            depthOffsets.append(depthOffsets[-1] + len(edgeKeys))
+
+        return(cls(nodeParent = np.concatenate(nodeParent), nodeLabel = np.concatenate(nodeLabel),
+            nodeCount = np.concatenate(nodeCount), depthOffsets = np.array(depthOffsets, dtype = np.int64)))
+
+
+    ##
+    # Create a trie from paths
+    @classmethod
+    def fromPaths(cls, paths: np.ndarray) -> 'BuildTrie':
+        '''
+        Create a trie from paths (one row per participant, shorter paths padded with -1)
+        '''
+
+        pathNodes = np.zeros(paths.shape[0], dtype = np.int64)
+        nextNodeId = 1
+
+        levels = list()
+        for depth in range(paths.shape[1]):
+            activePaths = paths[:, depth] >= 0
+            if not activePaths.any():
+                break
+
+            edgeKeys, edgeIndices, edgeCounts = np.unique((pathNodes[activePaths] << const.BUILD_TRIE_LABEL_BITS)
+                | paths[activePaths, depth], return_inverse = True, return_counts = True)
+
+            pathNodes[activePaths] = nextNodeId + edgeIndices.ravel()
+            nextNodeId += len(edgeKeys)
+
+            levels.append((edgeKeys, edgeCounts))
+
+        return(cls.fromLevels(rootCount = paths.shape[0], levels = levels))
+
+
+    ##
+    # Create a trie from extracted data
+    @classmethod
+    def fromExtractedData(cls, legendaryAndMythicItems: pd.DataFrame) -> 'BuildTrie':
+        '''
+        Create a trie from the extracted legendary/mythic items (complete participants, see
+        data_processing.extractBoughtMythicAndLegendaryItems)
+        '''
+
+        participantStart, slotIndices = dataProcessing.getParticipantSlots(legendaryAndMythicItems = legendaryAndMythicItems)
+
+        paths = np.full((participantStart.sum(), 2 + slotIndices.max(initial = -1) + 1), -1, dtype = np.int64)
+        paths[:, 0] = legendaryAndMythicItems['Queue'].to_numpy(dtype = np.int64)[participantStart]
+        paths[:, 1] = legendaryAndMythicItems['Champion'].to_numpy(dtype = np.int64)[participantStart]
+        paths[np.cumsum(participantStart) - 1, 2 + slotIndices] = legendaryAndMythicItems['Item'].to_numpy(dtype = np.int64)
+
+        return(cls.fromPaths(paths = paths))
+
+
+    ##
+    # Merge tries
+    @classmethod
+    def merge(cls, buildTries: Sequence['BuildTrie']) -> 'BuildTrie':
+        '''
+        Merge tries, summing the counts of the same paths
+        '''
+
+        nodeMappings = [np.zeros(len(buildTrie.nodeCount), dtype = np.int64) for buildTrie in buildTries]
+        nextNodeId = 1
+
+        levels = list()
+        for depth in range(1, max(len(buildTrie.depthOffsets) for buildTrie in buildTries) - 1):
+            ###
+            # Edge keys of the level with the parents in the merged trie
+            levelNodes = [np.arange(*buildTrie.depthOffsets[depth:(depth + 2)]) if depth + 1 < len(buildTrie.depthOffsets)
+                else np.zeros(0, dtype = np.int64) for buildTrie in buildTries]
+
+            edgeKeys = np.concatenate([(nodeMapping[buildTrie.nodeParent[nodes]] << const.BUILD_TRIE_LABEL_BITS)
+                | buildTrie.nodeLabel[nodes] for buildTrie, nodeMapping, nodes in zip(buildTries, nodeMappings, levelNodes)])
+            edgeCounts = np.concatenate([buildTrie.nodeCount[nodes] for buildTrie, nodes in zip(buildTries, levelNodes)])
+
+
+            ###
+            # Sum the counts of the same edges and map the nodes to the merged nodes
+            edgeKeys, edgeIndices = np.unique(edgeKeys, return_inverse = True)
+            edgeIndices = edgeIndices.ravel()
+
+            levelOffset = 0
+            for nodeMapping, nodes in zip(nodeMappings, levelNodes):
+                nodeMapping[nodes] = nextNodeId + edgeIndices[levelOffset:(levelOffset + len(nodes))]
+                levelOffset += len(nodes)
+
+            nextNodeId += len(edgeKeys)
+            levels.append((edgeKeys, np.bincount(edgeIndices, weights = edgeCounts, minlength = len(edgeKeys))))
+
+        return(cls.fromLevels(rootCount = sum(int(buildTrie.nodeCount[0]) for buildTrie in buildTries), levels = levels))
+
+
+    ##
+    # Find a node
+    def findNode(self, path: Sequence[int]) -> int:
+        '''
+        Return the node of a path (queue, champion, items), -1 if no participant has this path
+        '''
+
+        nodeId = 0
+        for label in path:
+            edgeKey = (nodeId << const.BUILD_TRIE_LABEL_BITS) | int(label)
+            position = np.searchsorted(self.edgeKeys, edgeKey)
+
+            if position == len(self.edgeKeys) or self.edgeKeys[position] != edgeKey:
+                return(-1)
+
+            nodeId = int(position) + 1
+
+        return(nodeId)
+
+
+    ##
+    # Children of a node
+    def getChildren(self, nodeId: int) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        Return the labels and counts of the children of a node
+        '''
+
+        childrenStart, childrenEnd = np.searchsorted(self.edgeKeys, [nodeId << const.BUILD_TRIE_LABEL_BITS,
+            (nodeId + 1) << const.BUILD_TRIE_LABEL_BITS])
+
+        return(self.nodeLabel[(childrenStart + 1):(childrenEnd + 1)], self.nodeCount[(childrenStart + 1):(childrenEnd + 1)])
+
+
+    ##
+    # Distribution of the next item
+    def getNextItemDistribution(self, championId: int, items: Sequence[int] = (),
+            queueIds: Union[List[int], None] = None) -> pd.DataFrame:
+        '''
+        Return the distribution of the next item after the given items (e.g. the second items after a mythic
+        item) of a champion, summed over the given queues (all queues if None). The share is relative to the
+        participants with the given items, the difference to 1 bought no further legendary/mythic item
+        '''
+
+        if queueIds is None:
+            queueIds, _ = self.getChildren(nodeId = 0)
+
+        nextItems = list()
+        nParticipants = 0
+        for queueId in queueIds:
+            if (nodeId := self.findNode(path = [queueId, championId, *items])) < 0:
+                continue
+
+            nParticipants += int(self.nodeCount[nodeId])
+            itemIds, itemCounts = self.getChildren(nodeId = nodeId)
+            nextItems.append(pd.DataFrame({'Item': itemIds, 'N': itemCounts}))
+
+        if not nextItems:
+            return(pd.DataFrame({'Item': list(), 'N': list(), 'Share': list()}))
+
+        nextItemDistribution = pd.concat(nextItems).groupby('Item')['N'].sum().sort_values(ascending = False).reset_index()
+        nextItemDistribution['Share'] = nextItemDistribution['N'] / nParticipants
+
+        return(nextItemDistribution)
+
+
+    ##
+    # Save
+    def save(self, triePath: str) -> None:
+        '''
+        Save the trie as npz file (temporary file which then replaces the old file)
+        '''
+
+        with open('{}{}'.format(triePath, const.PARTIAL_FILE_SUFFIX), 'wb') as trieFile:
+            np.savez_compressed(trieFile, NodeParent = self.nodeParent, NodeLabel = self.nodeLabel,
+                NodeCount = self.nodeCount, DepthOffsets = self.depthOffsets)
+
+        os.replace('{}{}'.format(triePath, const.PARTIAL_FILE_SUFFIX), triePath)
+
+
+    ##
+    # Load
+    @classmethod
+    def load(cls, triePath: str) -> 'BuildTrie':
+        '''
+        Load a trie saved with save
+        '''
+
+        with np.load(triePath) as trieFile:
+            return(cls(nodeParent = trieFile['NodeParent'], nodeLabel = trieFile['NodeLabel'],
+                nodeCount = trieFile['NodeCount'], depthOffsets = trieFile['DepthOffsets']))
+
+
+###
+# Functions
+
+##
+# Path of a trie
+def getBuildTriePath(region: str) -> str:
+    '''
+    Return the path of the build order trie of a region
+    '''
+
+    return('{}{}'.format(const.FOLDER_BUILD_TRIES, const.BUILD_TRIE_FILE.format(region = region,
+        dateFrom = const.EARLIEST_DATE_FOR_GAMES, dateTo = const.LATEST_DATE_FOR_GAMES)))
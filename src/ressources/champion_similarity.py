@@ -0,0 +1,351 @@
+'''
+
+Similarities of the champions based on their mythic item distributions. From the mythic count cube, the
+champion x mythic share matrix is built once per queue. From it, the pairwise distances between the champions
+(Jensen-Shannon, cosine, Hellinger) and the champion orders of hierarchical clusterings (Ward and average
+linkage) are computed. The comparisons of two queues (e.g. Normal - Ranked) cluster the champions on the
+difference of their shares with the euclidean distance.
+
+The results are cached per region (npz for python, the champion orders as csv for the heatmaps of the R script)
+and only recomputed if the content of the count cube changed (hash of its labels and counts).
+
+'''
+
+
+###
+# Imports
+import hashlib
+import logging
+import os
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+    import src.ressources.count_cubes as countCubes
+except Exception:
+    import ressources.constants as const
+    import ressources.count_cubes as countCubes
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Functions
+
+##
+# Pairwise distances
+def computeDistances(values: np.ndarray, metric: str) -> np.ndarray:
+    '''
+    Pairwise distances between the rows of the values (shares of a distribution per row for Jensen-Shannon,
+    cosine and Hellinger). The Jensen-Shannon distance is the square root of the divergence with base 2
+    '''
+
+    if metric == const.SIMILARITY_COSINE:
+        norms = np.linalg.norm(values, axis = 1)
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            distances = 1 - np.clip(np.nan_to_num((values @ values.T) / np.outer(norms, norms)), -1, 1)
+
+    elif metric == const.SIMILARITY_HELLINGER:
+        sqrtValues = np.sqrt(values)
+        distances = np.sqrt(np.clip(1 - sqrtValues @ sqrtValues.T, 0, None))
+
+    elif metric == const.SIMILARITY_EUCLIDEAN:
+        squaredNorms = np.sum(values**2, axis = 1)
+        distances = np.sqrt(np.clip(squaredNorms[:, np.newaxis] + squaredNorms[np.newaxis, :] - 2 * values @ values.T,
+            0, None))
+
+    elif metric == const.SIMILARITY_JENSEN_SHANNON:
+        ###
+        # Divergences in blocks of rows against all rows (the mixtures need rows x rows x categories)
+        distances = np.zeros((len(values), len(values)))
+
+        for blockStart in range(0, len(values), const.SIMILARITY_BLOCK_SIZE):
+            blockValues = values[blockStart:(blockStart + const.SIMILARITY_BLOCK_SIZE), np.newaxis, :]
+            mixtures = (blockValues + values[np.newaxis, :, :]) / 2
+
+            with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                divergences = 0.5 * np.sum(np.where(blockValues > 0, blockValues * np.log(blockValues / mixtures), 0), axis = 2) \
+                    + 0.5 * np.sum(np.where(values[np.newaxis, :, :] > 0, values[np.newaxis, :, :]
+                    * np.log(values[np.newaxis, :, :] / mixtures), 0), axis = 2)
+
+            distances[blockStart:(blockStart + const.SIMILARITY_BLOCK_SIZE)] = np.sqrt(np.clip(divergences / np.log(2), 0, None))
+
+    else:
+        raise ValueError('Unknown distance metric {}'.format(metric))
+
+    np.fill_diagonal(distances, 0)
+
+    return((distances + distances.T) / 2)
+
+
+##
+# Hierarchical clustering
+def computeLinkage(distances: np.ndarray, linkage: str) -> np.ndarray:
+    '''
+    Agglomerative clustering of a distance matrix with the Lance-Williams updates (Ward on the squared
+    distances as ward.D2 in R, or average linkage). Returns the merges in the format of scipy (the ids of
+    the two merged clusters, the height and the size of the new cluster, new clusters get the ids n, n + 1, ...)
+    '''
+
+    if linkage not in (const.SIMILARITY_LINKAGE_WARD, const.SIMILARITY_LINKAGE_AVERAGE):
+        raise ValueError('Unknown linkage {}'.format(linkage))
+
+    nObservations = len(distances)
+
+    clusterDistances = distances.astype(np.float64)**(2 if linkage == const.SIMILARITY_LINKAGE_WARD else 1)
+    np.fill_diagonal(clusterDistances, np.inf)
+
+    clusterSizes = np.ones(nObservations)
+    clusterIds = np.arange(nObservations)
+
+    merges = np.zeros((max(nObservations - 1, 0), 4))
+    for step in range(nObservations - 1):
+        ###
+        # Closest pair of active clusters, the merged cluster takes the place of the first
+        i, j = sorted(np.unravel_index(np.argmin(clusterDistances), clusterDistances.shape))
+        height = clusterDistances[i, j]
+
+        merges[step] = [clusterIds[i], clusterIds[j],
+            np.sqrt(height) if linkage == const.SIMILARITY_LINKAGE_WARD else height, clusterSizes[i] + clusterSizes[j]]
+
+
+        ###
+        # Distances of the merged cluster to all other clusters
+        if linkage == const.SIMILARITY_LINKAGE_WARD:
+            mergedDistances = ((clusterSizes[i] + clusterSizes) * clusterDistances[i] + (clusterSizes[j] + clusterSizes)
+                * clusterDistances[j] - clusterSizes * height) / (clusterSizes[i] + clusterSizes[j] + clusterSizes)
+        else:
+            mergedDistances = (clusterSizes[i] * clusterDistances[i] + clusterSizes[j] * clusterDistances[j]) \
+                / (clusterSizes[i] + clusterSizes[j])
+
+        clusterDistances[i, :] = clusterDistances[:, i] = mergedDistances
+        clusterDistances[j, :] = clusterDistances[:, j] = np.inf
+        clusterDistances[i, i] = np.inf
+
+        clusterSizes[i] += clusterSizes[j]
+        clusterIds[i] = nObservations + step
+
+    return(merges)
+
+
+##
+# Order of the leaves
+def getLeafOrder(merges: np.ndarray) -> np.ndarray:
+    '''
+    Return the order of the observations in the dendrogram of a clustering (see computeLinkage)
+    '''
+
+    nObservations = len(merges) + 1
+    mergedClusters = merges[:, :2].astype(np.int64)
+
+    leafOrder = list()
+    clusterStack = [2 * nObservations - 2]
+    while clusterStack:
+        clusterId = clusterStack.pop()
+
+        if clusterId < nObservations:
+            leafOrder.append(clusterId)
+        else:
+            clusterStack.extend(mergedClusters[clusterId - nObservations, ::-1])
+
+    return(np.array(leafOrder, dtype = np.int64))
+
+
+##
+# Distances and orders of one heatmap
+def computeHeatmapSimilarity(championIds: np.ndarray, values: np.ndarray, metrics: List[str]) -> Dict[str, np.ndarray]:
+    '''
+    Compute the distances between the champions (rows of the values) for the metrics and the champion
+    orders for every metric and linkage
+    '''
+
+    heatmapSimilarity = {'Champions': championIds, 'Values': values}
+
+    for metric in metrics:
+        distances = computeDistances(values = values, metric = metric)
+        heatmapSimilarity['Distance_{}'.format(metric)] = distances
+
+        for linkage in const.SIMILARITY_LINKAGES:
+            heatmapSimilarity['Order_{}_{}'.format(metric, linkage)] = championIds[getLeafOrder(merges = computeLinkage(
+                distances = distances, linkage = linkage))] if len(championIds) > 1 else championIds
+
+    return(heatmapSimilarity)
+
+
+##
+# Similarities of a mythic count cube
+def computeChampionSimilarities(countCube: countCubes.CountCube,
+        minParticipants: int = const.SIMILARITY_MIN_PARTICIPANTS) -> Dict[str, Dict[str, np.ndarray]]:
+    '''
+    Compute the distances and orders of the champions per queue (heatmap named by the queue) and for the
+    comparisons of queues. Champions with less than minParticipants participants in a queue they were played
+    in are left out
+    '''
+
+    ###
+    # Counts as queue x champion x mythic and the selection of the champions
+    counts = np.moveaxis(countCube.counts, [countCube.axisNames.index(axisName) for axisName in ('Queue', 'Champion', 'Mythic')],
+        [0, 1, 2])
+    championTotals = counts.sum(axis = 2)
+
+    playedChampions = championTotals > 0
+    selectedChampions = np.all(~playedChampions | (championTotals >= minParticipants), axis = 0) & playedChampions.any(axis = 0)
+
+    queueIndices = {queueId: queueIndex for queueIndex, queueId in enumerate(countCube.axisLabels['Queue'])
+        if queueId in const.QUEUE_NAMES}
+
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        shares = np.nan_to_num(counts / championTotals[:, :, np.newaxis])
+
+
+    ###
+    # Heatmaps of the queues
+    championSimilarities = dict()
+    for queueId, queueIndex in queueIndices.items():
+        queueChampions = selectedChampions & playedChampions[queueIndex]
+
+        championSimilarities[const.QUEUE_NAMES[queueId]] = computeHeatmapSimilarity(
+            championIds = countCube.axisLabels['Champion'][queueChampions], values = shares[queueIndex, queueChampions],
+            metrics = const.SIMILARITY_METRICS)
+
+
+    ###
+    # Comparisons of queues on the difference of the shares
+    for comparisonName, (queueId, referenceQueueId) in const.QUEUE_COMPARISONS.items():
+        if queueId not in queueIndices or referenceQueueId not in queueIndices:
+            continue
+
+        queueIndex, referenceQueueIndex = queueIndices[queueId], queueIndices[referenceQueueId]
+        comparisonChampions = selectedChampions & playedChampions[queueIndex] & playedChampions[referenceQueueIndex]
+
+        championSimilarities[comparisonName] = computeHeatmapSimilarity(
+            championIds = countCube.axisLabels['Champion'][comparisonChampions],
+            values = shares[queueIndex, comparisonChampions] - shares[referenceQueueIndex, comparisonChampions],
+            metrics = [const.SIMILARITY_EUCLIDEAN])
+
+    return(championSimilarities)
+
+
+##
+# Paths of the cache
+def getSimilarityPaths(region: str) -> List[str]:
+    '''
+    Return the paths of the npz file and the csv file with the champion orders of a region
+    '''
+
+    return(['{}{}'.format(const.FOLDER_SIMILARITIES, similarityFile.format(region = region,
+        dateFrom = const.EARLIEST_DATE_FOR_GAMES, dateTo = const.LATEST_DATE_FOR_GAMES))
+        for similarityFile in (const.SIMILARITY_FILE, const.SIMILARITY_ORDER_TABLE)])
+
+
+##
+# Champion orders as table
+def getChampionOrderTable(championSimilarities: Dict[str, Dict[str, np.ndarray]]) -> pd.DataFrame:
+    '''
+    Return the champion orders of all heatmaps, metrics and linkages in long format
+    '''
+
+    championOrders = list()
+    for heatmapName, heatmapSimilarity in championSimilarities.items():
+        for key, championOrder in heatmapSimilarity.items():
+            if not key.startswith('Order_'):
+                continue
+
+            metric, linkage = key[len('Order_'):].rsplit('_', 1)
+            championOrders.append(pd.DataFrame({'Heatmap': heatmapName, 'Metric': metric, 'Linkage': linkage,
+                'Position': np.arange(1, len(championOrder) + 1), 'Champion': championOrder}))
+
+    return(pd.concat(championOrders, ignore_index = True))
+
+
+##
+# Signature of the count cube
+def computeCubeSignature(countCube: countCubes.CountCube) -> str:
+    '''
+    Hash over the axis labels and the counts of a count cube. It changes whenever the content of the cube
+    changes, also if the number of matches stays the same (e.g. a full extraction with new item definitions)
+    '''
+
+    cubeHash = hashlib.sha256()
+    for axisName in countCube.axisNames:
+        cubeHash.update(axisName.encode('utf-8'))
+        cubeHash.update(np.ascontiguousarray(countCube.axisLabels[axisName], dtype = np.int64).tobytes())
+
+    cubeHash.update(np.ascontiguousarray(countCube.counts, dtype = np.int64).tobytes())
+
+    return(cubeHash.hexdigest())
+
+
+##
+# Save the cache
+def saveChampionSimilarities(region: str, championSimilarities: Dict[str, Dict[str, np.ndarray]], countCube: countCubes.CountCube,
+        minParticipants: int) -> None:
+    '''
+    Save the similarities of a region together with the signature of the count cube they were computed from
+    '''
+
+    os.makedirs(const.FOLDER_SIMILARITIES, exist_ok = True)
+    similarityPath, orderTablePath = getSimilarityPaths(region = region)
+
+    with open('{}{}'.format(similarityPath, const.PARTIAL_FILE_SUFFIX), 'wb') as similarityFile:
+        np.savez_compressed(similarityFile, CubeSignature = computeCubeSignature(countCube = countCube),
+            NMatches = countCube.nMatches, MinParticipants = minParticipants,
+            Mythics = countCube.axisLabels['Mythic'], HeatmapNames = np.array(list(championSimilarities)),
+            **{'{}__{}'.format(heatmapName, key): values for heatmapName, heatmapSimilarity in championSimilarities.items()
+            for key, values in heatmapSimilarity.items()})
+
+    getChampionOrderTable(championSimilarities = championSimilarities).to_csv('{}{}'.format(orderTablePath,
+        const.PARTIAL_FILE_SUFFIX), index = False)
+
+    os.replace('{}{}'.format(similarityPath, const.PARTIAL_FILE_SUFFIX), similarityPath)
+    os.replace('{}{}'.format(orderTablePath, const.PARTIAL_FILE_SUFFIX), orderTablePath)
+
+
+    ###
+    # End of function
+    return
+
+
+##
+# Load the similarities of a region
+def loadChampionSimilarities(region: str, minParticipants: int = const.SIMILARITY_MIN_PARTICIPANTS) -> Dict[str, Dict[str, np.ndarray]]:
+    '''
+    Return the similarities of a region from the cache, computing and caching them if the cache is missing
+    or was computed from another content of the mythic count cube (signature of the cube)
+    '''
+
+    countCube = countCubes.CountCube.load(cubePath = countCubes.getCountCubePaths(cubeName = const.COUNT_CUBE_MYTHIC,
+        region = region)[0])
+    similarityPath, _ = getSimilarityPaths(region = region)
+
+    if os.path.isfile(similarityPath):
+        with np.load(similarityPath) as similarityFile:
+            if ('CubeSignature' in similarityFile.files and str(similarityFile['CubeSignature'])
+                    == computeCubeSignature(countCube = countCube)
+                    and int(similarityFile['MinParticipants']) == minParticipants):
+                logger.debug('Load cached champion similarities of region %s', region)
+
+                championSimilarities = {heatmapName: dict() for heatmapName in similarityFile['HeatmapNames']}
+                for key in similarityFile.files:
+                    if '__' in key:
+                        heatmapName, heatmapKey = key.split('__', 1)
+                        championSimilarities[heatmapName][heatmapKey] = similarityFile[key]
+
+                return(championSimilarities)
+
+    logger.info('Compute champion similarities of region %s', region)
+
+    championSimilarities = computeChampionSimilarities(countCube = countCube, minParticipants = minParticipants)
+    saveChampionSimilarities(region = region, championSimilarities = championSimilarities, countCube = countCube,
+        minParticipants = minParticipants)
+
+    return(championSimilarities)
@@ -1,106 +1,450 @@
-'''
-
-File with all the used constants
-
-'''
-
-
-###
-# MongoDB
-MONGODB_PATH = 'localhost:27017'
-MONGODB_DATABASE = 'lol-games-item-diversity-{startDate}-{endDate}'
-
-MONGODB_DOCUMENTS_SUMMONER_IDS = 'summoner-ids-{region}'
-MONGODB_DOCUMENTS_SUMMONER_IDS_PROCESSED = 'summoner-ids-processed-{region}'
-# This collection is not strictly necessary, one could also add a field to the previous collection
-# and filter/update on that field. But this is easier to understand
-
-MONGODB_DOCUMENTS_GAME_INFORMATION = 'game-information-{region}'
-
-
-###
-# Riot-API URL endpoints
-URL_ID_FOR_NAME = 'https://{region}.api.riotgames.com/lol/summoner/v4/summoners/by-name/{userName}?api_key={apiKey}'
-URL_MATCH_HISTORY = 'https://{region}.api.riotgames.com/lol/match/v4/matchlists/by-account/{accountId}?api_key={apiKey}'
-URL_MATCH_INFO = 'https://{region}.api.riotgames.com/lol/match/v4/matches/{matchId}?api_key={apiKey}'
-URL_MATCH_TIMELINE = 'https://{region}.api.riotgames.com/lol/match/v4/timelines/by-match/{matchId}?api_key={apiKey}'
-
-URL_SLEEP_AFTER_REQUEST = 120 / 100 # There are only 100 requests every 2 minutes allowed
-# https://developer.riotgames.com/docs/portal#web-apis_api-keys
-URL_SLEEP_ON_ERROR = 10
-
-
-###
-# Environment variable which holds the API key
-API_KEY = 'RIOT_API_KEY_EMBEDDING'
-
-
-###
-# Initial accounts
-INITIAL_ACCOUNTS = {
-    'euw1': 'giantZorg',
-    'na1': 'Hèrmés'
-}
-
-
-###
-# Maximum number of accounts/games to evaluate
-MAXIMUM_ACCOUNTS_TO_EVALUATE = 10000
-
-# Date from when on games should be evaluated
-EARLIEST_DATE_FOR_GAMES = '20210428'    # In time format TIME_FORMAT
-LATEST_DATE_FOR_GAMES = '20210511'
-
-
-###
-# Queue IDs (taken from http://static.developer.riotgames.com/docs/lol/queues.json)
-QUEUE_NORMAL = 400
-QUEUE_FLEX = 440
-QUEUE_RANKED = 420
-QUEUE_ARAM = 450
-QUEUES_EVALUATE = set((QUEUE_NORMAL, QUEUE_FLEX, QUEUE_RANKED, QUEUE_ARAM))
-
-
-###
-# Time
-TIME_FORMAT = '%Y%m%d'
-TIME_ZONE = 'Europe/Zurich'
-
-
-###
-# Items
-DDRAGON_ITEMS = 'http://ddragon.leagueoflegends.com/cdn/11.10.1/data/en_US/item.json'
-DDRAGON_ITEM_ICONS = 'http://ddragon.leagueoflegends.com/cdn/11.10.1/img/item/{itemId}.png'
-
-LOL_WIKI_MYTHICS = 'https://leagueoflegends.fandom.com/wiki/Mythic_item'
-LOL_WIKI_LEGENDARIES = 'https://leagueoflegends.fandom.com/wiki/Legendary_item'
-
-ITEMS_MANAMUNE = 'Manamune'
-ITEMS_MURAMANA = 'Muramana'
-ITEMS_ARCHANGELS = 'Archangel\'s Staff'
-ITEMS_SERAPHS = 'Seraph\'s Embrace'
-
-ITEMS_MAPPING = {ITEMS_MURAMANA: ITEMS_MANAMUNE, ITEMS_SERAPHS: ITEMS_ARCHANGELS}
-
-# Champions
-DDRAGON_CHAMPIONS = 'http://ddragon.leagueoflegends.com/cdn/11.10.1/data/en_US/champion.json'
-DDRAGON_CHAMPION_ICONS = 'http://ddragon.leagueoflegends.com/cdn/11.10.1/img/champion/{champion}.png'
-
-
-###
-# Timeline
-TIMELINE_ITEM_BOUGHT = 'ITEM_PURCHASED'
-TIMELINE_ITEM_RETURNED = 'ITEM_UNDO'
-TIMELINE_ITEM_SOLD = 'ITEM_SOLD'
-
-
-###
-# Data path
-FOLDER_DATA = 'data/'
-MYTHIC_DATA_FILE = 'mythics_{region}_{dateFrom}_{dateTo}.csv'
-LEGENDARY_MYTHIC_DATA_FILE = 'legendary_and_mythics_{region}_{dateFrom}_{dateTo}.csv'
-
-MYTHIC_IDS = 'mythic_ids.csv'
-CHAMPION_IDS = 'champion_ids.csv'
-
-FOLDER_ICONS = '{}icons/'.format(FOLDER_DATA)
+'''
+
+File with all the used constants
+
+'''
+
+
+###
+# MongoDB
+MONGODB_PATH = 'localhost:27017'
+
+# One database for all time windows, the matches are selected by their creation time (and patch) when they
+# are used. The per-window databases of earlier versions can be moved into it with migrate_database.py
+MONGODB_DATABASE = 'lol-games-item-diversity'
+MONGODB_DATABASE_WINDOW = 'lol-games-item-diversity-{startDate}-{endDate}'
+
+MONGODB_DOCUMENTS_SUMMONER_IDS = 'summoner-ids-{region}'
+MONGODB_DOCUMENTS_SUMMONER_IDS_PROCESSED = 'summoner-ids-processed-{region}'
+# This collection is not strictly necessary, one could also add a field to the previous collection
+# and filter/update on that field. But this is easier to understand
+
+MONGODB_DOCUMENTS_GAME_INFORMATION = 'game-information-{region}'
+
+# Fields of the match documents which are indexed (gameCreation from the API in unix time in milliseconds,
+# patch derived from gameVersion when the match is saved) and of the processed summoners (time intervals
+# [begin, end) in unix time in milliseconds for which the match history of the summoner was retrieved)
+MONGODB_FIELD_GAME_CREATION = 'gameCreation'
+MONGODB_FIELD_PATCH = 'patch'
+MONGODB_FIELD_COVERED_INTERVALS = 'coveredIntervals'
+
+# Number of match ids which are requested at once when only a subset of the matches is read
+MONGODB_ID_BATCH_SIZE = 10000
+
+# Storage layout of the collections (see ressources/storage_layout.py): block compressor of the collections (set when
+# they are created, zstd needs MongoDB 4.2), secondary indexes of the match collection (lists of ascending fields) and
+# suffix of the temporary collections of a migration
+MONGODB_BLOCK_COMPRESSOR = 'zstd'
+MONGODB_FIELD_QUEUE = 'queueId'
+MONGODB_MATCH_INDEXES = [
+    [MONGODB_FIELD_GAME_CREATION],
+    [MONGODB_FIELD_PATCH, MONGODB_FIELD_GAME_CREATION],
+    [MONGODB_FIELD_QUEUE, MONGODB_FIELD_GAME_CREATION]
+]
+MONGODB_MIGRATION_SUFFIX = '-migration'
+
+
+###
+# Riot-API URL endpoints
+URL_ID_FOR_NAME = 'https://{region}.api.riotgames.com/lol/summoner/v4/summoners/by-name/{userName}?api_key={apiKey}'
+URL_MATCH_HISTORY = 'https://{region}.api.riotgames.com/lol/match/v4/matchlists/by-account/{accountId}?api_key={apiKey}'
+URL_MATCH_HISTORY_TIME_RANGE = '&beginTime={beginTime}&endTime={endTime}'    # Appended to URL_MATCH_HISTORY
+URL_MATCH_INFO = 'https://{region}.api.riotgames.com/lol/match/v4/matches/{matchId}?api_key={apiKey}'
+URL_MATCH_TIMELINE = 'https://{region}.api.riotgames.com/lol/match/v4/timelines/by-match/{matchId}?api_key={apiKey}'
+
+URL_SLEEP_AFTER_REQUEST = 120 / 100 # There are only 100 requests every 2 minutes allowed
+# https://developer.riotgames.com/docs/portal#web-apis_api-keys
+URL_SLEEP_ON_ERROR = 10
+
+
+###
+# Environment variable which holds the API key
+API_KEY = 'RIOT_API_KEY_EMBEDDING'
+
+
+###
+# Initial accounts
+INITIAL_ACCOUNTS = {
+    'euw1': 'giantZorg',
+    'na1': 'Hèrmés'
+}
+
+
+###
+# Maximum number of accounts/games to evaluate
+MAXIMUM_ACCOUNTS_TO_EVALUATE = 10000
+
+# Date from when on games should be evaluated
+EARLIEST_DATE_FOR_GAMES = '20210428'    # In time format TIME_FORMAT
+LATEST_DATE_FOR_GAMES = '20210511'
+
+# Longest time range of a match history request with begin and end time (one week in milliseconds)
+MATCH_HISTORY_MAXIMUM_TIME_RANGE = 7 * 24 * 3600 * 1000
+
+
+###
+# Queue IDs (taken from http://static.developer.riotgames.com/docs/lol/queues.json)
+QUEUE_NORMAL = 400
+QUEUE_FLEX = 440
+QUEUE_RANKED = 420
+QUEUE_ARAM = 450
+QUEUES_EVALUATE = set((QUEUE_NORMAL, QUEUE_FLEX, QUEUE_RANKED, QUEUE_ARAM))
+QUEUE_NAMES = {QUEUE_NORMAL: 'Normal', QUEUE_RANKED: 'Ranked', QUEUE_FLEX: 'Flex', QUEUE_ARAM: 'ARAM'}
+
+# Comparisons of queues (name, queue and reference queue), e.g. for the champion similarities and the significance tests
+QUEUE_COMPARISONS = {'Normal-Ranked': (QUEUE_NORMAL, QUEUE_RANKED), 'ARAM-Ranked': (QUEUE_ARAM, QUEUE_RANKED)}
+
+
+###
+# Time
+TIME_FORMAT = '%Y%m%d'
+TIME_ZONE = 'Europe/Zurich'
+
+
+###
+# Data dragon version (patch) of the item and champion information
+DDRAGON_VERSION = '11.10.1'
+
+
+###
+# Items
+DDRAGON_ITEMS = 'http://ddragon.leagueoflegends.com/cdn/{}/data/en_US/item.json'.format(DDRAGON_VERSION)
+DDRAGON_ITEM_ICONS = 'http://ddragon.leagueoflegends.com/cdn/{}/img/item/{{itemId}}.png'.format(DDRAGON_VERSION)
+
+LOL_WIKI_MYTHICS = 'https://leagueoflegends.fandom.com/wiki/Mythic_item'
+LOL_WIKI_LEGENDARIES = 'https://leagueoflegends.fandom.com/wiki/Legendary_item'
+
+ITEMS_MANAMUNE = 'Manamune'
+ITEMS_MURAMANA = 'Muramana'
+ITEMS_ARCHANGELS = 'Archangel\'s Staff'
+ITEMS_SERAPHS = 'Seraph\'s Embrace'
+
+ITEMS_MAPPING = {ITEMS_MURAMANA: ITEMS_MANAMUNE, ITEMS_SERAPHS: ITEMS_ARCHANGELS}
+
+# Champions
+DDRAGON_CHAMPIONS = 'http://ddragon.leagueoflegends.com/cdn/{}/data/en_US/champion.json'.format(DDRAGON_VERSION)
+DDRAGON_CHAMPION_ICONS = 'http://ddragon.leagueoflegends.com/cdn/{}/img/champion/{{champion}}.png'.format(
+    DDRAGON_VERSION)
+
+
+###
+# Timeline
+TIMELINE_ITEM_BOUGHT = 'ITEM_PURCHASED'
+TIMELINE_ITEM_RETURNED = 'ITEM_UNDO'
+TIMELINE_ITEM_SOLD = 'ITEM_SOLD'
+
+# Event types in the compact item event arrays (see data_processing.extractItemEvents)
+ITEM_EVENT_BOUGHT = 0
+ITEM_EVENT_UNDO = 1
+ITEM_EVENT_SOLD = 2
+
+
+###
+# Data path
+FOLDER_DATA = 'data/'
+MYTHIC_DATA_FILE = 'mythics_{region}_{dateFrom}_{dateTo}.csv'
+LEGENDARY_MYTHIC_DATA_FILE = 'legendary_and_mythics_{region}_{dateFrom}_{dateTo}.csv'
+
+EXTRACTION_STATE_FILE = 'extraction_state_{region}_{dateFrom}_{dateTo}.json'
+
+# Ids of the extracted matches of the extraction state (append-only, 8 bytes per id, the state records the valid size)
+EXTRACTION_STATE_MATCH_IDS_FILE = 'extraction_state_{region}_{dateFrom}_{dateTo}_match_ids.bin'
+
+# Name used instead of the region for the extracted data combined over several regions (additional column Region)
+COMBINED_REGIONS = 'all_regions'
+
+# Preview mode (extraction of a uniform random sample of the matches, see ressources/sampled_preview.py): name used
+# instead of the region for the outputs of the sample, estimates with their confidence intervals (normal approximation)
+PREVIEW_REGION = '{region}_preview'
+PREVIEW_ESTIMATES_FILE = 'preview_{estimate}_{region}_{dateFrom}_{dateTo}.csv'
+PREVIEW_CONFIDENCE_LEVEL = 0.95
+
+# Columns of the extracted data files (Timestamp: time the item was bought in milliseconds since the start of the game)
+MYTHIC_DATA_COLUMNS = ['Mythic', 'Champion', 'Queue', 'GameTimeSeconds', 'Timestamp']
+LEGENDARY_MYTHIC_DATA_COLUMNS = ['Item', 'Mythic', 'Champion', 'Match', 'N_Items', 'Queue', 'GameTimeSeconds', 'Timestamp']
+
+# Version of the columns of the extracted data. Increase it if the columns change, existing extractions with
+# another version are then rebuilt
+EXTRACTED_DATA_SCHEMA_VERSION = 2
+
+# Suffix for output files which are still being written. They replace the final files once complete
+PARTIAL_FILE_SUFFIX = '.partial'
+
+# Number of matches after which the extracted data is written to file
+EXTRACTION_CHUNK_SIZE = 5000
+
+# Number of rows per chunk when reading the extracted data for the aggregations
+EXTRACTED_DATA_READ_CHUNK_SIZE = 1000000
+
+# Columnar output (partitioned by region and queue, region and queue directories in hive style)
+OUTPUT_FORMAT_CSV = 'csv'
+OUTPUT_FORMAT_PARQUET = 'parquet'
+
+FOLDER_PARQUET = '{}parquet/'.format(FOLDER_DATA)
+MYTHIC_DATASET = 'mythics_{dateFrom}_{dateTo}'
+LEGENDARY_MYTHIC_DATASET = 'legendary_and_mythics_{dateFrom}_{dateTo}'
+PARQUET_PARTITION_REGION = 'Region={region}'
+PARQUET_PARTITION_QUEUE = 'Queue={queue}'
+PARQUET_PART_FILE = 'part-{chunk:06d}.parquet'
+PARQUET_COMPRESSION = 'zstd'
+
+# Sidecar with the item and champion information, replaces MYTHIC_IDS and CHAMPION_IDS for the parquet output
+PARQUET_METADATA = 'metadata_{dateFrom}_{dateTo}.json'
+
+MYTHIC_IDS = 'mythic_ids.csv'
+CHAMPION_IDS = 'champion_ids.csv'
+
+FOLDER_ICONS = '{}icons/'.format(FOLDER_DATA)
+
+# Manifest of the downloaded icons (kept outside of the icon folder, which should only contain icons)
+ICON_MANIFEST = 'icon_manifest.json'
+ICON_SYNC_WORKERS = 8
+
+# Icon atlas (see ressources/icon_atlas.py): all icons packed into one RGBA image (png for R, npy which can be
+# memory mapped) with an index of the position of every icon. Rebuilt if the icons changed (signature of the
+# icon files saved with the atlas)
+FOLDER_ICON_ATLAS = '{}icon_atlas/'.format(FOLDER_DATA)
+ICON_ATLAS_IMAGE = 'icon_atlas.png'
+ICON_ATLAS_ARRAY = 'icon_atlas.npy'
+ICON_ATLAS_INDEX = 'icon_atlas.csv'
+ICON_ATLAS_SIGNATURE = 'icon_atlas.json'
+ICON_ATLAS_WIDTH = 2048
+
+
+###
+# Count cubes: number of participants per queue, champion and mythic item and per queue, champion, item slot
+# (position among the first 5 legendary/mythic items) and item. Updated with every written chunk of the
+# extraction, one file per region (dense arrays for python, the non-zero cells as csv for R)
+FOLDER_COUNT_CUBES = '{}cubes/'.format(FOLDER_DATA)
+COUNT_CUBE_FILE = '{cube}_{region}_{dateFrom}_{dateTo}.npz'
+COUNT_CUBE_TABLE = '{cube}_{region}_{dateFrom}_{dateTo}.csv'
+
+COUNT_CUBE_MYTHIC = 'mythic'
+COUNT_CUBE_ITEM_SLOT = 'item_slot'
+COUNT_CUBE_AXES = {
+    COUNT_CUBE_MYTHIC: ['Queue', 'Champion', 'Mythic'],
+    COUNT_CUBE_ITEM_SLOT: ['Queue', 'Champion', 'Slot', 'Item']
+}
+
+
+###
+# Diversity metrics (see ressources/diversity_metrics.py), computed from the count cubes
+DIVERSITY_FILE = 'diversity_{cube}_{dateFrom}_{dateTo}.csv'
+DIVERSITY_TOP_K = [1, 3]
+DIVERSITY_MIN_PARTICIPANTS = 10
+
+# Bootstrap confidence intervals. The replicates are computed in batches with independent random streams
+# derived from the seed, so the result does not depend on the number of worker processes. The number of replicates
+# per batch is limited by the maximum batch size and by the memory of a batch (bytes, estimated as the number of
+# arrays of the size of the replicated counts during the computation of the metrics times their size)
+DIVERSITY_BOOTSTRAP_REPLICATES = 1000
+DIVERSITY_BOOTSTRAP_BATCH_SIZE = 50
+DIVERSITY_BOOTSTRAP_BATCH_MEMORY = 2**27
+DIVERSITY_BOOTSTRAP_ARRAY_COPIES = 6
+DIVERSITY_CONFIDENCE_LEVEL = 0.95
+DIVERSITY_SEED = 20210428
+
+
+###
+# Unordered item combinations (first 5 legendary/mythic items), see ressources/item_combinations.py. The
+# item indices of a combination are packed into one integer with ITEM_COMBINATION_BITS bits per item
+ITEM_COMBINATION_FILE = 'item_combinations_{region}_{dateFrom}_{dateTo}.csv'
+ITEM_COMBINATION_BITS = 12
+ITEM_COMBINATION_SIZE = 5
+
+
+###
+# Build order tries (see ressources/build_trie.py): paths queue -> champion -> first item -> ... -> fifth item
+# with the number of participants at every node. Labels (queue, champion and item ids) have BUILD_TRIE_LABEL_BITS bits
+FOLDER_BUILD_TRIES = '{}tries/'.format(FOLDER_DATA)
+BUILD_TRIE_FILE = 'build_order_{region}_{dateFrom}_{dateTo}.npz'
+BUILD_TRIE_LABEL_BITS = 16
+
+
+###
+# Approximate build counts (see ressources/build_sketches.py): count-min sketch of the unordered item
+# combinations per queue and champion with the top BUILD_SKETCH_TOP_K builds per group. The estimates
+# exceed the true counts by at most BUILD_SKETCH_EPSILON times the participants of the group with
+# probability 1 - BUILD_SKETCH_DELTA. Sketches can only be merged if they have the same parameters
+FOLDER_BUILD_SKETCHES = '{}sketches/'.format(FOLDER_DATA)
+BUILD_SKETCH_FILE = 'build_sketch_{region}_{dateFrom}_{dateTo}.npz'
+BUILD_SKETCH_HEAVY_HITTERS_FILE = 'build_heavy_hitters_{dateFrom}_{dateTo}.csv'
+BUILD_SKETCH_EPSILON = 0.002
+BUILD_SKETCH_DELTA = 0.01
+BUILD_SKETCH_TOP_K = 20
+BUILD_SKETCH_SEED = 20210428
+
+# Groups are keyed by queue << BUILD_SKETCH_GROUP_BITS | champion
+BUILD_SKETCH_GROUP_BITS = 16
+
+
+###
+# Item timings (see ressources/timing_sketches.py): quantile sketches of the times at which the items were bought
+# per queue, champion, slot and item, once in minutes and once as share of the game duration. The buckets grow
+# logarithmically, the quantiles have a relative error of at most TIMING_SKETCH_RELATIVE_ACCURACY for values within
+# the range of the sketch (smaller values end up in the first, larger values in the last bucket). Slot 0 holds the
+# first mythic item, slots 1 to 5 the first 5 legendary/mythic items
+FOLDER_TIMING_SKETCHES = '{}timings/'.format(FOLDER_DATA)
+TIMING_SKETCH_FILE = 'timing_sketch_{sketch}_{region}_{dateFrom}_{dateTo}.npz'
+TIMING_QUANTILES_FILE = 'item_timing_quantiles_{sketch}_{dateFrom}_{dateTo}.csv'
+
+TIMING_SKETCH_MINUTES = 'minutes'
+TIMING_SKETCH_GAME_SHARE = 'game_share'
+TIMING_SKETCH_RANGES = {TIMING_SKETCH_MINUTES: (0.5, 120.0), TIMING_SKETCH_GAME_SHARE: (0.005, 1.0)}
+TIMING_SKETCH_RELATIVE_ACCURACY = 0.02
+TIMING_SKETCH_QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9]
+
+TIMING_SKETCH_FIRST_MYTHIC_SLOT = 0
+
+# Groups are keyed by queue, champion, slot and item with TIMING_SKETCH_GROUP_BITS bits each
+TIMING_SKETCH_GROUP_BITS = 16
+
+
+###
+# Champion similarities (see ressources/champion_similarity.py): distances between the mythic item distributions
+# of the champions per queue and the champion orders of hierarchical clusterings, computed from the mythic count
+# cube and cached per region (recomputed if the cube changed). The queue comparisons (QUEUE_COMPARISONS) cluster the
+# champions on the difference of the distributions of two queues (euclidean distance, like the heatmaps of the R script)
+FOLDER_SIMILARITIES = '{}similarities/'.format(FOLDER_DATA)
+SIMILARITY_FILE = 'champion_similarity_{region}_{dateFrom}_{dateTo}.npz'
+SIMILARITY_ORDER_TABLE = 'champion_order_{region}_{dateFrom}_{dateTo}.csv'
+
+SIMILARITY_JENSEN_SHANNON = 'jensen_shannon'
+SIMILARITY_COSINE = 'cosine'
+SIMILARITY_HELLINGER = 'hellinger'
+SIMILARITY_EUCLIDEAN = 'euclidean'
+SIMILARITY_METRICS = [SIMILARITY_JENSEN_SHANNON, SIMILARITY_COSINE, SIMILARITY_HELLINGER]
+
+SIMILARITY_LINKAGE_WARD = 'ward'
+SIMILARITY_LINKAGE_AVERAGE = 'average'
+SIMILARITY_LINKAGES = [SIMILARITY_LINKAGE_WARD, SIMILARITY_LINKAGE_AVERAGE]
+
+# Minimum number of participants of a champion in every queue it was played in (as in the R script)
+SIMILARITY_MIN_PARTICIPANTS = 10
+
+# Number of champions per block for the pairwise Jensen-Shannon divergences
+SIMILARITY_BLOCK_SIZE = 64
+
+
+###
+# Significance tests of the differences between queues and regions (see ressources/significance_tests.py):
+# chi-square and G-tests of the distributions per champion and permutation tests of the G statistic and of the
+# differences in diversity, with the p-values adjusted over the champions (Benjamini-Hochberg and Holm)
+SIGNIFICANCE_FILE = 'significance_{cube}_{dateFrom}_{dateTo}.csv'
+SIGNIFICANCE_METRICS = ['Entropy', 'GiniSimpson']
+SIGNIFICANCE_MIN_PARTICIPANTS = 10
+
+# The permutations are drawn in batches with independent random streams derived from the seed, so the result
+# does not depend on the number of worker processes
+SIGNIFICANCE_PERMUTATIONS = 2000
+SIGNIFICANCE_BATCH_SIZE = 100
+SIGNIFICANCE_SEED = 20210428
+
+
+###
+# Local query service (see ressources/query_service.py) over the count cubes and the item combinations of the
+# extracted data. Results are kept in a LRU cache, the data of a region is reloaded if its files changed (checked
+# at most every QUERY_RELOAD_CHECK_SECONDS seconds)
+QUERY_HOST = '127.0.0.1'
+QUERY_PORT = 8765
+QUERY_CACHE_SIZE = 1024
+QUERY_RELOAD_CHECK_SECONDS = 5
+QUERY_TOP_BUILDS = 10
+
+
+###
+# Event store: item events (all items) and match information as flat binary files, read as memory-mapped
+# NumPy arrays (see ressources/event_store.py). Written by export_event_store.py
+FOLDER_EVENT_STORE = '{}event_store/{{region}}_{{dateFrom}}_{{dateTo}}/'.format(FOLDER_DATA)
+EVENT_STORE_EVENTS = 'events.bin'
+EVENT_STORE_MATCHES = 'matches.bin'
+EVENT_STORE_CHAMPION_OFFSETS = 'champion_offsets.bin'
+EVENT_STORE_CHAMPION_PARTICIPANTS = 'champion_participants.bin'
+EVENT_STORE_METADATA = 'store.json'
+
+
+###
+# Match store: storage of the summoners and matches used by the crawler and the extraction (see
+# ressources/match_store.py), either the MongoDB database or the local store without a server (see
+# ressources/local_match_store.py)
+MATCH_STORE_MONGODB = 'mongodb'
+MATCH_STORE_LOCAL = 'local'
+MATCH_STORE_BACKEND = MATCH_STORE_MONGODB
+
+# Local store: one folder per region, the matches are sharded by their id into append-only segment files (a new segment
+# is started once a segment reaches the maximum size) with an index file per shard. The matches are compressed with zstd
+# if the package zstandard is installed, with zlib otherwise
+FOLDER_LOCAL_MATCH_STORE = '{}match_store/{{region}}/'.format(FOLDER_DATA)
+LOCAL_MATCH_STORE_SEGMENT = 'matches_{shard:02d}_{segment:05d}.seg'
+LOCAL_MATCH_STORE_INDEX = 'index_{shard:02d}.idx'
+LOCAL_MATCH_STORE_SUMMONERS = 'summoners.jsonl'
+LOCAL_MATCH_STORE_SUMMONERS_PROCESSED = 'summoners_processed.jsonl'
+LOCAL_MATCH_STORE_SHARDS = 8
+LOCAL_MATCH_STORE_SEGMENT_SIZE = 2**28
+LOCAL_MATCH_STORE_ZSTD_LEVEL = 3
+LOCAL_MATCH_STORE_ZLIB_LEVEL = 6
+
+# Benchmark of the match stores (benchmark_match_store.py): number of synthetic matches, database of the MongoDB store
+# (dropped afterwards) and time to wait for the MongoDB server before it is skipped
+BENCHMARK_MATCH_STORE_MATCHES = 2000
+BENCHMARK_MATCH_STORE_DATABASE = 'lol-games-item-diversity-benchmark'
+BENCHMARK_MATCH_STORE_SERVER_TIMEOUT_MS = 2000
+
+
+###
+# Metadata cache (downloaded item/champion/wiki data and the information parsed from it), one folder per
+# data dragon version
+FOLDER_METADATA_CACHE = '{}cache/{{version}}/'.format(FOLDER_DATA)
+METADATA_CACHE_INDEX = 'index.json'
+METADATA_CACHE_PARSED = 'parsed.json'
+
+# Resources which can change (lol wiki) are revalidated with the server after this time (in seconds).
+# The data dragon resources are versioned and never revalidated
+METADATA_CACHE_MAX_AGE = 24 * 60 * 60
+METADATA_REQUEST_TIMEOUT = 30
+
+
+###
+# Profiling, enabled with the environment variable PROFILING_ENVIRONMENT_VARIABLE. Possible values are
+# comma separated combinations of PROFILING_TIMERS (time per stage), PROFILING_CPROFILE and
+# PROFILING_TRACEMALLOC (cProfile/tracemalloc over the sampled window of loop iterations), e.g.
+# ITEM_DIVERSITY_PROFILING=timers,cprofile
+PROFILING_ENVIRONMENT_VARIABLE = 'ITEM_DIVERSITY_PROFILING'
+PROFILING_TIMERS = 'timers'
+PROFILING_CPROFILE = 'cprofile'
+PROFILING_TRACEMALLOC = 'tracemalloc'
+
+# Sampled window (loop iterations) for cProfile and tracemalloc, can be overwritten with the environment
+# variables PROFILING_SAMPLE_START_VARIABLE and PROFILING_SAMPLE_LENGTH_VARIABLE
+PROFILING_SAMPLE_START = 10
+PROFILING_SAMPLE_LENGTH = 100
+PROFILING_SAMPLE_START_VARIABLE = 'ITEM_DIVERSITY_PROFILING_SAMPLE_START'
+PROFILING_SAMPLE_LENGTH_VARIABLE = 'ITEM_DIVERSITY_PROFILING_SAMPLE_LENGTH'
+
+PROFILING_REPORT = 'profiling_{name}_{time}.txt'
+PROFILING_REPORT_TOP_ENTRIES = 30
+
+
+###
+# Benchmarks
+BENCHMARK_CORPUS_SIZES = [100, 500, 2000]
+BENCHMARK_BASELINE = 'benchmark_baseline.json'
+BENCHMARK_REPETITIONS = 3
+
+# Maximum allowed relative loss in throughput compared to the baseline before a benchmark fails
+BENCHMARK_TOLERANCE = 0.25
+
+# Startup benchmark (benchmark_startup.py): import time of the entry points in a fresh interpreter, with the
+# modules they must not import at their start (the crawler only needs the http and json stack, the metadata
+# and icon functions load pandas, BeautifulSoup, PIL and pytz on demand, BeautifulSoup and PIL are only needed
+# by the extraction if the item classification or the icon atlas are not cached)
+BENCHMARK_STARTUP_ENTRY_POINTS = {
+    'get_data_from_api': ['pandas', 'numpy', 'bs4', 'PIL', 'pytz', 'ressources.metadata_requests'],
+    'extract_item_data': ['bs4', 'PIL']
+}
+BENCHMARK_STARTUP_BASELINE = 'benchmark_startup_baseline.json'
+BENCHMARK_STARTUP_REPETITIONS = 5
+
+# Maximum allowed relative increase of the import time compared to the baseline (noisier than the throughput)
+BENCHMARK_STARTUP_TOLERANCE = 0.5
+
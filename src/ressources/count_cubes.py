@@ -0,0 +1,259 @@
+'''
+
+Pre-aggregated count cubes of the extracted data: dense arrays with the number of participants per
+combination of the axis labels (e.g. queue x champion x mythic item). The cubes are updated with every
+chunk written by the extraction, so adding new matches only costs the new rows.
+
+Each cube is saved per region as npz file (counts, axis labels and the number of matches it contains)
+and as csv file with the non-zero cells (long format with the count in the column N) for R.
+
+'''
+
+
+###
+# Imports
+import logging
+import os
+from typing import Dict, List, Union
+
+import numpy as np
+import pandas as pd
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+    import src.ressources.data_processing as dataProcessing
+except Exception:
+    import ressources.constants as const
+    import ressources.data_processing as dataProcessing
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Classes
+
+##
+# Count cube
+class CountCube:
+    '''
+    Dense counts over named axes. The labels of every axis are sorted integers, unknown labels
+    extend the axis when data is added
+    '''
+
+    def __init__(self, axisNames: List[str], axisLabels: Union[Dict, None] = None,
+            counts: Union[np.ndarray, None] = None, nMatches: int = 0) -> None:
+        self.axisNames = list(axisNames)
+        self.axisLabels = axisLabels if axisLabels is not None else {axisName: np.zeros(0, dtype = np.int64)
+            for axisName in self.axisNames}
+        self.counts = counts if counts is not None else np.zeros([len(self.axisLabels[axisName])
+            for axisName in self.axisNames], dtype = np.int64)
+        self.nMatches = nMatches
+
+
+    ##
+    # Indices on an axis
+    def getAxisIndices(self, axisName: str, labels: np.ndarray) -> np.ndarray:
+        '''
+        Return the indices of the labels on an axis, extending the axis (and the counts) by unknown labels
+        '''
+
+        axisLabels = self.axisLabels[axisName]
+        uniqueLabels = np.unique(labels)
+
+        if not np.isin(uniqueLabels, axisLabels).all():
+            newAxisLabels = np.union1d(axisLabels, uniqueLabels)
+            axisPosition = self.axisNames.index(axisName)
+
+            newShape = list(self.counts.shape)
+            newShape[axisPosition] = len(newAxisLabels)
+
+            newCounts = np.zeros(newShape, dtype = np.int64)
+            newCounts[(slice(None), ) * axisPosition + (np.searchsorted(newAxisLabels, axisLabels), )] = self.counts
+
+            self.axisLabels[axisName] = axisLabels = newAxisLabels
+            self.counts = newCounts
+
+        return(np.searchsorted(axisLabels, labels))
+
+
+    ##
+    # Add data
+    def add(self, data: pd.DataFrame, nMatches: int) -> None:
+        '''
+        Count the rows of the data (one column per axis) into the cube
+        '''
+
+        if data.shape[0] == 0:
+            self.nMatches += nMatches
+            return
+
+        axisIndices = [self.getAxisIndices(axisName = axisName, labels = data[axisName].to_numpy(dtype = np.int64))
+            for axisName in self.axisNames]
+
+        self.counts += np.bincount(np.ravel_multi_index(axisIndices, self.counts.shape),
+            minlength = self.counts.size).reshape(self.counts.shape)
+        self.nMatches += nMatches
+
+
+    ##
+    # Non-zero cells
+    def toFrame(self) -> pd.DataFrame:
+        '''
+        Return the non-zero cells in long format (one column per axis and the count N)
+        '''
+
+        cellIndices = np.nonzero(self.counts)
+
+        return(pd.DataFrame({**{axisName: self.axisLabels[axisName][cellIndices[axisPosition]]
+            for axisPosition, axisName in enumerate(self.axisNames)}, 'N': self.counts[cellIndices]}))
+
+
+    ##
+    # Save
+    def save(self, cubePath: str, tablePath: str) -> None:
+        '''
+        Save the cube as npz file and the non-zero cells as csv file (temporary files which then replace the old files)
+        '''
+
+        with open('{}{}'.format(cubePath, const.PARTIAL_FILE_SUFFIX), 'wb') as cubeFile:
+            np.savez_compressed(cubeFile, Counts = self.counts, NMatches = self.nMatches,
+                AxisNames = np.array(self.axisNames), **{'Axis_{}'.format(axisName): self.axisLabels[axisName]
+                for axisName in self.axisNames})
+
+        self.toFrame().to_csv('{}{}'.format(tablePath, const.PARTIAL_FILE_SUFFIX), index = False)
+
+        os.replace('{}{}'.format(cubePath, const.PARTIAL_FILE_SUFFIX), cubePath)
+        os.replace('{}{}'.format(tablePath, const.PARTIAL_FILE_SUFFIX), tablePath)
+
+
+    ##
+    # Load
+    @classmethod
+    def load(cls, cubePath: str) -> 'CountCube':
+        '''
+        Load a cube saved with save
+        '''
+
+        with np.load(cubePath) as cubeFile:
+            axisNames = cubeFile['AxisNames'].tolist()
+
+            return(cls(axisNames = axisNames, axisLabels = {axisName: cubeFile['Axis_{}'.format(axisName)]
+                for axisName in axisNames}, counts = cubeFile['Counts'], nMatches = int(cubeFile['NMatches'])))
+
+
+###
+# Functions
+
+##
+# Paths of a cube
+def getCountCubePaths(cubeName: str, region: str) -> List[str]:
+    '''
+    Return the paths of the npz and the csv file of a cube
+    '''
+
+    return(['{}{}'.format(const.FOLDER_COUNT_CUBES, cubeFile.format(cube = cubeName, region = region,
+        dateFrom = const.EARLIEST_DATE_FOR_GAMES, dateTo = const.LATEST_DATE_FOR_GAMES))
+        for cubeFile in (const.COUNT_CUBE_FILE, const.COUNT_CUBE_TABLE)])
+
+
+##
+# Create empty cubes
+def createEmptyCountCubes() -> Dict[str, CountCube]:
+    '''
+    Return empty cubes for all cube definitions
+    '''
+
+    return({cubeName: CountCube(axisNames = axisNames) for cubeName, axisNames in const.COUNT_CUBE_AXES.items()})
+
+
+##
+# Load the cubes of a region
+def loadCountCubes(region: str, nMatches: int) -> Union[Dict[str, CountCube], None]:
+    '''
+    Load the cubes of a region. Returns None if a cube is missing or does not contain the given number
+    of matches (e.g. interrupted extraction), the cubes then have to be rebuilt from the extracted data
+    '''
+
+    if nMatches == 0:
+        return(createEmptyCountCubes())
+
+    countCubes = dict()
+    for cubeName in const.COUNT_CUBE_AXES:
+        cubePath, _ = getCountCubePaths(cubeName = cubeName, region = region)
+
+        if not os.path.isfile(cubePath):
+            logger.info('Count cube %s of region %s does not exist', cubeName, region)
+            return(None)
+
+        countCubes[cubeName] = CountCube.load(cubePath = cubePath)
+
+        if countCubes[cubeName].nMatches != nMatches:
+            logger.info('Count cube %s of region %s does not match the extracted data', cubeName, region)
+            return(None)
+
+    return(countCubes)
+
+
+##
+# Save the cubes of a region
+def saveCountCubes(region: str, countCubes: Dict[str, CountCube]) -> None:
+    '''
+    Save all cubes of a region
+    '''
+
+    os.makedirs(const.FOLDER_COUNT_CUBES, exist_ok = True)
+
+    for cubeName, countCube in countCubes.items():
+        countCube.save(*getCountCubePaths(cubeName = cubeName, region = region))
+
+
+    ###
+    # End of function
+    return
+
+
+##
+# Item slots
+def addItemSlots(legendaryAndMythicItems: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Add the slot (1 to 5, order in which the items were bought) to the legendary/mythic items
+    '''
+
+    _, slotIndices = dataProcessing.getParticipantSlots(legendaryAndMythicItems = legendaryAndMythicItems)
+
+    return(legendaryAndMythicItems.assign(Slot = slotIndices + 1))
+
+
+##
+# Update the cubes
+def updateCountCubes(countCubes: Dict[str, CountCube], firstMythicItem: pd.DataFrame,
+        legendaryAndMythicItems: pd.DataFrame, nMatches: int) -> None:
+    '''
+    Add a chunk of extracted data (nMatches matches) to the cubes
+    '''
+
+    countCubes[const.COUNT_CUBE_MYTHIC].add(data = firstMythicItem, nMatches = nMatches)
+    countCubes[const.COUNT_CUBE_ITEM_SLOT].add(data = addItemSlots(legendaryAndMythicItems = legendaryAndMythicItems),
+        nMatches = nMatches)
+
+
+    ###
+    # End of function
+    return
+
+
+##
+# Load a cube of several regions
+def loadCountCubeTable(cubeName: str, regions: List[str]) -> pd.DataFrame:
+    '''
+    Return the non-zero cells of a cube for several regions in long format, with the region as additional column
+    '''
+
+    return(pd.concat([CountCube.load(cubePath = getCountCubePaths(cubeName = cubeName, region = region)[0]).toFrame(
+        ).assign(Region = region) for region in regions], ignore_index = True))
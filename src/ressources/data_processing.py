@@ -1,295 +1,364 @@
-'''
-
-Functions for data processing
-
-'''
-
-
-###
-# Imports
-import logging
-from typing import Dict, List
-
-import numpy as np
-import pandas as pd
-
-
-###
-# Load ressources
-try:
-    import src.ressources.constants as const
-except Exception:
-    import ressources.constants as const
-
-
-###
-# Logging
-logger = logging.getLogger(__name__)
-
-
-###
-# Functions
-
-##
-# Extract the queue id and the champion ids
-def extractQueueAndChampions(matchData: Dict) -> Dict:
-    '''
-    Extract and return the champion ids and the queue id
-    '''
-
-    logger.debug('Extract queue id and champion ids for match id %i', matchData['_id'])
-
-
-    ###
-    # Extract both the queue id as well as the chmapion id per participant id from the participant information
-    return({'QueueId': matchData['queueId'], 'GameDuration': matchData['gameDuration'], **{
-        'Champion_{}'.format(participant['participantId']): participant['championId']
-        for participant in matchData['participants']}})
-
-
-##
-# Extract the bought items from the timeline
-def extractBoughtMythicAndLegendaryItems(matchData: Dict, legendaryItemsIds: Dict,
-        mythicItemsIds: Dict, queueAndChampionIds: Dict, ct: int) -> Dict:
-    '''
-    Extract the bought mythic and legendary items
-    '''
-
-    logger.debug('Extract bought items for match id %i', matchData['_id'])
-
-
-    ###
-    # Create sets for quicker comparisons
-    legendaryItems = set(legendaryItemsIds.keys())
-    mythicItems = set(mythicItemsIds.keys())
-
-
-    ###
-    # Champion IDs
-    championIds = [queueAndChampionIds['Champion_{}'.format(i)] for i in range(1, 11)]
-
-
-    ###
-    # Create the objects for the data
-    legendaryItemsEvents = dict()
-    mythicItemsEvents = dict()
-    for i in range(1, 11):
-        legendaryItemsEvents[i] = {'ItemId': list(), 'Timestamp': list(), 'ItemBought': list(), 'ItemSale': list()}
-        mythicItemsEvents[i] = {'ItemId': list(), 'Timestamp': list(), 'ItemBought': list(), 'ItemSale': list()}
-
-
-    ###
-    # Extract all item buy or undo events for legendary and mythic items
-    for timeframe in matchData['timeline']['frames']:
-        for event in timeframe['events']:
-            # Item buy events
-            if event['type'] == const.TIMELINE_ITEM_BOUGHT:
-                # Legendary items
-                if event['itemId'] in legendaryItems:
-                    legendaryItemsEvents[event['participantId']]['ItemId'].append(event['itemId'])
-                    legendaryItemsEvents[event['participantId']]['Timestamp'].append(event['timestamp'])
-                    legendaryItemsEvents[event['participantId']]['ItemBought'].append(True)
-                    legendaryItemsEvents[event['participantId']]['ItemSale'].append(False)
-
-                # Mythic items
-                elif event['itemId'] in mythicItems:
-                    mythicItemsEvents[event['participantId']]['ItemId'].append(event['itemId'])
-                    mythicItemsEvents[event['participantId']]['Timestamp'].append(event['timestamp'])
-                    mythicItemsEvents[event['participantId']]['ItemBought'].append(True)
-                    mythicItemsEvents[event['participantId']]['ItemSale'].append(False)
-
-            # Item undo events
-            elif event['type'] == const.TIMELINE_ITEM_RETURNED:
-                # Legendary items
-                if event['beforeId'] in legendaryItems:
-                    legendaryItemsEvents[event['participantId']]['ItemId'].append(event['beforeId'])
-                    legendaryItemsEvents[event['participantId']]['Timestamp'].append(event['timestamp'])
-                    legendaryItemsEvents[event['participantId']]['ItemBought'].append(False)
-                    legendaryItemsEvents[event['participantId']]['ItemSale'].append(False)
-
-                # Mythic items
-                elif event['beforeId'] in mythicItems:
-                    mythicItemsEvents[event['participantId']]['ItemId'].append(event['beforeId'])
-                    mythicItemsEvents[event['participantId']]['Timestamp'].append(event['timestamp'])
-                    mythicItemsEvents[event['participantId']]['ItemBought'].append(False)
-                    mythicItemsEvents[event['participantId']]['ItemSale'].append(False)
-
-            # Item sale events
-            elif event['type'] == const.TIMELINE_ITEM_SOLD:
-                # Legendary items
-                if event['itemId'] in legendaryItems:
-                    legendaryItemsEvents[event['participantId']]['ItemId'].append(event['itemId'])
-                    legendaryItemsEvents[event['participantId']]['Timestamp'].append(event['timestamp'])
-                    legendaryItemsEvents[event['participantId']]['ItemBought'].append(False)
-                    legendaryItemsEvents[event['participantId']]['ItemSale'].append(True)
-
-                # Mythic items
-                elif event['itemId'] in mythicItems:
-                    mythicItemsEvents[event['participantId']]['ItemId'].append(event['itemId'])
-                    mythicItemsEvents[event['participantId']]['Timestamp'].append(event['timestamp'])
-                    mythicItemsEvents[event['participantId']]['ItemBought'].append(False)
-                    mythicItemsEvents[event['participantId']]['ItemSale'].append(True)
-
-    ###
-    # Extract the first mythic item bought (there is the unlikely event that someone sells and buys another
-    # mythic item later on in the game which is not considered here)
-    firstMythicItem = list()
-    mythicItemBought = dict()  # To use together with the legendary items
-    for i in range(1, 11):
-        # In most cases, there will only be one event
-        nEvents = len(mythicItemsEvents[i]['ItemId'])
-
-        # Defaults if none found
-        mythicItemForSummoner = 0
-        mythicItemBought[i] = pd.DataFrame({'Item': list(), 'Timestamp': list()})
-
-        if nEvents == 1:
-            if mythicItemsEvents[i]['ItemBought'][0]:
-                mythicItemForSummoner = mythicItemsEvents[i]['ItemId'][0]
-                mythicItemBought[i] = pd.DataFrame({'Item': mythicItemsEvents[i]['ItemId'][0],
-                    'Timestamp': mythicItemsEvents[i]['Timestamp'][0]}, index = [0])
-
-        elif nEvents > 1:
-            # In this case, a mythic item has been bought, the sale undone and then maybe another mythic item
-            # was bought. Sort the events by time and take the item before the first sale event, then after the last
-            # undo event
-            mythicItemSummonerEvents = pd.DataFrame(mythicItemsEvents[i])
-
-            # Sort by time then select all items before the first sale
-            mythicItemSummonerEvents = mythicItemSummonerEvents.sort_values('Timestamp').reset_index()
-            mythicItemSummonerEvents = mythicItemSummonerEvents.loc[
-                mythicItemSummonerEvents['ItemSale'].cumsum() == 0]
-
-            # Select the last item buy event
-            mythicItemSummonerEvents = mythicItemSummonerEvents.loc[mythicItemSummonerEvents['ItemBought']]
-
-            if nLen := (mythicItemSummonerEvents.shape[0]):
-                # int() is there to convert the numpy int type to standard int type
-                mythicItemForSummoner = int(mythicItemSummonerEvents['ItemId'].iloc[nLen-1])
-                mythicItemBought[i] = pd.DataFrame({'Item': int(mythicItemSummonerEvents['ItemId'].iloc[nLen-1]),
-                    'Timestamp': int(mythicItemSummonerEvents['Timestamp'].iloc[nLen-1])}, index = [0])
-
-        # In einer Liste abspeichern
-        firstMythicItem.append(mythicItemForSummoner)
-
-    # Zum Datenframe umwandeln
-    firstMythicItem = pd.DataFrame({'Mythic': firstMythicItem, 'Champion': championIds})
-
-
-    ###
-    # Extract the first 5 legendary/mythic items
-    legendaryAndMythicItemsBought = list()
-    for i in range(1, 11):
-        ##
-        # Extract the legendary items with timestamps
-        nEvents = len(legendaryItemsEvents[i]['ItemId'])
-
-        legendaryItemsBoughtForSummoner = pd.DataFrame({'Item': list(), 'Timestamp': list()})
-
-        # Only one event, no extra work needed
-        if nEvents == 1:
-            if legendaryItemsEvents[i]['ItemBought'][0]:
-                legendaryItemsBoughtForSummoner = pd.DataFrame({'Item': legendaryItemsEvents[i]['ItemId'][0],
-                    'Timestamp': legendaryItemsEvents[i]['Timestamp'][0]}, index = [0])
-
-        elif nEvents > 1:
-            # Sort the events by time. Then remove the sale events (we don't consider them for this analysis),
-            # any major item sales should happen after the 5 item stage. Afterwards, match the undo (buy) events
-            # to the previous event on the same item and remove both events.
-            # Do not consider the tear items at this stage (not sure how they behave, only the base version should
-            # appear as the upgrade is not technically a buy event, but might be)
-            legendaryItemsSummonerEvents = pd.DataFrame(legendaryItemsEvents[i])
-
-            # Remove sales events and sort by time
-            legendaryItemsSummonerEvents = legendaryItemsSummonerEvents.loc[
-                ~legendaryItemsSummonerEvents['ItemSale']].reset_index(drop = True).sort_values('Timestamp')
-
-            if nBuyAndUndoEvents := legendaryItemsSummonerEvents.shape[0]:   # Case 0 shouldn't happen
-                # Match and remove undo events
-                undoEvents = np.where(~legendaryItemsSummonerEvents['ItemBought'])[0]
-
-                if nUndoEvents := len(undoEvents):
-                    indizesToKeep = [True] * nBuyAndUndoEvents
-                    for j in range(0, nUndoEvents):
-                        itemIdUndone = legendaryItemsSummonerEvents['ItemId'].iloc[undoEvents[j]]
-
-                        for k in range(undoEvents[j] - 1, -1, -1):
-                            if (indizesToKeep[k] and legendaryItemsSummonerEvents['ItemBought'].iloc[k]
-                                and legendaryItemsSummonerEvents['ItemId'].iloc[k] == itemIdUndone):
-                                indizesToKeep[k] = False
-
-                    # Remove the undone sale events and the undo evens
-                    legendaryItemsSummonerEvents = legendaryItemsSummonerEvents.loc[indizesToKeep]
-                    legendaryItemsSummonerEvents = legendaryItemsSummonerEvents.loc[
-                        legendaryItemsSummonerEvents['ItemBought']].reset_index(drop = True)
-
-            legendaryItemsBoughtForSummoner = legendaryItemsSummonerEvents[['ItemId', 'Timestamp']].rename(
-                columns = {'ItemId': 'Item'})
-
-        ##
-        # Combine mythic and legendary items, then select the first 5 or fill up to the first 5
-        legendaryItemsBoughtForSummoner['Mythic'] = 0
-        mythicItemBought[i]['Mythic'] = 1
-
-        legendaryAndMythicTogether = pd.concat([legendaryItemsBoughtForSummoner, mythicItemBought[i]],
-            ignore_index = True).sort_values('Timestamp').reset_index(drop = True).iloc[0:5].drop(
-            columns = 'Timestamp')
-
-        # Add identifiers (for later groupby's)
-        legendaryAndMythicTogether['Champion'] = championIds[i-1]
-        legendaryAndMythicTogether['Match'] = ct
-        legendaryAndMythicTogether['N_Items'] = legendaryAndMythicTogether.shape[0]
-
-        # Save the dataframe
-        legendaryAndMythicItemsBought.append(legendaryAndMythicTogether)
-
-    # Concatenate the items for the different champions
-    legendaryAndMythicItemsBought = pd.concat(legendaryAndMythicItemsBought, ignore_index = True)
-
-
-    ###
-    # Add the queue and game duration information
-    firstMythicItem['Queue'] = queueAndChampionIds['QueueId']
-    firstMythicItem['GameTimeSeconds'] = queueAndChampionIds['GameDuration']
-
-    legendaryAndMythicItemsBought['Queue'] = queueAndChampionIds['QueueId']
-    legendaryAndMythicItemsBought['GameTimeSeconds'] = queueAndChampionIds['GameDuration']
-
-
-    ###
-    # Return the mythic and all items
-    return(firstMythicItem, legendaryAndMythicItemsBought)
-
-
-##
-# Concatenate and save the extracted data
-def concatenateAndSaveExtractedData(region: str, firstMythicItemCollected: List,
-        legendaryAndMythicItemsCollected: List, mythicItemsIds: Dict) -> None:
-    '''
-    Concatenate and save the data extracted from the match data.
-    Folder has to exist and will not be created.
-    '''
-
-    logger.debug('Save extracted data for region %s', region)
-
-    # Concatenate data
-    firstMythicItem = pd.concat(firstMythicItemCollected, ignore_index = True)
-    legendaryAndMythicItems = pd.concat(legendaryAndMythicItemsCollected, ignore_index = True)
-
-    legendaryAndMythicItems['Item'] = legendaryAndMythicItems['Item'].astype(int)
-
-    # Save data
-    firstMythicItem.to_csv('{}{}'.format(const.FOLDER_DATA, const.MYTHIC_DATA_FILE.format(
-        region = region, dateFrom = const.EARLIEST_DATE_FOR_GAMES, dateTo = const.LATEST_DATE_FOR_GAMES
-    )), index = False)
-    legendaryAndMythicItems.to_csv('{}{}'.format(const.FOLDER_DATA, const.LEGENDARY_MYTHIC_DATA_FILE.format(
-        region = region, dateFrom = const.EARLIEST_DATE_FOR_GAMES, dateTo = const.LATEST_DATE_FOR_GAMES
-    )), index = False)
-
-    pd.DataFrame(mythicItemsIds, index = [0]).transpose().reset_index().rename(
-        columns = {'index': 'Id', 0: 'Item'}).to_csv('{}{}'.format(const.FOLDER_DATA,
-        const.MYTHIC_IDS), index = False)
-
-    ###
-    # End of function
-    return
+'''
+
+Functions for data processing
+
+'''
+
+
+###
+# Imports
+import logging
+import os
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+except Exception:
+    import ressources.constants as const
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Functions
+
+##
+# Extract the queue id and the champion ids
+def extractQueueAndChampions(matchData: Dict) -> Dict:
+    '''
+    Extract and return the champion ids and the queue id
+    '''
+
+    logger.debug('Extract queue id and champion ids for match id %i', matchData['_id'])
+
+
+    ###
+    # Extract both the queue id as well as the chmapion id per participant id from the participant information
+    return({'QueueId': matchData['queueId'], 'GameDuration': matchData['gameDuration'], **{
+        'Champion_{}'.format(participant['participantId']): participant['championId']
+        for participant in matchData['participants']}})
+
+
+##
+# Compact representation of the item events of a match: one record per event with small integer types
+# (9 bytes per event). The array is a single contiguous buffer and can be passed between processes
+# as bytes (itemEvents.tobytes() and np.frombuffer(buffer, dtype = ITEM_EVENT_DTYPE))
+ITEM_EVENT_DTYPE = np.dtype([('ItemId', np.uint16), ('ParticipantId', np.uint8), ('Type', np.int8),
+    ('Timestamp', np.uint32), ('Mythic', np.bool_)])
+
+# Timeline event type -> event type in the compact representation and the field with the item id
+TIMELINE_ITEM_EVENTS = {
+    const.TIMELINE_ITEM_BOUGHT: (const.ITEM_EVENT_BOUGHT, 'itemId'),
+    const.TIMELINE_ITEM_RETURNED: (const.ITEM_EVENT_UNDO, 'beforeId'),
+    const.TIMELINE_ITEM_SOLD: (const.ITEM_EVENT_SOLD, 'itemId')
+}
+
+
+##
+# Extract the item events from the timeline
+def extractItemEvents(matchData: Dict, legendaryItemsIds: Dict, mythicItemsIds: Dict,
+        allItems: bool = False) -> np.ndarray:
+    '''
+    Extract all buy, undo and sale events of legendary and mythic items (of all items if allItems is
+    set) in a single pass over the timeline and return them as structured array (ITEM_EVENT_DTYPE),
+    in the order of the timeline
+    '''
+
+    logger.debug('Extract item events for match id %i', matchData['_id'])
+
+    itemEvents = list()
+    for timeframe in matchData['timeline']['frames']:
+        for event in timeframe['events']:
+            if (itemEventType := TIMELINE_ITEM_EVENTS.get(event['type'], None)) is None:
+                continue
+
+            itemId = event[itemEventType[1]]
+
+            if itemId in legendaryItemsIds:
+                itemEvents.append((itemId, event['participantId'], itemEventType[0], event['timestamp'], False))
+
+            elif itemId in mythicItemsIds:
+                itemEvents.append((itemId, event['participantId'], itemEventType[0], event['timestamp'], True))
+
+            elif allItems:
+                itemEvents.append((itemId, event['participantId'], itemEventType[0], event['timestamp'], False))
+
+    return(np.array(itemEvents, dtype = ITEM_EVENT_DTYPE))
+
+
+##
+# Extract the bought items from the item events
+def extractBoughtItemsFromEvents(itemEvents: np.ndarray, queueAndChampionIds: Dict,
+        ct: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    '''
+    Extract the first mythic item and the first 5 legendary/mythic items bought per participant from
+    the item events of a match, with the time they were bought (Timestamp, milliseconds since the start
+    of the game, 0 if no mythic item was bought)
+    '''
+
+    ###
+    # Champion IDs
+    championIds = [queueAndChampionIds['Champion_{}'.format(i)] for i in range(1, 11)]
+
+
+    ###
+    # Sort the events by participant, then by time (stable, events at the same time keep the order
+    # of the timeline) and find the range of events of every participant
+    itemEvents = itemEvents[np.lexsort((itemEvents['Timestamp'], itemEvents['ParticipantId']))]
+    participantBoundaries = np.searchsorted(itemEvents['ParticipantId'], np.arange(1, 12))
+
+
+    ###
+    # Extract the mythic and legendary items per participant
+    firstMythicItem = list()
+    firstMythicTimestamp = list()
+    itemsCollected = {'Item': list(), 'Mythic': list(), 'Champion': list(), 'N_Items': list(), 'Timestamp': list()}
+    for i in range(1, 11):
+        participantEvents = itemEvents[participantBoundaries[i-1]:participantBoundaries[i]]
+
+        ##
+        # First mythic item: the last one bought before the first sale of a mythic item (undo events are
+        # not considered, there is the unlikely event that someone sells and buys another mythic item later
+        # on in the game which is not considered here)
+        mythicEvents = participantEvents[participantEvents['Mythic']]
+
+        if len(firstSale := np.flatnonzero(mythicEvents['Type'] == const.ITEM_EVENT_SOLD)):
+            mythicEvents = mythicEvents[:firstSale[0]]
+
+        mythicEvents = mythicEvents[mythicEvents['Type'] == const.ITEM_EVENT_BOUGHT]
+
+        firstMythicItem.append(int(mythicEvents['ItemId'][-1]) if len(mythicEvents) else 0)
+        firstMythicTimestamp.append(int(mythicEvents['Timestamp'][-1]) if len(mythicEvents) else 0)
+
+
+        ##
+        # Legendary items: remove the sale events (we don't consider them for this analysis, any major
+        # item sales should happen after the 5 item stage). Then match the undo events to all previous
+        # buy events of the same item and remove them.
+        # Do not consider the tear items at this stage (not sure how they behave, only the base version should
+        # appear as the upgrade is not technically a buy event, but might be)
+        legendaryEvents = participantEvents[~participantEvents['Mythic']
+            & (participantEvents['Type'] != const.ITEM_EVENT_SOLD)]
+
+        itemsToKeep = legendaryEvents['Type'] == const.ITEM_EVENT_BOUGHT
+        for undoEvent in np.flatnonzero(legendaryEvents['Type'] == const.ITEM_EVENT_UNDO):
+            itemsToKeep[:undoEvent] &= legendaryEvents['ItemId'][:undoEvent] != legendaryEvents['ItemId'][undoEvent]
+
+        legendaryEvents = legendaryEvents[itemsToKeep]
+
+
+        ##
+        # Combine mythic and legendary items, then select the first 5 (stable, a mythic item bought at the
+        # same time as a legendary item comes after it)
+        itemIds = legendaryEvents['ItemId'].astype(np.int64)
+        itemTimestamps = legendaryEvents['Timestamp']
+        mythicFlags = np.zeros(len(itemIds), dtype = np.int64)
+
+        if len(mythicEvents):
+            itemIds = np.append(itemIds, mythicEvents['ItemId'][-1])
+            itemTimestamps = np.append(itemTimestamps, mythicEvents['Timestamp'][-1])
+            mythicFlags = np.append(mythicFlags, 1)
+
+        firstItems = np.argsort(itemTimestamps, kind = 'stable')[:5]
+
+        itemsCollected['Item'].append(itemIds[firstItems])
+        itemsCollected['Mythic'].append(mythicFlags[firstItems])
+        itemsCollected['Champion'].append(np.full(len(firstItems), championIds[i-1], dtype = np.int64))
+        itemsCollected['N_Items'].append(np.full(len(firstItems), len(firstItems), dtype = np.int64))
+        itemsCollected['Timestamp'].append(itemTimestamps[firstItems].astype(np.int64))
+
+
+    ###
+    # Create the dataframes, adding the queue and game duration information
+    firstMythicItem = pd.DataFrame({'Mythic': firstMythicItem, 'Champion': championIds,
+        'Queue': queueAndChampionIds['QueueId'], 'GameTimeSeconds': queueAndChampionIds['GameDuration'],
+        'Timestamp': firstMythicTimestamp})
+
+    legendaryAndMythicItemsBought = pd.DataFrame({'Item': np.concatenate(itemsCollected['Item']),
+        'Mythic': np.concatenate(itemsCollected['Mythic']), 'Champion': np.concatenate(itemsCollected['Champion']),
+        'Match': ct, 'N_Items': np.concatenate(itemsCollected['N_Items']), 'Queue': queueAndChampionIds['QueueId'],
+        'GameTimeSeconds': queueAndChampionIds['GameDuration'], 'Timestamp': np.concatenate(itemsCollected['Timestamp'])})
+
+
+    ###
+    # Return the mythic and all items
+    return(firstMythicItem, legendaryAndMythicItemsBought)
+
+
+##
+# Extract the bought items from the timeline
+def extractBoughtMythicAndLegendaryItems(matchData: Dict, legendaryItemsIds: Dict,
+        mythicItemsIds: Dict, queueAndChampionIds: Dict, ct: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    '''
+    Extract the bought mythic and legendary items
+    '''
+
+    logger.debug('Extract bought items for match id %i', matchData['_id'])
+
+    itemEvents = extractItemEvents(matchData = matchData, legendaryItemsIds = legendaryItemsIds,
+        mythicItemsIds = mythicItemsIds)
+
+    return(extractBoughtItemsFromEvents(itemEvents = itemEvents, queueAndChampionIds = queueAndChampionIds, ct = ct))
+
+
+##
+# Participants of the extracted legendary/mythic items
+def getParticipantSlots(legendaryAndMythicItems: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    The items of a participant are consecutive rows with the same match and champion. Return whether a
+    row is the first item of a participant and the slot of every row (0 to 4, order in which the items
+    were bought)
+    '''
+
+    matchIds = legendaryAndMythicItems['Match'].to_numpy()
+    championIds = legendaryAndMythicItems['Champion'].to_numpy()
+
+    participantStart = np.ones(len(matchIds), dtype = bool)
+    participantStart[1:] = (matchIds[1:] != matchIds[:-1]) | (championIds[1:] != championIds[:-1])
+
+    rowIndices = np.arange(len(matchIds))
+
+    return(participantStart, rowIndices - np.maximum.accumulate(np.where(participantStart, rowIndices, 0)))
+
+
+##
+# Split chunks of extracted data at participant boundaries
+def iterateParticipantChunks(dataChunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    '''
+    Take chunks of the extracted legendary/mythic items (e.g. read in chunks from the csv file) and yield
+    chunks which only contain complete participants. The rows of the last participant of a chunk are
+    carried over to the next chunk, as they might continue there
+    '''
+
+    carriedRows = None
+    for dataChunk in dataChunks:
+        if carriedRows is not None:
+            dataChunk = pd.concat([carriedRows, dataChunk], ignore_index = True)
+
+        if dataChunk.shape[0] == 0:
+            continue
+
+        participantStart, _ = getParticipantSlots(legendaryAndMythicItems = dataChunk)
+        lastParticipantStart = np.flatnonzero(participantStart)[-1]
+
+        carriedRows = dataChunk.iloc[lastParticipantStart:]
+
+        if lastParticipantStart > 0:
+            yield(dataChunk.iloc[:lastParticipantStart])
+
+    if carriedRows is not None and carriedRows.shape[0]:
+        yield(carriedRows)
+
+
+##
+# Read the extracted legendary/mythic items in chunks
+def readExtractedDataChunks(legendaryMythicDataPath: str, columns: List[str],
+        chunkSize: int = const.EXTRACTED_DATA_READ_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    '''
+    Read columns of the extracted legendary/mythic items csv file in chunks of complete participants
+    (needs the columns Match and Champion)
+    '''
+
+    yield from iterateParticipantChunks(dataChunks = pd.read_csv(legendaryMythicDataPath, usecols = columns,
+        dtype = np.int64, chunksize = chunkSize))
+
+
+##
+# Paths of the extracted data
+def getExtractedDataPaths(region: str) -> Tuple[str, str]:
+    '''
+    Return the paths of the files with the extracted mythic and legendary/mythic items
+    '''
+
+    return(tuple('{}{}'.format(const.FOLDER_DATA, dataFile.format(region = region,
+        dateFrom = const.EARLIEST_DATE_FOR_GAMES, dateTo = const.LATEST_DATE_FOR_GAMES))
+        for dataFile in (const.MYTHIC_DATA_FILE, const.LEGENDARY_MYTHIC_DATA_FILE)))
+
+
+##
+# Paths of the extracted data in the columnar output
+def getParquetDatasetPaths(region: str, inProgress: bool = False) -> Tuple[str, str]:
+    '''
+    Return the directories of the region partition in the mythic and legendary/mythic datasets.
+    While an extraction is in progress, the data is written to a staging directory which is
+    ignored when reading the datasets (leading underscore)
+    '''
+
+    regionPartition = const.PARQUET_PARTITION_REGION.format(region = region)
+    if inProgress:
+        regionPartition = '_{}{}'.format(regionPartition, const.PARTIAL_FILE_SUFFIX)
+
+    return(tuple('{}{}/{}'.format(const.FOLDER_PARQUET, dataset.format(dateFrom = const.EARLIEST_DATE_FOR_GAMES,
+        dateTo = const.LATEST_DATE_FOR_GAMES), regionPartition)
+        for dataset in (const.MYTHIC_DATASET, const.LEGENDARY_MYTHIC_DATASET)))
+
+
+##
+# Concatenate and save the extracted data
+def concatenateAndSaveExtractedData(region: str, firstMythicItemCollected: List,
+        legendaryAndMythicItemsCollected: List, mythicItemsIds: Dict, append: bool = False) -> None:
+    '''
+    Concatenate and save the data extracted from the match data. If append is set, the data is
+    appended to the existing files (incremental extraction) instead of replacing them.
+    Folder has to exist and will not be created.
+    '''
+
+    logger.debug('Save extracted data for region %s', region)
+
+    mythicDataPath, legendaryMythicDataPath = getExtractedDataPaths(region = region)
+
+    # Nothing new to save, but the files have to exist for a later incremental run
+    if not firstMythicItemCollected:
+        logger.info('No new extracted data for region %s', region)
+
+        if not append:
+            pd.DataFrame(columns = const.MYTHIC_DATA_COLUMNS).to_csv(mythicDataPath, index = False)
+            pd.DataFrame(columns = const.LEGENDARY_MYTHIC_DATA_COLUMNS).to_csv(legendaryMythicDataPath, index = False)
+
+    else:
+        # Concatenate data
+        firstMythicItem = pd.concat(firstMythicItemCollected, ignore_index = True)
+        legendaryAndMythicItems = pd.concat(legendaryAndMythicItemsCollected, ignore_index = True)
+
+        legendaryAndMythicItems['Item'] = legendaryAndMythicItems['Item'].astype(int)
+
+        # Save data
+        firstMythicItem.to_csv(mythicDataPath, index = False, mode = 'a' if append else 'w', header = not append)
+        legendaryAndMythicItems.to_csv(legendaryMythicDataPath, index = False, mode = 'a' if append else 'w',
+            header = not append)
+
+    saveMythicItemIds(mythicItemsIds = mythicItemsIds)
+
+    ###
+    # End of function
+    return
+
+
+##
+# Save the mythic item ids
+def saveMythicItemIds(mythicItemsIds: Dict) -> None:
+    '''
+    Save the mapping of the mythic item ids to the item names. The file is first written to a
+    temporary file which then replaces the old one
+    '''
+
+    mythicIdsPath = '{}{}'.format(const.FOLDER_DATA, const.MYTHIC_IDS)
+
+    pd.DataFrame(mythicItemsIds, index = [0]).transpose().reset_index().rename(
+        columns = {'index': 'Id', 0: 'Item'}).to_csv('{}{}'.format(mythicIdsPath, const.PARTIAL_FILE_SUFFIX),
+        index = False)
+
+    os.replace('{}{}'.format(mythicIdsPath, const.PARTIAL_FILE_SUFFIX), mythicIdsPath)
+
+    ###
+    # End of function
+    return
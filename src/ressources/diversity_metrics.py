@@ -0,0 +1,243 @@
+'''
+
+Item diversity metrics per group (e.g. champion and queue), computed from count distributions over
+categories (e.g. mythic items). All metrics are vectorised over the groups, the input is an array of
+counts with the categories on the last axis:
+- Shannon entropy (natural logarithm) and the effective number of builds (exp of the entropy)
+- Gini-Simpson index (probability that two random participants chose different categories)
+- Top-k concentration (share of the k most frequent categories)
+
+Confidence intervals are computed with a multinomial bootstrap per group, the replicates are distributed
+over processes in batches with independent random streams (numpy SeedSequence). Only the groups with enough
+participants and the categories observed in them are bootstrapped, the counts are sent once to every process
+and the batches are sized by their memory.
+
+'''
+
+
+###
+# Imports
+from concurrent.futures import ProcessPoolExecutor
+import logging
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+    import src.ressources.count_cubes as countCubes
+except Exception:
+    import ressources.constants as const
+    import ressources.count_cubes as countCubes
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Distributions of the bootstrap in the worker processes (set once per process, see initialiseBootstrapWorker)
+bootstrapDistributions = dict()
+
+
+###
+# Functions
+
+##
+# Metrics
+def computeDiversityMetrics(counts: np.ndarray, topK: List[int] = const.DIVERSITY_TOP_K) -> Dict[str, np.ndarray]:
+    '''
+    Compute the diversity metrics for every group of the counts (categories on the last axis). Groups
+    without any participant get NaN
+    '''
+
+    nParticipants = counts.sum(axis = -1, keepdims = True)
+
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        shares = counts / nParticipants
+        entropy = np.sum(np.where(shares > 0, shares * np.log(1 / np.where(shares > 0, shares, 1)), 0), axis = -1)
+        entropy[nParticipants[..., 0] == 0] = np.nan
+
+    diversityMetrics = {'Entropy': entropy, 'EffectiveNumber': np.exp(entropy),
+        'GiniSimpson': 1 - np.sum(shares**2, axis = -1)}
+
+    sortedShares = -np.sort(-shares, axis = -1)
+    for k in topK:
+        diversityMetrics['Top{}Share'.format(k)] = np.sum(sortedShares[..., :k], axis = -1)
+
+    return(diversityMetrics)
+
+
+##
+# Distributions of the bootstrap in a worker process
+def initialiseBootstrapWorker(counts: np.ndarray) -> None:
+    '''
+    Keep the number of participants and the observed shares of every group (rows of the counts) in the
+    worker process, so the counts are only sent once per process and not with every batch
+    '''
+
+    nParticipants = counts.sum(axis = -1)
+    with np.errstate(invalid = 'ignore'):
+        shares = np.nan_to_num(counts / nParticipants[..., np.newaxis])
+
+    # Groups without participants get an arbitrary valid distribution, their metrics are NaN anyway
+    shares[nParticipants == 0, 0] = 1
+
+    bootstrapDistributions['NParticipants'] = nParticipants
+    bootstrapDistributions['Shares'] = shares
+
+
+##
+# One batch of bootstrap replicates
+def bootstrapBatch(nReplicates: int, seedSequence: np.random.SeedSequence, topK: List[int]) -> Dict[str, np.ndarray]:
+    '''
+    Draw bootstrap replicates of the distributions of the worker process (multinomial with the observed shares
+    and number of participants per group) and return the metrics of every replicate (replicates on the first axis)
+    '''
+
+    rng = np.random.default_rng(seedSequence)
+
+    nParticipants = bootstrapDistributions['NParticipants']
+    replicatedCounts = rng.multinomial(nParticipants, bootstrapDistributions['Shares'],
+        size = (nReplicates, *nParticipants.shape))
+
+    return(computeDiversityMetrics(counts = replicatedCounts, topK = topK))
+
+
+##
+# Replicates per batch
+def getBootstrapBatchSize(nGroups: int, nCategories: int) -> int:
+    '''
+    Number of replicates per batch, limited by the maximum batch size and by the memory of the replicated
+    counts and the arrays of the metrics (const.DIVERSITY_BOOTSTRAP_BATCH_MEMORY)
+    '''
+
+    bytesPerReplicate = (max(nGroups * nCategories, 1) * np.dtype(np.int64).itemsize
+        * const.DIVERSITY_BOOTSTRAP_ARRAY_COPIES)
+
+    return(int(np.clip(const.DIVERSITY_BOOTSTRAP_BATCH_MEMORY // bytesPerReplicate, 1,
+        const.DIVERSITY_BOOTSTRAP_BATCH_SIZE)))
+
+
+##
+# Bootstrap confidence intervals
+def bootstrapConfidenceIntervals(counts: np.ndarray, nReplicates: int = const.DIVERSITY_BOOTSTRAP_REPLICATES,
+        confidenceLevel: float = const.DIVERSITY_CONFIDENCE_LEVEL, seed: int = const.DIVERSITY_SEED,
+        topK: List[int] = const.DIVERSITY_TOP_K, minParticipants: int = const.DIVERSITY_MIN_PARTICIPANTS,
+        maxWorkers: Union[int, None] = None) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    '''
+    Percentile bootstrap confidence intervals of the metrics for every group (categories on the last axis).
+    Only the groups with at least minParticipants participants are bootstrapped, the other groups get NaN.
+    The replicates are computed in batches in parallel, the same seed gives the same intervals independent
+    of the number of workers
+    '''
+
+    ###
+    # Groups to bootstrap and the categories observed in them (categories without counts stay at 0 in every
+    # replicate and do not change the metrics)
+    groupShape = counts.shape[:-1]
+    counts = counts.reshape(-1, counts.shape[-1])
+
+    bootstrapGroups = counts.sum(axis = 1) >= max(minParticipants, 1)
+    selectedCounts = counts[bootstrapGroups]
+    selectedCounts = selectedCounts[:, selectedCounts.sum(axis = 0) > 0]
+
+
+    ###
+    # Batches with independent random streams
+    batchSize = getBootstrapBatchSize(nGroups = selectedCounts.shape[0], nCategories = selectedCounts.shape[1])
+
+    nBatches = -(-nReplicates // batchSize)
+    batchSizes = [batchSize] * (nBatches - 1) + [nReplicates - batchSize * (nBatches - 1)]
+    seedSequences = np.random.SeedSequence(seed).spawn(nBatches)
+
+    logger.debug('Bootstrap %i replicates in %i batches for %i of %i groups (%i categories)', nReplicates, nBatches,
+        selectedCounts.shape[0], counts.shape[0], selectedCounts.shape[1])
+
+
+    ###
+    # Compute the replicates, the counts are sent once to every process
+    if selectedCounts.shape[0] > 0:
+        with ProcessPoolExecutor(max_workers = maxWorkers, initializer = initialiseBootstrapWorker,
+                initargs = (selectedCounts, )) as executor:
+            batchMetrics = list(executor.map(bootstrapBatch, batchSizes, seedSequences, [topK] * nBatches))
+    else:
+        batchMetrics = [computeDiversityMetrics(counts = np.zeros((0, 0, 1), dtype = np.int64), topK = topK)]
+
+
+    ###
+    # Percentiles of the replicates, NaN for the groups which were not bootstrapped
+    alpha = (1 - confidenceLevel) / 2
+
+    confidenceIntervals = dict()
+    for metricName in batchMetrics[0]:
+        replicatedMetric = np.concatenate([batchMetric[metricName] for batchMetric in batchMetrics])
+
+        metricBounds = np.full((2, counts.shape[0]), np.nan)
+        if selectedCounts.shape[0] > 0:
+            metricBounds[:, bootstrapGroups] = np.quantile(replicatedMetric, [alpha, 1 - alpha], axis = 0)
+
+        confidenceIntervals[metricName] = tuple(metricBounds.reshape(2, *groupShape))
+
+    return(confidenceIntervals)
+
+
+##
+# Distributions of a count cube
+def getCubeDistributions(countCube: countCubes.CountCube, categoryAxis: str) -> Tuple[pd.DataFrame, np.ndarray]:
+    '''
+    Reshape a count cube into a matrix with one row per group (combination of the other axes) and the
+    categories of the given axis as columns. Returns the group labels and the matrix
+    '''
+
+    groupAxes = [axisName for axisName in countCube.axisNames if axisName != categoryAxis]
+
+    counts = np.moveaxis(countCube.counts, countCube.axisNames.index(categoryAxis), -1)
+    groupIndices = np.indices(counts.shape[:-1]).reshape(len(groupAxes), -1)
+
+    groupLabels = pd.DataFrame({axisName: countCube.axisLabels[axisName][groupIndices[axisPosition]]
+        for axisPosition, axisName in enumerate(groupAxes)})
+
+    return(groupLabels, counts.reshape(-1, counts.shape[-1]))
+
+
+##
+# Diversity table
+def computeDiversityTable(cubeName: str, categoryAxis: str, regions: List[str],
+        minParticipants: int = const.DIVERSITY_MIN_PARTICIPANTS, nReplicates: int = const.DIVERSITY_BOOTSTRAP_REPLICATES,
+        maxWorkers: Union[int, None] = None) -> pd.DataFrame:
+    '''
+    Compute the metrics with confidence intervals for every group of a count cube (over the categories of
+    the given axis) and region. Groups with less than minParticipants participants are left out
+    '''
+
+    diversityTables = list()
+    for region in regions:
+        logger.info('Compute diversity metrics of %s for region %s', cubeName, region)
+
+        groupLabels, counts = getCubeDistributions(countCube = countCubes.CountCube.load(
+            cubePath = countCubes.getCountCubePaths(cubeName = cubeName, region = region)[0]),
+            categoryAxis = categoryAxis)
+
+        selectedGroups = counts.sum(axis = 1) >= minParticipants
+        groupLabels = groupLabels.loc[selectedGroups].reset_index(drop = True)
+        counts = counts[selectedGroups]
+
+        diversityMetrics = computeDiversityMetrics(counts = counts)
+        confidenceIntervals = bootstrapConfidenceIntervals(counts = counts, nReplicates = nReplicates,
+            minParticipants = minParticipants, maxWorkers = maxWorkers)
+
+        diversityTable = groupLabels.assign(Region = region, N = counts.sum(axis = 1))
+        for metricName, metricValues in diversityMetrics.items():
+            diversityTable[metricName] = metricValues
+            diversityTable['{}Lower'.format(metricName)], diversityTable['{}Upper'.format(metricName)] = \
+                confidenceIntervals[metricName]
+
+        diversityTables.append(diversityTable)
+
+    return(pd.concat(diversityTables, ignore_index = True))
@@ -0,0 +1,381 @@
+'''
+
+Local columnar store of the item events and the match information, exported once from the MongoDB
+(see export_event_store.py) so that analyses can run on it without going through the full timeline
+documents again.
+
+The store consists of flat binary files which are read as memory-mapped NumPy arrays (no copy, the
+operating system loads the pages on access):
+- events: all item events (all items, not only legendary/mythic) as data_processing.ITEM_EVENT_DTYPE,
+  grouped by match in the order of the timeline
+- matches: one record per match (MATCH_DTYPE) with the queue, duration, creation time, the champion per
+  participant and the offset and number of its events
+- champion index: the participants (match index * 10 + participant id - 1) sorted by champion, with
+  offsets per champion id (the participants of champion c are champion_participants[offsets[c]:offsets[c+1]])
+
+The store is appended to in chunks. The number of written matches/events is kept in a json file which
+is only updated once a chunk is on disk, longer files (interrupted export) are truncated when the store
+is opened again.
+
+'''
+
+
+###
+# Imports
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+    import src.ressources.data_processing as dataProcessing
+except Exception:
+    import ressources.constants as const
+    import ressources.data_processing as dataProcessing
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Record of one match
+MATCH_DTYPE = np.dtype([('MatchId', np.int64), ('QueueId', np.uint16), ('GameDuration', np.uint32),
+    ('GameCreation', np.int64), ('EventOffset', np.int64), ('NEvents', np.uint32), ('Champions', np.uint16, (10, ))])
+
+
+###
+# Functions
+
+##
+# Folder of the store
+def getEventStoreFolder(region: str) -> str:
+    '''
+    Return the folder of the event store of a region
+    '''
+
+    return(const.FOLDER_EVENT_STORE.format(region = region, dateFrom = const.EARLIEST_DATE_FOR_GAMES,
+        dateTo = const.LATEST_DATE_FOR_GAMES))
+
+
+##
+# Hash of the mythic items
+def computeMythicItemsHash(mythicItemsIds: Dict) -> str:
+    '''
+    Hash of the mythic item ids, the mythic flag of the stored events has to be updated if it changes
+    '''
+
+    return(hashlib.sha256(json.dumps(sorted(int(itemId) for itemId in mythicItemsIds)).encode('utf-8')).hexdigest())
+
+
+##
+# Load the metadata of the store
+def loadEventStoreMetadata(region: str) -> Dict:
+    '''
+    Load the metadata (number of matches and events) of the store, an empty store if it does not exist
+    '''
+
+    metadataPath = '{}{}'.format(getEventStoreFolder(region = region), const.EVENT_STORE_METADATA)
+
+    if not os.path.isfile(metadataPath):
+        return({'NMatches': 0, 'NEvents': 0, 'MythicItemsHash': None})
+
+    with open(metadataPath, 'r') as metadataFile:
+        return(json.load(metadataFile))
+
+
+##
+# Save the metadata of the store
+def saveEventStoreMetadata(region: str, eventStoreMetadata: Dict) -> None:
+    '''
+    Save the metadata of the store (temporary file which then replaces the old file)
+    '''
+
+    metadataPath = '{}{}'.format(getEventStoreFolder(region = region), const.EVENT_STORE_METADATA)
+
+    with open('{}{}'.format(metadataPath, const.PARTIAL_FILE_SUFFIX), 'w') as metadataFile:
+        json.dump(eventStoreMetadata, metadataFile, indent = 1)
+
+    os.replace('{}{}'.format(metadataPath, const.PARTIAL_FILE_SUFFIX), metadataPath)
+
+
+    ###
+    # End of function
+    return
+
+
+##
+# Memory-map a file of the store
+def mapStoreFile(path: str, dtype: np.dtype, nRecords: int, mode: str = 'r') -> np.ndarray:
+    '''
+    Memory-map the first nRecords records of a file of the store (np.memmap can not map empty files)
+    '''
+
+    if nRecords == 0:
+        return(np.zeros(0, dtype = dtype))
+
+    return(np.memmap(path, dtype = dtype, mode = mode, shape = (nRecords, )))
+
+
+##
+# Open the store
+def loadEventStore(region: str) -> Dict:
+    '''
+    Open the event store of a region, returning the memory-mapped arrays of the matches, the events
+    and the champion index
+    '''
+
+    eventStoreFolder = getEventStoreFolder(region = region)
+    eventStoreMetadata = loadEventStoreMetadata(region = region)
+
+    if eventStoreMetadata.get('ChampionIndexMatches', 0) != eventStoreMetadata['NMatches']:
+        raise AssertionError('Event store of region {} is incomplete, run the export again'.format(region))
+
+    return({
+        'Matches': mapStoreFile(path = '{}{}'.format(eventStoreFolder, const.EVENT_STORE_MATCHES),
+            dtype = MATCH_DTYPE, nRecords = eventStoreMetadata['NMatches']),
+        'Events': mapStoreFile(path = '{}{}'.format(eventStoreFolder, const.EVENT_STORE_EVENTS),
+            dtype = dataProcessing.ITEM_EVENT_DTYPE, nRecords = eventStoreMetadata['NEvents']),
+        'ChampionOffsets': mapStoreFile(path = '{}{}'.format(eventStoreFolder, const.EVENT_STORE_CHAMPION_OFFSETS),
+            dtype = np.dtype(np.int64), nRecords = eventStoreMetadata.get('NChampionOffsets', 0)),
+        'ChampionParticipants': mapStoreFile(path = '{}{}'.format(eventStoreFolder,
+            const.EVENT_STORE_CHAMPION_PARTICIPANTS), dtype = np.dtype(np.int64),
+            nRecords = 10 * eventStoreMetadata['NMatches'])
+    })
+
+
+##
+# Events of a match
+def getMatchEvents(eventStore: Dict, matchIndex: int) -> np.ndarray:
+    '''
+    Return the item events of a match (view on the memory-mapped events, no copy)
+    '''
+
+    eventOffset = int(eventStore['Matches']['EventOffset'][matchIndex])
+
+    return(eventStore['Events'][eventOffset:(eventOffset + int(eventStore['Matches']['NEvents'][matchIndex]))])
+
+
+##
+# Legendary and mythic item events
+def selectLegendaryAndMythicEvents(itemEvents: np.ndarray, legendaryItemsIds: Dict) -> np.ndarray:
+    '''
+    Select the events of legendary and mythic items, as needed by data_processing.extractBoughtItemsFromEvents
+    '''
+
+    return(itemEvents[itemEvents['Mythic'] | np.isin(itemEvents['ItemId'],
+        np.array(list(legendaryItemsIds), dtype = np.int64))])
+
+
+##
+# Queue and champions of a match
+def getQueueAndChampionIds(eventStore: Dict, matchIndex: int) -> Dict:
+    '''
+    Return the queue id, game duration and champion ids of a match in the form of
+    data_processing.extractQueueAndChampions
+    '''
+
+    matchRecord = eventStore['Matches'][matchIndex]
+
+    return({'QueueId': int(matchRecord['QueueId']), 'GameDuration': int(matchRecord['GameDuration']), **{
+        'Champion_{}'.format(i + 1): int(championId) for i, championId in enumerate(matchRecord['Champions'])}})
+
+
+##
+# Participants of a champion
+def getChampionParticipants(eventStore: Dict, championId: int) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Return the match indices and participant ids of all participants which played a champion
+    '''
+
+    if championId + 1 >= len(eventStore['ChampionOffsets']):
+        return(np.zeros(0, dtype = np.int64), np.zeros(0, dtype = np.int64))
+
+    championParticipants = eventStore['ChampionParticipants'][
+        eventStore['ChampionOffsets'][championId]:eventStore['ChampionOffsets'][championId + 1]]
+
+    return(championParticipants // 10, championParticipants % 10 + 1)
+
+
+###
+# Classes
+
+##
+# Writer of the store
+class EventStoreWriter:
+    '''
+    Appends the item events and match information of new matches to the event store of a region,
+    in chunks. Closing the writer rebuilds the champion index
+    '''
+
+    def __init__(self, region: str, mythicItemsIds: Dict, chunkSize: int = const.EXTRACTION_CHUNK_SIZE) -> None:
+        logger.debug('Open event store of region %s', region)
+
+        self.region = region
+        self.mythicItemsIds = mythicItemsIds
+        self.chunkSize = chunkSize
+
+        self.eventStoreFolder = getEventStoreFolder(region = region)
+        self.eventsPath = '{}{}'.format(self.eventStoreFolder, const.EVENT_STORE_EVENTS)
+        self.matchesPath = '{}{}'.format(self.eventStoreFolder, const.EVENT_STORE_MATCHES)
+
+        os.makedirs(self.eventStoreFolder, exist_ok = True)
+
+        self.eventStoreMetadata = loadEventStoreMetadata(region = region)
+        self.checkStoreFiles()
+        self.updateMythicFlags()
+
+        self.storedMatchIds = set(mapStoreFile(path = self.matchesPath, dtype = MATCH_DTYPE,
+            nRecords = self.eventStoreMetadata['NMatches'])['MatchId'].tolist())
+
+        self.eventsBuffer = list()
+        self.matchesBuffer = list()
+        self.nEventsBuffer = 0
+
+
+    ##
+    # Check the files of the store
+    def checkStoreFiles(self) -> None:
+        '''
+        Truncate the files to the recorded number of records (data of an interrupted chunk). If a file
+        is shorter than recorded, the store is not usable and is started again
+        '''
+
+        expectedSizes = {self.eventsPath: self.eventStoreMetadata['NEvents'] * dataProcessing.ITEM_EVENT_DTYPE.itemsize,
+            self.matchesPath: self.eventStoreMetadata['NMatches'] * MATCH_DTYPE.itemsize}
+
+        if any((os.path.getsize(path) if os.path.isfile(path) else 0) < expectedSize
+                for path, expectedSize in expectedSizes.items()):
+            logger.warning('Event store of region %s is shorter than recorded, export all matches again', self.region)
+
+            self.eventStoreMetadata = {'NMatches': 0, 'NEvents': 0, 'MythicItemsHash': None}
+            expectedSizes = {path: 0 for path in expectedSizes}
+
+        for path, expectedSize in expectedSizes.items():
+            with open(path, 'ab') as storeFile:
+                storeFile.truncate(expectedSize)
+
+
+    ##
+    # Update the mythic flags
+    def updateMythicFlags(self) -> None:
+        '''
+        Set the mythic flag of the stored events again if the mythic items changed (in place)
+        '''
+
+        mythicItemsHash = computeMythicItemsHash(mythicItemsIds = self.mythicItemsIds)
+
+        if self.eventStoreMetadata['MythicItemsHash'] not in (None, mythicItemsHash) and self.eventStoreMetadata['NEvents']:
+            logger.info('Mythic items changed, update the stored events of region %s', self.region)
+
+            storedEvents = mapStoreFile(path = self.eventsPath, dtype = dataProcessing.ITEM_EVENT_DTYPE,
+                nRecords = self.eventStoreMetadata['NEvents'], mode = 'r+')
+            storedEvents['Mythic'] = np.isin(storedEvents['ItemId'], np.array(list(self.mythicItemsIds), dtype = np.int64))
+            storedEvents.flush()
+
+            del storedEvents
+
+        self.eventStoreMetadata['MythicItemsHash'] = mythicItemsHash
+
+
+    ##
+    # Add a match
+    def addMatch(self, matchData: Dict) -> None:
+        '''
+        Add the item events and the match information of one match, writing a chunk once enough matches
+        are collected
+        '''
+
+        itemEvents = dataProcessing.extractItemEvents(matchData = matchData, legendaryItemsIds = dict(),
+            mythicItemsIds = self.mythicItemsIds, allItems = True)
+
+        championIds = [0] * 10
+        for participant in matchData['participants']:
+            championIds[participant['participantId'] - 1] = participant['championId']
+
+        self.matchesBuffer.append((matchData['_id'], matchData['queueId'], matchData['gameDuration'],
+            matchData.get('gameCreation', 0), self.eventStoreMetadata['NEvents'] + self.nEventsBuffer,
+            len(itemEvents), championIds))
+        self.eventsBuffer.append(itemEvents)
+        self.nEventsBuffer += len(itemEvents)
+
+        if len(self.matchesBuffer) >= self.chunkSize:
+            self.flush()
+
+
+    ##
+    # Write the collected matches
+    def flush(self) -> None:
+        '''
+        Append the collected matches and events to the files, then record them in the metadata
+        '''
+
+        if not self.matchesBuffer:
+            return
+
+        logger.debug('Write chunk of %i matches to the event store of region %s', len(self.matchesBuffer), self.region)
+
+        for path, storeData in ((self.eventsPath, np.concatenate(self.eventsBuffer)),
+                (self.matchesPath, np.array(self.matchesBuffer, dtype = MATCH_DTYPE))):
+            with open(path, 'ab') as storeFile:
+                storeFile.write(storeData.tobytes())
+
+                storeFile.flush()
+                os.fsync(storeFile.fileno())
+
+        self.storedMatchIds.update(matchRecord[0] for matchRecord in self.matchesBuffer)
+        self.eventStoreMetadata['NMatches'] += len(self.matchesBuffer)
+        self.eventStoreMetadata['NEvents'] += self.nEventsBuffer
+
+        saveEventStoreMetadata(region = self.region, eventStoreMetadata = self.eventStoreMetadata)
+
+        self.eventsBuffer = list()
+        self.matchesBuffer = list()
+        self.nEventsBuffer = 0
+
+
+    ##
+    # Finish the store
+    def close(self) -> None:
+        '''
+        Write the remaining matches and rebuild the champion index over all matches
+        '''
+
+        logger.debug('Close event store of region %s', self.region)
+
+        self.flush()
+
+
+        ###
+        # Participants sorted by champion (stable, by match within a champion) and offsets per champion id
+        championIds = mapStoreFile(path = self.matchesPath, dtype = MATCH_DTYPE,
+            nRecords = self.eventStoreMetadata['NMatches'])['Champions'].ravel().astype(np.int64)
+
+        championParticipants = np.argsort(championIds, kind = 'stable').astype(np.int64)
+        championOffsets = np.zeros(championIds.max(initial = 0) + 2, dtype = np.int64)
+        championOffsets[1:] = np.cumsum(np.bincount(championIds, minlength = len(championOffsets) - 1))
+
+        for fileName, storeData in ((const.EVENT_STORE_CHAMPION_PARTICIPANTS, championParticipants),
+                (const.EVENT_STORE_CHAMPION_OFFSETS, championOffsets)):
+            storePath = '{}{}'.format(self.eventStoreFolder, fileName)
+
+            with open('{}{}'.format(storePath, const.PARTIAL_FILE_SUFFIX), 'wb') as storeFile:
+                storeFile.write(storeData.tobytes())
+
+            os.replace('{}{}'.format(storePath, const.PARTIAL_FILE_SUFFIX), storePath)
+
+        self.eventStoreMetadata['NChampionOffsets'] = len(championOffsets)
+        self.eventStoreMetadata['ChampionIndexMatches'] = self.eventStoreMetadata['NMatches']
+
+        saveEventStoreMetadata(region = self.region, eventStoreMetadata = self.eventStoreMetadata)
+
+        logger.info('Event store of region %s contains %i matches with %i item events', self.region,
+            self.eventStoreMetadata['NMatches'], self.eventStoreMetadata['NEvents'])
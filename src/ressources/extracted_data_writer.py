@@ -0,0 +1,327 @@
+'''
+
+Streaming writer for the extracted item data. The data is written in chunks of matches while the
+extraction runs, so the memory usage does not grow with the number of matches and an interrupted
+extraction can be resumed from the last written chunk.
+
+'''
+
+
+###
+# Imports
+from itertools import zip_longest
+import logging
+import os
+import shutil
+from typing import Dict, Iterator, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+
+###
+# Load ressources
+try:
+    import src.ressources.build_sketches as buildSketches
+    import src.ressources.constants as const
+    import src.ressources.count_cubes as countCubes
+    import src.ressources.data_processing as dataProcessing
+    import src.ressources.extraction_state as extractionState
+    import src.ressources.timing_sketches as timingSketches
+except Exception:
+    import ressources.build_sketches as buildSketches
+    import ressources.constants as const
+    import ressources.count_cubes as countCubes
+    import ressources.data_processing as dataProcessing
+    import ressources.extraction_state as extractionState
+    import ressources.timing_sketches as timingSketches
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Classes
+
+##
+# Chunked writer for the extracted data
+class ExtractedDataWriter:
+    '''
+    Collects the extracted data per match and appends it in chunks to partial csv output files.
+    After every chunk, the extraction state is saved, so the partial files together with the
+    state can be resumed after an interruption. Closing the writer moves the partial files to
+    their final names (atomic replacement).
+
+    Every chunk is also added to the count cubes of the region (see count_cubes.py) and, if an item universe
+    is given, to the approximate build counts of the region (see build_sketches.py). If item timings are set,
+    the purchase times are added to the timing sketches of the region (see timing_sketches.py).
+
+    Other output formats override getOutputPaths, prepareOutput, writeChunk, iterateWrittenData and finishOutput.
+    '''
+
+    def __init__(self, region: str, stateOfExtraction: Dict, chunkSize: int = const.EXTRACTION_CHUNK_SIZE,
+            itemUniverse: Union[np.ndarray, None] = None, itemTimings: bool = False) -> None:
+        logger.debug('Create writer for the extracted data of region %s', region)
+
+        self.region = region
+        self.stateOfExtraction = stateOfExtraction
+        self.chunkSize = chunkSize
+
+        self.outputPaths, self.partialPaths = self.getOutputPaths()
+
+        self.firstMythicItemBuffer = list()
+        self.legendaryAndMythicItemsBuffer = list()
+        self.matchIdsBuffer = set()
+
+
+        ###
+        # Prepare the partial output. An interrupted extraction is continued as is (the output was
+        # already checked when loading the state)
+        if not self.stateOfExtraction['InProgress']:
+            self.prepareOutput()
+
+            self.stateOfExtraction['InProgress'] = True
+            extractionState.saveExtractionState(region = self.region, extractionState = self.stateOfExtraction)
+
+
+        ###
+        # Load the count cubes, the build sketch (optional approximate build counts) and the timing sketches
+        # (optional quantiles of the purchase times). If they do not contain the already extracted matches
+        # (interrupted extraction or not created yet), they are rebuilt from the written data in one pass
+        # over its chunks
+        self.countCubes = countCubes.loadCountCubes(region = self.region, nMatches = self.stateOfExtraction['NMatches'])
+
+        self.buildSketch = None
+        if itemUniverse is not None:
+            self.buildSketch = buildSketches.loadBuildSketch(region = self.region,
+                nMatches = self.stateOfExtraction['NMatches'], itemUniverse = itemUniverse)
+
+        self.timingSketches = None
+        if itemTimings:
+            self.timingSketches = timingSketches.loadTimingSketches(region = self.region,
+                nMatches = self.stateOfExtraction['NMatches'])
+
+        rebuildCountCubes = self.countCubes is None
+        rebuildBuildSketch = itemUniverse is not None and self.buildSketch is None
+        rebuildTimingSketches = itemTimings and self.timingSketches is None
+
+        if rebuildCountCubes or rebuildBuildSketch or rebuildTimingSketches:
+            logger.info('Rebuild the %s of region %s from the extracted data', ', '.join(summaryName
+                for summaryName, rebuildSummary in (('count cubes', rebuildCountCubes),
+                    ('build sketch', rebuildBuildSketch), ('timing sketches', rebuildTimingSketches))
+                if rebuildSummary), self.region)
+
+            if rebuildCountCubes:
+                self.countCubes = countCubes.createEmptyCountCubes()
+            if rebuildBuildSketch:
+                self.buildSketch = buildSketches.BuildSketch.create(itemUniverse = itemUniverse)
+            if rebuildTimingSketches:
+                self.timingSketches = timingSketches.createEmptyTimingSketches()
+
+            for firstMythicItem, legendaryAndMythicItems, nMatches in self.readWrittenDataChunks():
+                if rebuildCountCubes:
+                    countCubes.updateCountCubes(countCubes = self.countCubes, firstMythicItem = firstMythicItem,
+                        legendaryAndMythicItems = legendaryAndMythicItems, nMatches = nMatches)
+                if rebuildBuildSketch:
+                    self.buildSketch.add(legendaryAndMythicItems = legendaryAndMythicItems, nMatches = nMatches)
+                if rebuildTimingSketches:
+                    timingSketches.updateTimingSketches(timingSketches = self.timingSketches,
+                        firstMythicItem = firstMythicItem, legendaryAndMythicItems = legendaryAndMythicItems,
+                        nMatches = nMatches)
+
+            if rebuildCountCubes:
+                countCubes.saveCountCubes(region = self.region, countCubes = self.countCubes)
+            if rebuildBuildSketch:
+                buildSketches.saveBuildSketch(region = self.region, buildSketch = self.buildSketch)
+            if rebuildTimingSketches:
+                timingSketches.saveTimingSketches(region = self.region, timingSketches = self.timingSketches)
+
+
+    ##
+    # Paths of the output
+    def getOutputPaths(self) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        '''
+        Return the paths of the final and of the partial output files
+        '''
+
+        return(dataProcessing.getExtractedDataPaths(region = self.region),
+            extractionState.getOutputFilePaths(region = self.region, inProgress = True))
+
+
+    ##
+    # Prepare the partial output files
+    def prepareOutput(self) -> None:
+        '''
+        Create the partial files. An incremental extraction starts from a copy of the existing outputs,
+        a full extraction from empty files
+        '''
+
+        if self.stateOfExtraction['NMatches'] > 0:
+            for outputPath, partialPath in zip(self.outputPaths, self.partialPaths):
+                shutil.copyfile(outputPath, partialPath)
+
+        else:
+            for partialPath, columns in zip(self.partialPaths,
+                    (const.MYTHIC_DATA_COLUMNS, const.LEGENDARY_MYTHIC_DATA_COLUMNS)):
+                pd.DataFrame(columns = columns).to_csv(partialPath, index = False)
+
+
+    ##
+    # Write a chunk to the partial output files
+    def writeChunk(self, firstMythicItem: pd.DataFrame, legendaryAndMythicItems: pd.DataFrame) -> None:
+        '''
+        Append a chunk to the partial files and make sure it is on disk before the state refers to it
+        '''
+
+        for partialPath, extractedData in zip(self.partialPaths, (firstMythicItem, legendaryAndMythicItems)):
+            with open(partialPath, 'a', newline = '') as partialFile:
+                extractedData.to_csv(partialFile, index = False, header = False)
+
+                partialFile.flush()
+                os.fsync(partialFile.fileno())
+
+
+    ##
+    # Iterate over the written data
+    def iterateWrittenData(self) -> Tuple[Iterator[pd.DataFrame], Iterator[pd.DataFrame]]:
+        '''
+        Return iterators over chunks of the data written to the partial files so far (first mythic items
+        and legendary/mythic items, const.EXTRACTED_DATA_READ_CHUNK_SIZE rows per chunk)
+        '''
+
+        return(tuple(pd.read_csv(partialPath, chunksize = const.EXTRACTED_DATA_READ_CHUNK_SIZE)
+            for partialPath in self.partialPaths))
+
+
+    ##
+    # Read the written data in chunks
+    def readWrittenDataChunks(self) -> Iterator[Tuple[pd.DataFrame, pd.DataFrame, int]]:
+        '''
+        Read the data written so far in chunks, so the memory usage does not grow with the number of matches
+        (e.g. to rebuild the count cubes). Yields a chunk of the first mythic items, a chunk of complete
+        participants of the legendary/mythic items and the number of matches of the chunk. The matches are
+        counted with the match counter, the matches after the last one with items are added with empty data
+        '''
+
+        firstMythicItemChunks, legendaryAndMythicItemsChunks = self.iterateWrittenData()
+
+        emptyData = tuple(pd.DataFrame({column: np.zeros(0, dtype = np.int64) for column in columns})
+            for columns in (const.MYTHIC_DATA_COLUMNS, const.LEGENDARY_MYTHIC_DATA_COLUMNS))
+
+        nMatchesRead = 0
+        for firstMythicItem, legendaryAndMythicItems in zip_longest(firstMythicItemChunks,
+                dataProcessing.iterateParticipantChunks(dataChunks = legendaryAndMythicItemsChunks)):
+            if legendaryAndMythicItems is None or legendaryAndMythicItems.shape[0] == 0:
+                nMatches = 0
+            else:
+                nMatches = max(int(legendaryAndMythicItems['Match'].max()) + 1 - nMatchesRead, 0)
+
+            nMatchesRead += nMatches
+
+            yield(emptyData[0] if firstMythicItem is None else firstMythicItem,
+                emptyData[1] if legendaryAndMythicItems is None else legendaryAndMythicItems, nMatches)
+
+        if nMatchesRead < self.stateOfExtraction['NMatches']:
+            yield(emptyData[0], emptyData[1], self.stateOfExtraction['NMatches'] - nMatchesRead)
+
+
+    ##
+    # Move the finished output files into place
+    def finishOutput(self, mythicItemsIds: Union[Dict, None]) -> None:
+        '''
+        Replace the final output files with the partial files and save the mythic item ids (skipped if
+        they are None, e.g. if they are saved once for several regions)
+        '''
+
+        for outputPath, partialPath in zip(self.outputPaths, self.partialPaths):
+            os.replace(partialPath, outputPath)
+
+        if mythicItemsIds is not None:
+            dataProcessing.saveMythicItemIds(mythicItemsIds = mythicItemsIds)
+
+
+    ##
+    # Add the data of one match
+    def addMatch(self, matchId: int, firstMythicItem: pd.DataFrame,
+            legendaryAndMythicItemsBought: pd.DataFrame) -> None:
+        '''
+        Add the extracted data of one match, writing a chunk once enough matches are collected
+        '''
+
+        self.firstMythicItemBuffer.append(firstMythicItem)
+        self.legendaryAndMythicItemsBuffer.append(legendaryAndMythicItemsBought)
+        self.matchIdsBuffer.add(matchId)
+
+        if len(self.matchIdsBuffer) >= self.chunkSize:
+            self.flush()
+
+
+    ##
+    # Write the collected data
+    def flush(self) -> None:
+        '''
+        Append the collected data to the partial files, then record the written matches in the state
+        '''
+
+        if not self.matchIdsBuffer:
+            return
+
+        logger.debug('Write chunk of %i matches for region %s', len(self.matchIdsBuffer), self.region)
+
+
+        ###
+        # Write the data
+        firstMythicItem = pd.concat(self.firstMythicItemBuffer, ignore_index = True)
+        legendaryAndMythicItems = pd.concat(self.legendaryAndMythicItemsBuffer, ignore_index = True)
+
+        legendaryAndMythicItems['Item'] = legendaryAndMythicItems['Item'].astype(int)
+
+        self.writeChunk(firstMythicItem = firstMythicItem, legendaryAndMythicItems = legendaryAndMythicItems)
+
+
+        ###
+        # Update and save the state
+        self.stateOfExtraction['MatchIds'] |= self.matchIdsBuffer
+        self.stateOfExtraction['NMatches'] += len(self.matchIdsBuffer)
+        self.stateOfExtraction['NChunks'] += 1
+
+        countCubes.updateCountCubes(countCubes = self.countCubes, firstMythicItem = firstMythicItem,
+            legendaryAndMythicItems = legendaryAndMythicItems, nMatches = len(self.matchIdsBuffer))
+        countCubes.saveCountCubes(region = self.region, countCubes = self.countCubes)
+
+        if self.buildSketch is not None:
+            self.buildSketch.add(legendaryAndMythicItems = legendaryAndMythicItems, nMatches = len(self.matchIdsBuffer))
+            buildSketches.saveBuildSketch(region = self.region, buildSketch = self.buildSketch)
+
+        if self.timingSketches is not None:
+            timingSketches.updateTimingSketches(timingSketches = self.timingSketches, firstMythicItem = firstMythicItem,
+                legendaryAndMythicItems = legendaryAndMythicItems, nMatches = len(self.matchIdsBuffer))
+            timingSketches.saveTimingSketches(region = self.region, timingSketches = self.timingSketches)
+
+        extractionState.saveExtractionState(region = self.region, extractionState = self.stateOfExtraction,
+            newMatchIds = self.matchIdsBuffer)
+
+
+        ###
+        # Empty the buffers
+        self.firstMythicItemBuffer = list()
+        self.legendaryAndMythicItemsBuffer = list()
+        self.matchIdsBuffer = set()
+
+
+    ##
+    # Finish the output files
+    def close(self, mythicItemsIds: Union[Dict, None]) -> None:
+        '''
+        Write the remaining data and replace the final output with the partial output
+        '''
+
+        logger.debug('Close writer for the extracted data of region %s', self.region)
+
+        self.flush()
+        self.finishOutput(mythicItemsIds = mythicItemsIds)
+
+        self.stateOfExtraction['InProgress'] = False
+        extractionState.saveExtractionState(region = self.region, extractionState = self.stateOfExtraction)
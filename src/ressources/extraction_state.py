@@ -0,0 +1,326 @@
+'''
+
+Functions to persist the extraction state (watermark) which allows to run the item extraction
+incrementally, processing only the matches which were added since the last run
+
+The state itself (counters, output sizes, item classification) is a small json file. The ids of the
+extracted matches are appended to a separate binary file, the state records its valid size, so saving
+the state after a chunk only writes the ids of that chunk
+
+'''
+
+
+###
+# Imports
+from array import array
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Set, Tuple, Union
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+    import src.ressources.data_processing as dataProcessing
+except Exception:
+    import ressources.constants as const
+    import ressources.data_processing as dataProcessing
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Functions
+
+##
+# Hash of the item classification
+def computeItemClassificationHash(legendaryItemsIds: Dict, mythicItemsIds: Dict, tearItemMappings: Dict) -> str:
+    '''
+    Compute a hash over the inputs which decide how the items are classified. If the hash changes
+    (e.g. new item definitions), the already extracted data is no longer valid and has to be rebuilt
+    '''
+
+    itemClassification = json.dumps({
+        'Legendary': sorted((int(itemId), itemName) for itemId, itemName in legendaryItemsIds.items()),
+        'Mythic': sorted((int(itemId), itemName) for itemId, itemName in mythicItemsIds.items()),
+        'Tear': sorted((int(evolvedId), int(basicId)) for evolvedId, basicId in tearItemMappings.items())
+    })
+
+    return(hashlib.sha256(itemClassification.encode('utf-8')).hexdigest())
+
+
+##
+# Path of the state file
+def getExtractionStatePath(region: str) -> str:
+    '''
+    Return the path of the file holding the extraction state for a region
+    '''
+
+    return('{}{}'.format(const.FOLDER_DATA, const.EXTRACTION_STATE_FILE.format(
+        region = region, dateFrom = const.EARLIEST_DATE_FOR_GAMES, dateTo = const.LATEST_DATE_FOR_GAMES)))
+
+
+##
+# Path of the match ids file
+def getMatchIdsPath(region: str) -> str:
+    '''
+    Return the path of the file holding the ids of the extracted matches for a region
+    '''
+
+    return('{}{}'.format(const.FOLDER_DATA, const.EXTRACTION_STATE_MATCH_IDS_FILE.format(
+        region = region, dateFrom = const.EARLIEST_DATE_FOR_GAMES, dateTo = const.LATEST_DATE_FOR_GAMES)))
+
+
+##
+# Load the match ids
+def loadMatchIds(region: str, matchIdsSize: int) -> Union[Set, None]:
+    '''
+    Load the ids of the extracted matches from the first matchIdsSize bytes of the match ids file. Ids which
+    were appended after the state was saved for the last time are removed. Returns None if the file is
+    smaller than recorded
+    '''
+
+    matchIdsPath = getMatchIdsPath(region = region)
+
+    if not os.path.isfile(matchIdsPath) or os.path.getsize(matchIdsPath) < matchIdsSize:
+        logger.warning('Match ids file %s does not match the extraction state', matchIdsPath)
+        return(None)
+
+    if os.path.getsize(matchIdsPath) > matchIdsSize:
+        logger.warning('Truncate match ids file %s to the size recorded in the extraction state', matchIdsPath)
+        with open(matchIdsPath, 'r+b') as matchIdsFile:
+            matchIdsFile.truncate(matchIdsSize)
+
+    matchIds = array('q')
+    with open(matchIdsPath, 'rb') as matchIdsFile:
+        matchIds.frombytes(matchIdsFile.read())
+
+    return(set(matchIds))
+
+
+##
+# Empty state
+def createEmptyExtractionState(itemClassificationHash: str, outputFormat: str = const.OUTPUT_FORMAT_CSV) -> Dict:
+    '''
+    Create the state of an extraction which has not processed any match yet
+    '''
+
+    return({'ItemClassificationHash': itemClassificationHash, 'OutputFormat': outputFormat,
+        'SchemaVersion': const.EXTRACTED_DATA_SCHEMA_VERSION, 'MatchIds': set(), 'MatchIdsSize': None,
+        'NMatches': 0, 'NChunks': 0, 'OutputSizes': dict(), 'InProgress': False})
+
+
+##
+# Paths of the output files covered by the state
+def getOutputFilePaths(region: str, inProgress: bool) -> Tuple[str, ...]:
+    '''
+    Return the paths of the csv output files the state refers to. While an extraction is in progress,
+    these are the partial files which replace the final files once the extraction is complete
+    '''
+
+    return(tuple('{}{}'.format(outputPath, const.PARTIAL_FILE_SUFFIX if inProgress else '')
+        for outputPath in dataProcessing.getExtractedDataPaths(region = region)))
+
+
+##
+# Check the csv output against the state
+def checkCsvOutput(region: str, extractionState: Dict) -> bool:
+    '''
+    Check the csv output files against the recorded sizes, truncating files which are larger than recorded
+    '''
+
+    for outputPath in getOutputFilePaths(region = region, inProgress = extractionState['InProgress']):
+        recordedSize = extractionState['OutputSizes'].get(outputPath, None)
+
+        if recordedSize is None or not os.path.isfile(outputPath) or os.path.getsize(outputPath) < recordedSize:
+            logger.warning('Output file %s does not match the extraction state', outputPath)
+            return(False)
+
+        if os.path.getsize(outputPath) > recordedSize:
+            logger.warning('Truncate output file %s to the size recorded in the extraction state', outputPath)
+            with open(outputPath, 'r+b') as outputFile:
+                outputFile.truncate(recordedSize)
+
+    return(True)
+
+
+##
+# Check the parquet output against the state
+def checkParquetOutput(region: str, extractionState: Dict) -> bool:
+    '''
+    Check that the region directories of the parquet datasets exist and remove the part files of
+    chunks which were written after the state was saved for the last time
+    '''
+
+    for datasetPath in dataProcessing.getParquetDatasetPaths(region = region,
+            inProgress = extractionState['InProgress']):
+        if not os.path.isdir(datasetPath):
+            logger.warning('Dataset directory %s does not match the extraction state', datasetPath)
+            return(False)
+
+        for queuePartition in os.listdir(datasetPath):
+            for partFile in os.listdir('{}/{}'.format(datasetPath, queuePartition)):
+                if partFile >= const.PARQUET_PART_FILE.format(chunk = extractionState['NChunks']):
+                    logger.warning('Remove part file %s/%s/%s written after the last saved extraction state',
+                        datasetPath, queuePartition, partFile)
+                    os.remove('{}/{}/{}'.format(datasetPath, queuePartition, partFile))
+
+    return(True)
+
+
+##
+# Load the state
+def loadExtractionState(region: str, itemClassificationHash: str, outputFormat: str = const.OUTPUT_FORMAT_CSV) -> Dict:
+    '''
+    Load the extraction state for a region. An empty state (and therefore a full rebuild) is returned
+    if no state exists, if the item classification, the output format or the columns of the extracted data
+    (schema version) changed or if the output files
+    do not match the recorded state anymore.
+
+    Output which was written after the state was saved for the last time (e.g. an append which was
+    interrupted) is removed. If the last extraction was interrupted, the state refers to its partial
+    output which can be resumed.
+    '''
+
+    logger.debug('Load extraction state for region %s', region)
+
+    ###
+    # Check whether a state is available at all
+    statePath = getExtractionStatePath(region = region)
+
+    if not os.path.isfile(statePath):
+        logger.info('No extraction state found for region %s, full extraction', region)
+        return(createEmptyExtractionState(itemClassificationHash = itemClassificationHash,
+            outputFormat = outputFormat))
+
+    with open(statePath, 'r') as stateFile:
+        extractionState = json.load(stateFile)
+
+
+    ###
+    # Item definitions changed, the whole data has to be rebuilt
+    if extractionState['ItemClassificationHash'] != itemClassificationHash:
+        logger.info('Item classification changed for region %s, full extraction', region)
+        return(createEmptyExtractionState(itemClassificationHash = itemClassificationHash,
+            outputFormat = outputFormat))
+
+
+    ###
+    # Output format changed, the whole data has to be rebuilt
+    extractionState.setdefault('OutputFormat', const.OUTPUT_FORMAT_CSV)
+    extractionState.setdefault('NChunks', 0)
+    extractionState.setdefault('InProgress', False)
+
+    if extractionState['OutputFormat'] != outputFormat:
+        logger.info('Output format changed for region %s, full extraction', region)
+        return(createEmptyExtractionState(itemClassificationHash = itemClassificationHash,
+            outputFormat = outputFormat))
+
+
+    ###
+    # Columns of the extracted data changed (states without version are from the extraction without
+    # the purchase times), the whole data has to be rebuilt
+    if extractionState.get('SchemaVersion', 1) != const.EXTRACTED_DATA_SCHEMA_VERSION:
+        logger.info('Columns of the extracted data changed for region %s, full extraction', region)
+        return(createEmptyExtractionState(itemClassificationHash = itemClassificationHash,
+            outputFormat = outputFormat))
+
+
+    ###
+    # Check the output against the state
+    if extractionState['InProgress']:
+        logger.info('Resume interrupted extraction for region %s', region)
+
+    if outputFormat == const.OUTPUT_FORMAT_PARQUET:
+        outputMatchesState = checkParquetOutput(region = region, extractionState = extractionState)
+    else:
+        outputMatchesState = checkCsvOutput(region = region, extractionState = extractionState)
+
+    if not outputMatchesState:
+        logger.warning('Output does not match the extraction state for region %s, full extraction', region)
+        return(createEmptyExtractionState(itemClassificationHash = itemClassificationHash,
+            outputFormat = outputFormat))
+
+
+    ###
+    # Load the match ids as a set for quick comparisons. States with the ids in the json file are from before
+    # the match ids file, their ids are written to the match ids file with the next save (size None)
+    if 'MatchIds' in extractionState:
+        extractionState['MatchIds'] = set(extractionState['MatchIds'])
+        extractionState['MatchIdsSize'] = None
+
+    elif (matchIds := loadMatchIds(region = region, matchIdsSize = extractionState['MatchIdsSize'])) is not None:
+        extractionState['MatchIds'] = matchIds
+
+    else:
+        logger.warning('Match ids do not match the extraction state for region %s, full extraction', region)
+        return(createEmptyExtractionState(itemClassificationHash = itemClassificationHash,
+            outputFormat = outputFormat))
+
+    logger.info('Extraction state loaded for region %s, %i matches already extracted', region,
+        extractionState['NMatches'])
+
+    return(extractionState)
+
+
+##
+# Save the state
+def saveExtractionState(region: str, extractionState: Dict, newMatchIds: Union[Set, None] = None) -> None:
+    '''
+    Record the current sizes of the output (or partial output) files in the state and save it. The state
+    is first written to a temporary file which then replaces the old state, so an interruption never
+    leaves a broken state.
+
+    The new match ids (already added to the ids of the state) are appended to the match ids file before the
+    state is written. If the state has no valid size of the match ids file yet (new or converted state), the
+    file is rewritten with all ids of the state.
+    '''
+
+    logger.debug('Save extraction state for region %s', region)
+
+    ###
+    # Record the output sizes (the parquet output is tracked by the number of written chunks instead)
+    if extractionState['OutputFormat'] == const.OUTPUT_FORMAT_CSV:
+        extractionState['OutputSizes'] = {outputPath: os.path.getsize(outputPath)
+            for outputPath in getOutputFilePaths(region = region, inProgress = extractionState['InProgress'])}
+
+
+    ###
+    # Append the new match ids, ids appended by an interrupted save are overwritten
+    if extractionState['MatchIdsSize'] is None:
+        matchIdsSize, matchIdsToAppend = 0, extractionState['MatchIds']
+    else:
+        matchIdsSize, matchIdsToAppend = extractionState['MatchIdsSize'], newMatchIds or set()
+
+    matchIdsPath = getMatchIdsPath(region = region)
+
+    with open(matchIdsPath, 'r+b' if os.path.isfile(matchIdsPath) else 'wb') as matchIdsFile:
+        matchIdsFile.truncate(matchIdsSize)
+        matchIdsFile.seek(matchIdsSize)
+        matchIdsFile.write(array('q', sorted(matchIdsToAppend)).tobytes())
+        matchIdsFile.flush()
+        os.fsync(matchIdsFile.fileno())
+
+        extractionState['MatchIdsSize'] = matchIdsFile.tell()
+
+
+    ###
+    # Write the state (without the match ids)
+    statePath = getExtractionStatePath(region = region)
+
+    with open('{}.tmp'.format(statePath), 'w') as stateFile:
+        json.dump({stateKey: stateValue for stateKey, stateValue in extractionState.items() if stateKey != 'MatchIds'},
+            stateFile)
+
+    os.replace('{}.tmp'.format(statePath), statePath)
+
+
+    ###
+    # End of function
+    return
@@ -0,0 +1,209 @@
+'''
+
+Icon atlas: all champion and item icons of the icon folder packed into one RGBA image, so plotting
+code loads the icons with a single read instead of decoding hundreds of png files.
+
+The icons are placed on shelves (rows) sorted by their height. The atlas is saved as png (e.g. for
+readPNG in R) and as npy array (can be memory mapped), together with an index (csv, icon name and
+position) and the signature of the icon files it was built from. It is only rebuilt if the icons changed.
+
+'''
+
+
+###
+# Imports
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+except Exception:
+    import ressources.constants as const
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Functions
+
+##
+# Paths of the atlas files
+def getIconAtlasPaths() -> Dict[str, str]:
+    '''
+    Return the paths of the atlas image, array, index and signature
+    '''
+
+    return({atlasFile: '{}{}'.format(const.FOLDER_ICON_ATLAS, atlasFileName) for atlasFile, atlasFileName in
+        (('Image', const.ICON_ATLAS_IMAGE), ('Array', const.ICON_ATLAS_ARRAY), ('Index', const.ICON_ATLAS_INDEX),
+        ('Signature', const.ICON_ATLAS_SIGNATURE))})
+
+
+##
+# Signature of the icons
+def computeIconSignature() -> str:
+    '''
+    Compute a hash over the names, sizes and modification times of the icon files
+    '''
+
+    iconFiles = sorted(iconFile for iconFile in os.listdir(const.FOLDER_ICONS) if iconFile.endswith('.png')) \
+        if os.path.isdir(const.FOLDER_ICONS) else list()
+
+    iconStatistics = [(iconFile, os.stat('{}{}'.format(const.FOLDER_ICONS, iconFile)).st_size,
+        os.stat('{}{}'.format(const.FOLDER_ICONS, iconFile)).st_mtime_ns) for iconFile in iconFiles]
+
+    return(hashlib.sha256(json.dumps(iconStatistics).encode('utf-8')).hexdigest())
+
+
+##
+# Place the icons on shelves
+def packIcons(iconSizes: Dict[str, Tuple[int, int]], atlasWidth: int = const.ICON_ATLAS_WIDTH) -> Tuple[pd.DataFrame, int]:
+    '''
+    Place the icons (name -> width and height) on shelves: sorted by height (then name), left to right, a new
+    shelf is started below the highest icon of the current one once the atlas width is reached. Returns the
+    index (icon name, position and size) and the height of the atlas
+    '''
+
+    iconPositions = list()
+    shelfX, shelfY, shelfHeight = 0, 0, 0
+
+    for iconName, (iconWidth, iconHeight) in sorted(iconSizes.items(), key = lambda icon: (-icon[1][1], icon[0])):
+        if iconWidth > atlasWidth:
+            raise AssertionError('Icon {} is wider than the atlas ({} > {} pixels)'.format(iconName, iconWidth,
+                atlasWidth))
+
+        if shelfX + iconWidth > atlasWidth:
+            shelfX, shelfY, shelfHeight = 0, shelfY + shelfHeight, 0
+
+        iconPositions.append({'Icon': iconName, 'X': shelfX, 'Y': shelfY, 'Width': iconWidth, 'Height': iconHeight})
+
+        shelfX += iconWidth
+        shelfHeight = max(shelfHeight, iconHeight)
+
+    return(pd.DataFrame(iconPositions, columns = ['Icon', 'X', 'Y', 'Width', 'Height']), shelfY + shelfHeight)
+
+
+##
+# Build the atlas
+def buildIconAtlas(iconSignature: str) -> pd.DataFrame:
+    '''
+    Pack all icons of the icon folder into one atlas and save it (temporary files which then replace the
+    old files, the signature is replaced last). Returns the index
+    '''
+
+    logger.info('Build icon atlas from %s', const.FOLDER_ICONS)
+
+    os.makedirs(const.FOLDER_ICON_ATLAS, exist_ok = True)
+    atlasPaths = getIconAtlasPaths()
+
+
+    ###
+    # Decode the icons and place them (PIL is only imported if the atlas is rebuilt)
+    from PIL import Image
+
+    icons = dict()
+    for iconFile in sorted(os.listdir(const.FOLDER_ICONS)):
+        if iconFile.endswith('.png'):
+            with Image.open('{}{}'.format(const.FOLDER_ICONS, iconFile)) as iconImage:
+                icons[iconFile[:-4]] = np.asarray(iconImage.convert('RGBA'))
+
+    atlasIndex, atlasHeight = packIcons(iconSizes = {iconName: (iconPixels.shape[1], iconPixels.shape[0])
+        for iconName, iconPixels in icons.items()})
+
+
+    ###
+    # Compose the atlas (transparent background)
+    atlasPixels = np.zeros((atlasHeight, const.ICON_ATLAS_WIDTH, 4), dtype = np.uint8)
+
+    for iconName, x, y, iconWidth, iconHeight in atlasIndex[['Icon', 'X', 'Y', 'Width', 'Height']].itertuples(index = False):
+        atlasPixels[y:(y + iconHeight), x:(x + iconWidth)] = icons[iconName]
+
+
+    ###
+    # Save the atlas files
+    with open('{}{}'.format(atlasPaths['Array'], const.PARTIAL_FILE_SUFFIX), 'wb') as arrayFile:
+        np.save(arrayFile, atlasPixels)
+
+    Image.fromarray(atlasPixels, mode = 'RGBA').save('{}{}'.format(atlasPaths['Image'], const.PARTIAL_FILE_SUFFIX),
+        format = 'PNG')
+    atlasIndex.to_csv('{}{}'.format(atlasPaths['Index'], const.PARTIAL_FILE_SUFFIX), index = False)
+
+    with open('{}{}'.format(atlasPaths['Signature'], const.PARTIAL_FILE_SUFFIX), 'w') as signatureFile:
+        json.dump({'Signature': iconSignature, 'Shape': list(atlasPixels.shape), 'NIcons': len(icons)}, signatureFile)
+
+    for atlasFile in ('Array', 'Image', 'Index', 'Signature'):
+        os.replace('{}{}'.format(atlasPaths[atlasFile], const.PARTIAL_FILE_SUFFIX), atlasPaths[atlasFile])
+
+    logger.info('Icon atlas with %i icons (%i x %i pixels) saved to %s', len(icons), const.ICON_ATLAS_WIDTH,
+        atlasHeight, const.FOLDER_ICON_ATLAS)
+
+    return(atlasIndex)
+
+
+##
+# Rebuild the atlas if the icons changed
+def updateIconAtlas() -> bool:
+    '''
+    Rebuild the atlas if it does not exist or if the icons changed since it was built. Returns whether
+    it was rebuilt
+    '''
+
+    atlasPaths = getIconAtlasPaths()
+    iconSignature = computeIconSignature()
+
+    if all(os.path.isfile(atlasPath) for atlasPath in atlasPaths.values()):
+        with open(atlasPaths['Signature'], 'r') as signatureFile:
+            if json.load(signatureFile)['Signature'] == iconSignature:
+                logger.info('Icon atlas is up to date')
+                return(False)
+
+    buildIconAtlas(iconSignature = iconSignature)
+
+    return(True)
+
+
+##
+# Load the atlas
+def loadIconAtlas(memoryMapped: bool = True) -> Tuple[np.ndarray, pd.DataFrame]:
+    '''
+    Load the atlas array (memory mapped, read only, if set) and the index with the icon names as index
+    '''
+
+    atlasPaths = getIconAtlasPaths()
+
+    return(np.load(atlasPaths['Array'], mmap_mode = 'r' if memoryMapped else None),
+        pd.read_csv(atlasPaths['Index'], dtype = {'Icon': str}).set_index('Icon'))
+
+
+##
+# Single icon
+def getIcon(atlasPixels: np.ndarray, atlasIndex: pd.DataFrame, iconName: str) -> np.ndarray:
+    '''
+    Return the pixels of an icon (view into the atlas, height x width x RGBA)
+    '''
+
+    x, y, iconWidth, iconHeight = atlasIndex.loc[iconName, ['X', 'Y', 'Width', 'Height']]
+
+    return(atlasPixels[y:(y + iconHeight), x:(x + iconWidth)])
+
+
+##
+# All icons
+def getIcons(atlasPixels: np.ndarray, atlasIndex: pd.DataFrame) -> Dict[str, np.ndarray]:
+    '''
+    Return the pixels of all icons of the index (icon name -> view into the atlas)
+    '''
+
+    return({iconName: atlasPixels[y:(y + iconHeight), x:(x + iconWidth)] for iconName, x, y, iconWidth, iconHeight in
+        atlasIndex[['X', 'Y', 'Width', 'Height']].itertuples(index = True)})
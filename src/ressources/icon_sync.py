@@ -0,0 +1,174 @@
+'''
+
+Synchronisation of the champion and item icons. Only missing or changed icons (different url, e.g.
+a new data dragon version) are downloaded, in parallel over a shared session. The downloaded bytes
+are written as they are, without decoding and re-encoding them.
+
+'''
+
+
+###
+# Imports
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import json
+import logging
+import os
+from typing import Dict, Tuple, Union
+
+import requests
+from tqdm import tqdm
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+except Exception:
+    import ressources.constants as const
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Functions
+
+##
+# Load the icon manifest
+def loadIconManifest() -> Dict:
+    '''
+    Load the manifest of the downloaded icons (file name -> url and size)
+    '''
+
+    manifestPath = '{}{}'.format(const.FOLDER_DATA, const.ICON_MANIFEST)
+
+    if not os.path.isfile(manifestPath):
+        return(dict())
+
+    with open(manifestPath, 'r') as manifestFile:
+        return(json.load(manifestFile))
+
+
+##
+# Save the icon manifest
+def saveIconManifest(iconManifest: Dict) -> None:
+    '''
+    Save the manifest of the downloaded icons (temporary file which then replaces the old file)
+    '''
+
+    manifestPath = '{}{}'.format(const.FOLDER_DATA, const.ICON_MANIFEST)
+
+    with open('{}{}'.format(manifestPath, const.PARTIAL_FILE_SUFFIX), 'w') as manifestFile:
+        json.dump(iconManifest, manifestFile, indent = 1, sort_keys = True)
+
+    os.replace('{}{}'.format(manifestPath, const.PARTIAL_FILE_SUFFIX), manifestPath)
+
+
+    ###
+    # End of function
+    return
+
+
+##
+# Check whether an icon is up to date
+def isIconUpToDate(iconFile: str, iconUrl: str, iconManifest: Dict) -> bool:
+    '''
+    An icon is up to date if it exists with the size recorded in the manifest and was downloaded from the same url
+    '''
+
+    iconPath = '{}{}'.format(const.FOLDER_ICONS, iconFile)
+    manifestEntry = iconManifest.get(iconFile, None)
+
+    return(manifestEntry is not None and manifestEntry['Url'] == iconUrl and os.path.isfile(iconPath)
+        and os.path.getsize(iconPath) == manifestEntry['Size'])
+
+
+##
+# Download a single icon
+def downloadIcon(session: requests.Session, iconFile: str, iconUrl: str) -> Tuple[str, Union[int, None]]:
+    '''
+    Download an icon and write the received bytes to the icon folder. Returns the file name and the size,
+    the size is None if the download failed
+    '''
+
+    try:
+        iconResponse = session.get(iconUrl, timeout = const.METADATA_REQUEST_TIMEOUT)
+
+        if iconResponse.status_code != 200:
+            logger.warning('Could not download icon %s, status code %i', iconUrl, iconResponse.status_code)
+            return(iconFile, None)
+
+        # Write to a temporary file outside of the icon folder first, so the folder never contains partial icons
+        partialPath = '{}{}{}'.format(const.FOLDER_DATA, iconFile, const.PARTIAL_FILE_SUFFIX)
+        with open(partialPath, 'wb') as iconFileHandle:
+            iconFileHandle.write(iconResponse.content)
+
+        os.replace(partialPath, '{}{}'.format(const.FOLDER_ICONS, iconFile))
+
+        return(iconFile, len(iconResponse.content))
+
+    except Exception as err:
+        logger.warning('Unexpected error while downloading icon %s: %s', iconUrl, str(err))
+        return(iconFile, None)
+
+
+##
+# Synchronise the icons
+def syncIcons(iconUrls: Dict, proxies: Union[Dict, None], maxWorkers: int = const.ICON_SYNC_WORKERS) -> Dict:
+    '''
+    Download all icons (file name -> url) which are missing or changed, using a bounded thread pool
+    over a shared session. Returns the number of fetched, skipped and failed icons
+    '''
+
+    logger.debug('Synchronise %i icons', len(iconUrls))
+
+    os.makedirs(const.FOLDER_ICONS, exist_ok = True)
+
+
+    ###
+    # Select the icons which have to be downloaded
+    iconManifest = loadIconManifest()
+
+    iconsToFetch = {iconFile: iconUrl for iconFile, iconUrl in iconUrls.items()
+        if not isIconUpToDate(iconFile = iconFile, iconUrl = iconUrl, iconManifest = iconManifest)}
+
+    iconSyncCounts = {'Fetched': 0, 'Skipped': len(iconUrls) - len(iconsToFetch), 'Failed': 0}
+
+
+    ###
+    # Download the icons in parallel. The connection pool is as large as the thread pool so
+    # that every thread can reuse its connection
+    if iconsToFetch:
+        with requests.Session() as session:
+            session.verify = False  # Set verify to False to disable SSL verification
+            if proxies is not None:
+                session.proxies.update(proxies)
+
+            connectionAdapter = requests.adapters.HTTPAdapter(pool_connections = maxWorkers, pool_maxsize = maxWorkers)
+            session.mount('http://', connectionAdapter)
+            session.mount('https://', connectionAdapter)
+
+            with ThreadPoolExecutor(max_workers = maxWorkers) as executor:
+                iconDownloads = [executor.submit(downloadIcon, session, iconFile, iconUrl)
+                    for iconFile, iconUrl in iconsToFetch.items()]
+
+                for iconDownload in tqdm(as_completed(iconDownloads), total = len(iconDownloads)):
+                    iconFile, iconSize = iconDownload.result()
+
+                    if iconSize is None:
+                        iconSyncCounts['Failed'] += 1
+                    else:
+                        iconSyncCounts['Fetched'] += 1
+                        iconManifest[iconFile] = {'Url': iconsToFetch[iconFile], 'Size': iconSize}
+
+        saveIconManifest(iconManifest = iconManifest)
+
+
+    ###
+    # Report and return the counts
+    logger.info('Icons fetched: %i, skipped: %i, failed: %i', iconSyncCounts['Fetched'],
+        iconSyncCounts['Skipped'], iconSyncCounts['Failed'])
+
+    return(iconSyncCounts)
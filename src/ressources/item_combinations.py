@@ -0,0 +1,170 @@
+'''
+
+Counting of unordered item combinations (the first 5 legendary/mythic items of a participant, without
+considering the order in which they were bought).
+
+The items are mapped to their index in the sorted universe of legendary and mythic items (starting at 1,
+0 marks an empty slot for participants with less than 5 items). The indices of a participant are sorted
+and packed into one integer (const.ITEM_COMBINATION_BITS bits per item), so identical builds have the same
+key and can be counted with hashing on integer columns.
+
+'''
+
+
+###
+# Imports
+import logging
+from typing import Dict, Iterable, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+    import src.ressources.data_processing as dataProcessing
+except Exception:
+    import ressources.constants as const
+    import ressources.data_processing as dataProcessing
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Functions
+
+##
+# Item universe
+def createItemUniverse(legendaryItemsIds: Dict, mythicItemsIds: Dict) -> np.ndarray:
+    '''
+    Return the sorted ids of all legendary and mythic items
+    '''
+
+    itemUniverse = np.array(sorted({*legendaryItemsIds.keys(), *mythicItemsIds.keys()}), dtype = np.int64)
+
+    if len(itemUniverse) >= 2**const.ITEM_COMBINATION_BITS:
+        raise AssertionError('Too many items ({}) to encode them with {} bits'.format(len(itemUniverse),
+            const.ITEM_COMBINATION_BITS))
+
+    return(itemUniverse)
+
+
+##
+# Encode the combinations
+def encodeItemCombinations(legendaryAndMythicItems: pd.DataFrame, itemUniverse: np.ndarray) -> pd.DataFrame:
+    '''
+    Encode the items of every participant as one integer.
+    Returns one row per participant with the queue, the champion, the number of items and the combination
+    '''
+
+    ###
+    # Participant and slot of every row
+    participantStart, slotIndices = dataProcessing.getParticipantSlots(legendaryAndMythicItems = legendaryAndMythicItems)
+    participantIndices = np.cumsum(participantStart) - 1
+    championIds = legendaryAndMythicItems['Champion'].to_numpy()
+
+
+    ###
+    # Item indices per participant, sorted and packed
+    itemIndices = np.searchsorted(itemUniverse, legendaryAndMythicItems['Item'].to_numpy(dtype = np.int64)) + 1
+
+    participantItems = np.zeros((participantStart.sum(), const.ITEM_COMBINATION_SIZE), dtype = np.int64)
+    participantItems[participantIndices, slotIndices] = itemIndices
+    participantItems.sort(axis = 1)
+
+    combinations = np.zeros(len(participantItems), dtype = np.int64)
+    for slotIndex in range(const.ITEM_COMBINATION_SIZE):
+        combinations |= participantItems[:, slotIndex] << (const.ITEM_COMBINATION_BITS * slotIndex)
+
+    return(pd.DataFrame({'Queue': legendaryAndMythicItems['Queue'].to_numpy(dtype = np.int64)[participantStart],
+        'Champion': championIds[participantStart].astype(np.int64), 'NItems': (participantItems > 0).sum(axis = 1),
+        'Combination': combinations}))
+
+
+##
+# Decode a combination
+def decodeItemCombination(combination: int, itemUniverse: np.ndarray) -> Tuple[int, ...]:
+    '''
+    Return the sorted item ids of an encoded combination
+    '''
+
+    itemIndices = [(int(combination) >> (const.ITEM_COMBINATION_BITS * slotIndex)) & (2**const.ITEM_COMBINATION_BITS - 1)
+        for slotIndex in range(const.ITEM_COMBINATION_SIZE)]
+
+    return(tuple(int(itemUniverse[itemIndex - 1]) for itemIndex in itemIndices if itemIndex > 0))
+
+
+##
+# Count the combinations
+def countItemCombinations(encodedCombinations: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Count the identical combinations per queue and champion. Also used to merge counts (column N)
+    of several chunks
+    '''
+
+    if 'N' not in encodedCombinations.columns:
+        encodedCombinations = encodedCombinations.assign(N = 1)
+
+    return(encodedCombinations.groupby(['Queue', 'Champion', 'NItems', 'Combination'], sort = False)['N'].sum(
+        ).reset_index())
+
+
+##
+# Count the combinations of chunks of extracted data
+def countItemCombinationsOfChunks(dataChunks: Iterable[pd.DataFrame], itemUniverse: np.ndarray) -> pd.DataFrame:
+    '''
+    Count the combinations over chunks of the extracted legendary/mythic items
+    '''
+
+    combinationCounts = [countItemCombinations(encodedCombinations = encodeItemCombinations(
+        legendaryAndMythicItems = dataChunk, itemUniverse = itemUniverse))
+        for dataChunk in dataProcessing.iterateParticipantChunks(dataChunks = dataChunks)]
+
+    if not combinationCounts:
+        return(pd.DataFrame(columns = ['Queue', 'Champion', 'NItems', 'Combination', 'N'], dtype = np.int64))
+
+    return(countItemCombinations(encodedCombinations = pd.concat(combinationCounts, ignore_index = True)))
+
+
+##
+# Top builds
+def getTopBuilds(combinationCounts: pd.DataFrame, itemUniverse: np.ndarray, championId: int,
+        queueIds: Union[List[int], None] = None, nBuilds: int = 10, nItems: int = const.ITEM_COMBINATION_SIZE) -> pd.DataFrame:
+    '''
+    Return the most frequent builds (with nItems items) of a champion over the given queues (all queues
+    if None), with their share of all builds of the champion with nItems items
+    '''
+
+    championCombinations = combinationCounts.loc[(combinationCounts['Champion'] == championId)
+        & (combinationCounts['NItems'] == nItems)]
+    if queueIds is not None:
+        championCombinations = championCombinations.loc[championCombinations['Queue'].isin(queueIds)]
+
+    topBuilds = championCombinations.groupby('Combination')['N'].sum().sort_values(ascending = False)
+
+    return(pd.DataFrame({'Items': [decodeItemCombination(combination = combination, itemUniverse = itemUniverse)
+        for combination in topBuilds.index[:nBuilds]], 'N': topBuilds.to_numpy()[:nBuilds],
+        'Share': topBuilds.to_numpy()[:nBuilds] / max(topBuilds.sum(), 1)}))
+
+
+##
+# Share of the modal build
+def getModalBuildShares(combinationCounts: pd.DataFrame, nItems: int = const.ITEM_COMBINATION_SIZE) -> pd.DataFrame:
+    '''
+    Return per queue and champion the number of participants with nItems items, the number of distinct
+    builds and the share of the participants on the most frequent build
+    '''
+
+    groupedCombinations = combinationCounts.loc[combinationCounts['NItems'] == nItems].groupby(
+        ['Queue', 'Champion'])['N']
+
+    modalBuildShares = pd.DataFrame({'N': groupedCombinations.sum(), 'NBuilds': groupedCombinations.size(),
+        'ModalN': groupedCombinations.max()}).reset_index()
+    modalBuildShares['ModalShare'] = modalBuildShares['ModalN'] / modalBuildShares['N']
+
+    return(modalBuildShares)
@@ -0,0 +1,345 @@
+'''
+
+Local match store without a server process (see ressources/match_store.py for the interface), one folder
+per region:
+- matches: sharded by the match id (const.LOCAL_MATCH_STORE_SHARDS), every shard is a sequence of append-only
+  segment files. Every match is one compressed json document (zstd if the package zstandard is installed,
+  zlib otherwise), a new segment is started once a segment reaches const.LOCAL_MATCH_STORE_SEGMENT_SIZE
+- index: one append-only file per shard with a fixed-size binary record per match (id, creation time, queue,
+  patch, compression, segment, offset and length), so the windowed selection of the matches only reads the
+  index and a scan reads the segments sequentially
+- summoners and processed summoners: append-only json lines, the last entry of a summoner is valid
+
+A match is only visible once its index record is written, which happens after the document is written to its
+segment. Incomplete records at the end of an index file (interrupted write) are removed when the shard is
+opened for writing. Only one process should write to the store of a region (the crawler), any number can read.
+
+'''
+
+
+###
+# Imports
+import json
+import logging
+import os
+import struct
+from typing import Dict, Iterator, List, Set, Tuple, Union
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+    import src.ressources.api_data_transformations as apiDataTransformations
+    import src.ressources.match_store as matchStore
+except Exception:
+    import ressources.constants as const
+    import ressources.api_data_transformations as apiDataTransformations
+    import ressources.match_store as matchStore
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Index record of one match: match id, creation time, queue id, patch (major, minor), compression, segment,
+# offset and length of the compressed document in the segment
+INDEX_RECORD = struct.Struct('<qqiHHBIQI')
+
+COMPRESSION_ZLIB = 0
+COMPRESSION_ZSTD = 1
+
+
+###
+# Functions
+
+##
+# Patch as numbers
+def getPatchNumbers(patch: str) -> Tuple[int, int]:
+    '''
+    Return the major and minor version of a patch (e.g. 11.10), 0 for parts which are not numbers
+    '''
+
+    patchParts = (patch.split('.') + ['0', '0'])[:2]
+
+    return(tuple(int(patchPart) if patchPart.isdigit() else 0 for patchPart in patchParts))
+
+
+##
+# Read json lines
+def readJsonLines(path: str) -> Iterator[Dict]:
+    '''
+    Iterate over the entries of a json lines file (an incomplete last line of an interrupted write is skipped)
+    '''
+
+    if not os.path.isfile(path):
+        return
+
+    with open(path, 'r') as jsonLinesFile:
+        for jsonLine in jsonLinesFile:
+            try:
+                yield(json.loads(jsonLine))
+            except ValueError:
+                logger.warning('Skip incomplete entry in %s', path)
+
+
+###
+# Local match store
+
+##
+# Match store in local files
+class LocalMatchStore(matchStore.MatchStore):
+    '''
+    Match store in append-only, compressed segment files with an index per shard (one folder per region)
+    '''
+
+    def __init__(self, folder: str = const.FOLDER_LOCAL_MATCH_STORE):
+        self.folder = folder
+
+        # Index per region (match id -> index record), loaded on first use and updated by saveMatch
+        self.indexes = dict()
+
+        # Open files for writing, per region and shard the segment number, segment file and index file
+        self.shardWriters = dict()
+        self.summonerFiles = dict()
+
+        if zstandard is not None:
+            self.compression = COMPRESSION_ZSTD
+            self.compressor = zstandard.ZstdCompressor(level = const.LOCAL_MATCH_STORE_ZSTD_LEVEL)
+        else:
+            self.compression = COMPRESSION_ZLIB
+            self.compressor = None
+
+
+    def getRegionFolder(self, region: str) -> str:
+        '''
+        Return the folder of a region
+        '''
+
+        return(self.folder.format(region = region))
+
+
+    def setupRegion(self, region: str) -> None:
+        os.makedirs(self.getRegionFolder(region = region), exist_ok = True)
+
+
+    ##
+    # Summoners
+    def appendSummonerEntry(self, region: str, summonerFile: str, summonerEntry: Dict) -> None:
+        '''
+        Append an entry to a summoner file of a region (kept open, flushed after every entry)
+        '''
+
+        if (region, summonerFile) not in self.summonerFiles:
+            self.setupRegion(region = region)
+            self.summonerFiles[(region, summonerFile)] = open('{}{}'.format(self.getRegionFolder(region = region),
+                summonerFile), 'a')
+
+        self.summonerFiles[(region, summonerFile)].write('{}\n'.format(json.dumps(summonerEntry)))
+        self.summonerFiles[(region, summonerFile)].flush()
+
+
+    def saveSummoner(self, region: str, summonerInformation: Dict, checkIfExists: bool = True) -> None:
+        # The last entry of a summoner is valid, so an existing summoner is always replaced
+        self.appendSummonerEntry(region = region, summonerFile = const.LOCAL_MATCH_STORE_SUMMONERS,
+            summonerEntry = dict(summonerInformation, _id = summonerInformation['SummonerAccountId']))
+
+
+    def getSummonerIds(self, region: str) -> Set:
+        return(set(summoner['_id'] for summoner in readJsonLines(path = '{}{}'.format(
+            self.getRegionFolder(region = region), const.LOCAL_MATCH_STORE_SUMMONERS))))
+
+
+    def saveProcessedSummoner(self, region: str, summonerAccountId: str, coveredIntervals: List) -> None:
+        self.appendSummonerEntry(region = region, summonerFile = const.LOCAL_MATCH_STORE_SUMMONERS_PROCESSED,
+            summonerEntry = {'_id': summonerAccountId, const.MONGODB_FIELD_COVERED_INTERVALS: coveredIntervals})
+
+
+    def getCoveredIntervals(self, region: str) -> Dict[str, List]:
+        return({summoner['_id']: summoner.get(const.MONGODB_FIELD_COVERED_INTERVALS, list()) for summoner
+            in readJsonLines(path = '{}{}'.format(self.getRegionFolder(region = region),
+                const.LOCAL_MATCH_STORE_SUMMONERS_PROCESSED))})
+
+
+    ##
+    # Index
+    def loadIndex(self, region: str) -> Dict[int, Tuple]:
+        '''
+        Load the index of a region (match id -> shard and index record, a later record of a match replaces
+        an earlier one), cached for the following calls
+        '''
+
+        if region in self.indexes:
+            return(self.indexes[region])
+
+        regionIndex = dict()
+        for shard in range(const.LOCAL_MATCH_STORE_SHARDS):
+            indexPath = '{}{}'.format(self.getRegionFolder(region = region), const.LOCAL_MATCH_STORE_INDEX.format(
+                shard = shard))
+
+            if not os.path.isfile(indexPath):
+                continue
+
+            with open(indexPath, 'rb') as indexFile:
+                indexData = indexFile.read()
+
+            for indexRecord in INDEX_RECORD.iter_unpack(indexData[:(len(indexData)
+                    - len(indexData) % INDEX_RECORD.size)]):
+                regionIndex[indexRecord[0]] = (shard, ) + indexRecord[1:]
+
+        self.indexes[region] = regionIndex
+
+        return(regionIndex)
+
+
+    ##
+    # Matches
+    def getShardWriter(self, region: str, shard: int) -> List:
+        '''
+        Open the last segment and the index of a shard for appending (incomplete index records are removed).
+        Returns the segment number, the segment file and the index file
+        '''
+
+        if (region, shard) in self.shardWriters:
+            return(self.shardWriters[(region, shard)])
+
+        self.setupRegion(region = region)
+        regionFolder = self.getRegionFolder(region = region)
+
+        indexPath = '{}{}'.format(regionFolder, const.LOCAL_MATCH_STORE_INDEX.format(shard = shard))
+        if os.path.isfile(indexPath) and (incompleteBytes := os.path.getsize(indexPath) % INDEX_RECORD.size):
+            logger.warning('Remove incomplete index record of shard %i of region %s', shard, region)
+            os.truncate(indexPath, os.path.getsize(indexPath) - incompleteBytes)
+
+        # Last segment of the shard (file names const.LOCAL_MATCH_STORE_SEGMENT with the segment number at the end)
+        segmentPrefix = const.LOCAL_MATCH_STORE_SEGMENT.split('{segment')[0].format(shard = shard)
+        segment = max([int(os.path.splitext(segmentFile)[0][len(segmentPrefix):]) for segmentFile
+            in os.listdir(regionFolder) if segmentFile.startswith(segmentPrefix)] or [0])
+
+        self.shardWriters[(region, shard)] = [segment, open('{}{}'.format(regionFolder,
+            const.LOCAL_MATCH_STORE_SEGMENT.format(shard = shard, segment = segment)), 'ab'), open(indexPath, 'ab')]
+
+        return(self.shardWriters[(region, shard)])
+
+
+    def saveMatch(self, region: str, matchId: int, matchInformation: Dict, matchTimeline: Dict) -> None:
+        logger.debug('Save match data for match id %i, region %s', matchId, region)
+
+
+        ###
+        # Combine and compress the document (same fields as in the MongoDB store)
+        matchDocument = dict(matchInformation, timeline = matchTimeline, _id = matchId)
+        matchDocument[const.MONGODB_FIELD_PATCH] = apiDataTransformations.getPatch(matchInformation['gameVersion'])
+
+        documentBytes = json.dumps(matchDocument, separators = (',', ':')).encode('utf-8')
+        if self.compression == COMPRESSION_ZSTD:
+            documentBytes = self.compressor.compress(documentBytes)
+        else:
+            documentBytes = zlib.compress(documentBytes, const.LOCAL_MATCH_STORE_ZLIB_LEVEL)
+
+
+        ###
+        # Append the document to the segment of its shard (a new segment is started if it is full), then the
+        # index record
+        shard = matchId % const.LOCAL_MATCH_STORE_SHARDS
+        shardWriter = self.getShardWriter(region = region, shard = shard)
+
+        if 0 < shardWriter[1].tell() and (shardWriter[1].tell() + len(documentBytes)
+                > const.LOCAL_MATCH_STORE_SEGMENT_SIZE):
+            shardWriter[1].close()
+            shardWriter[0] += 1
+            shardWriter[1] = open('{}{}'.format(self.getRegionFolder(region = region),
+                const.LOCAL_MATCH_STORE_SEGMENT.format(shard = shard, segment = shardWriter[0])), 'ab')
+
+        offset = shardWriter[1].tell()
+        shardWriter[1].write(documentBytes)
+        shardWriter[1].flush()
+
+        indexRecord = (matchId, matchDocument['gameCreation'], matchDocument['queueId']) + getPatchNumbers(
+            patch = matchDocument[const.MONGODB_FIELD_PATCH]) + (self.compression, shardWriter[0], offset,
+            len(documentBytes))
+
+        shardWriter[2].write(INDEX_RECORD.pack(*indexRecord))
+        shardWriter[2].flush()
+
+        if region in self.indexes:
+            self.indexes[region][matchId] = (shard, ) + indexRecord[1:]
+
+
+    def getMatchIds(self, region: str) -> Set:
+        return(set(self.loadIndex(region = region)))
+
+
+    def getMatchIdsInWindow(self, region: str, dateFrom: str = const.EARLIEST_DATE_FOR_GAMES,
+            dateTo: str = const.LATEST_DATE_FOR_GAMES, patches: Union[List[str], None] = None) -> Set:
+        startTimewindow, endTimewindow = apiDataTransformations.getTimeWindow(dateFrom = dateFrom, dateTo = dateTo)
+        patchNumbers = None if patches is None else set(getPatchNumbers(patch = patch) for patch in patches)
+
+        return(set(matchId for matchId, (_, gameCreation, _, patchMajor, patchMinor, *_) in self.loadIndex(
+            region = region).items() if startTimewindow <= gameCreation < endTimewindow
+            and (patchNumbers is None or (patchMajor, patchMinor) in patchNumbers)))
+
+
+    def iterateMatches(self, region: str, matchIds: Union[Set, None] = None) -> Iterator[Dict]:
+        regionIndex = self.loadIndex(region = region)
+
+        # Read in the order of the files (sequential reads per segment)
+        matchLocations = sorted((shard, segment, offset, length, compression) for matchId, (shard, _, _, _, _,
+            compression, segment, offset, length) in regionIndex.items() if matchIds is None or matchId in matchIds)
+
+        if any(compression == COMPRESSION_ZSTD for *_, compression in matchLocations) and zstandard is None:
+            raise AssertionError('The match store of region {} is compressed with zstd, the package zstandard is '
+                'needed to read it'.format(region))
+
+        return(self.readMatches(region = region, matchLocations = matchLocations))
+
+
+    def readMatches(self, region: str, matchLocations: List[Tuple]) -> Iterator[Dict]:
+        '''
+        Read and decompress the documents at the sorted locations (shard, segment, offset, length, compression)
+        '''
+
+        decompressor = zstandard.ZstdDecompressor() if zstandard is not None else None
+
+        segmentFile = None
+        openSegment = None
+
+        try:
+            for shard, segment, offset, length, compression in matchLocations:
+                if (shard, segment) != openSegment:
+                    if segmentFile is not None:
+                        segmentFile.close()
+
+                    segmentFile = open('{}{}'.format(self.getRegionFolder(region = region),
+                        const.LOCAL_MATCH_STORE_SEGMENT.format(shard = shard, segment = segment)), 'rb')
+                    openSegment = (shard, segment)
+
+                segmentFile.seek(offset)
+                documentBytes = segmentFile.read(length)
+
+                yield(json.loads(decompressor.decompress(documentBytes) if compression == COMPRESSION_ZSTD
+                    else zlib.decompress(documentBytes)))
+
+        finally:
+            if segmentFile is not None:
+                segmentFile.close()
+
+
+    def close(self) -> None:
+        for _, segmentFile, indexFile in self.shardWriters.values():
+            segmentFile.close()
+            indexFile.close()
+
+        for summonerFile in self.summonerFiles.values():
+            summonerFile.close()
+
+        self.shardWriters = dict()
+        self.summonerFiles = dict()
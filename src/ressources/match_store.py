@@ -0,0 +1,237 @@
+'''
+
+Storage of the summoners and matches used by the crawler (get_data_from_api.py) and the extraction
+(extract_item_data.py, export_event_store.py), with two backends behind the same interface (MatchStore):
+- MongoMatchStore: the MongoDB database (see ressources/mongodb.py and ressources/storage_layout.py)
+- LocalMatchStore: append-only, compressed segment files with an id index per region, without a server
+  process (see ressources/local_match_store.py)
+
+The backend is chosen with openMatchStore (const.MATCH_STORE_MONGODB or const.MATCH_STORE_LOCAL). Every
+process opens its own store.
+
+'''
+
+
+###
+# Imports
+from abc import ABC, abstractmethod
+import logging
+import random
+from typing import Dict, Iterator, List, Set, Tuple, Union
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+    import src.ressources.mongodb as mongodb
+    import src.ressources.storage_layout as storageLayout
+except Exception:
+    import ressources.constants as const
+    import ressources.mongodb as mongodb
+    import ressources.storage_layout as storageLayout
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Interface
+
+##
+# Match store
+class MatchStore(ABC):
+    '''
+    Interface of the match stores. The summoners are dicts with the keys SummonerId, SummonerAccountId and
+    TimeCreated, the matches the match information with the timeline in the field 'timeline', the match id
+    in '_id' and the patch in const.MONGODB_FIELD_PATCH
+    '''
+
+    @abstractmethod
+    def setupRegion(self, region: str) -> None:
+        '''
+        Prepare the storage of a region (e.g. collections and indexes), nothing is done if it exists
+        '''
+
+
+    @abstractmethod
+    def saveSummoner(self, region: str, summonerInformation: Dict, checkIfExists: bool = True) -> None:
+        '''
+        Save a summoner (replaces the summoner if it exists and checkIfExists is set)
+        '''
+
+
+    @abstractmethod
+    def getSummonerIds(self, region: str) -> Set:
+        '''
+        Return the account ids of all saved summoners
+        '''
+
+
+    @abstractmethod
+    def saveProcessedSummoner(self, region: str, summonerAccountId: str, coveredIntervals: List) -> None:
+        '''
+        Save the time intervals covered by the retrieved match histories of a summoner (replaces the old intervals)
+        '''
+
+
+    @abstractmethod
+    def getCoveredIntervals(self, region: str) -> Dict[str, List]:
+        '''
+        Return the covered time intervals per processed summoner
+        '''
+
+
+    @abstractmethod
+    def saveMatch(self, region: str, matchId: int, matchInformation: Dict, matchTimeline: Dict) -> None:
+        '''
+        Save the match information together with its timeline
+        '''
+
+
+    @abstractmethod
+    def getMatchIds(self, region: str) -> Set:
+        '''
+        Return the ids of all saved matches
+        '''
+
+
+    @abstractmethod
+    def getMatchIdsInWindow(self, region: str, dateFrom: str = const.EARLIEST_DATE_FOR_GAMES,
+            dateTo: str = const.LATEST_DATE_FOR_GAMES, patches: Union[List[str], None] = None) -> Set:
+        '''
+        Return the ids of the matches created in the time window (dates in time format TIME_FORMAT, both
+        included), optionally only of the given patches
+        '''
+
+
+    def sampleMatchIdsInWindow(self, region: str, sampleSize: Union[int, float],
+            dateFrom: str = const.EARLIEST_DATE_FOR_GAMES, dateTo: str = const.LATEST_DATE_FOR_GAMES,
+            patches: Union[List[str], None] = None) -> Tuple[Set, int]:
+        '''
+        Draw a uniform random sample (without replacement) of the ids of the matches in the time window (number
+        of matches, or share if below 1). Returns the sampled ids and the number of matches in the window
+        '''
+
+        matchIdsInWindow = sorted(self.getMatchIdsInWindow(region = region, dateFrom = dateFrom, dateTo = dateTo,
+            patches = patches))
+
+        nSampled = min(round(sampleSize * len(matchIdsInWindow)) if sampleSize < 1 else int(sampleSize),
+            len(matchIdsInWindow))
+
+        return(set(random.sample(matchIdsInWindow, nSampled)), len(matchIdsInWindow))
+
+
+    @abstractmethod
+    def iterateMatches(self, region: str, matchIds: Union[Set, None] = None) -> Iterator[Dict]:
+        '''
+        Iterate over the saved matches (all or the given ones), with at least the fields used by the
+        extraction (_id, queueId, timeline, participants, gameDuration and gameCreation)
+        '''
+
+
+    @abstractmethod
+    def close(self) -> None:
+        '''
+        Close the store (files or connection)
+        '''
+
+
+###
+# MongoDB backend
+
+##
+# Match store in the MongoDB database
+class MongoMatchStore(MatchStore):
+    '''
+    Match store in the MongoDB database (the functions of ressources/mongodb.py)
+    '''
+
+    def __init__(self, databaseName: str = const.MONGODB_DATABASE):
+        self.mongoDbClient, self.mongoDbDatabase = mongodb.setupClientAndDatabase(databaseName = databaseName)
+
+
+    def setupRegion(self, region: str) -> None:
+        storageLayout.setupCollections(mongoDbDatabase = self.mongoDbDatabase, region = region)
+
+
+    def saveSummoner(self, region: str, summonerInformation: Dict, checkIfExists: bool = True) -> None:
+        mongodb.saveSummoner(mongoDbDatabase = self.mongoDbDatabase, region = region,
+            summonerInformation = summonerInformation, checkIfExists = checkIfExists)
+
+
+    def getSummonerIds(self, region: str) -> Set:
+        return(mongodb.getIdsOfCollection(mongoDbDatabase = self.mongoDbDatabase,
+            dbCollection = const.MONGODB_DOCUMENTS_SUMMONER_IDS, region = region))
+
+
+    def saveProcessedSummoner(self, region: str, summonerAccountId: str, coveredIntervals: List) -> None:
+        mongodb.saveProcessedSummoner(mongoDbDatabase = self.mongoDbDatabase, region = region,
+            summonerAccountId = summonerAccountId, coveredIntervals = coveredIntervals)
+
+
+    def getCoveredIntervals(self, region: str) -> Dict[str, List]:
+        return(mongodb.getCoveredIntervals(mongoDbDatabase = self.mongoDbDatabase, region = region))
+
+
+    def saveMatch(self, region: str, matchId: int, matchInformation: Dict, matchTimeline: Dict) -> None:
+        mongodb.saveRetrievedMatchData(mongoDbDatabase = self.mongoDbDatabase, region = region,
+            matchId = matchId, matchInformation = matchInformation, matchTimeline = matchTimeline)
+
+
+    def getMatchIds(self, region: str) -> Set:
+        return(mongodb.getIdsOfCollection(mongoDbDatabase = self.mongoDbDatabase,
+            dbCollection = const.MONGODB_DOCUMENTS_GAME_INFORMATION, region = region))
+
+
+    def getMatchIdsInWindow(self, region: str, dateFrom: str = const.EARLIEST_DATE_FOR_GAMES,
+            dateTo: str = const.LATEST_DATE_FOR_GAMES, patches: Union[List[str], None] = None) -> Set:
+        return(mongodb.getMatchIdsInWindow(mongoDbDatabase = self.mongoDbDatabase, region = region,
+            dateFrom = dateFrom, dateTo = dateTo, patches = patches))
+
+
+    def sampleMatchIdsInWindow(self, region: str, sampleSize: Union[int, float],
+            dateFrom: str = const.EARLIEST_DATE_FOR_GAMES, dateTo: str = const.LATEST_DATE_FOR_GAMES,
+            patches: Union[List[str], None] = None) -> Tuple[Set, int]:
+        # Sampled on the server
+        return(mongodb.sampleMatchIdsInWindow(mongoDbDatabase = self.mongoDbDatabase, region = region,
+            sampleSize = sampleSize, dateFrom = dateFrom, dateTo = dateTo, patches = patches))
+
+
+    def iterateMatches(self, region: str, matchIds: Union[Set, None] = None) -> Iterator[Dict]:
+        return(mongodb.getTimelineDataGenerator(mongoDbDatabase = self.mongoDbDatabase, region = region,
+            matchIds = matchIds))
+
+
+    def close(self) -> None:
+        self.mongoDbClient.close()
+
+
+###
+# Functions
+
+##
+# Open a match store
+def openMatchStore(backend: str = const.MATCH_STORE_BACKEND, **storeArguments) -> MatchStore:
+    '''
+    Open the match store of the backend (const.MATCH_STORE_MONGODB or const.MATCH_STORE_LOCAL), the arguments
+    are passed to the store (e.g. databaseName of the MongoDB store, folder of the local store). The local
+    store is imported when needed
+    '''
+
+    logger.info('Open match store %s', backend)
+
+    if backend == const.MATCH_STORE_MONGODB:
+        return(MongoMatchStore(**storeArguments))
+
+    if backend == const.MATCH_STORE_LOCAL:
+        try:
+            import src.ressources.local_match_store as localMatchStore
+        except Exception:
+            import ressources.local_match_store as localMatchStore
+
+        return(localMatchStore.LocalMatchStore(**storeArguments))
+
+    raise AssertionError('Unknown match store backend {}'.format(backend))
@@ -0,0 +1,221 @@
+'''
+
+Local cache for the item, champion and lol wiki data, one folder per data dragon version.
+
+The raw downloads are saved together with their http validators (ETag/Last-Modified) and a hash of
+their content. The information parsed from them is saved together with the content hashes of the
+sources it was parsed from, so it only has to be parsed again if one of the sources changed.
+Versioned data dragon resources never change and are therefore not revalidated, the other resources
+are revalidated with conditional requests once the cached version is older than
+const.METADATA_CACHE_MAX_AGE. Without network access, the cached versions are used.
+
+'''
+
+
+###
+# Imports
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Union
+
+import requests
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+except Exception:
+    import ressources.constants as const
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Functions
+
+##
+# Cache folder
+def getMetadataCacheFolder(version: str = const.DDRAGON_VERSION) -> str:
+    '''
+    Return the cache folder for a data dragon version, creating it if necessary
+    '''
+
+    cacheFolder = const.FOLDER_METADATA_CACHE.format(version = version)
+    os.makedirs(cacheFolder, exist_ok = True)
+
+    return(cacheFolder)
+
+
+##
+# Load a json file of the cache
+def loadCacheFile(cacheFile: str, version: str = const.DDRAGON_VERSION) -> Dict:
+    '''
+    Load a json file of the cache, returning an empty dictionary if it does not exist (yet)
+    '''
+
+    cachePath = '{}{}'.format(getMetadataCacheFolder(version = version), cacheFile)
+
+    if not os.path.isfile(cachePath):
+        return(dict())
+
+    with open(cachePath, 'r', encoding = 'utf-8') as cacheFileHandle:
+        return(json.load(cacheFileHandle))
+
+
+##
+# Save a json file of the cache
+def saveCacheFile(cacheFile: str, cacheContent: Dict, version: str = const.DDRAGON_VERSION) -> None:
+    '''
+    Save a json file of the cache (temporary file which then replaces the old file)
+    '''
+
+    cachePath = '{}{}'.format(getMetadataCacheFolder(version = version), cacheFile)
+
+    with open('{}{}'.format(cachePath, const.PARTIAL_FILE_SUFFIX), 'w', encoding = 'utf-8') as cacheFileHandle:
+        json.dump(cacheContent, cacheFileHandle)
+
+    os.replace('{}{}'.format(cachePath, const.PARTIAL_FILE_SUFFIX), cachePath)
+
+
+    ###
+    # End of function
+    return
+
+
+##
+# Get a resource through the cache
+def getCachedResource(url: str, proxies: Union[Dict, None], immutable: bool = False,
+        version: str = const.DDRAGON_VERSION) -> str:
+    '''
+    Return the content of a resource, downloading it only if it is not cached yet or if the cached version
+    is outdated (revalidated with a conditional request). If the download fails, the cached version is used.
+    '''
+
+    ###
+    # Use the cached version if it does not need to be revalidated
+    cacheIndex = loadCacheFile(cacheFile = const.METADATA_CACHE_INDEX, version = version)
+    cacheEntry = cacheIndex.get(url, None)
+
+    if cacheEntry is not None:
+        cachedResourcePath = '{}{}'.format(getMetadataCacheFolder(version = version), cacheEntry['File'])
+
+        if not os.path.isfile(cachedResourcePath):
+            cacheEntry = None
+
+        elif immutable or time.time() - cacheEntry['Checked'] < const.METADATA_CACHE_MAX_AGE:
+            logger.debug('Use cached version of %s', url)
+
+            with open(cachedResourcePath, 'r', encoding = 'utf-8') as cachedResourceFile:
+                return(cachedResourceFile.read())
+
+
+    ###
+    # Request the resource, conditional if a cached version exists
+    requestHeaders = dict()
+    if cacheEntry is not None:
+        if cacheEntry['ETag'] is not None:
+            requestHeaders['If-None-Match'] = cacheEntry['ETag']
+        if cacheEntry['LastModified'] is not None:
+            requestHeaders['If-Modified-Since'] = cacheEntry['LastModified']
+
+    try:
+        resourceResponse = requests.get(url, headers = requestHeaders, verify = False, proxies = proxies,
+            timeout = const.METADATA_REQUEST_TIMEOUT)   # Set verify to False to disable SSL verification
+        statusCode = resourceResponse.status_code
+
+    except Exception as err:
+        logger.warning('Request for %s failed: %s', url, str(err))
+        statusCode = None
+
+
+    ###
+    # Not modified or not available, use the cached version
+    if statusCode != 200:
+        if cacheEntry is None:
+            raise AssertionError('Resource {} could not be downloaded and is not cached'.format(url))
+
+        if statusCode == 304:
+            logger.debug('Cached version of %s is still valid', url)
+            cacheEntry['Checked'] = time.time()
+            saveCacheFile(cacheFile = const.METADATA_CACHE_INDEX, cacheContent = cacheIndex, version = version)
+        else:
+            logger.warning('Use possibly outdated cached version of %s', url)
+
+        with open(cachedResourcePath, 'r', encoding = 'utf-8') as cachedResourceFile:
+            return(cachedResourceFile.read())
+
+
+    ###
+    # Save the new version together with its validators
+    logger.debug('Save new version of %s to the cache', url)
+
+    cacheEntry = {'File': '{}.txt'.format(hashlib.sha1(url.encode('utf-8')).hexdigest()),
+        'ETag': resourceResponse.headers.get('ETag', None),
+        'LastModified': resourceResponse.headers.get('Last-Modified', None),
+        'ContentHash': hashlib.sha256(resourceResponse.content).hexdigest(),
+        'Checked': time.time()}
+
+    with open('{}{}'.format(getMetadataCacheFolder(version = version), cacheEntry['File']), 'w',
+            encoding = 'utf-8') as cachedResourceFile:
+        cachedResourceFile.write(resourceResponse.text)
+
+    cacheIndex[url] = cacheEntry
+    saveCacheFile(cacheFile = const.METADATA_CACHE_INDEX, cacheContent = cacheIndex, version = version)
+
+    return(resourceResponse.text)
+
+
+##
+# Content hashes of cached resources
+def getSourceHashes(urls: List[str], version: str = const.DDRAGON_VERSION) -> List[Union[str, None]]:
+    '''
+    Return the content hashes of cached resources (None for resources which are not cached)
+    '''
+
+    cacheIndex = loadCacheFile(cacheFile = const.METADATA_CACHE_INDEX, version = version)
+
+    return([cacheIndex[url]['ContentHash'] if url in cacheIndex else None for url in urls])
+
+
+##
+# Load parsed information
+def loadParsedMetadata(name: str, sourceUrls: List[str], version: str = const.DDRAGON_VERSION) -> Any:
+    '''
+    Return the parsed information saved under the given name if it was parsed from the current versions
+    of the source resources, otherwise None
+    '''
+
+    parsedMetadata = loadCacheFile(cacheFile = const.METADATA_CACHE_PARSED, version = version).get(name, None)
+
+    if parsedMetadata is None or parsedMetadata['SourceHashes'] != getSourceHashes(urls = sourceUrls,
+            version = version):
+        return(None)
+
+    logger.debug('Use cached %s', name)
+    return(parsedMetadata['Content'])
+
+
+##
+# Save parsed information
+def saveParsedMetadata(name: str, sourceUrls: List[str], content: Any, version: str = const.DDRAGON_VERSION) -> None:
+    '''
+    Save parsed information (json serialisable) together with the content hashes of its sources
+    '''
+
+    parsedMetadataCache = loadCacheFile(cacheFile = const.METADATA_CACHE_PARSED, version = version)
+    parsedMetadataCache[name] = {'SourceHashes': getSourceHashes(urls = sourceUrls, version = version),
+        'Content': content}
+
+    saveCacheFile(cacheFile = const.METADATA_CACHE_PARSED, cacheContent = parsedMetadataCache, version = version)
+
+
+    ###
+    # End of function
+    return
@@ -0,0 +1,222 @@
+'''
+
+Functions to request the item and champion metadata (data dragon and lol wiki, through the metadata
+cache) and to download the champion and item icons
+
+'''
+
+
+###
+# Imports
+import json
+import logging
+from typing import Dict, List, Union
+
+import pandas as pd
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+    import src.ressources.metadata_cache as metadataCache
+    import src.ressources.icon_sync as iconSync
+except Exception:
+    import ressources.constants as const
+    import ressources.metadata_cache as metadataCache
+    import ressources.icon_sync as iconSync
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Functions
+
+##
+# Get the item information json
+def getItemInformation(proxies: Union[Dict, None]) -> List[Dict]:
+    '''
+    Download the full item information from http://ddragon.leagueoflegends.com/cdn/11.10.1/data/en_US/item.json
+    then also only take the subset containing the mythic and legendary items.
+
+    The mythic and legendary items are not marked as such inside the json, this information is taken from
+    lolwiki (https://leagueoflegends.fandom.com/wiki/Mythic_item and )
+
+    All downloads go through the metadata cache, the item classification is only parsed again if one
+    of its sources changed
+    '''
+
+    logger.debug('Get the item informations')
+
+
+    ###
+    # Get the data from data dragon (versioned, never changes once cached)
+    itemRawData = json.loads(metadataCache.getCachedResource(url = const.DDRAGON_ITEMS, proxies = proxies,
+        immutable = True))
+
+
+    ###
+    # Get the legendary and mythic items
+    mythicItemsHtml = metadataCache.getCachedResource(url = const.LOL_WIKI_MYTHICS, proxies = proxies)
+    legendaryItemsHtml = metadataCache.getCachedResource(url = const.LOL_WIKI_LEGENDARIES, proxies = proxies)
+
+
+    ###
+    # Use the cached classification if none of the sources changed
+    itemClassificationSources = [const.DDRAGON_ITEMS, const.LOL_WIKI_MYTHICS, const.LOL_WIKI_LEGENDARIES]
+
+    if (itemClassification := metadataCache.loadParsedMetadata(name = 'ItemClassification',
+            sourceUrls = itemClassificationSources)) is not None:
+        legendaryItemsIds, mythicItemsIds, tearItemMappings = ({int(itemId): itemValue for itemId, itemValue
+            in itemClassification[itemMapping]} for itemMapping in ('Legendary', 'Mythic', 'Tear'))
+
+        return(itemRawData, legendaryItemsIds, mythicItemsIds, tearItemMappings)
+
+
+    ###
+    # Parse the legendary and mythic items (BeautifulSoup is only imported if the classification is not cached)
+    from bs4 import BeautifulSoup
+
+    ##
+    # Mythic items
+    mythicItemsHtml = BeautifulSoup(mythicItemsHtml, features = "html.parser")
+
+    # Extract all the entries from the table containing the mythic items.
+    # They are found in <span ...>...</span> blocks which have the attribute data-item
+    mythicItems = {itemDescription.text.strip().lower() for itemDescription
+        in mythicItemsHtml.find_all('span', {'data-item': True})}
+
+
+    ##
+    # Legendary items
+    legendaryItemsHtml = BeautifulSoup(legendaryItemsHtml, features = "html.parser")
+
+    # Extract all the entries from the table containing the mythic items.
+    # They are found in <span ...>...</span> blocks which have the attribute data-item
+    legendaryItems = {itemDescription.text.strip().lower() for itemDescription
+        in legendaryItemsHtml.find_all('span', {'data-item': True})}
+
+
+    ###
+    # Extract the relevant item ids as mappings from the raw item data
+    legendaryItemsIds = dict()
+    mythicItemsIds = dict()
+
+    for itemId, itemDescription in itemRawData['data'].items():
+        if itemDescription['name'].lower() in legendaryItems:
+            legendaryItemsIds[int(itemId)] = itemDescription['name']
+
+        elif itemDescription['name'].lower() in mythicItems:
+            mythicItemsIds[int(itemId)] = itemDescription['name']
+
+    # Ensure that all items were successfully mapped
+    if len(legendaryItems) != len(legendaryItemsIds):
+        raise AssertionError('Not all legendary items were successfully mapped')
+
+    if len(mythicItems) != len(mythicItemsIds):
+        raise AssertionError('Not all mythic items were successfully mapped')
+
+
+    ###
+    # Get the ids for the tear items because they evolve and therefore could theoretically confuse
+    # the evaluation. This will be solved by mapping the evolved version onto the base version
+    tearItemMappings = dict()
+    for evolvedItem, basicItem in const.ITEMS_MAPPING.items():
+        for itemId, itemName in legendaryItemsIds.items():
+            if itemName == evolvedItem:
+                evolvedItemId = itemId
+            elif itemName == basicItem:
+                basicItemId = itemId
+
+        tearItemMappings[evolvedItemId] = basicItemId
+
+
+    ###
+    # Save the classification to the cache
+    metadataCache.saveParsedMetadata(name = 'ItemClassification', sourceUrls = itemClassificationSources,
+        content = {itemMapping: sorted(itemIds.items()) for itemMapping, itemIds in
+            (('Legendary', legendaryItemsIds), ('Mythic', mythicItemsIds), ('Tear', tearItemMappings))})
+
+
+    ###
+    # Return the various informations
+    return(itemRawData, legendaryItemsIds, mythicItemsIds, tearItemMappings)
+
+
+##
+# Get champion data
+def getChampionInfoAndIcons(proxies: Union[Dict, None]) -> pd.DataFrame:
+    '''
+    Download the json with the champion information, save the relevant mapping and in addition
+    the champion icons. The mapping is also returned
+    '''
+
+    logger.debug('Get champion information and icons')
+
+    ###
+    # Get champion information (versioned, never changes once cached)
+    championRawInformation = metadataCache.getCachedResource(url = const.DDRAGON_CHAMPIONS, proxies = proxies,
+        immutable = True)
+
+
+    ##
+    # Extract the name <-> id mapping, unless it is already cached
+    if (championTable := metadataCache.loadParsedMetadata(name = 'ChampionInformation',
+            sourceUrls = [const.DDRAGON_CHAMPIONS])) is not None:
+        championInformation = pd.DataFrame(championTable)
+
+    else:
+        championRawInformation = json.loads(championRawInformation)
+
+        championsIds = list()
+        championsIdName = list()
+        championsNames = list()
+
+        for championEntry in championRawInformation['data'].values():
+            championsIdName.append(championEntry['id'])
+            championsIds.append(championEntry['key'])
+            championsNames.append(championEntry['name'])
+
+        # Concatenate the information and save it to the cache
+        championInformation = pd.DataFrame({'Id': championsIds, 'IdName': championsIdName, 'Name': championsNames})
+        championInformation['Id'] = championInformation['Id'].astype(int)
+
+        metadataCache.saveParsedMetadata(name = 'ChampionInformation', sourceUrls = [const.DDRAGON_CHAMPIONS],
+            content = championInformation.to_dict(orient = 'list'))
+
+    # Save the mapping
+    championInformation.to_csv('{}{}'.format(const.FOLDER_DATA, const.CHAMPION_IDS), index = False)
+
+
+    ###
+    # Download the missing or changed icons
+    iconSync.syncIcons(iconUrls = {'{}.png'.format(championIdName): const.DDRAGON_CHAMPION_ICONS.format(
+        champion = championIdName) for championIdName in championInformation['IdName']}, proxies = proxies)
+
+
+    ###
+    # Return the champion information
+    return(championInformation)
+
+
+##
+# Get item icons
+def getItemIcons(legendaryItemsIds: Dict, mythicItemsIds: Dict, proxies: Union[Dict, None]) -> Dict:
+    '''
+    Download the missing or changed icons of the legendary and mythic items. Returns the number
+    of fetched, skipped and failed icons
+    '''
+
+    logger.debug('Get item icons')
+
+
+    ###
+    # Create list of item ids, then download and save them. Use the id and not the name
+    # as the names don't make for good filenames
+    itemIds = list(legendaryItemsIds.keys()) + list(mythicItemsIds.keys())
+
+    return(iconSync.syncIcons(iconUrls = {'{}.png'.format(itemId): const.DDRAGON_ITEM_ICONS.format(itemId = itemId)
+        for itemId in itemIds}, proxies = proxies))
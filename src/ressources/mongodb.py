@@ -1,186 +1,370 @@
-'''
-
-MongoDB functions
-
-'''
-
-
-###
-# Imports
-import copy
-import logging
-from typing import Dict, Set, Tuple
-
-from pymongo import MongoClient, database, cursor
-
-
-###
-# Load ressources
-try:
-    import src.ressources.constants as const
-except Exception:
-    import ressources.constants as const
-
-
-###
-# Logging
-logger = logging.getLogger(__name__)
-
-
-###
-# Functions
-
-##
-# Function to setup the client and the database
-def setupClientAndDatabase() -> Tuple[MongoClient, database.Database]:
-    '''
-    Function which creates the MongoDB client and creates/connects the database as specified
-    in the constants.
-    '''
-
-    logger.info('MongoDB client and database are setup')
-
-    ##
-    # Create the client
-    mongoDbClient = MongoClient(const.MONGODB_PATH)
-
-
-    ##
-    # Create/connect to the database
-    mongoDbDatabase = mongoDbClient[const.MONGODB_DATABASE.format(
-        startDate = const.EARLIEST_DATE_FOR_GAMES, endDate = const.LATEST_DATE_FOR_GAMES)]
-
-    # To delete the database run mongoDbClient.drop_database(const.MONGODB_DATABASE.format(startDate = const.EARLIEST_DATE_FOR_GAMES, endDate = const.LATEST_DATE_FOR_GAMES)) pylint: disable=line-too-long
-
-
-    ##
-    # Return both objects
-    return(mongoDbClient, mongoDbDatabase)
-
-
-##
-# Return all ids of a collection
-def getIdsOfCollection(mongoDbDatabase: database.Database, dbCollection: str, region: str) -> Set:
-    '''
-    Get the set of all ids of the given collection
-    '''
-
-    logger.debug('Get set of saved ids of collection %s', dbCollection.format(region = region))
-
-#    return(set(mongoDbDatabase[dbCollection.format(region = region)].find().distinct('_id')))
-    return(set([x['_id'] for x in mongoDbDatabase[dbCollection.format(region = region)].aggregate(
-        [{'$group': {'_id': '$_id'}}])]))
-
-
-##
-# Save a summoner id information
-def saveSummoner(mongoDbDatabase: database.Database, region: str,
-        summonerInformation: Dict, checkIfExists: bool = True) -> None:
-    '''
-    Save the summoner information (id and account id) into the corresponding collection
-    '''
-
-    logger.debug('Save summoner id %s', summonerInformation['SummonerAccountId'])
-
-    ###
-    # If desired, check first whether the entry already exists. If it already exists,
-    # the entry will be updated
-    if checkIfExists:
-        upsert = mongoDbDatabase[const.MONGODB_DOCUMENTS_SUMMONER_IDS.format(
-            region = region)].find_one({'_id': summonerInformation['SummonerAccountId']}) is not None
-
-    else:
-        upsert = False
-
-
-    ###
-    # Get the collection object and insert the data.
-    # MongoDB wants a unique id which gets added first. The copy is made in order not to
-    # affect the original object
-    summonerInformation = copy.deepcopy(summonerInformation)
-    summonerInformation['_id'] = summonerInformation['SummonerAccountId']
-
-    if upsert:
-        logger.debug('Upsert summoner id %s', summonerInformation['_id'])
-
-        mongoDbDatabase[const.MONGODB_DOCUMENTS_SUMMONER_IDS.format(region = region)
-            ].find_one_and_replace(filter = {'_id': summonerInformation['SummonerAccountId']},
-            replacement = summonerInformation, return_document = False)
-
-    else:
-        logger.debug('Insert summoner id %s', summonerInformation['_id'])
-
-        mongoDbDatabase[const.MONGODB_DOCUMENTS_SUMMONER_IDS.format(region = region)
-            ].insert_one(summonerInformation)
-
-
-    ###
-    # End of function
-    return
-
-
-##
-# Save the processed summoner ids
-def saveProcessedSummoner(mongoDbDatabase: database.Database, region: str, summonerAccountId: str) -> None:
-    '''
-    Save a summoner id to the collection of processed summoners
-    '''
-
-    logger.debug('Save summoner id %s to the collection of processed summoners', summonerAccountId)
-
-    ###
-    # Save the summoner id as the _id field
-    mongoDbDatabase[const.MONGODB_DOCUMENTS_SUMMONER_IDS_PROCESSED.format(region = region)
-        ].insert_one({'_id': summonerAccountId})
-
-
-    ###
-    # End of function
-    return
-
-
-##
-# Save match data
-def saveRetrievedMatchData(mongoDbDatabase: database.Database, region: str, matchId: str,
-        matchInformation: Dict, matchTimeline: Dict) -> None:
-    '''
-    Save the retrieved match data and match timeline into the corresponding collection.
-    The matchId is used in the _id field
-    '''
-
-    logger.debug('Save match data for match id %i, region %s', matchId, region)
-
-
-    ###
-    # Combine the data into a new dictionary
-    matchInformation = copy.deepcopy(matchInformation)  # In order not to modify the original object
-    matchInformation['timeline'] = matchTimeline
-    matchInformation['_id'] = matchId
-
-
-    ###
-    # Save the data
-    mongoDbDatabase[const.MONGODB_DOCUMENTS_GAME_INFORMATION.format(region = region)
-        ].insert_one(matchInformation)
-
-
-    ###
-    # End of function
-    return
-
-
-##
-# Generator for the timeline data
-def getTimelineDataGenerator(mongoDbDatabase: database.Database, region: str) -> cursor.Cursor:
-    '''
-    Function which returns a generator which can be used to get the timeline data together with the
-    queue id and the champions
-    '''
-
-    logger.debug('Create the timeline data generator')
-
-
-    ###
-    # Create the generator
-    return(mongoDbDatabase[const.MONGODB_DOCUMENTS_GAME_INFORMATION.format(region = region)
-        ].find(projection = ['queueId', 'timeline', 'participants', 'gameDuration']))
+'''
+
+MongoDB functions
+
+'''
+
+
+###
+# Imports
+import copy
+import logging
+from typing import Dict, Iterator, List, Set, Tuple, Union
+
+from pymongo import ASCENDING, MongoClient, ReplaceOne, database
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+    import src.ressources.api_data_transformations as apiDataTransformations
+except Exception:
+    import ressources.constants as const
+    import ressources.api_data_transformations as apiDataTransformations
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Functions
+
+##
+# Function to setup the client and the database
+def setupClientAndDatabase(databaseName: str = const.MONGODB_DATABASE) -> Tuple[MongoClient, database.Database]:
+    '''
+    Function which creates the MongoDB client and creates/connects the database as specified
+    in the constants (or the given database, e.g. for benchmarks). The database holds the data of all time windows.
+    '''
+
+    logger.info('MongoDB client and database are setup')
+
+    ##
+    # Create the client
+    mongoDbClient = MongoClient(const.MONGODB_PATH)
+
+
+    ##
+    # Create/connect to the database
+    mongoDbDatabase = mongoDbClient[databaseName]
+
+    # To delete the database run mongoDbClient.drop_database(const.MONGODB_DATABASE)
+
+
+    ##
+    # Return both objects
+    return(mongoDbClient, mongoDbDatabase)
+
+
+##
+# Indexes of the match collection
+def createMatchIndexes(mongoDbDatabase: database.Database, region: str) -> None:
+    '''
+    Create the indexes of the match collection (const.MONGODB_MATCH_INDEXES, on the creation time, on the
+    patch and on the queue, nothing is done if they already exist)
+    '''
+
+    logger.debug('Create indexes of the match collection of region %s', region)
+
+    gameInformation = mongoDbDatabase[const.MONGODB_DOCUMENTS_GAME_INFORMATION.format(region = region)]
+
+    for indexFields in const.MONGODB_MATCH_INDEXES:
+        gameInformation.create_index([(indexField, ASCENDING) for indexField in indexFields])
+
+
+    ###
+    # End of function
+    return
+
+
+##
+# Return all ids of a collection
+def getIdsOfCollection(mongoDbDatabase: database.Database, dbCollection: str, region: str) -> Set:
+    '''
+    Get the set of all ids of the given collection
+    '''
+
+    logger.debug('Get set of saved ids of collection %s', dbCollection.format(region = region))
+
+#    return(set(mongoDbDatabase[dbCollection.format(region = region)].find().distinct('_id')))
+    return(set([x['_id'] for x in mongoDbDatabase[dbCollection.format(region = region)].aggregate(
+        [{'$group': {'_id': '$_id'}}])]))
+
+
+##
+# Save a summoner id information
+def saveSummoner(mongoDbDatabase: database.Database, region: str,
+        summonerInformation: Dict, checkIfExists: bool = True) -> None:
+    '''
+    Save the summoner information (id and account id) into the corresponding collection
+    '''
+
+    logger.debug('Save summoner id %s', summonerInformation['SummonerAccountId'])
+
+    ###
+    # If desired, check first whether the entry already exists. If it already exists,
+    # the entry will be updated
+    if checkIfExists:
+        upsert = mongoDbDatabase[const.MONGODB_DOCUMENTS_SUMMONER_IDS.format(
+            region = region)].find_one({'_id': summonerInformation['SummonerAccountId']}) is not None
+
+    else:
+        upsert = False
+
+
+    ###
+    # Get the collection object and insert the data.
+    # MongoDB wants a unique id which gets added first. The copy is made in order not to
+    # affect the original object
+    summonerInformation = copy.deepcopy(summonerInformation)
+    summonerInformation['_id'] = summonerInformation['SummonerAccountId']
+
+    if upsert:
+        logger.debug('Upsert summoner id %s', summonerInformation['_id'])
+
+        mongoDbDatabase[const.MONGODB_DOCUMENTS_SUMMONER_IDS.format(region = region)
+            ].find_one_and_replace(filter = {'_id': summonerInformation['SummonerAccountId']},
+            replacement = summonerInformation, return_document = False)
+
+    else:
+        logger.debug('Insert summoner id %s', summonerInformation['_id'])
+
+        mongoDbDatabase[const.MONGODB_DOCUMENTS_SUMMONER_IDS.format(region = region)
+            ].insert_one(summonerInformation)
+
+
+    ###
+    # End of function
+    return
+
+
+##
+# Return the covered time intervals of the processed summoners
+def getCoveredIntervals(mongoDbDatabase: database.Database, region: str) -> Dict[str, List]:
+    '''
+    Get the time intervals for which the match histories of the processed summoners were retrieved
+    '''
+
+    logger.debug('Get covered time intervals of the processed summoners of region %s', region)
+
+    return({summoner['_id']: summoner.get(const.MONGODB_FIELD_COVERED_INTERVALS, list()) for summoner
+        in mongoDbDatabase[const.MONGODB_DOCUMENTS_SUMMONER_IDS_PROCESSED.format(region = region)].find()})
+
+
+##
+# Save the processed summoner ids
+def saveProcessedSummoner(mongoDbDatabase: database.Database, region: str, summonerAccountId: str,
+        coveredIntervals: List) -> None:
+    '''
+    Save a summoner id with the time intervals covered by the retrieved match histories to the collection
+    of processed summoners (replaces the entry if the summoner was already processed for another time window)
+    '''
+
+    logger.debug('Save summoner id %s to the collection of processed summoners', summonerAccountId)
+
+    ###
+    # Save the summoner id as the _id field
+    mongoDbDatabase[const.MONGODB_DOCUMENTS_SUMMONER_IDS_PROCESSED.format(region = region)].replace_one(
+        {'_id': summonerAccountId}, {'_id': summonerAccountId, const.MONGODB_FIELD_COVERED_INTERVALS: coveredIntervals},
+        upsert = True)
+
+
+    ###
+    # End of function
+    return
+
+
+##
+# Save match data
+def saveRetrievedMatchData(mongoDbDatabase: database.Database, region: str, matchId: str,
+        matchInformation: Dict, matchTimeline: Dict) -> None:
+    '''
+    Save the retrieved match data and match timeline into the corresponding collection.
+    The matchId is used in the _id field, the patch is added for the index
+    '''
+
+    logger.debug('Save match data for match id %i, region %s', matchId, region)
+
+
+    ###
+    # Combine the data into a new dictionary
+    matchInformation = copy.deepcopy(matchInformation)  # In order not to modify the original object
+    matchInformation['timeline'] = matchTimeline
+    matchInformation['_id'] = matchId
+    matchInformation[const.MONGODB_FIELD_PATCH] = apiDataTransformations.getPatch(matchInformation['gameVersion'])
+
+
+    ###
+    # Save the data
+    mongoDbDatabase[const.MONGODB_DOCUMENTS_GAME_INFORMATION.format(region = region)
+        ].insert_one(matchInformation)
+
+
+    ###
+    # End of function
+    return
+
+
+##
+# Return the ids of the matches in a time window
+def getMatchIdsInWindow(mongoDbDatabase: database.Database, region: str, dateFrom: str = const.EARLIEST_DATE_FOR_GAMES,
+        dateTo: str = const.LATEST_DATE_FOR_GAMES, patches: Union[List[str], None] = None) -> Set:
+    '''
+    Get the set of the ids of the matches created in the time window (dates in time format TIME_FORMAT,
+    both included), optionally only of the given patches (e.g. ['11.9', '11.10']). Uses the indexes of
+    the match collection
+    '''
+
+    logger.debug('Get set of match ids of region %s between %s and %s', region, dateFrom, dateTo)
+
+    startTimewindow, endTimewindow = apiDataTransformations.getTimeWindow(dateFrom = dateFrom, dateTo = dateTo)
+
+    matchFilter = {const.MONGODB_FIELD_GAME_CREATION: {'$gte': startTimewindow, '$lt': endTimewindow}}
+    if patches is not None:
+        matchFilter[const.MONGODB_FIELD_PATCH] = {'$in': list(patches)}
+
+    return(set(x['_id'] for x in mongoDbDatabase[const.MONGODB_DOCUMENTS_GAME_INFORMATION.format(region = region)].find(
+        matchFilter, projection = ['_id'])))
+
+
+##
+# Uniform random sample of the matches of a time window
+def sampleMatchIdsInWindow(mongoDbDatabase: database.Database, region: str, sampleSize: Union[int, float],
+        dateFrom: str = const.EARLIEST_DATE_FOR_GAMES, dateTo: str = const.LATEST_DATE_FOR_GAMES,
+        patches: Union[List[str], None] = None) -> Tuple[Set, int]:
+    '''
+    Draw a uniform random sample (without replacement) of the ids of the matches created in the time window,
+    optionally only of the given patches, on the server ($sample after the selection of the window with the
+    indexes). The sample size is a number of matches, or a share of the matches in the window if below 1.
+    Returns the sampled ids and the number of matches in the window
+    '''
+
+    logger.debug('Sample %s match ids of region %s between %s and %s', sampleSize, region, dateFrom, dateTo)
+
+    startTimewindow, endTimewindow = apiDataTransformations.getTimeWindow(dateFrom = dateFrom, dateTo = dateTo)
+
+    matchFilter = {const.MONGODB_FIELD_GAME_CREATION: {'$gte': startTimewindow, '$lt': endTimewindow}}
+    if patches is not None:
+        matchFilter[const.MONGODB_FIELD_PATCH] = {'$in': list(patches)}
+
+    matchCollection = mongoDbDatabase[const.MONGODB_DOCUMENTS_GAME_INFORMATION.format(region = region)]
+    nMatchesInWindow = matchCollection.count_documents(matchFilter)
+
+    if (nSampled := min(round(sampleSize * nMatchesInWindow) if sampleSize < 1 else int(sampleSize),
+            nMatchesInWindow)) == 0:
+        return(set(), nMatchesInWindow)
+
+    return(set(x['_id'] for x in matchCollection.aggregate([{'$match': matchFilter},
+        {'$sample': {'size': nSampled}}, {'$project': {'_id': 1}}])), nMatchesInWindow)
+
+
+##
+# Generator for the timeline data
+def getTimelineDataGenerator(mongoDbDatabase: database.Database, region: str,
+        matchIds: Union[Set, None] = None) -> Iterator[Dict]:
+    '''
+    Function which returns a generator which can be used to get the timeline data together with the
+    queue id and the champions. If a set of match ids is given, only these matches are returned
+    (requested in batches to keep the queries small)
+    '''
+
+    logger.debug('Create the timeline data generator')
+
+    projection = ['queueId', 'timeline', 'participants', 'gameDuration', 'gameCreation']
+    gameInformation = mongoDbDatabase[const.MONGODB_DOCUMENTS_GAME_INFORMATION.format(region = region)]
+
+
+    ###
+    # Create the generator over all matches
+    if matchIds is None:
+        return(gameInformation.find(projection = projection))
+
+
+    ###
+    # Create the generator over the selected matches
+    def selectedMatchesGenerator():
+        matchIdsSorted = sorted(matchIds)
+
+        for i in range(0, len(matchIdsSorted), const.MONGODB_ID_BATCH_SIZE):
+            yield from gameInformation.find({'_id': {'$in': matchIdsSorted[i:(i + const.MONGODB_ID_BATCH_SIZE)]}},
+                projection = projection)
+
+    return(selectedMatchesGenerator())
+
+
+##
+# Move a per-window database into the database of all windows
+def migrateWindowDatabase(mongoDbClient: MongoClient, mongoDbDatabase: database.Database, region: str,
+        dateFrom: str, dateTo: str) -> Dict:
+    '''
+    Copy the summoners, processed summoners and matches of a region from the database of a single time
+    window (as created by earlier versions, see const.MONGODB_DATABASE_WINDOW) into the given database.
+    Existing entries are kept, the processed summoners get the window as covered time interval and the
+    matches the patch. Returns the number of copied entries per collection
+    '''
+
+    logger.info('Migrate database of the time window %s to %s for region %s', dateFrom, dateTo, region)
+
+    windowDatabase = mongoDbClient[const.MONGODB_DATABASE_WINDOW.format(startDate = dateFrom, endDate = dateTo)]
+    timeWindow = apiDataTransformations.getTimeWindow(dateFrom = dateFrom, dateTo = dateTo)
+
+    createMatchIndexes(mongoDbDatabase = mongoDbDatabase, region = region)
+
+
+    ###
+    # Summoners (the frontier of the crawl, shared by all windows)
+    summonerCollection = const.MONGODB_DOCUMENTS_SUMMONER_IDS.format(region = region)
+    knownSummoners = getIdsOfCollection(mongoDbDatabase = mongoDbDatabase,
+        dbCollection = const.MONGODB_DOCUMENTS_SUMMONER_IDS, region = region)
+
+    newSummoners = [summoner for summoner in windowDatabase[summonerCollection].find()
+        if summoner['_id'] not in knownSummoners]
+    if newSummoners:
+        mongoDbDatabase[summonerCollection].insert_many(newSummoners, ordered = False)
+
+
+    ###
+    # Processed summoners, the window is added to the covered intervals
+    coveredIntervals = getCoveredIntervals(mongoDbDatabase = mongoDbDatabase, region = region)
+
+    processedSummoners = [ReplaceOne({'_id': summoner['_id']}, {'_id': summoner['_id'],
+        const.MONGODB_FIELD_COVERED_INTERVALS: apiDataTransformations.mergeIntervals(
+            intervals = coveredIntervals.get(summoner['_id'], list()) + [list(timeWindow)])}, upsert = True)
+        for summoner in windowDatabase[const.MONGODB_DOCUMENTS_SUMMONER_IDS_PROCESSED.format(region = region)].find()]
+
+    if processedSummoners:
+        mongoDbDatabase[const.MONGODB_DOCUMENTS_SUMMONER_IDS_PROCESSED.format(region = region)].bulk_write(
+            processedSummoners, ordered = False)
+
+
+    ###
+    # Matches (copied in batches with the patch added)
+    gameInformationCollection = const.MONGODB_DOCUMENTS_GAME_INFORMATION.format(region = region)
+    knownMatches = getIdsOfCollection(mongoDbDatabase = mongoDbDatabase,
+        dbCollection = const.MONGODB_DOCUMENTS_GAME_INFORMATION, region = region)
+
+    nMatches = 0
+    matchBatch = list()
+    for matchInformation in windowDatabase[gameInformationCollection].find():
+        if matchInformation['_id'] in knownMatches:
+            continue
+
+        matchInformation[const.MONGODB_FIELD_PATCH] = apiDataTransformations.getPatch(matchInformation['gameVersion'])
+        matchBatch.append(matchInformation)
+
+        if len(matchBatch) >= const.MONGODB_ID_BATCH_SIZE:
+            mongoDbDatabase[gameInformationCollection].insert_many(matchBatch, ordered = False)
+            nMatches += len(matchBatch)
+            matchBatch = list()
+
+    if matchBatch:
+        mongoDbDatabase[gameInformationCollection].insert_many(matchBatch, ordered = False)
+        nMatches += len(matchBatch)
+
+
+    ###
+    # Return the number of copied entries
+    return({'Summoners': len(newSummoners), 'ProcessedSummoners': len(processedSummoners), 'Matches': nMatches})
@@ -0,0 +1,288 @@
+'''
+
+Columnar output for the extracted item data. The data is written as parquet datasets partitioned
+by region and queue (hive style directories), with dictionary encoded champion and item ids and
+small integer types. The item and champion information is saved in a json sidecar.
+
+Requires pyarrow, which is only needed for this output format.
+
+'''
+
+
+###
+# Imports
+import json
+import logging
+import os
+import shutil
+from typing import Dict, Iterator, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+    import src.ressources.data_processing as dataProcessing
+    import src.ressources.extracted_data_writer as extractedDataWriter
+except Exception:
+    import ressources.constants as const
+    import ressources.data_processing as dataProcessing
+    import ressources.extracted_data_writer as extractedDataWriter
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Functions
+
+##
+# Path of the metadata sidecar
+def getParquetMetadataPath() -> str:
+    '''
+    Return the path of the json sidecar with the item and champion information
+    '''
+
+    return('{}{}'.format(const.FOLDER_PARQUET, const.PARQUET_METADATA.format(
+        dateFrom = const.EARLIEST_DATE_FOR_GAMES, dateTo = const.LATEST_DATE_FOR_GAMES)))
+
+
+##
+# Save the metadata sidecar
+def saveParquetMetadata(legendaryItemsIds: Dict, mythicItemsIds: Dict, championInformation: pd.DataFrame) -> None:
+    '''
+    Save the item and champion information next to the datasets. Replaces the mythic and champion
+    id csv files for the columnar output
+    '''
+
+    logger.debug('Save metadata sidecar for the parquet datasets')
+
+    metadataPath = getParquetMetadataPath()
+
+    with open('{}{}'.format(metadataPath, const.PARTIAL_FILE_SUFFIX), 'w') as metadataFile:
+        json.dump({
+            'MythicItems': {str(itemId): itemName for itemId, itemName in sorted(mythicItemsIds.items())},
+            'LegendaryItems': {str(itemId): itemName for itemId, itemName in sorted(legendaryItemsIds.items())},
+            'Champions': championInformation.sort_values('Id').to_dict(orient = 'list'),
+            'Queues': {str(queueId): queueName for queueId, queueName in (
+                (const.QUEUE_NORMAL, 'Normal'), (const.QUEUE_RANKED, 'Ranked'), (const.QUEUE_FLEX, 'Flex'),
+                (const.QUEUE_ARAM, 'ARAM'))}
+        }, metadataFile, indent = 1)
+
+    os.replace('{}{}'.format(metadataPath, const.PARTIAL_FILE_SUFFIX), metadataPath)
+
+
+    ###
+    # End of function
+    return
+
+
+##
+# Load the metadata sidecar
+def loadParquetMetadata() -> Dict:
+    '''
+    Load the item and champion information saved next to the datasets, with the ids as integers
+    '''
+
+    with open(getParquetMetadataPath(), 'r') as metadataFile:
+        metadata = json.load(metadataFile)
+
+    for metadataKey in ('MythicItems', 'LegendaryItems', 'Queues'):
+        metadata[metadataKey] = {int(keyId): keyName for keyId, keyName in metadata[metadataKey].items()}
+
+    metadata['Champions'] = pd.DataFrame(metadata['Champions'])
+
+    return(metadata)
+
+
+##
+# Categorical over fixed categories
+def toCategorical(values: pd.Series, categories: np.ndarray) -> pd.Categorical:
+    '''
+    Convert the ids to a categorical over the fixed categories. Ids which are not in the categories would
+    become missing values, so an error is raised instead (e.g. a champion released after the patch of the
+    champion information)
+    '''
+
+    if (unknownIds := np.setdiff1d(values.unique(), categories)).size > 0:
+        raise AssertionError('Ids {} of column {} are not in the categories of the datasets, update the item and '
+            'champion information'.format(', '.join(str(unknownId) for unknownId in unknownIds), values.name))
+
+    return(pd.Categorical(values, categories = categories))
+
+
+##
+# Convert the extracted data to the column types of the datasets
+def convertExtractedDataTypes(firstMythicItem: pd.DataFrame, legendaryAndMythicItems: pd.DataFrame,
+        itemCategories: np.ndarray, mythicCategories: np.ndarray,
+        championCategories: np.ndarray) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    '''
+    Convert the extracted data to compact column types. The champion and item ids become categoricals
+    over a fixed set of categories (dictionary encoded in the parquet files, the same dictionary for
+    every chunk, unknown ids raise an error), the mythic flag a bool, the number of items a uint8 and the
+    times a uint32.
+    '''
+
+    firstMythicItem = pd.DataFrame({
+        'Mythic': toCategorical(values = firstMythicItem['Mythic'], categories = mythicCategories),
+        'Champion': toCategorical(values = firstMythicItem['Champion'], categories = championCategories),
+        'Queue': firstMythicItem['Queue'].to_numpy(),
+        'GameTimeSeconds': firstMythicItem['GameTimeSeconds'].to_numpy(dtype = np.uint32),
+        'Timestamp': firstMythicItem['Timestamp'].to_numpy(dtype = np.uint32)
+    })
+
+    legendaryAndMythicItems = pd.DataFrame({
+        'Item': toCategorical(values = legendaryAndMythicItems['Item'], categories = itemCategories),
+        'Mythic': legendaryAndMythicItems['Mythic'].to_numpy(dtype = bool),
+        'Champion': toCategorical(values = legendaryAndMythicItems['Champion'], categories = championCategories),
+        'Match': legendaryAndMythicItems['Match'].to_numpy(dtype = np.uint32),
+        'N_Items': legendaryAndMythicItems['N_Items'].to_numpy(dtype = np.uint8),
+        'Queue': legendaryAndMythicItems['Queue'].to_numpy(),
+        'GameTimeSeconds': legendaryAndMythicItems['GameTimeSeconds'].to_numpy(dtype = np.uint32),
+        'Timestamp': legendaryAndMythicItems['Timestamp'].to_numpy(dtype = np.uint32)
+    })
+
+    return(firstMythicItem, legendaryAndMythicItems)
+
+
+##
+# Read a dataset in chunks
+def iterateDatasetChunks(datasetPath: str, columns: Union[List[str], None] = None,
+        chunkSize: int = const.EXTRACTED_DATA_READ_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    '''
+    Iterate over the record batches of the region partition (or staging directory) of a dataset, with the
+    ids as integers (all columns if columns is None)
+    '''
+
+    if not os.path.isdir(datasetPath):
+        raise FileNotFoundError('Dataset directory {} not found'.format(datasetPath))
+
+    for recordBatch in ds.dataset(datasetPath, format = 'parquet', partitioning = 'hive').to_batches(
+            columns = columns, batch_size = chunkSize):
+        datasetData = recordBatch.to_pandas()
+
+        yield(datasetData.astype({column: np.int64 for column in ('Item', 'Mythic', 'Champion', 'Queue')
+            if column in datasetData.columns and datasetData[column].dtype != bool}))
+
+
+###
+# Classes
+
+##
+# Chunked writer for the parquet datasets
+class ParquetExtractedDataWriter(extractedDataWriter.ExtractedDataWriter):
+    '''
+    Writes every chunk as one parquet file per queue partition into a staging directory of the
+    region partition. Closing the writer swaps the staging directory with the region partition.
+    An incremental extraction starts from hard links to the existing (immutable) part files.
+    '''
+
+    def __init__(self, region: str, stateOfExtraction: Dict, legendaryItemsIds: Dict, mythicItemsIds: Dict,
+            championInformation: pd.DataFrame, chunkSize: int = const.EXTRACTION_CHUNK_SIZE,
+            itemUniverse: Union[np.ndarray, None] = None, itemTimings: bool = False) -> None:
+        ###
+        # Fixed categories for the dictionary encoding (0 is used for no mythic item)
+        self.legendaryItemsIds = legendaryItemsIds
+        self.championInformation = championInformation
+
+        self.itemCategories = np.array(sorted({0, *legendaryItemsIds.keys(), *mythicItemsIds.keys()}),
+            dtype = np.uint16)
+        self.mythicCategories = np.array(sorted({0, *mythicItemsIds.keys()}), dtype = np.uint16)
+        self.championCategories = np.array(sorted(championInformation['Id']), dtype = np.uint16)
+
+        super().__init__(region = region, stateOfExtraction = stateOfExtraction, chunkSize = chunkSize,
+            itemUniverse = itemUniverse, itemTimings = itemTimings)
+
+
+    ##
+    # Paths of the output
+    def getOutputPaths(self) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        '''
+        Return the region partition directories of the datasets and their staging directories
+        '''
+
+        return(dataProcessing.getParquetDatasetPaths(region = self.region, inProgress = False),
+            dataProcessing.getParquetDatasetPaths(region = self.region, inProgress = True))
+
+
+    ##
+    # Prepare the staging directories
+    def prepareOutput(self) -> None:
+        '''
+        Create the staging directories, linking the existing part files for an incremental extraction
+        '''
+
+        for outputPath, partialPath in zip(self.outputPaths, self.partialPaths):
+            if os.path.isdir(partialPath):
+                shutil.rmtree(partialPath)
+
+            if self.stateOfExtraction['NMatches'] > 0:
+                shutil.copytree(outputPath, partialPath, copy_function = os.link)
+            else:
+                os.makedirs(partialPath)
+
+
+    ##
+    # Write a chunk
+    def writeChunk(self, firstMythicItem: pd.DataFrame, legendaryAndMythicItems: pd.DataFrame) -> None:
+        '''
+        Write the chunk as one part file per queue into the staging directories
+        '''
+
+        extractedData = convertExtractedDataTypes(firstMythicItem = firstMythicItem,
+            legendaryAndMythicItems = legendaryAndMythicItems, itemCategories = self.itemCategories,
+            mythicCategories = self.mythicCategories, championCategories = self.championCategories)
+
+        for partialPath, datasetData in zip(self.partialPaths, extractedData):
+            for queueId, queueData in datasetData.groupby('Queue'):
+                queuePath = '{}/{}'.format(partialPath, const.PARQUET_PARTITION_QUEUE.format(queue = queueId))
+                os.makedirs(queuePath, exist_ok = True)
+
+                with open('{}/{}'.format(queuePath, const.PARQUET_PART_FILE.format(
+                        chunk = self.stateOfExtraction['NChunks'])), 'wb') as partFile:
+                    pq.write_table(pa.Table.from_pandas(queueData.drop(columns = 'Queue'), preserve_index = False),
+                        partFile, compression = const.PARQUET_COMPRESSION)
+
+                    partFile.flush()
+                    os.fsync(partFile.fileno())
+
+
+    ##
+    # Iterate over the written data
+    def iterateWrittenData(self) -> Tuple[Iterator[pd.DataFrame], Iterator[pd.DataFrame]]:
+        '''
+        Return iterators over chunks of the data written to the staging directories so far (record batches
+        of const.EXTRACTED_DATA_READ_CHUNK_SIZE rows), with the ids as integers
+        '''
+
+        return(tuple(iterateDatasetChunks(datasetPath = partialPath) for partialPath in self.partialPaths))
+
+
+    ##
+    # Move the finished datasets into place
+    def finishOutput(self, mythicItemsIds: Union[Dict, None]) -> None:
+        '''
+        Swap the staging directories with the region partitions and save the metadata sidecar (skipped
+        if the mythic item ids are None)
+        '''
+
+        for outputPath, partialPath in zip(self.outputPaths, self.partialPaths):
+            oldOutputPath = '{}/_{}.old'.format(os.path.dirname(outputPath), os.path.basename(outputPath))
+
+            if os.path.isdir(outputPath):
+                os.replace(outputPath, oldOutputPath)
+
+            os.replace(partialPath, outputPath)
+            shutil.rmtree(oldOutputPath, ignore_errors = True)
+
+        if mythicItemsIds is not None:
+            saveParquetMetadata(legendaryItemsIds = self.legendaryItemsIds, mythicItemsIds = mythicItemsIds,
+                championInformation = self.championInformation)
@@ -0,0 +1,298 @@
+'''
+
+Opt-in profiling for the entry points. Each stage of a run is wrapped in a timer, optionally cProfile
+and/or tracemalloc run over a sampled window of loop iterations. At exit, a report with the time and
+allocations per stage is written to the data folder.
+
+Profiling is enabled with the environment variable const.PROFILING_ENVIRONMENT_VARIABLE or by passing
+the profiling options to setupProfiling. When it is disabled, the timers are no-ops.
+
+Worker processes never write a report (the atexit handlers do not run in them). They collect their stage
+timers after setupWorkerProfiling and return them (getWorkerProfile) to the main process, which adds them to
+its report with mergeWorkerProfile. The sampled window of cProfile and tracemalloc only runs in the main process.
+
+'''
+
+
+###
+# Imports
+import atexit
+import contextlib
+import cProfile
+from datetime import datetime
+import io
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+from typing import ContextManager, Dict, Iterable, Iterator, Set, Union
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+except Exception:
+    import ressources.constants as const
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Profiling state of the process
+profilingState = {'Enabled': False}
+
+
+###
+# Functions
+
+##
+# Setup
+def setupProfiling(name: str, profilingOptions: Union[Set[str], None] = None) -> None:
+    '''
+    Enable profiling if requested (profiling options or environment variable) and register the
+    report at exit. The name is used for the report file
+    '''
+
+    ###
+    # Profiling options, from the arguments or from the environment
+    if profilingOptions is None:
+        profilingOptions = {profilingOption.strip().lower() for profilingOption
+            in os.environ.get(const.PROFILING_ENVIRONMENT_VARIABLE, '').split(',') if profilingOption.strip()}
+
+    if not profilingOptions or profilingOptions == {'0'}:
+        return
+
+    logger.info('Profiling enabled with options %s', ', '.join(sorted(profilingOptions)))
+
+
+    ###
+    # Initialise the state
+    sampleStart = int(os.environ.get(const.PROFILING_SAMPLE_START_VARIABLE, const.PROFILING_SAMPLE_START))
+
+    profilingState.update({
+        'Enabled': True, 'Name': name, 'StartTime': time.perf_counter(),
+        'Stages': dict(), 'Iteration': 0, 'WorkerIterations': 0, 'SampleStart': sampleStart,
+        'SampleEnd': sampleStart + int(os.environ.get(const.PROFILING_SAMPLE_LENGTH_VARIABLE,
+            const.PROFILING_SAMPLE_LENGTH)),
+        'Profiler': cProfile.Profile() if const.PROFILING_CPROFILE in profilingOptions else None,
+        'Tracemalloc': const.PROFILING_TRACEMALLOC in profilingOptions, 'TracemallocSnapshot': None
+    })
+
+    atexit.register(writeProfilingReport)
+
+
+##
+# Setup of a worker process
+def setupWorkerProfiling(profilingEnabled: bool) -> None:
+    '''
+    Collect the stage timers of a worker process from zero (a forked worker starts with a copy of the state
+    of the main process), without the sampled window of cProfile and tracemalloc
+    '''
+
+    profilingState.clear()
+    profilingState['Enabled'] = profilingEnabled
+
+    if profilingEnabled:
+        profilingState.update({'Stages': dict(), 'Iteration': 0, 'SampleStart': 0, 'SampleEnd': 0,
+            'Profiler': None, 'Tracemalloc': False, 'TracemallocSnapshot': None})
+
+
+##
+# Profile of a worker process
+def getWorkerProfile() -> Union[Dict, None]:
+    '''
+    Return the time and allocations per stage and the number of loop iterations of a worker process (None if
+    profiling is disabled)
+    '''
+
+    if not profilingState['Enabled']:
+        return(None)
+
+    return({'Stages': profilingState['Stages'], 'Iterations': profilingState['Iteration']})
+
+
+def mergeWorkerProfile(workerProfile: Union[Dict, None]) -> None:
+    '''
+    Add the time and allocations per stage and the loop iterations of a worker process to the report (the
+    times of parallel workers are summed)
+    '''
+
+    if not profilingState['Enabled'] or workerProfile is None:
+        return
+
+    profilingState['WorkerIterations'] += workerProfile['Iterations']
+
+    for stageName, workerStatistics in workerProfile['Stages'].items():
+        stageStatistics = profilingState['Stages'].setdefault(stageName, {'Calls': 0, 'Seconds': 0.0,
+            'AllocatedBytes': 0})
+
+        for statisticName, value in workerStatistics.items():
+            stageStatistics[statisticName] += value
+
+
+##
+# Timer for a stage
+def stageTimer(stageName: str) -> ContextManager:
+    '''
+    Context manager which adds the time spent in it (and the allocated memory while tracemalloc is
+    running) to the given stage
+    '''
+
+    if not profilingState['Enabled']:
+        return(contextlib.nullcontext())
+
+    return(timeStage(stageName = stageName))
+
+
+@contextlib.contextmanager
+def timeStage(stageName: str) -> Iterator[None]:
+    '''
+    Implementation of stageTimer for enabled profiling
+    '''
+
+    stageStatistics = profilingState['Stages'].setdefault(stageName, {'Calls': 0, 'Seconds': 0.0,
+        'AllocatedBytes': 0})
+
+    tracingMemory = tracemalloc.is_tracing()
+    if tracingMemory:
+        memoryBefore, _ = tracemalloc.get_traced_memory()
+
+    startTime = time.perf_counter()
+    try:
+        yield
+    finally:
+        stageStatistics['Seconds'] += time.perf_counter() - startTime
+        stageStatistics['Calls'] += 1
+
+        if tracingMemory and tracemalloc.is_tracing():
+            stageStatistics['AllocatedBytes'] += tracemalloc.get_traced_memory()[0] - memoryBefore
+
+
+##
+# Timed iteration
+def timedIterator(iterable: Iterable, stageName: str) -> Iterator:
+    '''
+    Iterate over an iterable, adding the time to get each element (e.g. reading from a database cursor)
+    to the given stage
+    '''
+
+    if not profilingState['Enabled']:
+        yield from iterable
+        return
+
+    iterator = iter(iterable)
+    while True:
+        with stageTimer(stageName = stageName):
+            try:
+                element = next(iterator)
+            except StopIteration:
+                return
+
+        yield(element)
+
+
+##
+# Sampled window
+def nextIteration() -> None:
+    '''
+    Mark the start of a loop iteration. cProfile and tracemalloc are started at the beginning of the
+    sampled window and stopped at its end
+    '''
+
+    if not profilingState['Enabled']:
+        return
+
+    if profilingState['Iteration'] == profilingState['SampleStart']:
+        logger.debug('Start sampled profiling window')
+
+        if profilingState['Profiler'] is not None:
+            profilingState['Profiler'].enable()
+        if profilingState['Tracemalloc']:
+            tracemalloc.start()
+
+    elif profilingState['Iteration'] == profilingState['SampleEnd']:
+        stopSampling()
+
+    profilingState['Iteration'] += 1
+
+
+def stopSampling() -> None:
+    '''
+    Stop cProfile and tracemalloc (keeping a snapshot of the allocations)
+    '''
+
+    if profilingState['Profiler'] is not None:
+        profilingState['Profiler'].disable()
+
+    if tracemalloc.is_tracing():
+        profilingState['TracemallocSnapshot'] = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+
+##
+# Report
+def writeProfilingReport() -> None:
+    '''
+    Write the report with the time and allocations per stage, followed by the cProfile and tracemalloc
+    results of the sampled window
+    '''
+
+    stopSampling()
+
+    totalSeconds = time.perf_counter() - profilingState['StartTime']
+    sampledWindow = 'iterations {} to {}'.format(profilingState['SampleStart'], min(profilingState['SampleEnd'],
+        profilingState['Iteration']))
+
+
+    ###
+    # Time and allocations per stage
+    reportLines = ['Profiling report for {}, total time {:.2f} s, {} loop iterations'.format(
+        profilingState['Name'], totalSeconds, profilingState['Iteration'] + profilingState['WorkerIterations']), '',
+        '{:<30} {:>10} {:>12} {:>12} {:>8} {:>16}'.format('Stage', 'Calls', 'Total [s]', 'Mean [ms]', 'Share',
+            'Allocated [MB]')]
+
+    for stageName, stageStatistics in sorted(profilingState['Stages'].items(), key = lambda stage: -stage[1]['Seconds']):
+        reportLines.append('{:<30} {:>10} {:>12.3f} {:>12.3f} {:>7.1f}% {:>16.2f}'.format(stageName,
+            stageStatistics['Calls'], stageStatistics['Seconds'],
+            1000 * stageStatistics['Seconds'] / max(stageStatistics['Calls'], 1),
+            100 * stageStatistics['Seconds'] / max(totalSeconds, 1e-9), stageStatistics['AllocatedBytes'] / 2**20))
+
+
+    ###
+    # cProfile (only if the sampled window was reached)
+    if profilingState['Profiler'] is not None and profilingState['Iteration'] > profilingState['SampleStart']:
+        profilerOutput = io.StringIO()
+        pstats.Stats(profilingState['Profiler'], stream = profilerOutput).sort_stats('cumulative').print_stats(
+            const.PROFILING_REPORT_TOP_ENTRIES)
+
+        reportLines += ['', 'cProfile of the sampled window ({})'.format(sampledWindow), profilerOutput.getvalue()]
+
+
+    ###
+    # tracemalloc
+    if profilingState['TracemallocSnapshot'] is not None:
+        reportLines += ['', 'Allocations of the sampled window ({})'.format(sampledWindow)]
+        reportLines += [str(statistic) for statistic in profilingState['TracemallocSnapshot'].statistics(
+            'lineno')[:const.PROFILING_REPORT_TOP_ENTRIES]]
+
+
+    ###
+    # Write the report
+    reportPath = '{}{}'.format(const.FOLDER_DATA, const.PROFILING_REPORT.format(name = profilingState['Name'],
+        time = datetime.now().strftime('%Y%m%d_%H%M%S')))
+
+    with open(reportPath, 'w') as reportFile:
+        reportFile.write('\n'.join(reportLines) + '\n')
+
+    logger.info('Profiling report written to %s\n%s', reportPath, '\n'.join(reportLines[:len(
+        profilingState['Stages']) + 3]))
+
+
+    ###
+    # End of function
+    return
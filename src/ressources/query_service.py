@@ -0,0 +1,487 @@
+'''
+
+Local query service over the build statistics of the extracted data. The data of a region is loaded once into
+in-memory structures indexed by queue and champion:
+- the count cubes (mythic item and item per slot, dense arrays indexed by the axis labels)
+- the counts of the unordered item combinations (sorted by the group keys of queue and champion, see
+  build_sketches.getGroupKeys, every group a contiguous range)
+
+Queries (distribution of the mythic item or the item in a slot, top builds and diversity metrics of a champion
+over a set of queues) are answered from these structures, the results are kept in a LRU cache. The data of a
+region is reloaded once the extracted data files changed (an extraction finished). The extracted data is read from
+the csv files or the parquet datasets, depending on the output format of the extraction state of the region.
+
+The service is used through QueryService directly, the http server (createQueryServer) or query_builds.py.
+
+'''
+
+
+###
+# Imports
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Tuple, Union
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+
+###
+# Load ressources
+try:
+    import src.ressources.build_sketches as buildSketches
+    import src.ressources.constants as const
+    import src.ressources.count_cubes as countCubes
+    import src.ressources.data_processing as dataProcessing
+    import src.ressources.diversity_metrics as diversityMetrics
+    import src.ressources.extraction_state as extractionState
+    import src.ressources.item_combinations as itemCombinations
+except Exception:
+    import ressources.build_sketches as buildSketches
+    import ressources.constants as const
+    import ressources.count_cubes as countCubes
+    import ressources.data_processing as dataProcessing
+    import ressources.diversity_metrics as diversityMetrics
+    import ressources.extraction_state as extractionState
+    import ressources.item_combinations as itemCombinations
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Functions
+
+##
+# Signature of files
+def getFileSignature(filePaths: List[str]) -> Tuple:
+    '''
+    Return the modification times and sizes of the files (None for missing files)
+    '''
+
+    return(tuple((os.stat(filePath).st_mtime_ns, os.stat(filePath).st_size) if os.path.isfile(filePath) else None
+        for filePath in filePaths))
+
+
+##
+# Output format of the extracted data
+def getOutputFormat(region: str) -> str:
+    '''
+    Return the output format of the extracted data of a region recorded in its extraction state (csv if there
+    is no state)
+    '''
+
+    statePath = extractionState.getExtractionStatePath(region = region)
+    if not os.path.isfile(statePath):
+        return(const.OUTPUT_FORMAT_CSV)
+
+    with open(statePath, 'r') as stateFile:
+        return(json.load(stateFile).get('OutputFormat', const.OUTPUT_FORMAT_CSV))
+
+
+##
+# Files of the extracted data
+def getExtractedDataFiles(region: str, outputFormat: str) -> List[str]:
+    '''
+    Return the files of the extracted data of a region: the csv files or the part files in the region
+    partitions of the parquet datasets
+    '''
+
+    if outputFormat != const.OUTPUT_FORMAT_PARQUET:
+        return(list(dataProcessing.getExtractedDataPaths(region = region)))
+
+    return(['{}/{}'.format(directoryPath, fileName)
+        for datasetPath in dataProcessing.getParquetDatasetPaths(region = region)
+        for directoryPath, _, fileNames in sorted(os.walk(datasetPath)) for fileName in sorted(fileNames)])
+
+
+##
+# Signature of the extracted data
+def getDataSignature(region: str) -> Tuple:
+    '''
+    Return the output format, the files of the extracted data of a region and their signature
+    '''
+
+    outputFormat = getOutputFormat(region = region)
+    dataFiles = getExtractedDataFiles(region = region, outputFormat = outputFormat)
+
+    return((outputFormat, tuple(dataFiles), getFileSignature(filePaths = dataFiles)))
+
+
+###
+# Classes
+
+##
+# LRU cache
+class LruCache:
+    '''
+    Thread-safe cache of the last used results with a maximum number of entries
+    '''
+
+    def __init__(self, maxSize: int = const.QUERY_CACHE_SIZE) -> None:
+        self.maxSize = maxSize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+
+    ##
+    # Get or compute a result
+    def getOrCompute(self, key: Hashable, computeResult: Callable[[], Any]) -> Any:
+        '''
+        Return the cached result of the key, computing and caching it if it is not cached
+        '''
+
+        with self.lock:
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return(self.entries[key])
+
+            self.misses += 1
+
+        result = computeResult()
+
+        with self.lock:
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.maxSize:
+                self.entries.popitem(last = False)
+
+        return(result)
+
+
+##
+# Statistics of one region
+class RegionStatistics:
+    '''
+    In-memory statistics of the extracted data of a region
+    '''
+
+    def __init__(self, region: str) -> None:
+        logger.info('Load the build statistics of region %s', region)
+
+        self.region = region
+
+        self.dataSignature = getDataSignature(region = region)
+        self.outputFormat = self.dataSignature[0]
+
+
+        ###
+        # Count cubes
+        self.mythicCube = countCubes.CountCube.load(cubePath = countCubes.getCountCubePaths(
+            cubeName = const.COUNT_CUBE_MYTHIC, region = region)[0])
+        self.itemSlotCube = countCubes.CountCube.load(cubePath = countCubes.getCountCubePaths(
+            cubeName = const.COUNT_CUBE_ITEM_SLOT, region = region)[0])
+
+
+        ###
+        # Item combinations sorted by queue and champion (the items of the data are the universe)
+        self.itemUniverse = self.itemSlotCube.axisLabels['Item'].astype(np.int64)
+
+        combinationCounts = itemCombinations.countItemCombinationsOfChunks(dataChunks = self.readDataChunks(
+            columns = ['Item', 'Champion', 'Match', 'Queue']), itemUniverse = self.itemUniverse)
+
+        self.combinationCounts = combinationCounts.sort_values(['Queue', 'Champion', 'N'],
+            ascending = [True, True, False], ignore_index = True)
+        self.combinationGroupKeys = buildSketches.getGroupKeys(queueIds = self.combinationCounts['Queue'].to_numpy(),
+            championIds = self.combinationCounts['Champion'].to_numpy())
+
+
+    ##
+    # Read the extracted data
+    def readDataChunks(self, columns: List[str]) -> Iterator[pd.DataFrame]:
+        '''
+        Read columns of the extracted legendary/mythic items in chunks, from the csv file or the parquet dataset
+        '''
+
+        if self.outputFormat == const.OUTPUT_FORMAT_PARQUET:
+            try:
+                import src.ressources.parquet_output as parquetOutput
+            except Exception:
+                import ressources.parquet_output as parquetOutput
+
+            return(parquetOutput.iterateDatasetChunks(datasetPath = dataProcessing.getParquetDatasetPaths(
+                region = self.region)[1], columns = columns))
+
+        return(dataProcessing.readExtractedDataChunks(legendaryMythicDataPath = dataProcessing.getExtractedDataPaths(
+            region = self.region)[1], columns = columns))
+
+
+    ##
+    # Queues of a query
+    def getQueueIds(self, queueIds: Union[List[int], None]) -> List[int]:
+        '''
+        Return the queues of a query (all queues of the region if None)
+        '''
+
+        return([int(queueId) for queueId in (self.mythicCube.axisLabels['Queue'] if queueIds is None else queueIds)])
+
+
+    ##
+    # Distribution of a cube
+    def getCubeDistribution(self, countCube: countCubes.CountCube, categoryAxis: str, championId: int,
+            queueIds: Union[List[int], None], fixedAxes: Dict[str, int]) -> pd.Series:
+        '''
+        Return the counts over the categories of a cube for a champion, summed over the queues
+        '''
+
+        axisIndices = list()
+        for axisName in countCube.axisNames:
+            if axisName == categoryAxis:
+                axisIndices.append(np.arange(len(countCube.axisLabels[axisName])))
+                continue
+
+            labels = [championId] if axisName == 'Champion' else [fixedAxes[axisName]] if axisName in fixedAxes \
+                else self.getQueueIds(queueIds = queueIds)
+            axisIndices.append(np.flatnonzero(np.isin(countCube.axisLabels[axisName], labels)))
+
+        counts = countCube.counts[np.ix_(*axisIndices)].sum(axis = tuple(axisPosition for axisPosition, axisName
+            in enumerate(countCube.axisNames) if axisName != categoryAxis))
+
+        return(pd.Series(counts, index = countCube.axisLabels[categoryAxis]))
+
+
+    ##
+    # Distribution query
+    def getDistribution(self, championId: int, queueIds: Union[List[int], None] = None,
+            slot: Union[int, None] = None) -> Dict:
+        '''
+        Distribution of the mythic item (slot None, 0 for no mythic item) or of the item in a slot (1 to 5)
+        of a champion over the given queues (all if None)
+        '''
+
+        if slot is None:
+            counts = self.getCubeDistribution(countCube = self.mythicCube, categoryAxis = 'Mythic', championId = championId,
+                queueIds = queueIds, fixedAxes = dict())
+        else:
+            counts = self.getCubeDistribution(countCube = self.itemSlotCube, categoryAxis = 'Item', championId = championId,
+                queueIds = queueIds, fixedAxes = {'Slot': slot})
+
+        counts = counts.loc[counts > 0].sort_values(ascending = False)
+
+        return({'Region': self.region, 'Champion': championId, 'Queues': self.getQueueIds(queueIds = queueIds),
+            'Slot': slot, 'N': int(counts.sum()), 'Items': [{'Item': int(itemId), 'N': int(n), 'Share': n / counts.sum()}
+            for itemId, n in counts.items()]})
+
+
+    ##
+    # Top builds query
+    def getTopBuilds(self, championId: int, queueIds: Union[List[int], None] = None, nBuilds: int = const.QUERY_TOP_BUILDS,
+            nItems: int = const.ITEM_COMBINATION_SIZE) -> Dict:
+        '''
+        Most frequent builds (unordered combinations of nItems items) of a champion over the given queues (all if None)
+        '''
+
+        groupKeys = buildSketches.getGroupKeys(queueIds = np.array(self.getQueueIds(queueIds = queueIds), dtype = np.int64),
+            championIds = np.full(len(self.getQueueIds(queueIds = queueIds)), championId, dtype = np.int64))
+        groupRanges = zip(np.searchsorted(self.combinationGroupKeys, groupKeys, side = 'left'),
+            np.searchsorted(self.combinationGroupKeys, groupKeys, side = 'right'))
+        championCombinations = pd.concat([self.combinationCounts.iloc[groupStart:groupEnd]
+            for groupStart, groupEnd in groupRanges], ignore_index = True)
+
+        topBuilds = itemCombinations.getTopBuilds(combinationCounts = championCombinations, itemUniverse = self.itemUniverse,
+            championId = championId, nBuilds = nBuilds, nItems = nItems)
+
+        return({'Region': self.region, 'Champion': championId, 'Queues': self.getQueueIds(queueIds = queueIds),
+            'NItems': nItems, 'Builds': [{'Items': list(items), 'N': int(n), 'Share': float(share)}
+            for items, n, share in topBuilds.itertuples(index = False)]})
+
+
+    ##
+    # Diversity query
+    def getDiversity(self, championId: int, queueIds: Union[List[int], None] = None, slot: Union[int, None] = None) -> Dict:
+        '''
+        Diversity metrics of the distribution of the mythic item (slot None) or of the item in a slot
+        '''
+
+        distribution = self.getDistribution(championId = championId, queueIds = queueIds, slot = slot)
+        metrics = diversityMetrics.computeDiversityMetrics(counts = np.array([item['N'] for item in distribution['Items']],
+            dtype = np.int64).reshape(1, -1))
+
+        # Without any participant (unknown champion, queue or slot) the metrics are undefined
+        return({'Region': self.region, 'Champion': championId, 'Queues': distribution['Queues'], 'Slot': slot,
+            'N': distribution['N'], **{metricName: None if distribution['N'] == 0 or np.isnan(values[0])
+            else float(values[0]) for metricName, values in metrics.items()}})
+
+
+##
+# Query service
+class QueryService:
+    '''
+    Answers the queries for any region, loading the statistics of a region at the first query and reloading
+    them once its extracted data changed. Results are cached per region and state of its data.
+
+    A region is (re)loaded under its own lock, queries of the other regions (and of the region while it is
+    reloaded) are answered in the meantime
+    '''
+
+    QUERIES = {'distribution': RegionStatistics.getDistribution, 'builds': RegionStatistics.getTopBuilds,
+        'diversity': RegionStatistics.getDiversity}
+
+    def __init__(self, cacheSize: int = const.QUERY_CACHE_SIZE,
+            reloadCheckSeconds: float = const.QUERY_RELOAD_CHECK_SECONDS) -> None:
+        self.reloadCheckSeconds = reloadCheckSeconds
+        self.resultCache = LruCache(maxSize = cacheSize)
+
+        self.regionStatistics = dict()
+        self.lastChecks = dict()
+        self.regionLocks = dict()
+        self.lock = threading.Lock()
+
+
+    ##
+    # Statistics of a region
+    def getRegionStatistics(self, region: str) -> RegionStatistics:
+        '''
+        Return the statistics of a region, (re)loading them if they are not loaded yet or the data changed
+        '''
+
+        ###
+        # Loaded statistics which were checked recently are used directly, the check is due for one query only
+        with self.lock:
+            regionStatistics = self.regionStatistics.get(region, None)
+
+            if regionStatistics is not None and time.monotonic() - self.lastChecks[region] < self.reloadCheckSeconds:
+                return(regionStatistics)
+
+            self.lastChecks[region] = time.monotonic()
+            regionLock = self.regionLocks.setdefault(region, threading.Lock())
+
+
+        ###
+        # Check the data and (re)load the statistics under the lock of the region, then swap them in. Queries
+        # waiting for the first load of the region use the statistics loaded in the meantime
+        with regionLock:
+            with self.lock:
+                if self.regionStatistics.get(region, None) is not regionStatistics:
+                    return(self.regionStatistics[region])
+
+            if regionStatistics is None or getDataSignature(region = region) != regionStatistics.dataSignature:
+                regionStatistics = RegionStatistics(region = region)
+
+                with self.lock:
+                    self.regionStatistics[region] = regionStatistics
+
+        return(regionStatistics)
+
+
+    ##
+    # Answer a query
+    def query(self, queryName: str, region: str, **queryParameters) -> Dict:
+        '''
+        Answer a query (see QUERIES) for a region, from the cache if possible
+        '''
+
+        if queryName not in self.QUERIES:
+            raise ValueError('Unknown query {}'.format(queryName))
+
+        regionStatistics = self.getRegionStatistics(region = region)
+
+        cacheKey = (queryName, region, regionStatistics.dataSignature, tuple(sorted((parameterName,
+            tuple(parameterValue) if isinstance(parameterValue, list) else parameterValue)
+            for parameterName, parameterValue in queryParameters.items())))
+
+        return(self.resultCache.getOrCompute(key = cacheKey, computeResult = lambda: self.QUERIES[queryName](
+            regionStatistics, **queryParameters)))
+
+
+    ##
+    # Status
+    def getStatus(self) -> Dict:
+        '''
+        Loaded regions and cache statistics
+        '''
+
+        with self.lock:
+            loadedRegions = {region: regionStatistics.mythicCube.nMatches for region, regionStatistics
+                in self.regionStatistics.items()}
+
+        return({'Regions': loadedRegions, 'CacheEntries': len(self.resultCache.entries),
+            'CacheHits': self.resultCache.hits, 'CacheMisses': self.resultCache.misses})
+
+
+##
+# Parameters of a query
+def parseQueryParameters(queryName: str, parameters: Dict[str, List[str]]) -> Tuple[str, Dict]:
+    '''
+    Convert the parameters of a http query (region, champion, queue as comma separated list, slot, n, items)
+    to the region and the arguments of the query
+    '''
+
+    region = parameters.get('region', ['euw1'])[0]
+    queryParameters = {'championId': int(parameters['champion'][0])}
+
+    if 'queue' in parameters:
+        queryParameters['queueIds'] = [int(queueId) for queueId in parameters['queue'][0].split(',')]
+
+    if queryName in ('distribution', 'diversity') and 'slot' in parameters:
+        queryParameters['slot'] = int(parameters['slot'][0])
+
+    if queryName == 'builds':
+        if 'n' in parameters:
+            queryParameters['nBuilds'] = int(parameters['n'][0])
+        if 'items' in parameters:
+            queryParameters['nItems'] = int(parameters['items'][0])
+
+    return(region, queryParameters)
+
+
+##
+# Http server
+def createQueryServer(queryService: QueryService, host: str = const.QUERY_HOST,
+        port: int = const.QUERY_PORT) -> ThreadingHTTPServer:
+    '''
+    Create a http server answering GET requests /<query>?region=..&champion=..&queue=..(&slot=..&n=..&items=..)
+    and /status with json
+    '''
+
+    class QueryRequestHandler(BaseHTTPRequestHandler):
+        def sendJson(self, statusCode: int, content: Dict) -> None:
+            body = json.dumps(content).encode('utf-8')
+
+            self.send_response(statusCode)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            requestUrl = urlparse(self.path)
+            queryName = requestUrl.path.strip('/')
+
+            if queryName == 'status':
+                self.sendJson(statusCode = 200, content = queryService.getStatus())
+                return
+
+            if queryName not in QueryService.QUERIES:
+                self.sendJson(statusCode = 404, content = {'Error': 'Unknown query {}'.format(queryName)})
+                return
+
+            try:
+                region, queryParameters = parseQueryParameters(queryName = queryName,
+                    parameters = parse_qs(requestUrl.query))
+            except (KeyError, ValueError) as parameterError:
+                self.sendJson(statusCode = 400, content = {'Error': 'Invalid parameters: {}'.format(parameterError)})
+                return
+
+            try:
+                self.sendJson(statusCode = 200, content = queryService.query(queryName, region, **queryParameters))
+            except FileNotFoundError:
+                self.sendJson(statusCode = 404, content = {'Error': 'No extracted data for region {}'.format(region)})
+
+        def log_message(self, format: str, *args) -> None:
+            logger.debug(format, *args)
+
+    return(ThreadingHTTPServer((host, port), QueryRequestHandler))
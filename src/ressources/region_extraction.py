@@ -0,0 +1,308 @@
+'''
+
+Extraction of the bought mythic/legendary items of one or several regions. The item and champion
+metadata is retrieved once by the caller and shared by all regions. Several regions are extracted
+concurrently (one process per region, every process with its own match store and writer), so the
+total runtime is close to the one of the largest region.
+
+In the preview mode, a uniform random sample of the matches is extracted instead (to separate outputs, named
+with const.PREVIEW_REGION) and the estimates with their error bars are saved (see ressources/sampled_preview.py).
+
+The extracted data of several regions can additionally be combined into one csv file per dataset
+with the region as additional column (the parquet datasets are already partitioned by region).
+
+'''
+
+
+###
+# Imports
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import os
+import time
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+    import src.ressources.data_processing as dataProcessing
+    import src.ressources.extracted_data_writer as extractedDataWriter
+    import src.ressources.extraction_state as extractionState
+    import src.ressources.match_store as matchStore
+    import src.ressources.profiling as profiling
+    import src.ressources.sampled_preview as sampledPreview
+except Exception:
+    import ressources.constants as const
+    import ressources.data_processing as dataProcessing
+    import ressources.extracted_data_writer as extractedDataWriter
+    import ressources.extraction_state as extractionState
+    import ressources.match_store as matchStore
+    import ressources.profiling as profiling
+    import ressources.sampled_preview as sampledPreview
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Functions
+
+##
+# Extract one region
+def extractRegion(region: str, legendaryItemsIds: Dict, mythicItemsIds: Dict, tearItemMappings: Dict,
+        championInformation: pd.DataFrame, outputFormat: str = const.OUTPUT_FORMAT_CSV,
+        incrementalExtraction: bool = True, itemUniverse: Union[np.ndarray, None] = None, itemTimings: bool = False,
+        sampleSize: Union[int, float, None] = None, matchStoreBackend: str = const.MATCH_STORE_BACKEND,
+        saveMetadata: bool = True, progressPosition: int = 0) -> Dict:
+    '''
+    Extract the matches of the time window of a region which are not extracted yet and write them with
+    the writer of the output format. If saveMetadata is not set, the mythic item ids (or the metadata
+    sidecar of the parquet datasets) are not saved, e.g. if they are saved once for several regions.
+
+    If a sample size is set (number of matches, or share of the matches if below 1), only a uniform random
+    sample of the matches of the time window is extracted, always completely and to the outputs of the
+    preview region, and the estimates from the sample are saved.
+
+    The matches are read from the match store of the backend (const.MATCH_STORE_MONGODB or const.MATCH_STORE_LOCAL).
+
+    Returns the number of extracted matches (and of matches in the time window for a sample) and the runtime
+    '''
+
+    logger.info('Extract region %s%s', region, '' if sampleSize is None else ' (preview, sample {})'.format(sampleSize))
+
+    startTime = time.perf_counter()
+
+
+    ###
+    # Open the match store (one per process)
+    store = matchStore.openMatchStore(backend = matchStoreBackend)
+
+
+    ###
+    # Load the extraction state (already extracted matches) and select the matches to extract from the
+    # time window of the output (the store holds the matches of all time windows)
+    itemClassificationHash = extractionState.computeItemClassificationHash(legendaryItemsIds = legendaryItemsIds,
+        mythicItemsIds = mythicItemsIds, tearItemMappings = tearItemMappings)
+
+    outputRegion = region if sampleSize is None else const.PREVIEW_REGION.format(region = region)
+
+    if incrementalExtraction and sampleSize is None:
+        stateOfExtraction = extractionState.loadExtractionState(region = region,
+            itemClassificationHash = itemClassificationHash, outputFormat = outputFormat)
+    else:
+        stateOfExtraction = extractionState.createEmptyExtractionState(
+            itemClassificationHash = itemClassificationHash, outputFormat = outputFormat)
+
+    if sampleSize is None:
+        matchIdsToExtract = store.getMatchIdsInWindow(region = region, dateFrom = const.EARLIEST_DATE_FOR_GAMES,
+            dateTo = const.LATEST_DATE_FOR_GAMES) - stateOfExtraction['MatchIds']
+
+        logger.info('%i matches to extract for region %s', len(matchIdsToExtract), region)
+
+    else:
+        matchIdsToExtract, nMatchesInWindow = store.sampleMatchIdsInWindow(region = region, sampleSize = sampleSize,
+            dateFrom = const.EARLIEST_DATE_FOR_GAMES, dateTo = const.LATEST_DATE_FOR_GAMES)
+
+        logger.info('%i of %i matches sampled for region %s', len(matchIdsToExtract), nMatchesInWindow, region)
+
+        sampledMythicItems = list()
+
+
+    ###
+    # Generate the generator for the timeline data
+    dataGenerator = store.iterateMatches(region = region, matchIds = matchIdsToExtract)
+
+
+    ###
+    # Iterate over the data. The match counter continues from the already extracted matches.
+    # The extracted data is written in chunks by the writer
+    if outputFormat == const.OUTPUT_FORMAT_PARQUET:
+        try:
+            import src.ressources.parquet_output as parquetOutput
+        except Exception:
+            import ressources.parquet_output as parquetOutput
+
+        dataWriter = parquetOutput.ParquetExtractedDataWriter(region = outputRegion, stateOfExtraction = stateOfExtraction,
+            legendaryItemsIds = legendaryItemsIds, mythicItemsIds = mythicItemsIds,
+            championInformation = championInformation, itemUniverse = itemUniverse, itemTimings = itemTimings)
+
+    else:
+        dataWriter = extractedDataWriter.ExtractedDataWriter(region = outputRegion, stateOfExtraction = stateOfExtraction,
+            itemUniverse = itemUniverse, itemTimings = itemTimings)
+
+    nMatchesBefore = stateOfExtraction['NMatches']
+
+    for ct, matchData in tqdm(enumerate(profiling.timedIterator(dataGenerator, stageName = 'CursorRead'),
+            start = stateOfExtraction['NMatches']), total = len(matchIdsToExtract), desc = region,
+            position = progressPosition):
+        profiling.nextIteration()
+
+        with profiling.stageTimer(stageName = 'Extraction'):
+            ###
+            # Get the queue id as well as the champion ids
+            queueAndChampionIds = dataProcessing.extractQueueAndChampions(matchData)
+
+
+            ###
+            # Get the first 5 legendary/mythic items bought per champion as well as the mythic items per champion
+            firstMythicItem, legendaryAndMythicItemsBought = dataProcessing.extractBoughtMythicAndLegendaryItems(
+                matchData = matchData, legendaryItemsIds = legendaryItemsIds, mythicItemsIds = mythicItemsIds,
+                queueAndChampionIds = queueAndChampionIds, ct = ct)
+
+
+        ###
+        # Pass the extracted information to the writer (writes a chunk to the output from time to time)
+        with profiling.stageTimer(stageName = 'Output'):
+            dataWriter.addMatch(matchId = matchData['_id'], firstMythicItem = firstMythicItem,
+                legendaryAndMythicItemsBought = legendaryAndMythicItemsBought)
+
+        # Keep the first mythic items of the sampled matches for the estimates
+        if sampleSize is not None:
+            sampledMythicItems.append(firstMythicItem[['Mythic', 'Queue']].assign(Match = ct))
+
+
+    ###
+    # Write the remaining data and move the output files into place
+    with profiling.stageTimer(stageName = 'Output'):
+        dataWriter.close(mythicItemsIds = mythicItemsIds if saveMetadata else None)
+
+    store.close()
+
+    regionSummary = {'Region': region, 'NMatchesExtracted': stateOfExtraction['NMatches'] - nMatchesBefore,
+        'NMatches': stateOfExtraction['NMatches']}
+
+
+    ###
+    # Estimates from the sample
+    if sampleSize is not None and sampledMythicItems:
+        previewEstimates = sampledPreview.computePreviewEstimates(sampleData = pd.concat(sampledMythicItems,
+            ignore_index = True), nPopulation = nMatchesInWindow)
+
+        logger.info('Preview estimates of region %s (%i of %i matches):\n%s', region, len(sampledMythicItems),
+            nMatchesInWindow, previewEstimates['queues'].to_string(index = False))
+        logger.info('Preview estimates saved to %s', ', '.join(sampledPreview.savePreviewEstimates(
+            region = region, previewEstimates = previewEstimates)))
+
+    if sampleSize is not None:
+        regionSummary['NMatchesInWindow'] = nMatchesInWindow
+
+
+    ###
+    # Return the summary of the region
+    regionSummary['Seconds'] = time.perf_counter() - startTime
+
+    return(regionSummary)
+
+
+##
+# Extract several regions
+def extractRegions(regions: List[str], legendaryItemsIds: Dict, mythicItemsIds: Dict, tearItemMappings: Dict,
+        championInformation: pd.DataFrame, outputFormat: str = const.OUTPUT_FORMAT_CSV,
+        incrementalExtraction: bool = True, itemUniverse: Union[np.ndarray, None] = None, itemTimings: bool = False,
+        sampleSize: Union[int, float, None] = None, matchStoreBackend: str = const.MATCH_STORE_BACKEND,
+        maxWorkers: Union[int, None] = None) -> pd.DataFrame:
+    '''
+    Extract several regions with the same metadata, one process per region (at most maxWorkers processes,
+    None uses one per region). A single region is extracted in the current process. With several regions, the
+    stage timers of the workers are added to the profiling report, the sampled window of cProfile and
+    tracemalloc is not run. The metadata is saved once. If a sample size is set, only a sample of the matches of every region is
+    extracted (preview mode, see extractRegion). Returns the summary per region
+    '''
+
+    extractionArguments = {'legendaryItemsIds': legendaryItemsIds, 'mythicItemsIds': mythicItemsIds,
+        'tearItemMappings': tearItemMappings, 'championInformation': championInformation, 'outputFormat': outputFormat,
+        'incrementalExtraction': incrementalExtraction, 'itemUniverse': itemUniverse, 'itemTimings': itemTimings,
+        'sampleSize': sampleSize, 'matchStoreBackend': matchStoreBackend}
+
+
+    ###
+    # Single region
+    if len(regions) == 1:
+        return(pd.DataFrame([extractRegion(region = regions[0], **extractionArguments)]))
+
+
+    ###
+    # Several regions in parallel, the metadata is saved once afterwards (the writers of the regions
+    # would otherwise replace the same files at the same time)
+    profilingEnabled = profiling.profilingState['Enabled']
+    if profilingEnabled and (profiling.profilingState['Profiler'] is not None
+            or profiling.profilingState['Tracemalloc']):
+        logger.warning('%i regions are extracted in worker processes, the profiling report only holds their stage '
+            'timers (no cProfile or tracemalloc window). Extract a single region to profile the extraction loop',
+            len(regions))
+
+    with ProcessPoolExecutor(max_workers = min(maxWorkers or len(regions), len(regions))) as executor:
+        regionResults = list(executor.map(extractRegionWithoutMetadata, regions, range(len(regions)),
+            [extractionArguments] * len(regions), [profilingEnabled] * len(regions)))
+
+    regionSummaries = list()
+    for regionSummary, workerProfile in regionResults:
+        regionSummaries.append(regionSummary)
+        profiling.mergeWorkerProfile(workerProfile = workerProfile)
+
+    if outputFormat == const.OUTPUT_FORMAT_PARQUET:
+        try:
+            import src.ressources.parquet_output as parquetOutput
+        except Exception:
+            import ressources.parquet_output as parquetOutput
+
+        parquetOutput.saveParquetMetadata(legendaryItemsIds = legendaryItemsIds, mythicItemsIds = mythicItemsIds,
+            championInformation = championInformation)
+
+    else:
+        dataProcessing.saveMythicItemIds(mythicItemsIds = mythicItemsIds)
+
+    return(pd.DataFrame(regionSummaries))
+
+
+##
+# Worker of extractRegions
+def extractRegionWithoutMetadata(region: str, progressPosition: int, extractionArguments: Dict,
+        profilingEnabled: bool = False) -> Tuple[Dict, Union[Dict, None]]:
+    '''
+    Extract a region in a worker process of extractRegions, without saving the metadata. Returns the summary
+    of the region and the profile of the worker (None if profiling is disabled)
+    '''
+
+    profiling.setupWorkerProfiling(profilingEnabled = profilingEnabled)
+
+    regionSummary = extractRegion(region = region, saveMetadata = False, progressPosition = progressPosition,
+        **extractionArguments)
+
+    return(regionSummary, profiling.getWorkerProfile())
+
+
+##
+# Combine the extracted data of several regions
+def combineRegionOutputs(regions: List[str]) -> List[str]:
+    '''
+    Combine the csv files with the extracted data of several regions into one file per dataset with the
+    region as additional column (read and written in chunks, the match counter is unique per region).
+    The combined files are written to temporary files which then replace the old files. Returns their paths
+    '''
+
+    logger.info('Combine the extracted data of regions %s', ', '.join(regions))
+
+    combinedPaths = dataProcessing.getExtractedDataPaths(region = const.COMBINED_REGIONS)
+
+    for datasetIndex, (combinedPath, columns) in enumerate(zip(combinedPaths,
+            (const.MYTHIC_DATA_COLUMNS, const.LEGENDARY_MYTHIC_DATA_COLUMNS))):
+        partialPath = '{}{}'.format(combinedPath, const.PARTIAL_FILE_SUFFIX)
+        pd.DataFrame(columns = columns + ['Region']).to_csv(partialPath, index = False)
+
+        for region in regions:
+            for dataChunk in pd.read_csv(dataProcessing.getExtractedDataPaths(region = region)[datasetIndex],
+                    chunksize = const.EXTRACTED_DATA_READ_CHUNK_SIZE):
+                dataChunk[columns].assign(Region = region).to_csv(partialPath, index = False, mode = 'a', header = False)
+
+        os.replace(partialPath, combinedPath)
+
+    return(list(combinedPaths))
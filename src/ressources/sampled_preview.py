@@ -0,0 +1,161 @@
+'''
+
+Estimates from the preview mode of the extraction, which extracts a uniform random sample (without
+replacement) of the matches of a time window instead of all of them:
+- the number of matches per queue in the window (share of the sampled matches times the number of matches)
+- the share of every mythic item among the participants with a mythic item per queue
+
+The sampling unit is the match, the participants of a match are not independent. The shares are therefore
+ratio estimates over the sampled matches with the linearised variance of a cluster sample. All variances
+include the finite population correction, so the error bars vanish if all matches are sampled. The confidence
+intervals use the normal approximation (const.PREVIEW_CONFIDENCE_LEVEL).
+
+'''
+
+
+###
+# Imports
+import logging
+import os
+from statistics import NormalDist
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+except Exception:
+    import ressources.constants as const
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Functions
+
+##
+# Quantile of the confidence intervals
+def getConfidenceQuantile(confidenceLevel: float = const.PREVIEW_CONFIDENCE_LEVEL) -> float:
+    '''
+    Quantile of the standard normal distribution for a two-sided confidence interval
+    '''
+
+    return(NormalDist().inv_cdf(0.5 + confidenceLevel / 2))
+
+
+##
+# Matches per queue
+def estimateQueueMatches(sampleData: pd.DataFrame, nPopulation: int, quantile: float) -> pd.DataFrame:
+    '''
+    Estimate the number of matches per queue in the time window from the sampled matches (one row per
+    participant with the columns Match and Queue). Returns the number of sampled matches (NSampled), the
+    estimate, its standard error and the confidence interval per queue
+    '''
+
+    nSampled = sampleData['Match'].nunique()
+    finitePopulationCorrection = 1 - nSampled / nPopulation
+
+    queueEstimates = sampleData.groupby('Queue')['Match'].nunique().rename('NSampled').reset_index()
+    queueShares = queueEstimates['NSampled'] / nSampled
+
+    queueEstimates['Estimate'] = nPopulation * queueShares
+    queueEstimates['StandardError'] = nPopulation * np.sqrt(finitePopulationCorrection * queueShares
+        * (1 - queueShares) / max(nSampled - 1, 1))
+    queueEstimates['Lower'] = (queueEstimates['Estimate'] - quantile * queueEstimates['StandardError']).clip(
+        lower = queueEstimates['NSampled'])
+    queueEstimates['Upper'] = (queueEstimates['Estimate'] + quantile * queueEstimates['StandardError']).clip(
+        upper = nPopulation)
+
+    return(queueEstimates)
+
+
+##
+# Share of the mythic items per queue
+def estimateMythicShares(sampleData: pd.DataFrame, nPopulation: int, quantile: float) -> pd.DataFrame:
+    '''
+    Estimate the share of every mythic item among the participants with a mythic item per queue from the
+    sampled matches (one row per participant with the columns Match, Queue and Mythic, 0 if no mythic item
+    was bought). For the matches i of a queue with y_i participants with the item and m_i participants with
+    any mythic item, the share is R = sum(y_i) / sum(m_i) with the variance
+    (1 - f) / (n * mean(m)^2) * sum((y_i - R * m_i)^2) / (n - 1), where n is the number of sampled matches of
+    the queue and f the sampled share of all matches. Returns the number of sampled participants with the
+    item (NSampled), the estimate, its standard error and the confidence interval per queue and item
+    '''
+
+    finitePopulationCorrection = 1 - sampleData['Match'].nunique() / nPopulation
+
+
+    ###
+    # Participants with the item (y) and with any mythic item (m) per match, the sums of the variance are
+    # expanded, so only the matches with the item are needed for the sums with y
+    mythicPicks = sampleData.loc[sampleData['Mythic'] != 0, ['Queue', 'Match', 'Mythic']]
+
+    matchPicks = mythicPicks.groupby(['Queue', 'Match']).size().rename('M')
+    itemPicks = mythicPicks.groupby(['Queue', 'Match', 'Mythic']).size().rename('Y').reset_index().join(matchPicks,
+        on = ['Queue', 'Match'])
+
+    queueTotals = pd.DataFrame({'NMatches': sampleData.groupby('Queue')['Match'].nunique(),
+        'SumM': matchPicks.groupby('Queue').sum(), 'SumMM': (matchPicks**2).groupby('Queue').sum()}).fillna(0)
+
+    mythicEstimates = itemPicks.assign(YY = itemPicks['Y']**2, YM = itemPicks['Y'] * itemPicks['M']).groupby(
+        ['Queue', 'Mythic']).agg(NSampled = ('Y', 'sum'), SumYY = ('YY', 'sum'), SumYM = ('YM', 'sum')).reset_index(
+        ).join(queueTotals, on = 'Queue')
+
+
+    ###
+    # Ratio estimate and its linearised variance
+    shares = mythicEstimates['NSampled'] / mythicEstimates['SumM']
+    residualVariance = (mythicEstimates['SumYY'] - 2 * shares * mythicEstimates['SumYM'] + shares**2
+        * mythicEstimates['SumMM']) / (mythicEstimates['NMatches'] - 1).clip(lower = 1)
+    meanPicks = mythicEstimates['SumM'] / mythicEstimates['NMatches']
+
+    mythicEstimates['Estimate'] = shares
+    mythicEstimates['StandardError'] = np.sqrt((finitePopulationCorrection * residualVariance
+        / (mythicEstimates['NMatches'] * meanPicks**2)).clip(lower = 0))
+    mythicEstimates['Lower'] = (shares - quantile * mythicEstimates['StandardError']).clip(lower = 0)
+    mythicEstimates['Upper'] = (shares + quantile * mythicEstimates['StandardError']).clip(upper = 1)
+
+    return(mythicEstimates[['Queue', 'Mythic', 'NSampled', 'Estimate', 'StandardError', 'Lower', 'Upper']])
+
+
+##
+# All estimates
+def computePreviewEstimates(sampleData: pd.DataFrame, nPopulation: int,
+        confidenceLevel: float = const.PREVIEW_CONFIDENCE_LEVEL) -> Dict[str, pd.DataFrame]:
+    '''
+    Compute all estimates from the sampled matches (first mythic item per participant with the match counter
+    as column Match) and the number of matches in the time window
+    '''
+
+    quantile = getConfidenceQuantile(confidenceLevel = confidenceLevel)
+
+    return({'queues': estimateQueueMatches(sampleData = sampleData, nPopulation = nPopulation, quantile = quantile),
+        'mythics': estimateMythicShares(sampleData = sampleData, nPopulation = nPopulation, quantile = quantile)})
+
+
+##
+# Save the estimates
+def savePreviewEstimates(region: str, previewEstimates: Dict[str, pd.DataFrame]) -> List[str]:
+    '''
+    Save every table of estimates to a csv file in the data folder (temporary files which then replace
+    the old files). Returns the paths
+    '''
+
+    estimatePaths = list()
+    for estimateName, estimateTable in previewEstimates.items():
+        estimatePath = '{}{}'.format(const.FOLDER_DATA, const.PREVIEW_ESTIMATES_FILE.format(estimate = estimateName,
+            region = region, dateFrom = const.EARLIEST_DATE_FOR_GAMES, dateTo = const.LATEST_DATE_FOR_GAMES))
+
+        estimateTable.to_csv('{}{}'.format(estimatePath, const.PARTIAL_FILE_SUFFIX), index = False)
+        os.replace('{}{}'.format(estimatePath, const.PARTIAL_FILE_SUFFIX), estimatePath)
+
+        estimatePaths.append(estimatePath)
+
+    return(estimatePaths)
@@ -0,0 +1,401 @@
+'''
+
+Significance tests of the differences between the item distributions of two queues (or regions) per champion,
+vectorised over all champions:
+- chi-square and G-tests of the 2 x categories contingency table of every champion
+- permutation tests of the G statistic and of the differences in diversity (see diversity_metrics.py). Permuting
+  the queue labels of the participants of a champion is drawing the counts of the first queue from the
+  multivariate hypergeometric distribution of the pooled counts, which is done with one vectorised
+  hypergeometric draw per category for all permutations and champions at once. The permutations are
+  distributed over processes in batches with independent random streams (numpy SeedSequence)
+
+The p-values are adjusted for the number of tested champions (Benjamini-Hochberg and Holm).
+
+'''
+
+
+###
+# Imports
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import logging
+import math
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+    import src.ressources.count_cubes as countCubes
+    import src.ressources.diversity_metrics as diversityMetrics
+except Exception:
+    import ressources.constants as const
+    import ressources.count_cubes as countCubes
+    import ressources.diversity_metrics as diversityMetrics
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Functions
+
+##
+# Regularised upper incomplete gamma function
+def regularizedUpperGamma(a: float, x: float) -> float:
+    '''
+    Q(a, x), with the series expansion for x < a + 1 and the continued fraction otherwise
+    '''
+
+    if x <= 0:
+        return(1.0)
+
+    logPrefactor = -x + a * math.log(x) - math.lgamma(a)
+
+    if x < a + 1:
+        term = total = 1 / a
+        for n in range(1, 10000):
+            term *= x / (a + n)
+            total += term
+            if abs(term) < abs(total) * 1e-15:
+                break
+
+        return(max(0.0, 1 - total * math.exp(logPrefactor)))
+
+    b = x + 1 - a
+    c = 1 / 1e-300
+    d = 1 / b
+    h = d
+    for n in range(1, 10000):
+        an = -n * (n - a)
+        b += 2
+
+        d = an * d + b
+        d = 1 / (d if abs(d) > 1e-300 else 1e-300)
+        c = b + an / c
+        c = c if abs(c) > 1e-300 else 1e-300
+
+        h *= d * c
+        if abs(d * c - 1) < 1e-15:
+            break
+
+    return(math.exp(logPrefactor) * h)
+
+
+##
+# P-values of the chi-square distribution
+def chiSquareSurvival(statistics: np.ndarray, degreesOfFreedom: np.ndarray) -> np.ndarray:
+    '''
+    Return P(X >= statistic) for chi-square distributions with the given degrees of freedom (NaN for 0 degrees)
+    '''
+
+    return(np.array([regularizedUpperGamma(a = df / 2, x = statistic / 2) if df > 0 else np.nan
+        for statistic, df in zip(np.ravel(statistics), np.ravel(degreesOfFreedom))]).reshape(np.shape(statistics)))
+
+
+##
+# Contingency table statistics
+def computeContingencyStatistics(countsA: np.ndarray, countsB: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    Chi-square and G statistics of the 2 x categories tables of the counts (categories on the last axis, any
+    leading axes) and their degrees of freedom (categories with counts - 1)
+    '''
+
+    categoryTotals = countsA + countsB
+    nA, nB = countsA.sum(axis = -1, keepdims = True), countsB.sum(axis = -1, keepdims = True)
+
+    chiSquare = np.zeros(countsA.shape[:-1])
+    gStatistic = np.zeros(countsA.shape[:-1])
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        for observed, nObserved in ((countsA, nA), (countsB, nB)):
+            expected = categoryTotals * nObserved / (nA + nB)
+
+            chiSquare += np.sum(np.where(expected > 0, (observed - expected)**2 / expected, 0), axis = -1)
+            gStatistic += 2 * np.sum(np.where(observed > 0, observed * np.log(observed / expected), 0), axis = -1)
+
+    return(chiSquare, gStatistic, np.maximum((categoryTotals > 0).sum(axis = -1) - 1, 0))
+
+
+##
+# Permuted counts
+def drawPermutedCounts(categoryTotals: np.ndarray, nA: np.ndarray, nPermutations: int, rng: np.random.Generator) -> np.ndarray:
+    '''
+    Draw the counts of the first group after permuting the group labels of the pooled participants (multivariate
+    hypergeometric, one hypergeometric draw per category). Returns an array permutations x groups x categories
+    '''
+
+    remainingTotals = np.broadcast_to(categoryTotals.sum(axis = -1), (nPermutations, len(categoryTotals))).copy()
+    remainingSample = np.broadcast_to(nA, (nPermutations, len(categoryTotals))).copy()
+
+    permutedCounts = np.zeros((nPermutations, *categoryTotals.shape), dtype = np.int64)
+    for categoryIndex in range(categoryTotals.shape[-1]):
+        nGood = np.broadcast_to(categoryTotals[:, categoryIndex], remainingTotals.shape)
+
+        permutedCounts[:, :, categoryIndex] = rng.hypergeometric(nGood, remainingTotals - nGood, remainingSample)
+
+        remainingTotals -= nGood
+        remainingSample -= permutedCounts[:, :, categoryIndex]
+
+    return(permutedCounts)
+
+
+##
+# One batch of permutations
+def permutationBatch(countsA: np.ndarray, countsB: np.ndarray, nPermutations: int, seedSequence: np.random.SeedSequence,
+        metrics: List[str]) -> Dict[str, np.ndarray]:
+    '''
+    Draw permutations and return per group the number of permutations with a G statistic and with absolute
+    differences of the metrics at least as large as observed
+    '''
+
+    rng = np.random.default_rng(seedSequence)
+
+    categoryTotals = countsA + countsB
+    permutedCountsA = drawPermutedCounts(categoryTotals = categoryTotals, nA = countsA.sum(axis = 1),
+        nPermutations = nPermutations, rng = rng)
+    permutedCountsB = categoryTotals[np.newaxis, :, :] - permutedCountsA
+
+
+    ###
+    # G statistic
+    _, observedG, _ = computeContingencyStatistics(countsA = countsA, countsB = countsB)
+    _, permutedG, _ = computeContingencyStatistics(countsA = permutedCountsA, countsB = permutedCountsB)
+
+    exceedances = {'G': np.sum(permutedG >= observedG * (1 - 1e-10), axis = 0)}
+
+
+    ###
+    # Differences of the diversity metrics
+    observedMetricsA = diversityMetrics.computeDiversityMetrics(counts = countsA, topK = [])
+    observedMetricsB = diversityMetrics.computeDiversityMetrics(counts = countsB, topK = [])
+    permutedMetricsA = diversityMetrics.computeDiversityMetrics(counts = permutedCountsA, topK = [])
+    permutedMetricsB = diversityMetrics.computeDiversityMetrics(counts = permutedCountsB, topK = [])
+
+    for metric in metrics:
+        observedDifference = np.abs(observedMetricsA[metric] - observedMetricsB[metric])
+        exceedances[metric] = np.sum(np.abs(permutedMetricsA[metric] - permutedMetricsB[metric])
+            >= observedDifference * (1 - 1e-10), axis = 0)
+
+    return(exceedances)
+
+
+##
+# Permutation tests
+def permutationTests(countsA: np.ndarray, countsB: np.ndarray, nPermutations: int = const.SIGNIFICANCE_PERMUTATIONS,
+        seed: int = const.SIGNIFICANCE_SEED, metrics: List[str] = const.SIGNIFICANCE_METRICS,
+        maxWorkers: Union[int, None] = None) -> Dict[str, np.ndarray]:
+    '''
+    Permutation p-values ((1 + exceedances) / (1 + permutations)) of the G statistic and of the differences of
+    the metrics for every group (rows of the counts). The same seed gives the same p-values independent of the
+    number of workers
+    '''
+
+    ###
+    # Batches with independent random streams
+    nBatches = -(-nPermutations // const.SIGNIFICANCE_BATCH_SIZE)
+    batchSizes = [const.SIGNIFICANCE_BATCH_SIZE] * (nBatches - 1) + [
+        nPermutations - const.SIGNIFICANCE_BATCH_SIZE * (nBatches - 1)]
+    seedSequences = np.random.SeedSequence(seed).spawn(nBatches)
+
+    logger.debug('%i permutations in %i batches for %i groups', nPermutations, nBatches, len(countsA))
+
+
+    ###
+    # Draw the permutations
+    with ProcessPoolExecutor(max_workers = maxWorkers) as executor:
+        batchExceedances = list(executor.map(permutationBatch, [countsA] * nBatches, [countsB] * nBatches, batchSizes,
+            seedSequences, [metrics] * nBatches))
+
+    return({statisticName: (1 + sum(exceedances[statisticName] for exceedances in batchExceedances)) / (1 + nPermutations)
+        for statisticName in batchExceedances[0]})
+
+
+##
+# Multiple comparison corrections
+def adjustPValuesBenjaminiHochberg(pValues: np.ndarray) -> np.ndarray:
+    '''
+    Benjamini-Hochberg adjusted p-values (false discovery rate)
+    '''
+
+    nTests = len(pValues)
+    order = np.argsort(pValues)
+
+    adjustedPValues = np.empty(nTests)
+    adjustedPValues[order] = np.minimum.accumulate((pValues[order] * nTests / np.arange(1, nTests + 1))[::-1])[::-1]
+
+    return(np.minimum(adjustedPValues, 1))
+
+
+def adjustPValuesHolm(pValues: np.ndarray) -> np.ndarray:
+    '''
+    Holm adjusted p-values (family-wise error rate)
+    '''
+
+    nTests = len(pValues)
+    order = np.argsort(pValues)
+
+    adjustedPValues = np.empty(nTests)
+    adjustedPValues[order] = np.maximum.accumulate(pValues[order] * (nTests - np.arange(nTests)))
+
+    return(np.minimum(adjustedPValues, 1))
+
+
+##
+# Counts of a cube for the tests
+def getComparisonCounts(countCube: countCubes.CountCube, categoryAxis: str,
+        fixedAxes: Union[Dict[str, int], None] = None) -> np.ndarray:
+    '''
+    Return the counts of a cube as queue x champion x category array (labels of the cube axes), selecting one
+    label of every other axis (e.g. {'Slot': 1} for the item cube)
+    '''
+
+    counts = countCube.counts
+    axisNames = list(countCube.axisNames)
+
+    for axisName, label in (fixedAxes or dict()).items():
+        axisPosition = axisNames.index(axisName)
+        labelIndex = np.searchsorted(countCube.axisLabels[axisName], label)
+
+        if labelIndex < len(countCube.axisLabels[axisName]) and countCube.axisLabels[axisName][labelIndex] == label:
+            counts = np.take(counts, labelIndex, axis = axisPosition)
+        else:
+            counts = np.zeros(counts.shape[:axisPosition] + counts.shape[(axisPosition + 1):], dtype = np.int64)
+
+        axisNames.remove(axisName)
+
+    return(np.moveaxis(counts, [axisNames.index(axisName) for axisName in ('Queue', 'Champion', categoryAxis)], [0, 1, 2]))
+
+
+##
+# Tests of two distributions per champion
+def testDifferences(championIds: np.ndarray, countsA: np.ndarray, countsB: np.ndarray,
+        minParticipants: int = const.SIGNIFICANCE_MIN_PARTICIPANTS, nPermutations: int = const.SIGNIFICANCE_PERMUTATIONS,
+        maxWorkers: Union[int, None] = None) -> pd.DataFrame:
+    '''
+    Test the differences of the distributions (champion x category counts) of two queues or regions for every
+    champion with at least minParticipants participants in both. Returns one row per champion with the
+    statistics, the p-values and the adjusted p-values
+    '''
+
+    selectedChampions = (countsA.sum(axis = 1) >= minParticipants) & (countsB.sum(axis = 1) >= minParticipants)
+    championIds, countsA, countsB = championIds[selectedChampions], countsA[selectedChampions], countsB[selectedChampions]
+
+    testResults = pd.DataFrame({'Champion': championIds, 'NA': countsA.sum(axis = 1), 'NB': countsB.sum(axis = 1)})
+    if len(championIds) == 0:
+        return(testResults)
+
+
+    ###
+    # Asymptotic tests
+    chiSquare, gStatistic, degreesOfFreedom = computeContingencyStatistics(countsA = countsA, countsB = countsB)
+
+    testResults['DegreesOfFreedom'] = degreesOfFreedom
+    testResults['ChiSquare'] = chiSquare
+    testResults['ChiSquareP'] = chiSquareSurvival(statistics = chiSquare, degreesOfFreedom = degreesOfFreedom)
+    testResults['G'] = gStatistic
+    testResults['GP'] = chiSquareSurvival(statistics = gStatistic, degreesOfFreedom = degreesOfFreedom)
+
+
+    ###
+    # Permutation tests
+    permutationPValues = permutationTests(countsA = countsA, countsB = countsB, nPermutations = nPermutations,
+        maxWorkers = maxWorkers)
+    metricsA = diversityMetrics.computeDiversityMetrics(counts = countsA, topK = [])
+    metricsB = diversityMetrics.computeDiversityMetrics(counts = countsB, topK = [])
+
+    testResults['GPermutationP'] = permutationPValues['G']
+    for metric in const.SIGNIFICANCE_METRICS:
+        testResults['{}Difference'.format(metric)] = metricsA[metric] - metricsB[metric]
+        testResults['{}PermutationP'.format(metric)] = permutationPValues[metric]
+
+
+    ###
+    # Adjusted p-values (tables without degrees of freedom have no asymptotic p-value and are not counted)
+    for pValueColumn in [column for column in testResults.columns if column.endswith('P')]:
+        testedChampions = testResults[pValueColumn].notna().to_numpy()
+        pValues = testResults.loc[testedChampions, pValueColumn].to_numpy()
+
+        testResults['{}BH'.format(pValueColumn)] = np.nan
+        testResults['{}Holm'.format(pValueColumn)] = np.nan
+        testResults.loc[testedChampions, '{}BH'.format(pValueColumn)] = adjustPValuesBenjaminiHochberg(pValues = pValues)
+        testResults.loc[testedChampions, '{}Holm'.format(pValueColumn)] = adjustPValuesHolm(pValues = pValues)
+
+    return(testResults)
+
+
+##
+# Comparisons of queues
+def compareQueues(cubeName: str, categoryAxis: str, regions: List[str], fixedAxes: Union[Dict[str, int], None] = None,
+        nPermutations: int = const.SIGNIFICANCE_PERMUTATIONS, maxWorkers: Union[int, None] = None) -> pd.DataFrame:
+    '''
+    Test the queue comparisons (const.QUEUE_COMPARISONS) of every region for all champions
+    '''
+
+    comparisonTables = list()
+    for region in regions:
+        countCube = countCubes.CountCube.load(cubePath = countCubes.getCountCubePaths(cubeName = cubeName, region = region)[0])
+        counts = getComparisonCounts(countCube = countCube, categoryAxis = categoryAxis, fixedAxes = fixedAxes)
+        queueIds = list(countCube.axisLabels['Queue'])
+
+        for comparisonName, (queueId, referenceQueueId) in const.QUEUE_COMPARISONS.items():
+            if queueId not in queueIds or referenceQueueId not in queueIds:
+                continue
+
+            logger.info('Test %s of %s for region %s', comparisonName, cubeName, region)
+
+            comparisonTables.append(testDifferences(championIds = countCube.axisLabels['Champion'],
+                countsA = counts[queueIds.index(queueId)], countsB = counts[queueIds.index(referenceQueueId)],
+                nPermutations = nPermutations, maxWorkers = maxWorkers).assign(Comparison = comparisonName,
+                RegionA = region, RegionB = region, QueueA = queueId, QueueB = referenceQueueId))
+
+    return(pd.concat(comparisonTables, ignore_index = True) if comparisonTables else pd.DataFrame())
+
+
+##
+# Comparisons of regions
+def compareRegions(cubeName: str, categoryAxis: str, regions: List[str], fixedAxes: Union[Dict[str, int], None] = None,
+        nPermutations: int = const.SIGNIFICANCE_PERMUTATIONS, maxWorkers: Union[int, None] = None) -> pd.DataFrame:
+    '''
+    Test every pair of regions per queue for all champions (the cubes are aligned on their labels)
+    '''
+
+    countCubesOfRegions = {region: countCubes.CountCube.load(cubePath = countCubes.getCountCubePaths(cubeName = cubeName,
+        region = region)[0]) for region in regions}
+
+
+    ###
+    # Common axis labels of all regions
+    alignedCube = countCubes.CountCube(axisNames = countCubesOfRegions[regions[0]].axisNames)
+    for countCube in countCubesOfRegions.values():
+        for axisName in countCube.axisNames:
+            alignedCube.getAxisIndices(axisName = axisName, labels = countCube.axisLabels[axisName])
+
+    alignedCounts = dict()
+    for region, countCube in countCubesOfRegions.items():
+        counts = np.zeros(alignedCube.counts.shape, dtype = np.int64)
+        counts[np.ix_(*[np.searchsorted(alignedCube.axisLabels[axisName], countCube.axisLabels[axisName])
+            for axisName in countCube.axisNames])] = countCube.counts
+
+        alignedCounts[region] = getComparisonCounts(countCube = countCubes.CountCube(axisNames = alignedCube.axisNames,
+            axisLabels = alignedCube.axisLabels, counts = counts), categoryAxis = categoryAxis, fixedAxes = fixedAxes)
+
+
+    ###
+    # Tests per pair of regions and queue
+    comparisonTables = list()
+    for regionA, regionB in itertools.combinations(regions, 2):
+        for queueIndex, queueId in enumerate(alignedCube.axisLabels['Queue']):
+            logger.info('Test %s against %s in queue %i of %s', regionA, regionB, queueId, cubeName)
+
+            comparisonTables.append(testDifferences(championIds = alignedCube.axisLabels['Champion'],
+                countsA = alignedCounts[regionA][queueIndex], countsB = alignedCounts[regionB][queueIndex],
+                nPermutations = nPermutations, maxWorkers = maxWorkers).assign(Comparison = '{}-{}'.format(regionA, regionB),
+                RegionA = regionA, RegionB = regionB, QueueA = queueId, QueueB = queueId))
+
+    return(pd.concat(comparisonTables, ignore_index = True) if comparisonTables else pd.DataFrame())
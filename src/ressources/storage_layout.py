@@ -0,0 +1,220 @@
+'''
+
+Storage layout of the MongoDB collections of a region (summoners, processed summoners and matches):
+- the collections are created with block compression (const.MONGODB_BLOCK_COMPRESSOR) before anything is
+  written to them, the match collection gets the secondary indexes of the windowed and filtered reads
+  (const.MONGODB_MATCH_INDEXES)
+- the size, storage size, compression and index sizes of the collections are reported
+- existing collections with another compressor are migrated in place: the documents are copied on the server
+  into a new collection with the storage options, the indexes are built on it and it replaces the old
+  collection (rename). The crawler and the extraction should not run during a migration
+
+The block compressor of a collection can only be set when it is created, so a migration copies the data.
+
+'''
+
+
+###
+# Imports
+import logging
+import time
+from typing import Dict, List
+
+from pymongo import database
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+    import src.ressources.api_data_transformations as apiDataTransformations
+    import src.ressources.mongodb as mongodb
+except Exception:
+    import ressources.constants as const
+    import ressources.api_data_transformations as apiDataTransformations
+    import ressources.mongodb as mongodb
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Functions
+
+##
+# Collections of a region
+def getRegionCollections(region: str) -> List[str]:
+    '''
+    Return the names of the collections of a region
+    '''
+
+    return([collectionName.format(region = region) for collectionName in (const.MONGODB_DOCUMENTS_SUMMONER_IDS,
+        const.MONGODB_DOCUMENTS_SUMMONER_IDS_PROCESSED, const.MONGODB_DOCUMENTS_GAME_INFORMATION)])
+
+
+##
+# Storage options of the collections
+def getCollectionOptions() -> Dict:
+    '''
+    Options of new collections (block compressor of the WiredTiger storage engine)
+    '''
+
+    return({'storageEngine': {'wiredTiger': {'configString': 'block_compressor={}'.format(
+        const.MONGODB_BLOCK_COMPRESSOR)}}})
+
+
+##
+# Create the collections and indexes of a region
+def setupCollections(mongoDbDatabase: database.Database, region: str) -> List[str]:
+    '''
+    Create the missing collections of a region with the storage options and the indexes of the match
+    collection (existing collections and indexes are kept). Returns the created collections
+    '''
+
+    existingCollections = set(mongoDbDatabase.list_collection_names())
+
+    createdCollections = list()
+    for collectionName in getRegionCollections(region = region):
+        if collectionName not in existingCollections:
+            logger.info('Create collection %s (block compressor %s)', collectionName, const.MONGODB_BLOCK_COMPRESSOR)
+            mongoDbDatabase.create_collection(collectionName, **getCollectionOptions())
+            createdCollections.append(collectionName)
+
+    mongodb.createMatchIndexes(mongoDbDatabase = mongoDbDatabase, region = region)
+
+    return(createdCollections)
+
+
+##
+# Size and index statistics of a collection
+def getCollectionStatistics(mongoDbDatabase: database.Database, collectionName: str) -> Dict:
+    '''
+    Return the number of documents, the uncompressed and the stored size (bytes), the compression ratio,
+    the size of every index and the block compressor of a collection
+    '''
+
+    storageStatistics = next(mongoDbDatabase[collectionName].aggregate([{'$collStats': {'storageStats': dict()}}]))[
+        'storageStats']
+
+    creationOptions = dict(option.split('=', 1) for option in storageStatistics.get('wiredTiger', dict()).get(
+        'creationString', '').split(',') if '=' in option)
+
+    return({'Collection': collectionName, 'Documents': storageStatistics['count'], 'Size': storageStatistics['size'],
+        'StorageSize': storageStatistics['storageSize'],
+        'CompressionRatio': storageStatistics['size'] / max(storageStatistics['storageSize'], 1),
+        'IndexSize': storageStatistics['totalIndexSize'], 'IndexSizes': dict(storageStatistics['indexSizes']),
+        'BlockCompressor': creationOptions.get('block_compressor', 'unknown')})
+
+
+##
+# Statistics of the collections of a region
+def getRegionStatistics(mongoDbDatabase: database.Database, region: str) -> List[Dict]:
+    '''
+    Return the statistics of the existing collections of a region
+    '''
+
+    existingCollections = set(mongoDbDatabase.list_collection_names())
+
+    return([getCollectionStatistics(mongoDbDatabase = mongoDbDatabase, collectionName = collectionName)
+        for collectionName in getRegionCollections(region = region) if collectionName in existingCollections])
+
+
+##
+# Migrate a collection in place
+def migrateCollection(mongoDbDatabase: database.Database, collectionName: str) -> bool:
+    '''
+    Move a collection with another block compressor into a new collection with the storage options, which
+    then replaces it (under the same name, with the same indexes). The documents are copied on the server
+    ($merge), the number of documents is checked before the old collection is replaced. Returns whether the
+    collection was migrated
+    '''
+
+    if getCollectionStatistics(mongoDbDatabase = mongoDbDatabase,
+            collectionName = collectionName)['BlockCompressor'] == const.MONGODB_BLOCK_COMPRESSOR:
+        logger.info('Collection %s already uses block compressor %s', collectionName, const.MONGODB_BLOCK_COMPRESSOR)
+        return(False)
+
+    logger.info('Migrate collection %s to block compressor %s', collectionName, const.MONGODB_BLOCK_COMPRESSOR)
+
+    migrationName = '{}{}'.format(collectionName, const.MONGODB_MIGRATION_SUFFIX)
+
+
+    ###
+    # New collection (a leftover of an aborted migration is removed)
+    mongoDbDatabase.drop_collection(migrationName)
+    mongoDbDatabase.create_collection(migrationName, **getCollectionOptions())
+
+
+    ###
+    # Copy the documents, then build the indexes of the old collection on the new one
+    mongoDbDatabase[collectionName].aggregate([{'$merge': {'into': migrationName, 'whenMatched': 'keepExisting'}}])
+
+    if (nMigrated := mongoDbDatabase[migrationName].estimated_document_count()) != (
+            nDocuments := mongoDbDatabase[collectionName].estimated_document_count()):
+        mongoDbDatabase.drop_collection(migrationName)
+        raise AssertionError('Migration of collection {} incomplete ({} of {} documents)'.format(collectionName,
+            nMigrated, nDocuments))
+
+    for indexName, indexInformation in mongoDbDatabase[collectionName].index_information().items():
+        if indexName != '_id_':
+            mongoDbDatabase[migrationName].create_index(indexInformation['key'], name = indexName)
+
+
+    ###
+    # Replace the old collection
+    mongoDbDatabase[migrationName].rename(collectionName, dropTarget = True)
+
+    return(True)
+
+
+##
+# Migrate the collections of a region
+def migrateRegion(mongoDbDatabase: database.Database, region: str) -> List[str]:
+    '''
+    Migrate the existing collections of a region to the storage options, then create the missing collections
+    and indexes. Returns the migrated collections
+    '''
+
+    existingCollections = set(mongoDbDatabase.list_collection_names())
+
+    migratedCollections = [collectionName for collectionName in getRegionCollections(region = region)
+        if collectionName in existingCollections and migrateCollection(mongoDbDatabase = mongoDbDatabase,
+            collectionName = collectionName)]
+
+    setupCollections(mongoDbDatabase = mongoDbDatabase, region = region)
+
+    return(migratedCollections)
+
+
+##
+# Time the reads of the extraction
+def timeReads(mongoDbDatabase: database.Database, region: str) -> Dict:
+    '''
+    Time the reads of the extraction on the match collection of a region: the ids of the matches in the time
+    window, the ids of the matches of a queue (the one of the first match) in the time window and a full scan
+    of the timelines (with the projection of the extraction). Returns the durations in seconds
+    '''
+
+    readDurations = dict()
+
+    startTime = time.perf_counter()
+    mongodb.getMatchIdsInWindow(mongoDbDatabase = mongoDbDatabase, region = region)
+    readDurations['WindowIdsSeconds'] = time.perf_counter() - startTime
+
+    gameInformation = mongoDbDatabase[const.MONGODB_DOCUMENTS_GAME_INFORMATION.format(region = region)]
+    if (firstMatch := gameInformation.find_one(projection = [const.MONGODB_FIELD_QUEUE])) is not None:
+        startTimewindow, endTimewindow = apiDataTransformations.getTimeWindow()
+
+        startTime = time.perf_counter()
+        list(gameInformation.find({const.MONGODB_FIELD_QUEUE: firstMatch[const.MONGODB_FIELD_QUEUE],
+            const.MONGODB_FIELD_GAME_CREATION: {'$gte': startTimewindow, '$lt': endTimewindow}}, projection = ['_id']))
+        readDurations['QueueWindowIdsSeconds'] = time.perf_counter() - startTime
+
+    startTime = time.perf_counter()
+    readDurations['ScannedMatches'] = sum(1 for _ in mongodb.getTimelineDataGenerator(mongoDbDatabase = mongoDbDatabase,
+        region = region))
+    readDurations['ScanSeconds'] = time.perf_counter() - startTime
+
+    return(readDurations)
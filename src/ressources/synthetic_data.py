@@ -0,0 +1,237 @@
+'''
+
+Deterministic generator of synthetic match data, shaped like the documents saved by
+mongodb.saveRetrievedMatchData (match information with the timeline in the field 'timeline' and
+the match id in '_id'). Used to benchmark the extraction without a database or API access.
+
+The builds contain the edge cases the extraction has to deal with: undone purchases, mythic items
+which are undone and replaced by another mythic item, sold items and the evolving tear items.
+
+'''
+
+
+###
+# Imports
+import logging
+import random
+from typing import Dict, Iterator, List, Tuple
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+except Exception:
+    import ressources.constants as const
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Item information (subset of patch 11.10)
+SYNTHETIC_MYTHIC_ITEMS = {
+    6630: 'Goredrinker', 6631: 'Stridebreaker', 3078: 'Trinity Force', 6632: 'Divine Sunderer',
+    6653: 'Liandry\'s Anguish', 6655: 'Luden\'s Tempest', 6656: 'Everfrost', 3152: 'Hextech Rocketbelt',
+    4633: 'Riftmaker', 4636: 'Night Harvester', 6671: 'Galeforce', 6672: 'Kraken Slayer',
+    6673: 'Immortal Shieldbow', 6691: 'Duskblade of Draktharr', 6692: 'Eclipse', 6693: 'Prowler\'s Claw',
+    3068: 'Sunfire Aegis', 6662: 'Frostfire Gauntlet', 6664: 'Turbo Chemtank', 3190: 'Locket of the Iron Solari',
+    2065: 'Shurelya\'s Battlesong', 6617: 'Moonstone Renewer', 4005: 'Imperial Mandate'
+}
+
+SYNTHETIC_LEGENDARY_ITEMS = {
+    3031: 'Infinity Edge', 3036: 'Lord Dominik\'s Regards', 3033: 'Mortal Reminder', 3046: 'Phantom Dancer',
+    3085: 'Runaan\'s Hurricane', 3094: 'Rapid Firecannon', 3072: 'Bloodthirster', 3026: 'Guardian Angel',
+    3156: 'Maw of Malmortius', 3139: 'Mercurial Scimitar', 3089: 'Rabadon\'s Deathcap', 3135: 'Void Staff',
+    3157: 'Zhonya\'s Hourglass', 3165: 'Morellonomicon', 3116: 'Rylai\'s Crystal Scepter',
+    3102: 'Banshee\'s Veil', 3075: 'Thornmail', 3065: 'Spirit Visage', 3143: 'Randuin\'s Omen',
+    3110: 'Frozen Heart', 3742: 'Dead Man\'s Plate', 3053: 'Sterak\'s Gage', 3071: 'Black Cleaver',
+    3074: 'Ravenous Hydra', 3748: 'Titanic Hydra', 6333: 'Death\'s Dance', 6694: 'Serylda\'s Grudge',
+    3814: 'Edge of Night', 3179: 'Umbral Glaive', 3153: 'Blade of The Ruined King', 3115: 'Nashor\'s Tooth',
+    4637: 'Demonic Embrace', 3100: 'Lich Bane', 3004: const.ITEMS_MANAMUNE, 3042: const.ITEMS_MURAMANA,
+    3003: const.ITEMS_ARCHANGELS, 3040: const.ITEMS_SERAPHS
+}
+
+SYNTHETIC_TEAR_ITEMS = {3042: 3004, 3040: 3003}
+
+# Items which are neither legendary nor mythic (components, boots, consumables)
+SYNTHETIC_OTHER_ITEMS = [1036, 1037, 1038, 1052, 1058, 1001, 3006, 3047, 3111, 3020, 2003, 2055, 3340]
+
+SYNTHETIC_CHAMPION_IDS = list(range(1, 161))
+SYNTHETIC_QUEUE_WEIGHTS = {const.QUEUE_RANKED: 0.45, const.QUEUE_NORMAL: 0.25, const.QUEUE_FLEX: 0.1,
+    const.QUEUE_ARAM: 0.2}
+
+
+###
+# Functions
+
+##
+# Item information of the synthetic data
+def getSyntheticItemInformation() -> Tuple[Dict, Dict, Dict]:
+    '''
+    Return the legendary items, mythic items and tear item mappings used by the synthetic data,
+    in the same form as api_requests.getItemInformation
+    '''
+
+    return(dict(SYNTHETIC_LEGENDARY_ITEMS), dict(SYNTHETIC_MYTHIC_ITEMS), dict(SYNTHETIC_TEAR_ITEMS))
+
+
+##
+# Item events of one participant
+def generateParticipantItemEvents(rng: random.Random, participantId: int, gameDurationMs: int) -> List[Dict]:
+    '''
+    Generate the item events of one participant over the game: components, a mythic item and
+    legendary items, with occasional undos, mythic replacements, sales and tear upgrades
+    '''
+
+    itemEvents = list()
+    legendaryItems = [itemId for itemId in SYNTHETIC_LEGENDARY_ITEMS if itemId not in SYNTHETIC_TEAR_ITEMS]
+
+    def itemEvent(eventType: str, timestamp: int, itemId: int) -> Dict:
+        if eventType == const.TIMELINE_ITEM_RETURNED:
+            return({'type': eventType, 'timestamp': timestamp, 'participantId': participantId,
+                'beforeId': itemId, 'afterId': 0})
+        return({'type': eventType, 'timestamp': timestamp, 'participantId': participantId, 'itemId': itemId})
+
+
+    ###
+    # Components and consumables over the whole game
+    for _ in range(rng.randint(6, 20)):
+        itemEvents.append(itemEvent(const.TIMELINE_ITEM_BOUGHT, rng.randint(0, gameDurationMs),
+            rng.choice(SYNTHETIC_OTHER_ITEMS)))
+
+
+    ###
+    # Completed items, roughly one every six minutes after the first eight minutes
+    timestamp = rng.randint(8 * 60000, 14 * 60000)
+    mythicPosition = rng.choice((0, 0, 0, 1, 1, 2)) if rng.random() < 0.93 else None
+    nCompletedItems = 0
+
+    while timestamp < gameDurationMs and nCompletedItems < 6:
+        if nCompletedItems == mythicPosition:
+            mythicItem = rng.choice(list(SYNTHETIC_MYTHIC_ITEMS))
+            itemEvents.append(itemEvent(const.TIMELINE_ITEM_BOUGHT, timestamp, mythicItem))
+
+            # Mythic undone and replaced by another one
+            if rng.random() < 0.03:
+                itemEvents.append(itemEvent(const.TIMELINE_ITEM_RETURNED, timestamp + 1500, mythicItem))
+                itemEvents.append(itemEvent(const.TIMELINE_ITEM_BOUGHT, timestamp + 4000,
+                    rng.choice(list(SYNTHETIC_MYTHIC_ITEMS))))
+
+        else:
+            # Tear items, bought early and evolving later on
+            if nCompletedItems < 2 and rng.random() < 0.05:
+                evolvedItem, basicItem = rng.choice(list(SYNTHETIC_TEAR_ITEMS.items()))
+                itemEvents.append(itemEvent(const.TIMELINE_ITEM_BOUGHT, timestamp, basicItem))
+
+                if timestamp + 10 * 60000 < gameDurationMs and rng.random() < 0.5:
+                    itemEvents.append(itemEvent(const.TIMELINE_ITEM_BOUGHT, timestamp + 10 * 60000, evolvedItem))
+
+            else:
+                legendaryItem = rng.choice(legendaryItems)
+                itemEvents.append(itemEvent(const.TIMELINE_ITEM_BOUGHT, timestamp, legendaryItem))
+
+                # Purchase undone and something else bought instead
+                if rng.random() < 0.05:
+                    itemEvents.append(itemEvent(const.TIMELINE_ITEM_RETURNED, timestamp + 2000, legendaryItem))
+                    itemEvents.append(itemEvent(const.TIMELINE_ITEM_BOUGHT, timestamp + 5000,
+                        rng.choice(legendaryItems)))
+
+                # Sold late in the game
+                elif rng.random() < 0.03 and timestamp + 5 * 60000 < gameDurationMs:
+                    itemEvents.append(itemEvent(const.TIMELINE_ITEM_SOLD, timestamp + 5 * 60000, legendaryItem))
+
+        nCompletedItems += 1
+        timestamp += rng.randint(4 * 60000, 8 * 60000)
+
+
+    ###
+    # Return the events
+    return(itemEvents)
+
+
+##
+# Generate one match
+def generateSyntheticMatch(rng: random.Random, matchId: int) -> Dict:
+    '''
+    Generate one match document with 10 participants and a timeline with one frame per minute
+    '''
+
+    queueId = rng.choices(list(SYNTHETIC_QUEUE_WEIGHTS), weights = list(SYNTHETIC_QUEUE_WEIGHTS.values()))[0]
+    gameDuration = rng.randint(15 * 60, 45 * 60) if queueId != const.QUEUE_ARAM else rng.randint(12 * 60, 30 * 60)
+    gameCreation = 1619560800000 + rng.randint(0, 13 * 24 * 3600 * 1000)
+    championIds = rng.sample(SYNTHETIC_CHAMPION_IDS, 10)
+
+
+    ###
+    # Match information
+    matchData = {
+        '_id': matchId, 'gameId': matchId, 'queueId': queueId, 'gameDuration': gameDuration,
+        'gameCreation': gameCreation, 'gameVersion': '11.10.376.1234', 'mapId': 12 if queueId != const.QUEUE_ARAM else 14,
+        'participants': [{'participantId': participantId, 'teamId': 100 if participantId <= 5 else 200,
+            'championId': championId, 'spell1Id': 4, 'spell2Id': rng.choice((7, 11, 12, 14))}
+            for participantId, championId in enumerate(championIds, start = 1)],
+        'participantIdentities': [{'participantId': participantId, 'player': {
+            'accountId': 'synthetic-account-{}-{}'.format(matchId, participantId),
+            'summonerId': 'synthetic-summoner-{}-{}'.format(matchId, participantId)}}
+            for participantId in range(1, 11)]
+    }
+
+
+    ###
+    # Timeline: item events plus some other events, sorted into frames of one minute
+    gameDurationMs = gameDuration * 1000
+
+    timelineEvents = list()
+    for participantId in range(1, 11):
+        timelineEvents += generateParticipantItemEvents(rng = rng, participantId = participantId,
+            gameDurationMs = gameDurationMs)
+
+        for _ in range(rng.randint(10, 25)):
+            timelineEvents.append({'type': rng.choice(('SKILL_LEVEL_UP', 'WARD_PLACED', 'CHAMPION_KILL')),
+                'timestamp': rng.randint(0, gameDurationMs), 'participantId': participantId})
+
+    timelineEvents.sort(key = lambda timelineEvent: timelineEvent['timestamp'])
+
+    frames = [{'timestamp': frameIndex * 60000, 'participantFrames': {}, 'events': list()}
+        for frameIndex in range(gameDurationMs // 60000 + 2)]
+    for timelineEvent in timelineEvents:
+        frames[min(timelineEvent['timestamp'] // 60000 + 1, len(frames) - 1)]['events'].append(timelineEvent)
+
+    matchData['timeline'] = {'frames': frames, 'frameInterval': 60000}
+
+
+    ###
+    # Return the match
+    return(matchData)
+
+
+##
+# Generate a corpus of matches
+def generateSyntheticCorpus(nMatches: int, seed: int = 0) -> Iterator[Dict]:
+    '''
+    Generate nMatches match documents. The same seed always gives the same corpus
+    '''
+
+    logger.debug('Generate synthetic corpus of %i matches', nMatches)
+
+    rng = random.Random(seed)
+
+    for matchIndex in range(nMatches):
+        yield(generateSyntheticMatch(rng = rng, matchId = 5000000000 + matchIndex))
+
+
+##
+# Generate a match history
+def generateSyntheticMatchHistory(rng: random.Random, nMatches: int = 100) -> Dict:
+    '''
+    Generate a match history as returned by the match list endpoint, with games of all queues
+    inside and outside of the evaluated time window
+    '''
+
+    return({'matches': [{'gameId': rng.randint(5000000000, 5999999999), 'platformId': 'EUW1',
+        'champion': rng.choice(SYNTHETIC_CHAMPION_IDS), 'queue': rng.choice((400, 420, 430, 440, 450, 900)),
+        'season': 13, 'timestamp': 1619000000000 + rng.randint(0, 30 * 24 * 3600 * 1000), 'role': 'SOLO',
+        'lane': 'TOP'} for _ in range(nMatches)], 'startIndex': 0, 'endIndex': nMatches, 'totalGames': nMatches})
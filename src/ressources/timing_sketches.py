@@ -0,0 +1,414 @@
+'''
+
+Quantile sketches of the times at which the items were bought (e.g. time to the first mythic item,
+time to the Nth legendary/mythic item) per queue, champion, slot and item with bounded memory.
+
+The values are counted in buckets with logarithmically growing bounds (bucket i covers the values
+between minValue * gamma^(i-1) and minValue * gamma^i, gamma = (1 + alpha) / (1 - alpha)). Every
+value within a bucket is at most a relative error alpha away from the value representing the bucket,
+so the quantiles have a relative error of at most alpha, however many matches are counted. The memory
+per group is fixed by the range of the values and alpha.
+
+Sketches with the same parameters can be merged (sum of the bucket counts), e.g. over extraction chunks
+or regions. Groups can be combined in the same way, e.g. all items of a slot for the time to the Nth item.
+
+'''
+
+
+###
+# Imports
+import logging
+import os
+from typing import Dict, List, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+
+###
+# Load ressources
+try:
+    import src.ressources.constants as const
+    import src.ressources.data_processing as dataProcessing
+except Exception:
+    import ressources.constants as const
+    import ressources.data_processing as dataProcessing
+
+
+###
+# Logging
+logger = logging.getLogger(__name__)
+
+
+###
+# Constants
+GROUP_COLUMNS = ['Queue', 'Champion', 'Slot', 'Item']
+
+
+###
+# Functions
+
+##
+# Group keys
+def getGroupKeys(queueIds: np.ndarray, championIds: np.ndarray, slots: np.ndarray, itemIds: np.ndarray) -> np.ndarray:
+    '''
+    Return the keys of the groups (queue, champion, slot and item packed into one integer)
+    '''
+
+    groupKeys = np.zeros(len(queueIds), dtype = np.int64)
+    for groupLabels in (queueIds, championIds, slots, itemIds):
+        groupKeys = (groupKeys << const.TIMING_SKETCH_GROUP_BITS) | np.asarray(groupLabels).astype(np.int64)
+
+    return(groupKeys)
+
+
+##
+# Decode group keys
+def decodeGroupKeys(groupKeys: np.ndarray) -> pd.DataFrame:
+    '''
+    Return the queue, champion, slot and item of the group keys
+    '''
+
+    labelMask = 2**const.TIMING_SKETCH_GROUP_BITS - 1
+
+    return(pd.DataFrame({groupColumn: (groupKeys >> (const.TIMING_SKETCH_GROUP_BITS * (len(GROUP_COLUMNS) - 1 - i)))
+        & labelMask for i, groupColumn in enumerate(GROUP_COLUMNS)}))
+
+
+##
+# Values of a sketch
+def getTimingValues(sketchName: str, timestamps: np.ndarray, gameTimeSeconds: np.ndarray) -> np.ndarray:
+    '''
+    Convert the purchase times (milliseconds since the start of the game) to the values of a sketch,
+    either minutes or the share of the game duration
+    '''
+
+    if sketchName == const.TIMING_SKETCH_GAME_SHARE:
+        return(timestamps / (1000 * np.maximum(gameTimeSeconds, 1)))
+
+    return(timestamps / 60000)
+
+
+###
+# Classes
+
+##
+# Quantile sketch of the purchase times
+class TimingSketch:
+    '''
+    Counts of the values in logarithmic buckets per group. New groups extend the sketch when data is added
+    '''
+
+    def __init__(self, relativeAccuracy: float, minValue: float, maxValue: float,
+            groupKeys: Union[np.ndarray, None] = None, counts: Union[np.ndarray, None] = None,
+            nMatches: int = 0) -> None:
+        self.relativeAccuracy = relativeAccuracy
+        self.minValue = minValue
+        self.maxValue = maxValue
+
+        self.gamma = (1 + relativeAccuracy) / (1 - relativeAccuracy)
+        self.nBuckets = int(np.ceil(np.log(maxValue / minValue) / np.log(self.gamma))) + 1
+
+        self.groupKeys = groupKeys if groupKeys is not None else np.zeros(0, dtype = np.int64)
+        self.counts = counts if counts is not None else np.zeros((len(self.groupKeys), self.nBuckets), dtype = np.uint32)
+
+        self.nMatches = nMatches
+
+
+    ##
+    # Create a sketch from its name
+    @classmethod
+    def create(cls, sketchName: str, relativeAccuracy: float = const.TIMING_SKETCH_RELATIVE_ACCURACY) -> 'TimingSketch':
+        '''
+        Create an empty sketch with the range of values of the sketch (see const.TIMING_SKETCH_RANGES)
+        '''
+
+        minValue, maxValue = const.TIMING_SKETCH_RANGES[sketchName]
+
+        return(cls(relativeAccuracy = relativeAccuracy, minValue = minValue, maxValue = maxValue))
+
+
+    ##
+    # Compatibility of two sketches
+    def isCompatible(self, timingSketch: 'TimingSketch') -> bool:
+        '''
+        Check if another sketch has the same buckets (required to merge them)
+        '''
+
+        return(self.relativeAccuracy == timingSketch.relativeAccuracy and self.minValue == timingSketch.minValue
+            and self.maxValue == timingSketch.maxValue)
+
+
+    ##
+    # Buckets of values
+    def getBucketIndices(self, values: np.ndarray) -> np.ndarray:
+        '''
+        Return the buckets of the values (values below the range go to the first, above the range to the last bucket)
+        '''
+
+        with np.errstate(divide = 'ignore'):
+            bucketIndices = np.ceil(np.log(np.maximum(values, self.minValue) / self.minValue) / np.log(self.gamma))
+
+        return(np.minimum(bucketIndices, self.nBuckets - 1).astype(np.int64))
+
+
+    ##
+    # Values representing the buckets
+    def getBucketValues(self) -> np.ndarray:
+        '''
+        Return the value representing every bucket (relative error of at most alpha to all values of the
+        bucket, the first bucket is represented by the smallest value of the range)
+        '''
+
+        bucketValues = 2 * self.minValue * self.gamma**np.arange(self.nBuckets) / (self.gamma + 1)
+        bucketValues[0] = self.minValue
+
+        return(bucketValues)
+
+
+    ##
+    # Indices of groups
+    def getGroupIndices(self, groupKeys: np.ndarray) -> np.ndarray:
+        '''
+        Return the indices of the groups, extending the sketch by unknown groups
+        '''
+
+        uniqueGroupKeys = np.unique(groupKeys)
+
+        if not np.isin(uniqueGroupKeys, self.groupKeys).all():
+            newGroupKeys = np.union1d(self.groupKeys, uniqueGroupKeys)
+
+            newCounts = np.zeros((len(newGroupKeys), self.nBuckets), dtype = np.uint32)
+            newCounts[np.searchsorted(newGroupKeys, self.groupKeys)] = self.counts
+
+            self.groupKeys, self.counts = newGroupKeys, newCounts
+
+        return(np.searchsorted(self.groupKeys, groupKeys))
+
+
+    ##
+    # Add values
+    def add(self, groupKeys: np.ndarray, values: np.ndarray, nMatches: int) -> None:
+        '''
+        Count the values (one per group key) into the buckets of their groups
+        '''
+
+        self.nMatches += nMatches
+
+        if len(groupKeys) == 0:
+            return
+
+        groupIndices = self.getGroupIndices(groupKeys = groupKeys)
+        np.add.at(self.counts, (groupIndices, self.getBucketIndices(values = values)), 1)
+
+
+    ##
+    # Merge sketches
+    @classmethod
+    def merge(cls, timingSketches: Sequence['TimingSketch']) -> 'TimingSketch':
+        '''
+        Merge sketches with the same buckets (sum of the counts)
+        '''
+
+        for timingSketch in timingSketches[1:]:
+            if not timingSketches[0].isCompatible(timingSketch = timingSketch):
+                raise AssertionError('Sketches with different buckets can not be merged')
+
+        mergedSketch = cls(relativeAccuracy = timingSketches[0].relativeAccuracy, minValue = timingSketches[0].minValue,
+            maxValue = timingSketches[0].maxValue, nMatches = sum(timingSketch.nMatches for timingSketch in timingSketches))
+
+        mergedSketch.getGroupIndices(groupKeys = np.concatenate([timingSketch.groupKeys for timingSketch in timingSketches]))
+        for timingSketch in timingSketches:
+            mergedSketch.counts[np.searchsorted(mergedSketch.groupKeys, timingSketch.groupKeys)] += timingSketch.counts
+
+        return(mergedSketch)
+
+
+    ##
+    # Quantiles
+    def getQuantiles(self, quantiles: List[float] = const.TIMING_SKETCH_QUANTILES,
+            groupBy: List[str] = GROUP_COLUMNS) -> pd.DataFrame:
+        '''
+        Return the number of values N and the quantiles (columns Q_<quantile>) per group. The groups are
+        combined over the group columns which are not in groupBy (set to 0 in the result, e.g. Item 0
+        for the quantiles over all items of a slot)
+        '''
+
+        ###
+        # Combine the groups (sum of the bucket counts)
+        groupLabels = decodeGroupKeys(groupKeys = self.groupKeys)
+        for groupColumn in GROUP_COLUMNS:
+            if groupColumn not in groupBy:
+                groupLabels[groupColumn] = 0
+
+        combinedGroupKeys, combinedGroupIndices = np.unique(getGroupKeys(*(groupLabels[groupColumn].to_numpy()
+            for groupColumn in GROUP_COLUMNS)), return_inverse = True)
+
+        combinedCounts = np.zeros((len(combinedGroupKeys), self.nBuckets), dtype = np.int64)
+        np.add.at(combinedCounts, combinedGroupIndices, self.counts)
+
+
+        ###
+        # Quantiles: value of the first bucket whose cumulative count exceeds the rank of the quantile
+        cumulativeCounts = np.cumsum(combinedCounts, axis = 1)
+        groupTotals = cumulativeCounts[:, -1] if self.nBuckets > 0 else np.zeros(len(combinedGroupKeys), dtype = np.int64)
+        bucketValues = self.getBucketValues()
+
+        quantileTable = decodeGroupKeys(groupKeys = combinedGroupKeys).assign(N = groupTotals)
+        for quantile in quantiles:
+            ranks = quantile * (groupTotals - 1)
+            quantileTable['Q_{}'.format(quantile)] = bucketValues[np.minimum(
+                (cumulativeCounts <= ranks[:, np.newaxis]).sum(axis = 1), self.nBuckets - 1)]
+
+        return(quantileTable)
+
+
+    ##
+    # Save
+    def save(self, sketchPath: str) -> None:
+        '''
+        Save the sketch as npz file (temporary file which then replaces the old file)
+        '''
+
+        with open('{}{}'.format(sketchPath, const.PARTIAL_FILE_SUFFIX), 'wb') as sketchFile:
+            np.savez_compressed(sketchFile, RelativeAccuracy = self.relativeAccuracy, MinValue = self.minValue,
+                MaxValue = self.maxValue, GroupKeys = self.groupKeys, Counts = self.counts, NMatches = self.nMatches)
+
+        os.replace('{}{}'.format(sketchPath, const.PARTIAL_FILE_SUFFIX), sketchPath)
+
+
+    ##
+    # Load
+    @classmethod
+    def load(cls, sketchPath: str) -> 'TimingSketch':
+        '''
+        Load a sketch saved with save
+        '''
+
+        with np.load(sketchPath) as sketchFile:
+            return(cls(relativeAccuracy = float(sketchFile['RelativeAccuracy']), minValue = float(sketchFile['MinValue']),
+                maxValue = float(sketchFile['MaxValue']), groupKeys = sketchFile['GroupKeys'],
+                counts = sketchFile['Counts'], nMatches = int(sketchFile['NMatches'])))
+
+
+###
+# Functions
+
+##
+# Path of a sketch
+def getTimingSketchPath(sketchName: str, region: str) -> str:
+    '''
+    Return the path of a timing sketch of a region
+    '''
+
+    return('{}{}'.format(const.FOLDER_TIMING_SKETCHES, const.TIMING_SKETCH_FILE.format(sketch = sketchName,
+        region = region, dateFrom = const.EARLIEST_DATE_FOR_GAMES, dateTo = const.LATEST_DATE_FOR_GAMES)))
+
+
+##
+# Empty sketches
+def createEmptyTimingSketches() -> Dict[str, TimingSketch]:
+    '''
+    Create the empty sketches (one per entry of const.TIMING_SKETCH_RANGES)
+    '''
+
+    return({sketchName: TimingSketch.create(sketchName = sketchName) for sketchName in const.TIMING_SKETCH_RANGES})
+
+
+##
+# Load the sketches of a region
+def loadTimingSketches(region: str, nMatches: int) -> Union[Dict[str, TimingSketch], None]:
+    '''
+    Load the sketches of a region. Returns None if one is missing, does not contain the given number of
+    matches or has other buckets, the sketches then have to be rebuilt from the extracted data
+    '''
+
+    timingSketches = createEmptyTimingSketches()
+
+    if nMatches == 0:
+        return(timingSketches)
+
+    for sketchName, emptySketch in timingSketches.items():
+        sketchPath = getTimingSketchPath(sketchName = sketchName, region = region)
+        if not os.path.isfile(sketchPath):
+            logger.info('Timing sketch %s of region %s does not exist', sketchName, region)
+            return(None)
+
+        timingSketches[sketchName] = TimingSketch.load(sketchPath = sketchPath)
+
+        if timingSketches[sketchName].nMatches != nMatches or not timingSketches[sketchName].isCompatible(
+                timingSketch = emptySketch):
+            logger.info('Timing sketch %s of region %s does not match the extracted data', sketchName, region)
+            return(None)
+
+    return(timingSketches)
+
+
+##
+# Save the sketches of a region
+def saveTimingSketches(region: str, timingSketches: Dict[str, TimingSketch]) -> None:
+    '''
+    Save the sketches of a region
+    '''
+
+    os.makedirs(const.FOLDER_TIMING_SKETCHES, exist_ok = True)
+
+    for sketchName, timingSketch in timingSketches.items():
+        timingSketch.save(sketchPath = getTimingSketchPath(sketchName = sketchName, region = region))
+
+
+    ###
+    # End of function
+    return
+
+
+##
+# Update the sketches
+def updateTimingSketches(timingSketches: Dict[str, TimingSketch], firstMythicItem: pd.DataFrame,
+        legendaryAndMythicItems: pd.DataFrame, nMatches: int) -> None:
+    '''
+    Add a chunk of extracted data (nMatches matches) to the sketches: the time of the first mythic item
+    (slot 0, participants without mythic item are skipped) and the times of the first 5 legendary/mythic
+    items (slots 1 to 5)
+    '''
+
+    ###
+    # Groups and purchase times of the first mythic items and the legendary/mythic items
+    firstMythicItem = firstMythicItem.loc[firstMythicItem['Mythic'].to_numpy(dtype = np.int64) != 0]
+    _, slotIndices = dataProcessing.getParticipantSlots(legendaryAndMythicItems = legendaryAndMythicItems)
+
+    groupKeys = np.concatenate([
+        getGroupKeys(queueIds = firstMythicItem['Queue'].to_numpy(), championIds = firstMythicItem['Champion'].to_numpy(),
+            slots = np.full(firstMythicItem.shape[0], const.TIMING_SKETCH_FIRST_MYTHIC_SLOT),
+            itemIds = firstMythicItem['Mythic'].to_numpy()),
+        getGroupKeys(queueIds = legendaryAndMythicItems['Queue'].to_numpy(),
+            championIds = legendaryAndMythicItems['Champion'].to_numpy(), slots = slotIndices + 1,
+            itemIds = legendaryAndMythicItems['Item'].to_numpy())])
+
+    timestamps = np.concatenate([firstMythicItem['Timestamp'].to_numpy(dtype = np.float64),
+        legendaryAndMythicItems['Timestamp'].to_numpy(dtype = np.float64)])
+    gameTimeSeconds = np.concatenate([firstMythicItem['GameTimeSeconds'].to_numpy(dtype = np.float64),
+        legendaryAndMythicItems['GameTimeSeconds'].to_numpy(dtype = np.float64)])
+
+
+    ###
+    # Add the values of every sketch
+    for sketchName, timingSketch in timingSketches.items():
+        timingSketch.add(groupKeys = groupKeys, values = getTimingValues(sketchName = sketchName, timestamps = timestamps,
+            gameTimeSeconds = gameTimeSeconds), nMatches = nMatches)
+
+
+    ###
+    # End of function
+    return
+
+
+##
+# Merge the sketches of several regions
+def loadMergedTimingSketches(regions: List[str]) -> Dict[str, TimingSketch]:
+    '''
+    Load and merge the sketches of several regions
+    '''
+
+    return({sketchName: TimingSketch.merge([TimingSketch.load(sketchPath = getTimingSketchPath(sketchName = sketchName,
+        region = region)) for region in regions]) for sketchName in const.TIMING_SKETCH_RANGES})
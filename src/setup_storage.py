@@ -0,0 +1,92 @@
+'''
+
+Script to set up the storage layout of the MongoDB collections of the regions (see ressources/storage_layout.py):
+creates the missing collections with block compression and the indexes of the match collection, optionally
+migrates the existing collections in place to the block compressor and reports the size, compression and index
+statistics of the collections (and optionally the duration of the reads of the extraction) before and after.
+
+The crawler (get_data_from_api.py) creates its collections in the same way, so this script is only needed to
+migrate existing databases or to look at the statistics. Do not run the crawler or the extraction during a
+migration.
+
+'''
+
+
+###
+# Imports
+import logging
+
+from pymongo import database
+
+
+###
+# Load ressources
+try:
+    import src.ressources.mongodb as mongodb
+    import src.ressources.storage_layout as storageLayout
+except Exception:
+    import ressources.mongodb as mongodb
+    import ressources.storage_layout as storageLayout
+
+
+###
+# Logging
+logging.basicConfig(level = 'INFO') # Set to DEBUG for more informations
+logger = logging.getLogger(__name__)
+
+
+###
+# Set run-specific constants
+REGIONS = ['euw1', 'na1']
+
+# Migrate the existing collections with another block compressor (copies the data of every collection once)
+MIGRATE_COLLECTIONS = False
+
+# Time the reads of the extraction (window query, queue query and full scan of the matches) before and after
+TIME_READS = False
+
+
+###
+# Functions
+
+##
+# Report the statistics of a region
+def reportRegionStatistics(mongoDbDatabase: database.Database, region: str, stage: str) -> None:
+    '''
+    Log the size, compression and index statistics of the collections of a region (and the duration of the reads)
+    '''
+
+    for collectionStatistics in storageLayout.getRegionStatistics(mongoDbDatabase = mongoDbDatabase, region = region):
+        logger.info('%s %s: %i documents, %.1f MB data, %.1f MB on disk (ratio %.2f, %s), indexes %.1f MB (%s)', stage,
+            collectionStatistics['Collection'], collectionStatistics['Documents'], collectionStatistics['Size'] / 2**20,
+            collectionStatistics['StorageSize'] / 2**20, collectionStatistics['CompressionRatio'],
+            collectionStatistics['BlockCompressor'], collectionStatistics['IndexSize'] / 2**20,
+            ', '.join('{} {:.1f} MB'.format(indexName, indexSize / 2**20) for indexName, indexSize
+                in collectionStatistics['IndexSizes'].items()))
+
+    if TIME_READS:
+        logger.info('%s reads of region %s: %s', stage, region, ', '.join('{} {:.3f}'.format(readName, readDuration)
+            for readName, readDuration in storageLayout.timeReads(mongoDbDatabase = mongoDbDatabase,
+                region = region).items()))
+
+
+###
+# Main loop
+if __name__ == '__main__':
+    mongoDbClient, mongoDbDatabase = mongodb.setupClientAndDatabase()
+
+    for region in REGIONS:
+        reportRegionStatistics(mongoDbDatabase = mongoDbDatabase, region = region, stage = 'Before')
+
+        if MIGRATE_COLLECTIONS:
+            migratedCollections = storageLayout.migrateRegion(mongoDbDatabase = mongoDbDatabase, region = region)
+            logger.info('Region %s: %i collections migrated (%s)', region, len(migratedCollections),
+                ', '.join(migratedCollections))
+
+        else:
+            createdCollections = storageLayout.setupCollections(mongoDbDatabase = mongoDbDatabase, region = region)
+            logger.info('Region %s: %i collections created', region, len(createdCollections))
+
+        reportRegionStatistics(mongoDbDatabase = mongoDbDatabase, region = region, stage = 'After')
+
+    mongoDbClient.close()